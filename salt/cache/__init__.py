@@ -7,7 +7,9 @@ Loader mechanism for caching data, with data expiration, etc.
 
 # Import Python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import itertools
 import logging
+import os
 import time
 
 # Import Salt libs
@@ -17,9 +19,20 @@ from salt.payload import Serial
 from salt.utils.odict import OrderedDict
 import salt.loader
 import salt.syspaths
+import salt.utils.event
 
 log = logging.getLogger(__name__)
 
+# The tag of the events which tell the processes of the master to drop their
+# memcache values of the keys that another process stored or flushed
+INVALIDATE_TAG = 'salt/cache/memcache/invalidate'
+
+_STATS = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0,
+          'resets': 0}
+
+# The number of keys fetched by each fetch_many of iter_many
+FETCH_CHUNK_SIZE = 1000
+
 
 def factory(opts, **kwargs):
     '''
@@ -179,6 +192,117 @@ class Cache(object):
         fun = '{0}.fetch'.format(self.driver)
         return self.modules[fun](bank, key, **self._kwargs)
 
+    def store_many(self, items):
+        '''
+        Store the data of many keys at once, in a single request to the cache
+        backend if the driver supports it
+
+        .. versionadded:: Fluorine
+
+        :param items:
+            An iterable of ``(bank, key, data)`` tuples, each of which is
+            stored like :py:meth:`store` would store it.
+
+        :raises SaltCacheError:
+            Raises an exception if cache driver detected an error accessing data
+            in the cache backend (auth, permissions, etc).
+        '''
+        items = list(items)
+        fun = '{0}.store_many'.format(self.driver)
+        if fun in self.modules:
+            return self.modules[fun](items, **self._kwargs)
+        fun = '{0}.store'.format(self.driver)
+        for bank, key, data in items:
+            self.modules[fun](bank, key, data, **self._kwargs)
+
+    def fetch_many(self, bank_keys):
+        '''
+        Fetch the data of many keys at once, in a single request to the cache
+        backend if the driver supports it
+
+        .. versionadded:: Fluorine
+
+        :param bank_keys:
+            An iterable of ``(bank, key)`` tuples.
+
+        :return:
+            Return a dict of the data of each ``(bank, key)`` tuple, which is
+            an empty dict if the key was not found, as with :py:meth:`fetch`.
+
+        :raises SaltCacheError:
+            Raises an exception if cache driver detected an error accessing data
+            in the cache backend (auth, permissions, etc).
+        '''
+        bank_keys = list(bank_keys)
+        fun = '{0}.fetch_many'.format(self.driver)
+        if fun in self.modules:
+            return self.modules[fun](bank_keys, **self._kwargs)
+        fun = '{0}.fetch'.format(self.driver)
+        return dict(((bank, key), self.modules[fun](bank, key, **self._kwargs))
+                    for bank, key in bank_keys)
+
+    def iter_many(self, bank_keys, chunk_size=FETCH_CHUNK_SIZE):
+        '''
+        Fetch the data of many keys like :py:meth:`fetch_many`, but only
+        ``chunk_size`` keys at a time, so that the data of all the keys is
+        never held in memory at once
+
+        .. versionadded:: Fluorine
+
+        :param bank_keys:
+            An iterable of ``(bank, key)`` tuples.
+
+        :return:
+            Yield a ``((bank, key), data)`` tuple for each of ``bank_keys``,
+            in order. The data is None if the driver did not return any.
+
+        :raises SaltCacheError:
+            Raises an exception if cache driver detected an error accessing data
+            in the cache backend (auth, permissions, etc).
+        '''
+        bank_keys = iter(bank_keys)
+        while True:
+            chunk = list(itertools.islice(bank_keys, chunk_size))
+            if not chunk:
+                return
+            data = self.fetch_many(chunk)
+            for bank_key in chunk:
+                yield bank_key, data.get(bank_key)
+
+    def list_with_data(self, bank, key):
+        '''
+        Fetch the data of the key in each of the banks within a bank, like
+        the ``data`` key of every minion under the ``minions`` bank
+
+        .. versionadded:: Fluorine
+
+        :param bank:
+            The name of the location inside the cache which holds the banks.
+
+        :param key:
+            The name of the key to fetch from each bank within ``bank``.
+
+        :return:
+            Return a dict of the data of the key by the name of the bank it
+            was found in. The banks without the key are left out.
+
+        :raises SaltCacheError:
+            Raises an exception if cache driver detected an error accessing data
+            in the cache backend (auth, permissions, etc).
+        '''
+        fun = '{0}.list_with_data'.format(self.driver)
+        if fun in self.modules:
+            return self.modules[fun](bank, key, **self._kwargs)
+        names = self.list(bank)
+        data = self.fetch_many(('{0}/{1}'.format(bank, name), key)
+                               for name in names)
+        ret = {}
+        for name in names:
+            item = data.get(('{0}/{1}'.format(bank, name), key))
+            if item:
+                ret[name] = item
+        return ret
+
     def updated(self, bank, key):
         '''
         Get the last updated epoch for the specified key
@@ -273,16 +397,37 @@ class MemCache(Cache):
     '''
     Short-lived in-memory cache store keeping values on time and/or size (count)
     basis.
+
+    The values are kept in the memory of the process, and the least recently
+    used one is evicted when there are more than ``memcache_max_items`` of
+    them. With ``memcache_event_invalidation`` enabled on the master, each
+    store or flush fires an event, and the other processes drop their copy of
+    the value before their next lookup. The events of each process are
+    numbered, and a process which missed any of them drops all its values.
     '''
     # {<storage_id>: odict({<key>: [atime, data], ...}), ...}
     data = {}
 
+    # The events which the processes of this master use to keep their
+    # values up to date with each other
+    _event = None
+    _listener = None
+    # The start time and number of the last event fired by this process
+    _started = None
+    _seq = 0
+    # When this process started listening, and the number of the last event
+    # received from each (pid, start) of the other processes
+    _listening_since = None
+    _senders = {}
+
     def __init__(self, opts, **kwargs):
         super(MemCache, self).__init__(opts, **kwargs)
         self.expire = opts.get('memcache_expire_seconds', 10)
         self.max = opts.get('memcache_max_items', 1024)
         self.cleanup = opts.get('memcache_full_cleanup', False)
         self.debug = opts.get('memcache_debug', False)
+        self.invalidate = opts.get('memcache_event_invalidation', False) \
+            and opts.get('__role') == 'master'
         if self.debug:
             self.call = 0
             self.hit = 0
@@ -295,6 +440,7 @@ class MemCache(Cache):
             for key, data in list(storage.items()):
                 if data[0] + expire < now:
                     del storage[key]
+                    _count('evictions')
                 else:
                     break
 
@@ -314,13 +460,127 @@ class MemCache(Cache):
             self._storage = MemCache.data[storage_id]
         return self._storage
 
+    def _evict(self):
+        if len(self.storage) >= self.max:
+            if self.cleanup:
+                MemCache.__cleanup(self.expire)
+            if len(self.storage) >= self.max:
+                self.storage.popitem(last=False)
+                _count('evictions')
+
+    def _drop(self, bank, key):
+        '''
+        Forget the value of the key, or of every key in the bank and the banks
+        within it if ``key`` is None
+        '''
+        if key is not None:
+            return self.storage.pop((bank, key), None) is not None
+        prefix = bank + '/'
+        dropped = [bank_key for bank_key in self.storage
+                   if bank_key[0] == bank or bank_key[0].startswith(prefix)]
+        for bank_key in dropped:
+            del self.storage[bank_key]
+        return bool(dropped)
+
+    def _notify(self, items):
+        '''
+        Tell the other processes of the master that the keys in ``items``, a
+        list of ``(bank, key)`` tuples, were stored or flushed
+        '''
+        if not self.invalidate:
+            return
+        try:
+            if MemCache._event is None:
+                MemCache._event = salt.utils.event.get_master_event(
+                    self.opts, self.opts['sock_dir'], listen=False)
+                MemCache._started = time.time()
+                MemCache._seq = 0
+            MemCache._seq += 1
+            MemCache._event.fire_event(
+                {'storage': self._get_storage_id(),
+                 'pid': os.getpid(),
+                 'start': MemCache._started,
+                 'seq': MemCache._seq,
+                 'items': items},
+                INVALIDATE_TAG)
+        except Exception as exc:
+            log.error('Unable to fire the memcache invalidation event: %s', exc)
+
+    def _apply_invalidations(self):
+        '''
+        Drop the values which other processes of the master stored or flushed
+        since the last lookup
+        '''
+        if not self.invalidate:
+            return
+        try:
+            if MemCache._listener is None:
+                MemCache._listener = salt.utils.event.get_master_event(
+                    self.opts, self.opts['sock_dir'], listen=True)
+                MemCache._listener.subscribe_prefixes([INVALIDATE_TAG])
+                MemCache._listening_since = time.time()
+                MemCache._senders = {}
+            # Read every event received so far. get_event() would stop at
+            # the first one with another tag, which the publisher still sends
+            # when it does not filter by prefix.
+            while True:
+                event = MemCache._listener.get_event_noblock()
+                if event is None:
+                    break
+                if event['tag'] != INVALIDATE_TAG:
+                    continue
+                data = event['data']
+                if data.get('pid') == os.getpid():
+                    continue
+                if self._missed(data):
+                    # The event bus dropped invalidations, e.g. because of
+                    # ipc_subscriber_hwm, so no value can be trusted
+                    log.warning('Missed memcache invalidation events, '
+                                'clearing the memcache')
+                    for storage in six.itervalues(MemCache.data):
+                        storage.clear()
+                    _count('resets')
+                if data.get('storage') != self._get_storage_id():
+                    continue
+                for bank, key in data.get('items', ()):
+                    if self._drop(bank, key):
+                        _count('invalidations')
+        except Exception as exc:
+            # Do not keep serving values which can no longer be kept up to
+            # date
+            log.error(
+                'Unable to read the memcache invalidation events, clearing '
+                'the memcache: %s', exc
+            )
+            self.storage.clear()
+
+    @staticmethod
+    def _missed(data):
+        '''
+        Return whether invalidation events of the sender of ``data`` were
+        missed before it
+        '''
+        seq = data.get('seq')
+        if seq is None:
+            return False
+        sender = (data.get('pid'), data.get('start'))
+        last = MemCache._senders.get(sender)
+        MemCache._senders[sender] = seq
+        if last is None:
+            # The first event of a sender which started firing after this
+            # process started listening has to be its first one
+            return seq != 1 and data.get('start', 0) > MemCache._listening_since
+        return seq != last + 1
+
     def fetch(self, bank, key):
+        self._apply_invalidations()
         if self.debug:
             self.call += 1
         now = time.time()
         record = self.storage.pop((bank, key), None)
         # Have a cached value for the key
         if record is not None and record[0] + self.expire >= now:
+            _count('hits')
             if self.debug:
                 self.hit += 1
                 log.debug(
@@ -333,25 +593,78 @@ class MemCache(Cache):
             return record[1]
 
         # Have no value for the key or value is expired
+        _count('misses')
         data = super(MemCache, self).fetch(bank, key)
-        if len(self.storage) >= self.max:
-            if self.cleanup:
-                MemCache.__cleanup(self.expire)
-            if len(self.storage) >= self.max:
-                self.storage.popitem(last=False)
+        self._evict()
         self.storage[(bank, key)] = [now, data]
         return data
 
     def store(self, bank, key, data):
         self.storage.pop((bank, key), None)
         super(MemCache, self).store(bank, key, data)
-        if len(self.storage) >= self.max:
-            if self.cleanup:
-                MemCache.__cleanup(self.expire)
-            if len(self.storage) >= self.max:
-                self.storage.popitem(last=False)
+        self._notify([(bank, key)])
+        self._evict()
         self.storage[(bank, key)] = [time.time(), data]
 
+    def _remember(self, items, now):
+        for bank, key, data in items:
+            self.storage.pop((bank, key), None)
+            self._evict()
+            self.storage[(bank, key)] = [now, data]
+
+    def fetch_many(self, bank_keys):
+        self._apply_invalidations()
+        now = time.time()
+        ret = {}
+        missing = []
+        for bank_key in bank_keys:
+            record = self.storage.pop(bank_key, None)
+            if record is not None and record[0] + self.expire >= now:
+                record[0] = now
+                self.storage[bank_key] = record
+                ret[bank_key] = record[1]
+            else:
+                missing.append(bank_key)
+        _count('hits', len(ret))
+        _count('misses', len(missing))
+        if self.debug:
+            self.call += len(ret) + len(missing)
+            self.hit += len(ret)
+        if missing:
+            data = super(MemCache, self).fetch_many(missing)
+            for bank_key in missing:
+                ret[bank_key] = data.get(bank_key, {})
+            self._remember(((bank, key, ret[(bank, key)])
+                            for bank, key in missing), now)
+        return ret
+
+    def store_many(self, items):
+        items = list(items)
+        for bank, key, _ in items:
+            self.storage.pop((bank, key), None)
+        super(MemCache, self).store_many(items)
+        self._notify([(bank, key) for bank, key, _ in items])
+        self._remember(items, time.time())
+
     def flush(self, bank, key=None):
-        self.storage.pop((bank, key), None)
+        self._drop(bank, key)
         super(MemCache, self).flush(bank, key)
+        self._notify([(bank, key)])
+
+
+def _count(name, count=1):
+    _STATS[name] += count
+
+
+def pop_stats():
+    '''
+    Return and reset the hits, misses, evictions, invalidations and resets
+    after missed invalidations of the memcache of this process, or None if
+    it was not used
+    '''
+    global _STATS  # pylint: disable=global-statement
+    stats = _STATS
+    if not any(six.itervalues(stats)):
+        return None
+    _STATS = dict.fromkeys(stats, 0)
+    return stats
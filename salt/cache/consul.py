@@ -168,6 +168,28 @@ def list_(bank):
     return keys
 
 
+def list_with_data(bank, key):
+    '''
+    Fetch the key value of each bank within the specified bank, with one
+    recursive read of the bank.
+    '''
+    try:
+        _, values = api.kv.get(bank + '/', recurse=True)
+    except Exception as exc:
+        raise SaltCacheError(
+            'There was an error getting the key "{0}": {1}'.format(
+                bank, exc
+            )
+        )
+    ret = {}
+    for value in values or []:
+        name, _, c_key = value['Key'][len(bank) + 1:].partition('/')
+        if c_key != key or value['Value'] is None:
+            continue
+        ret[name] = __context__['serial'].loads(value['Value'])
+    return ret
+
+
 def contains(bank, key):
     '''
     Checks if the specified bank contains the specified key.
@@ -17,6 +17,7 @@ import os.path
 import errno
 import shutil
 import tempfile
+import threading
 
 from salt.exceptions import SaltCacheError
 import salt.utils.atomicfile
@@ -26,6 +27,11 @@ log = logging.getLogger(__name__)
 
 __func_alias__ = {'list_': 'list'}
 
+# The number of threads which read the files of a fetch_many, and the number
+# of files below which they are read in the calling thread
+_FETCH_WORKERS = 8
+_FETCH_PARALLEL_MIN = 16
+
 
 def __cachedir(kwargs=None):
     if kwargs and 'cachedir' in kwargs:
@@ -100,6 +106,39 @@ def fetch(bank, key, cachedir):
         )
 
 
+def fetch_many(bank_keys, cachedir):
+    '''
+    Fetch information from many files, reading them in parallel.
+    '''
+    ret = {}
+    if len(bank_keys) < _FETCH_PARALLEL_MIN:
+        for bank, key in bank_keys:
+            ret[(bank, key)] = fetch(bank, key, cachedir)
+        return ret
+
+    errors = []
+
+    def _fetch(chunk):
+        try:
+            for bank, key in chunk:
+                ret[(bank, key)] = fetch(bank, key, cachedir)
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = []
+    for idx in range(_FETCH_WORKERS):
+        thread = threading.Thread(target=_fetch,
+                                  args=(bank_keys[idx::_FETCH_WORKERS],))
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+    return ret
+
+
 def updated(bank, key, cachedir):
     '''
     Return the epoch of the mtime for this cache file
@@ -70,6 +70,9 @@ from salt.exceptions import SaltCacheError
 _DEFAULT_DATABASE_NAME = "salt_cache"
 _DEFAULT_CACHE_TABLE_NAME = "cache"
 _RECONNECT_INTERVAL_SEC = 0.050
+# The number of keys read or written by each query of fetch_many and
+# store_many
+_BULK_SIZE = 1000
 
 log = logging.getLogger(__name__)
 client = None
@@ -207,6 +210,62 @@ def fetch(bank, key):
     return __context__['serial'].loads(r[0])
 
 
+def store_many(items):
+    '''
+    Store many key values, with one query per ``_BULK_SIZE`` keys.
+    '''
+    _init_client()
+    for idx in range(0, len(items), _BULK_SIZE):
+        values = ', '.join(
+            "('{0}', '{1}', '{2}')".format(
+                bank, key, __context__['serial'].dumps(data))
+            for bank, key, data in items[idx:idx + _BULK_SIZE])
+        query = "REPLACE INTO {0} (bank, etcd_key, data) values {1}".format(
+            _table_name, values)
+        cur, _ = run_query(client, query)
+        cur.close()
+
+
+def fetch_many(bank_keys):
+    '''
+    Fetch many key values, with one query per ``_BULK_SIZE`` keys.
+    '''
+    _init_client()
+    ret = dict((bank_key, {}) for bank_key in bank_keys)
+    for idx in range(0, len(bank_keys), _BULK_SIZE):
+        values = ', '.join(
+            "('{0}', '{1}')".format(bank, key)
+            for bank, key in bank_keys[idx:idx + _BULK_SIZE])
+        query = "SELECT bank, etcd_key, data FROM {0} " \
+            "WHERE (bank, etcd_key) IN ({1})".format(_table_name, values)
+        cur, _ = run_query(client, query)
+        for bank, key, data in cur.fetchall():
+            ret[(bank, key)] = __context__['serial'].loads(data)
+        cur.close()
+    return ret
+
+
+def list_with_data(bank, key):
+    '''
+    Fetch the key value of each bank within the specified bank, with one
+    query.
+    '''
+    _init_client()
+    query = "SELECT bank, data FROM {0} WHERE bank LIKE '{1}/%' " \
+        "AND etcd_key='{2}'".format(_table_name, bank, key)
+    cur, _ = run_query(client, query)
+    ret = {}
+    prefix = '{0}/'.format(bank)
+    for row_bank, data in cur.fetchall():
+        name = row_bank[len(prefix):]
+        # LIKE matches the banks nested further down as well
+        if not row_bank.startswith(prefix) or '/' in name:
+            continue
+        ret[name] = __context__['serial'].loads(data)
+    cur.close()
+    return ret
+
+
 def flush(bank, key=None):
     '''
     Remove the key from the cache bank with all the key content.
@@ -379,6 +379,52 @@ def fetch(bank, key):
     return __context__['serial'].loads(redis_value)
 
 
+def store_many(items):
+    '''
+    Store the data of many keys, using one pipelined request.
+    '''
+    redis_server = _get_redis_server()
+    redis_pipe = redis_server.pipeline()
+    try:
+        for bank, key, data in items:
+            _build_bank_hier(bank, redis_pipe)
+            redis_pipe.set(_get_key_redis_key(bank, key),
+                           __context__['serial'].dumps(data))
+            redis_pipe.sadd(_get_bank_keys_redis_key(bank), key)
+        log.debug('Setting the values of %d keys', len(items))
+        redis_pipe.execute()
+    except (RedisConnectionError, RedisResponseError) as rerr:
+        mesg = 'Cannot set {count} Redis cache keys: {rerr}'.format(count=len(items),
+                                                                    rerr=rerr)
+        log.error(mesg)
+        raise SaltCacheError(mesg)
+
+
+def fetch_many(bank_keys):
+    '''
+    Fetch the data of many keys from the Redis cache, using one pipelined
+    request.
+    '''
+    redis_server = _get_redis_server()
+    redis_pipe = redis_server.pipeline()
+    for bank, key in bank_keys:
+        redis_pipe.get(_get_key_redis_key(bank, key))
+    try:
+        redis_values = redis_pipe.execute()
+    except (RedisConnectionError, RedisResponseError) as rerr:
+        mesg = 'Cannot fetch {count} Redis cache keys: {rerr}'.format(count=len(bank_keys),
+                                                                      rerr=rerr)
+        log.error(mesg)
+        raise SaltCacheError(mesg)
+    ret = {}
+    for bank_key, redis_value in zip(bank_keys, redis_values):
+        if redis_value is None:
+            ret[bank_key] = {}
+        else:
+            ret[bank_key] = __context__['serial'].loads(redis_value)
+    return ret
+
+
 def flush(bank, key=None):
     '''
     Remove the key from the cache bank with all the key content. If no key is specified, remove
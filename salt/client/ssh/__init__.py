@@ -21,6 +21,7 @@ import tempfile
 import binascii
 import sys
 import datetime
+import contextlib
 
 # Import salt libs
 import salt.output
@@ -55,6 +56,7 @@ from salt.template import compile_template
 # Import 3rd-party libs
 from salt.ext import six
 from salt.ext.six.moves import input  # pylint: disable=import-error,redefined-builtin
+from salt.ext.six.moves import queue  # pylint: disable=import-error
 try:
     import saltwinshell
     HAS_WINSHELL = True
@@ -322,6 +324,8 @@ class SSH(object):
                                              python3_bin=self.opts['python3_bin'],
                                              extended_cfg=self.opts.get('ssh_ext_alternatives'))
         self.mods = mod_data(self.fsclient)
+        # The seconds each host spent in the phases of its routine
+        self.timing = {}
 
     def _get_roster(self):
         '''
@@ -515,6 +519,8 @@ class SSH(object):
                 **target)
         ret = {'id': single.id}
         stdout, stderr, retcode = single.run()
+        ret['timing'] = single.timing
+        ret['done'] = time.time()
         # This job is done, yield
         try:
             data = salt.utils.json.find_json(stdout)
@@ -534,11 +540,132 @@ class SSH(object):
             }
         que.put(ret)
 
+    def _prep_target(self, host):
+        '''
+        Fill in the defaults of the target of the host. Returns the return of
+        the host if it can not be run, None otherwise.
+        '''
+        for default in self.defaults:
+            if default not in self.targets[host]:
+                self.targets[host][default] = self.defaults[default]
+        if 'host' not in self.targets[host]:
+            self.targets[host]['host'] = host
+        if self.targets[host].get('winrm') and not HAS_WINSHELL:
+            log_msg = 'Please contact sales@saltstack.com for access to the enterprise saltwinshell module.'
+            log.debug(log_msg)
+            return {'fun_args': [],
+                    'jid': None,
+                    'return': log_msg,
+                    'retcode': 1,
+                    'fun': '',
+                    'id': host}
+        return None
+
+    def _keep_timing(self, ret):
+        '''
+        Keep the time the host which returned ``ret`` spent in each phase
+        '''
+        timing = ret.get('timing')
+        if timing is None:
+            return
+        timing['return'] = time.time() - ret['done']
+        self.timing[ret['id']] = timing
+        log.debug(
+            'Phases of the routine of %s: %s',
+            ret['id'],
+            ', '.join(['{0} {1:.3f}s'.format(phase, timing[phase])
+                       for phase in ('connect', 'deploy', 'execute', 'return')
+                       if phase in timing]))
+
+    def handle_pool_routine(self, tasks, que, opts, mine, worker):
+        '''
+        Run the routines of the hosts taken from ``tasks`` one after another,
+        until None is taken
+        '''
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            host, target = task
+            que.put({'started': host, 'worker': worker})
+            try:
+                self.handle_routine(que, opts, host, target, mine)
+            except Exception as exc:
+                error = ('Target \'{0}\' did not return any data, '
+                         'probably due to an error: {1}').format(host, exc)
+                log.error(error, exc_info_on_loglevel=logging.DEBUG)
+                que.put({'id': host, 'ret': error})
+
+    def handle_ssh_pool(self, mine=False):
+        '''
+        Execute the routines in a pool of ``ssh_max_procs`` processes, which
+        are started once and run the routines of many hosts each
+        '''
+        if not self.targets:
+            log.error('No matching targets found in roster.')
+            return
+        que = multiprocessing.Queue()
+        tasks = multiprocessing.Queue()
+        pending = set()
+        for host in self.targets:
+            no_ret = self._prep_target(host)
+            if no_ret is not None:
+                yield {host: no_ret}
+                continue
+            tasks.put((host, self.targets[host]))
+            pending.add(host)
+        workers = {}
+        for worker in range(min(self.opts.get('ssh_max_procs', 25), len(pending))):
+            tasks.put(None)
+            routine = MultiprocessingProcess(
+                            target=self.handle_pool_routine,
+                            args=(tasks, que, self.opts, mine, worker))
+            routine.start()
+            workers[worker] = routine
+        # The host each worker is running the routine of
+        running = {}
+        while pending:
+            try:
+                ret = que.get(timeout=0.1)
+            except queue.Empty:
+                ret = None
+            if ret is None:
+                lost = set()
+                for worker in list(workers):
+                    if not workers[worker].is_alive():
+                        workers.pop(worker).join()
+                        if running.get(worker) in pending:
+                            lost.add(running[worker])
+                if not workers:
+                    # Nothing is left to run the routines which did not start
+                    lost.update(pending)
+                for host in sorted(lost):
+                    error = ('Target \'{0}\' did not return any data, '
+                             'probably due to an error.').format(host)
+                    log.error(error)
+                    pending.discard(host)
+                    yield {host: error}
+                continue
+            if 'started' in ret:
+                running[ret['worker']] = ret['started']
+                continue
+            if ret['id'] not in pending:
+                continue
+            pending.discard(ret['id'])
+            self._keep_timing(ret)
+            yield {ret['id']: ret['ret']}
+        for routine in six.itervalues(workers):
+            routine.join()
+
     def handle_ssh(self, mine=False):
         '''
         Spin up the needed threads or processes and execute the subsequent
         routines
         '''
+        if self.opts.get('ssh_worker_pool'):
+            for ret in self.handle_ssh_pool(mine=mine):
+                yield ret
+            return
         que = multiprocessing.Queue()
         running = {}
         target_iter = self.targets.__iter__()
@@ -555,22 +682,10 @@ class SSH(object):
                 except StopIteration:
                     init = True
                     continue
-                for default in self.defaults:
-                    if default not in self.targets[host]:
-                        self.targets[host][default] = self.defaults[default]
-                if 'host' not in self.targets[host]:
-                    self.targets[host]['host'] = host
-                if self.targets[host].get('winrm') and not HAS_WINSHELL:
+                no_ret = self._prep_target(host)
+                if no_ret is not None:
                     returned.add(host)
                     rets.add(host)
-                    log_msg = 'Please contact sales@saltstack.com for access to the enterprise saltwinshell module.'
-                    log.debug(log_msg)
-                    no_ret = {'fun_args': [],
-                              'jid': None,
-                              'return': log_msg,
-                              'retcode': 1,
-                              'fun': '',
-                              'id': host}
                     yield {host: no_ret}
                     continue
                 args = (
@@ -591,6 +706,7 @@ class SSH(object):
                 ret = que.get(False)
                 if 'id' in ret:
                     returned.add(ret['id'])
+                    self._keep_timing(ret)
                     yield {ret['id']: ret['ret']}
             except Exception:
                 # This bare exception is here to catch spurious exceptions
@@ -608,6 +724,7 @@ class SSH(object):
                                 ret = que.get(False)
                                 if 'id' in ret:
                                     returned.add(ret['id'])
+                                    self._keep_timing(ret)
                                     yield {ret['id']: ret['ret']}
                         except Exception:
                             pass
@@ -662,7 +779,7 @@ class SSH(object):
             }
 
         # save load to the master job cache
-        if self.opts['master_job_cache'] == 'local_cache':
+        if self.opts['master_job_cache'] in ('local_cache', 'sqlite3_local_cache'):
             self.returners['{0}.save_load'.format(self.opts['master_job_cache'])](jid, job_load, minions=self.targets.keys())
         else:
             self.returners['{0}.save_load'.format(self.opts['master_job_cache'])](jid, job_load)
@@ -736,7 +853,7 @@ class SSH(object):
         try:
             if isinstance(jid, bytes):
                 jid = jid.decode('utf-8')
-            if self.opts['master_job_cache'] == 'local_cache':
+            if self.opts['master_job_cache'] in ('local_cache', 'sqlite3_local_cache'):
                 self.returners['{0}.save_load'.format(self.opts['master_job_cache'])](jid, job_load, minions=self.targets.keys())
             else:
                 self.returners['{0}.save_load'.format(self.opts['master_job_cache'])](jid, job_load)
@@ -920,6 +1037,19 @@ class Single(object):
             arch, _, _ = self.shell.exec_cmd('powershell $ENV:PROCESSOR_ARCHITECTURE')
             self.arch = arch.strip()
         self.thin = thin if thin else salt.utils.thin.thin_path(opts['cachedir'])
+        # The seconds spent in each phase of the routine
+        self.timing = {}
+
+    @contextlib.contextmanager
+    def _phase(self, name):
+        '''
+        Add the time spent within this block to the timing of the phase
+        '''
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.timing[name] = self.timing.get(name, 0) + time.time() - start
 
     def __arg_comps(self):
         '''
@@ -950,10 +1080,11 @@ class Single(object):
         '''
         Deploy salt-thin
         '''
-        self.shell.send(
-            self.thin,
-            os.path.join(self.thin_dir, 'salt-thin.tgz'),
-        )
+        with self._phase('deploy'):
+            self.shell.send(
+                self.thin,
+                os.path.join(self.thin_dir, 'salt-thin.tgz'),
+            )
         self.deploy_ext()
         return True
 
@@ -962,10 +1093,11 @@ class Single(object):
         Deploy the ext_mods tarball
         '''
         if self.mods.get('file'):
-            self.shell.send(
-                self.mods['file'],
-                os.path.join(self.thin_dir, 'salt-ext_mods.tgz'),
-            )
+            with self._phase('deploy'):
+                self.shell.send(
+                    self.mods['file'],
+                    os.path.join(self.thin_dir, 'salt-ext_mods.tgz'),
+                )
         return True
 
     def run(self, deploy_attempted=False):
@@ -978,10 +1110,22 @@ class Single(object):
         If a (re)deploy is needed, then retry the operation after a deploy
         attempt
 
+        The time spent connecting, deploying and executing is kept in
+        ``timing``
+
         Returns tuple of (stdout, stderr, retcode)
         '''
         stdout = stderr = retcode = None
 
+        if not self.winrm:
+            # Reuses or opens the connection which the commands below are
+            # multiplexed over, when ssh_control_persist is set
+            with self._phase('connect'):
+                stdout, stderr, retcode = self.shell.connect()
+            if retcode:
+                return stdout, stderr, retcode
+
+        start = time.time()
         if self.opts.get('raw_shell', False):
             cmd_str = ' '.join([self._escape_arg(arg) for arg in self.argv])
             stdout, stderr, retcode = self.shell.exec_cmd(cmd_str)
@@ -991,6 +1135,8 @@ class Single(object):
 
         else:
             stdout, stderr, retcode = self.cmd_block()
+        self.timing['execute'] = \
+            time.time() - start - self.timing.get('deploy', 0)
 
         return stdout, stderr, retcode
 
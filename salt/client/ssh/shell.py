@@ -5,6 +5,8 @@ Manage transport commands via ssh
 from __future__ import absolute_import, print_function, unicode_literals
 
 # Import python libs
+import errno
+import hashlib
 import re
 import os
 import sys
@@ -29,6 +31,9 @@ KEY_VALID_RE = re.compile(r'.*\(yes\/no\).*')
 RSTR = '_edbc7885e4f9aac9b83b35999b68d015148caf467b78fa39c05f669c0ff89878'
 RSTR_RE = re.compile(r'(?:^|\r?\n)' + RSTR + r'(?:\r?\n|$)')
 
+# The first version of OpenSSH with ControlPersist
+CONTROL_PERSIST_VERSION = (5, 6)
+
 
 class NoPasswdError(Exception):
     pass
@@ -194,6 +199,59 @@ class Shell(object):
         return ' '.join(['-o {0}'.format(opt)
                           for opt in self.ssh_options])
 
+    def _control_path(self):
+        '''
+        Return the path of the control socket which the connections to the
+        host are multiplexed over, or None if they are not multiplexed
+        '''
+        master_opts = self.opts.get('__master_opts__', self.opts)
+        if not master_opts.get('ssh_control_persist') or \
+                self.opts.get('_ssh_version', (0,)) < CONTROL_PERSIST_VERSION:
+            return None
+        control_dir = os.path.join(master_opts['cachedir'], 'ssh_control')
+        try:
+            os.makedirs(control_dir, 0o700)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+        # Hashed, the path of a unix socket is limited to about 100 bytes
+        name = '{0}@{1}:{2}'.format(self.user, self.host, self.port)
+        return os.path.join(
+            control_dir,
+            hashlib.sha1(name.encode('utf-8')).hexdigest()[:16])
+
+    def _control_opts(self):
+        '''
+        Return options to multiplex the connection over the control socket
+        '''
+        control_path = self._control_path()
+        if control_path is None:
+            return ''
+        master_opts = self.opts.get('__master_opts__', self.opts)
+        options = ['ControlMaster=auto',
+                   'ControlPath={0}'.format(control_path),
+                   'ControlPersist={0}'.format(
+                       int(master_opts['ssh_control_persist']))]
+        return ' '.join(['-o {0}'.format(opt) for opt in options])
+
+    def connect(self):
+        '''
+        Open the connection which the following commands to the host are
+        multiplexed over, unless it is open already. It stays open for
+        :conf_master:`ssh_control_persist` seconds after the last command.
+
+        Returns a tuple of (stdout, stderr, retcode), like ``exec_cmd``
+        '''
+        if self._control_path() is None:
+            return '', '', 0
+        # Asks the master over the socket, without going to the host
+        ret = self._run_cmd(self._cmd_str('-O check'))
+        if ret[2] == 0:
+            return ret
+        log.debug('Opening the multiplexed connection to %s', self.host)
+        # Into the background once authenticated, without running a command
+        return self._run_cmd(self._cmd_str('-f -N'))
+
     def _copy_id_str_old(self):
         '''
         Return the string to execute ssh-copy-id
@@ -258,6 +316,9 @@ class Shell(object):
                                       for item in self.remote_port_forwards.split(',')]))
         if self.ssh_options:
             command.append(self._ssh_opts())
+        control_opts = self._control_opts()
+        if control_opts:
+            command.append(control_opts)
 
         command.append(cmd)
 
@@ -356,6 +356,14 @@ VALID_OPTS = {
     # Maximum number of concurrently active processes at any given point in time
     'process_count_max': int,
 
+    # Number of long lived worker processes which run the published jobs, 0
+    # forks a new process for every job
+    'job_pool_workers': int,
+
+    # Number of jobs after which a job pool worker is replaced, 0 never
+    # replaces workers
+    'job_pool_max_jobs': int,
+
     # Whether or not the salt minion should run scheduled mine updates
     'mine_enabled': bool,
 
@@ -374,6 +382,25 @@ VALID_OPTS = {
     # The chunk size to use when streaming files with the file server
     'file_buffer_size': int,
 
+    # Fetch files from the master with several chunk requests in flight,
+    # resuming interrupted transfers
+    'file_client_stream': bool,
+
+    # The number of chunk requests in flight when file_client_stream is set
+    'file_client_stream_window': int,
+
+    # The most files whose hashes are fetched from the master with one
+    # request
+    'file_hash_bulk_size': int,
+
+    # Keep the files cached from the master in a store addressed by their
+    # hash, and hard link the per-saltenv cached files into it
+    'file_cache_store': bool,
+
+    # The size in bytes above which the least recently used files are
+    # removed from the file_cache_store, 0 for no limit
+    'file_cache_store_max_size': int,
+
     # The TCP port on which minion events should be published if ipc_mode is TCP
     'tcp_pub_port': int,
 
@@ -393,6 +420,9 @@ VALID_OPTS = {
     # The TCP port for mworkers to connect to on the master
     'tcp_master_workers': int,
 
+    # The TCP port for the auth mworkers to connect to on the master
+    'tcp_master_auth_workers': int,
+
     # The file to send logging data to
     'log_file': six.string_types,
 
@@ -444,6 +474,10 @@ VALID_OPTS = {
     # Tell the loader to attempt to import *.zip archives
     'enable_zip_modules': bool,
 
+    # Tell the loader to remember the module dir listings and the modules
+    # which are unavailable in the cachedir, to speed up the next start
+    'loader_cache': bool,
+
     # Tell the client to show minions that have timed out
     'show_timeout': bool,
 
@@ -540,6 +574,22 @@ VALID_OPTS = {
     # returner specified by 'event_return'
     'event_return_queue': int,
 
+    # Flush the queued events to the event returners once the oldest of them
+    # is this many seconds old, even if 'event_return_queue' was not reached
+    'event_return_queue_max_seconds': int,
+
+    # The maximum number of events to keep queued per event returner. Once
+    # a slow returner falls this far behind, its oldest events are dropped.
+    'event_return_queue_max_size': int,
+
+    # Write events which an event returner failed to store to the cachedir and
+    # pass them to the returner again after it stored events successfully
+    'event_return_spill': bool,
+
+    # Fire the event returner queue statistics as a master event every this
+    # many seconds, 0 disables them
+    'event_return_stats_interval': int,
+
     # Only forward events to an event returner if it matches one of the tags in this list
     'event_return_whitelist': list,
 
@@ -589,6 +639,10 @@ VALID_OPTS = {
     # Refs https://github.com/saltstack/salt/issues/34215
     'ipc_write_buffer': int,
 
+    # The number of messages which may wait to be written to a subscriber of
+    # the event bus before further messages for it are dropped, 0 is unlimited
+    'ipc_subscriber_hwm': int,
+
     # The number of MWorker processes for a master to startup. This number needs to scale up as
     # the number of connected minions increases.
     'worker_threads': int,
@@ -659,6 +713,8 @@ VALID_OPTS = {
     # could be, we'll just skip type-checking.
     'git_pillar_ssl_verify': bool,
     'git_pillar_global_lock': bool,
+    'git_pillar_fetch_workers': int,
+    'git_pillar_fetch_timeout': int,
     'git_pillar_user': six.string_types,
     'git_pillar_password': six.string_types,
     'git_pillar_insecure_auth': bool,
@@ -683,6 +739,9 @@ VALID_OPTS = {
     'gitfs_saltenv_blacklist': list,
     'gitfs_ssl_verify': bool,
     'gitfs_global_lock': bool,
+    'gitfs_fetch_workers': int,
+    'gitfs_fetch_timeout': int,
+    'gitfs_tree_index': bool,
     'gitfs_saltenv': list,
     'gitfs_ref_types': list,
     'gitfs_refspecs': list,
@@ -729,6 +788,17 @@ VALID_OPTS = {
     # Pillar cache backend. Defaults to `disk` which stores caches in the master cache
     'pillar_cache_backend': six.string_types,
 
+    # Share the rendered pillar SLS files between the minions which read the
+    # same grains, pillar and opts values while rendering them
+    'pillar_render_cache': bool,
+
+    # The number of rendered pillar SLS files kept by every master worker
+    'pillar_render_cache_size': int,
+
+    # The execution functions which pillar SLS files can call and still be
+    # cached by the pillar render cache
+    'pillar_render_cache_functions': list,
+
     'pillar_safe_render_error': bool,
 
     # When creating a pillar, there are several strategies to choose from when
@@ -781,6 +851,12 @@ VALID_OPTS = {
     'fileserver_limit_traversal': bool,
     'fileserver_verify_config': bool,
 
+    # Keep the roots file lists in an index updated by the FileserverUpdate
+    # process, and poll the file_roots for changes every this many seconds
+    # if inotify is not available
+    'fileserver_list_index': bool,
+    'fileserver_list_index_interval': int,
+
     # Optionally apply '*' permissioins to any user. By default '*' is a fallback case that is
     # applied only if the user didn't matched by other matchers.
     'permissive_acl': bool,
@@ -836,6 +912,10 @@ VALID_OPTS = {
     # reply from executions.
     'minion_data_cache': bool,
 
+    # Maintain an index of the grains and pillar data in the minion data cache,
+    # which is used to resolve grain and pillar targets.
+    'minion_data_index': bool,
+
     # The number of seconds between AES key rotations on the master
     'publish_session': int,
 
@@ -858,6 +938,22 @@ VALID_OPTS = {
     'runner_returns': bool,
 
     'serial': six.string_types,
+
+    # Serialize the loads sent between the master and minions with msgpack's
+    # bin type, once the peer announced that it reads them
+    'serial_bin_type': bool,
+
+    # The algorithms to compress the loads sent between the master and
+    # minions with, in the order of preference, once the peer announced that
+    # it reads them. Only loads of at least wire_compression_threshold bytes
+    # are compressed. Compressed loads are only read up to
+    # wire_compression_max_size bytes.
+    'wire_compression': (six.string_types, list),
+    'wire_compression_threshold': int,
+    'wire_compression_max_size': int,
+
+    # Compress the publications as well, which all minions have to read
+    'publish_compression': bool,
     'search': six.string_types,
 
     # A compound target definition.
@@ -913,6 +1009,17 @@ VALID_OPTS = {
     # The number of minutes between the minion refreshing its cache of grains
     'grains_refresh_every': int,
 
+    # The number of grains functions to run at the same time, 0 or 1 to run
+    # them one after the other
+    'grains_parallel_workers': int,
+
+    # The seconds after which a grains function running in parallel is given
+    # up on, 0 for no limit
+    'grains_func_timeout': int,
+
+    # Add the seconds each grains function took as the grains_timing grain
+    'grains_timing': bool,
+
     # Use lspci to gather system data for grains on a minion
     'enable_lspci': bool,
 
@@ -967,6 +1074,10 @@ VALID_OPTS = {
     # Never give up when trying to authenticate to a master
     'auth_safemode': bool,
 
+    # Resume the auth session with the master instead of a full sign in, if
+    # the master offers sessions
+    'auth_session_resume': bool,
+
     'random_master': bool,
 
     # An upper bound for the amount of time for a minion to sleep before attempting to
@@ -989,6 +1100,8 @@ VALID_OPTS = {
     'ssh_scan_ports': six.string_types,
     'ssh_scan_timeout': float,
     'ssh_identities_only': bool,
+    'ssh_control_persist': int,
+    'ssh_worker_pool': bool,
     'ssh_log_file': six.string_types,
     'ssh_config_file': six.string_types,
     'ssh_merge_pillar': bool,
@@ -1031,6 +1144,18 @@ VALID_OPTS = {
     # implications in large setups.
     'max_minions': int,
 
+    # The number of worker processes which only answer the sign ins of the minions,
+    # 0 lets the worker_threads answer them
+    'auth_workers': int,
+
+    # The number of sign ins which may wait for the auth_workers, the minions which
+    # sign in when it is full are told to sign in again later
+    'auth_queue_size': int,
+
+    # The number of seconds a minion may resume its auth session instead of signing in
+    # with a full RSA handshake, 0 disables the sessions
+    'auth_session_ttl': int,
+
 
     'username': (type(None), six.string_types),
     'password': (type(None), six.string_types),
@@ -1105,6 +1230,9 @@ VALID_OPTS = {
     'memcache_full_cleanup': bool,
     # Enable collecting the memcache stats and log it on `debug` log level.
     'memcache_debug': bool,
+    # Keep the memcache of the master processes up to date with each other
+    # through events fired on store and flush.
+    'memcache_event_invalidation': bool,
 
     # Thin and minimal Salt extra modules
     'thin_extra_mods': six.string_types,
@@ -1232,6 +1360,9 @@ DEFAULT_MINION_OPTS = {
     'grains_cache': False,
     'grains_cache_expiration': 300,
     'grains_deep_merge': False,
+    'grains_parallel_workers': 0,
+    'grains_func_timeout': 30,
+    'grains_timing': False,
     'conf_file': os.path.join(salt.syspaths.CONFIG_DIR, 'minion'),
     'sock_dir': os.path.join(salt.syspaths.SOCK_DIR, 'minion'),
     'sock_pool_size': 1,
@@ -1310,6 +1441,8 @@ DEFAULT_MINION_OPTS = {
     'git_pillar_root': '',
     'git_pillar_ssl_verify': True,
     'git_pillar_global_lock': True,
+    'git_pillar_fetch_workers': 1,
+    'git_pillar_fetch_timeout': 0,
     'git_pillar_user': '',
     'git_pillar_password': '',
     'git_pillar_insecure_auth': False,
@@ -1333,6 +1466,9 @@ DEFAULT_MINION_OPTS = {
     'gitfs_saltenv_whitelist': [],
     'gitfs_saltenv_blacklist': [],
     'gitfs_global_lock': True,
+    'gitfs_fetch_workers': 1,
+    'gitfs_fetch_timeout': 0,
+    'gitfs_tree_index': False,
     'gitfs_ssl_verify': True,
     'gitfs_saltenv': [],
     'gitfs_ref_types': ['branch', 'tag', 'sha'],
@@ -1359,13 +1495,21 @@ DEFAULT_MINION_OPTS = {
     'autosign_timeout': 120,
     'multiprocessing': True,
     'process_count_max': -1,
+    'job_pool_workers': 0,
+    'job_pool_max_jobs': 100,
     'mine_enabled': True,
     'mine_return_job': False,
     'mine_interval': 60,
     'ipc_mode': _DFLT_IPC_MODE,
     'ipc_write_buffer': _DFLT_IPC_WBUFFER,
+    'ipc_subscriber_hwm': 0,
     'ipv6': False,
     'file_buffer_size': 262144,
+    'file_client_stream': False,
+    'file_client_stream_window': 4,
+    'file_hash_bulk_size': 500,
+    'file_cache_store': False,
+    'file_cache_store_max_size': 1073741824,
     'tcp_pub_port': 4510,
     'tcp_pull_port': 4511,
     'tcp_authentication_retries': 5,
@@ -1385,6 +1529,11 @@ DEFAULT_MINION_OPTS = {
     'ext_job_cache': '',
     'cython_enable': False,
     'enable_zip_modules': False,
+    'serial_bin_type': False,
+    'wire_compression': [],
+    'wire_compression_threshold': 16384,
+    'wire_compression_max_size': 104857600,
+    'loader_cache': False,
     'state_verbose': True,
     'state_output': 'full',
     'state_output_diff': False,
@@ -1449,6 +1598,7 @@ DEFAULT_MINION_OPTS = {
     'master_tries': _MASTER_TRIES,
     'master_tops_first': False,
     'auth_safemode': False,
+    'auth_session_resume': True,
     'random_master': False,
     'minion_floscript': os.path.join(FLO_DIR, 'minion.flo'),
     'caller_floscript': os.path.join(FLO_DIR, 'caller.flo'),
@@ -1569,6 +1719,8 @@ DEFAULT_MASTER_OPTS = {
     'git_pillar_root': '',
     'git_pillar_ssl_verify': True,
     'git_pillar_global_lock': True,
+    'git_pillar_fetch_workers': 1,
+    'git_pillar_fetch_timeout': 0,
     'git_pillar_user': '',
     'git_pillar_password': '',
     'git_pillar_insecure_auth': False,
@@ -1593,6 +1745,9 @@ DEFAULT_MASTER_OPTS = {
     'gitfs_saltenv_whitelist': [],
     'gitfs_saltenv_blacklist': [],
     'gitfs_global_lock': True,
+    'gitfs_fetch_workers': 1,
+    'gitfs_fetch_timeout': 0,
+    'gitfs_tree_index': False,
     'gitfs_ssl_verify': True,
     'gitfs_saltenv': [],
     'gitfs_ref_types': ['branch', 'tag', 'sha'],
@@ -1637,6 +1792,9 @@ DEFAULT_MASTER_OPTS = {
     'pillar_cache': False,
     'pillar_cache_ttl': 3600,
     'pillar_cache_backend': 'disk',
+    'pillar_render_cache': False,
+    'pillar_render_cache_size': 1024,
+    'pillar_render_cache_functions': ['grains.get', 'pillar.get'],
     'ping_on_rotate': False,
     'peer': {},
     'preserve_minion_cache': False,
@@ -1664,6 +1822,7 @@ DEFAULT_MASTER_OPTS = {
     'file_recv': False,
     'file_recv_max_size': 100,
     'file_buffer_size': 1048576,
+    'file_hash_bulk_size': 500,
     'file_ignore_regex': [],
     'file_ignore_glob': [],
     'fileserver_backend': ['roots'],
@@ -1671,6 +1830,8 @@ DEFAULT_MASTER_OPTS = {
     'fileserver_ignoresymlinks': False,
     'fileserver_limit_traversal': False,
     'fileserver_verify_config': True,
+    'fileserver_list_index': False,
+    'fileserver_list_index_interval': 20,
     'max_open_files': 100000,
     'hash_type': 'sha256',
     'conf_file': os.path.join(salt.syspaths.CONFIG_DIR, 'master'),
@@ -1690,14 +1851,17 @@ DEFAULT_MASTER_OPTS = {
     'master_job_cache': 'local_cache',
     'job_cache_store_endtime': False,
     'minion_data_cache': True,
+    'minion_data_index': False,
     'enforce_mine_cache': False,
     'ipc_mode': _DFLT_IPC_MODE,
     'ipc_write_buffer': _DFLT_IPC_WBUFFER,
+    'ipc_subscriber_hwm': 0,
     'ipv6': False,
     'tcp_master_pub_port': 4512,
     'tcp_master_pull_port': 4513,
     'tcp_master_publish_pull': 4514,
     'tcp_master_workers': 4515,
+    'tcp_master_auth_workers': 4516,
     'log_file': os.path.join(salt.syspaths.LOGS_DIR, 'master'),
     'log_level': 'warning',
     'log_level_logfile': None,
@@ -1718,11 +1882,20 @@ DEFAULT_MASTER_OPTS = {
     'engines': [],
     'event_return': '',
     'event_return_queue': 0,
+    'event_return_queue_max_seconds': 0,
+    'event_return_queue_max_size': 10000,
+    'event_return_spill': True,
+    'event_return_stats_interval': 60,
     'event_return_whitelist': [],
     'event_return_blacklist': [],
     'event_match_type': 'startswith',
     'runner_returns': True,
     'serial': 'msgpack',
+    'serial_bin_type': False,
+    'wire_compression': [],
+    'wire_compression_threshold': 16384,
+    'wire_compression_max_size': 104857600,
+    'publish_compression': False,
     'test': False,
     'state_verbose': True,
     'state_output': 'full',
@@ -1736,6 +1909,7 @@ DEFAULT_MASTER_OPTS = {
     'ssh_list_nodegroups': {},
     'ssh_use_home_key': False,
     'cython_enable': False,
+    'loader_cache': False,
     'enable_gpu_grains': False,
     # XXX: Remove 'key_logfile' support in 2014.1.0
     'key_logfile': os.path.join(salt.syspaths.LOGS_DIR, 'key'),
@@ -1783,6 +1957,8 @@ DEFAULT_MASTER_OPTS = {
     'ssh_scan_ports': '22',
     'ssh_scan_timeout': 0.01,
     'ssh_identities_only': False,
+    'ssh_control_persist': 0,
+    'ssh_worker_pool': False,
     'ssh_log_file': os.path.join(salt.syspaths.LOGS_DIR, 'ssh'),
     'ssh_config_file': os.path.join(salt.syspaths.HOME_DIR, '.ssh', 'config'),
     'master_floscript': os.path.join(FLO_DIR, 'master.flo'),
@@ -1806,6 +1982,9 @@ DEFAULT_MASTER_OPTS = {
     'queue_dirs': [],
     'cli_summary': False,
     'max_minions': 0,
+    'auth_workers': 0,
+    'auth_queue_size': 1000,
+    'auth_session_ttl': 0,
     'master_sign_key_name': 'master_sign',
     'master_sign_pubkey': False,
     'master_pubkey_signature': 'master_pubkey_signature',
@@ -1826,6 +2005,7 @@ DEFAULT_MASTER_OPTS = {
     'memcache_max_items': 1024,
     'memcache_full_cleanup': False,
     'memcache_debug': False,
+    'memcache_event_invalidation': False,
     'thin_extra_mods': '',
     'min_extra_mods': '',
     'ssl': None,
@@ -21,6 +21,8 @@ import traceback
 import binascii
 import weakref
 import getpass
+import zlib
+import collections
 import tornado.gen
 
 # Import third party libs
@@ -56,6 +58,12 @@ if not HAS_M2 and not HAS_CDOME:
         # No need for crypt in local mode
         pass
 
+try:
+    import lz4.frame
+    HAS_LZ4 = True
+except ImportError:
+    HAS_LZ4 = False
+
 # Import salt libs
 import salt.defaults.exitcodes
 import salt.payload
@@ -78,6 +86,70 @@ from salt.exceptions import (
 log = logging.getLogger(__name__)
 
 
+def _zlib_decompress(data, max_size):
+    '''
+    Decompress zlib data, raise ValueError if it is larger than max_size bytes
+    '''
+    dobj = zlib.decompressobj()
+    ret = dobj.decompress(data, max_size + 1)
+    if len(ret) <= max_size:
+        ret += dobj.flush()
+    if len(ret) > max_size:
+        raise ValueError('larger than {0} bytes'.format(max_size))
+    return ret
+
+
+def _lz4_decompress(data, max_size):
+    '''
+    Decompress an lz4 frame, raise ValueError if it is larger than max_size
+    bytes
+    '''
+    ret = lz4.frame.LZ4FrameDecompressor().decompress(
+        data, max_length=max_size + 1)
+    if len(ret) > max_size:
+        raise ValueError('larger than {0} bytes'.format(max_size))
+    return ret
+
+
+# The algorithms the loads may be compressed with on the wire, as
+# (compress, decompress), decompress takes the largest size to decompress to
+COMPRESSORS = {'zlib': (zlib.compress, _zlib_decompress)}
+if HAS_LZ4:
+    COMPRESSORS['lz4'] = (lz4.frame.compress, _lz4_decompress)
+
+
+def wire_compression(opts):
+    '''
+    Return the algorithms in wire_compression which are available here, in
+    the order of preference
+    '''
+    algos = opts.get('wire_compression') or []
+    if isinstance(algos, six.string_types):
+        algos = [x.strip() for x in algos.split(',')]
+    return [x for x in algos if x in COMPRESSORS]
+
+
+def session_proof(session_key, minion_id, nonce):
+    '''
+    Return the proof that a minion holds the key of its auth session, which it
+    sends to the master to resume the session
+    '''
+    return hmac.new(
+        salt.utils.stringutils.to_bytes(session_key),
+        salt.utils.stringutils.to_bytes('{0}|{1}'.format(minion_id, nonce)),
+        hashlib.sha256).hexdigest()
+
+
+def session_digest(aes, session, ttl):
+    '''
+    Return the digest the master signs to bind the auth session in its reply
+    to the AES key and TTL it sends with it
+    '''
+    return salt.utils.stringutils.to_bytes(hashlib.sha256(
+        salt.utils.stringutils.to_bytes(aes) + session +
+        salt.utils.stringutils.to_bytes('{0}'.format(ttl))).hexdigest())
+
+
 def dropfile(cachedir, user=None):
     '''
     Set an AES dropfile to request the master update the publish session key
@@ -447,6 +519,9 @@ class AsyncAuth(object):
     # mapping of key -> creds
     creds_map = {}
 
+    # mapping of key -> auth session with the master
+    sessions = {}
+
     def __new__(cls, opts, io_loop=None):
         '''
         Only create one instance of AsyncAuth per __key()
@@ -514,7 +589,9 @@ class AsyncAuth(object):
         if key in AsyncAuth.creds_map:
             creds = AsyncAuth.creds_map[key]
             self._creds = creds
-            self._crypticle = Crypticle(self.opts, creds['aes'])
+            self._crypticle = Crypticle(self.opts, creds['aes'],
+                                        use_bin_type=creds.get('serial_bin_type', False),
+                                        compression=creds.get('compression'))
             self._authenticate_future = tornado.concurrent.Future()
             self._authenticate_future.set_result(True)
         else:
@@ -637,7 +714,9 @@ class AsyncAuth(object):
             key = self.__key(self.opts)
             AsyncAuth.creds_map[key] = creds
             self._creds = creds
-            self._crypticle = Crypticle(self.opts, creds['aes'])
+            self._crypticle = Crypticle(self.opts, creds['aes'],
+                                        use_bin_type=creds.get('serial_bin_type', False),
+                                        compression=creds.get('compression'))
             self._authenticate_future.set_result(True)  # mark the sign-in as complete
             # Notify the bus about creds change
             if self.opts.get('auth_events') is True:
@@ -723,6 +802,14 @@ class AsyncAuth(object):
                 # has the master returned that its maxed out with minions?
                 elif payload['load']['ret'] == 'full':
                     raise tornado.gen.Return('full')
+                elif payload['load']['ret'] == 'busy':
+                    log.warning(
+                        'The Salt Master is busy authenticating other minions, '
+                        'this salt minion will wait for %s seconds before '
+                        'attempting to re-authenticate',
+                        self.opts['acceptance_wait_time']
+                    )
+                    raise tornado.gen.Return('retry')
                 else:
                     log.error(
                         'The Salt Master has cached the public key for this '
@@ -731,18 +818,28 @@ class AsyncAuth(object):
                         self.opts['acceptance_wait_time']
                     )
                     raise tornado.gen.Return('retry')
-        auth['aes'] = self.verify_master(payload, master_pub='token' in sign_in_payload)
-        if not auth['aes']:
-            log.critical(
-                'The Salt Master server\'s public key did not authenticate!\n'
-                'The master may need to be updated if it is a version of Salt '
-                'lower than %s, or\n'
-                'If you are confident that you are connecting to a valid Salt '
-                'Master, then remove the master public key and restart the '
-                'Salt Minion.\nThe master public key can be found '
-                'at:\n%s', salt.version.__version__, m_pub_fn
-            )
-            raise SaltClientError('Invalid master key')
+        if 'resume' in payload and 'resume' in sign_in_payload:
+            # The master resumed our session, the reply is encrypted with the
+            # session key so the master does not need to be verified again
+            auth['aes'] = self.resume_aes(payload, sign_in_payload)
+            if not auth['aes']:
+                log.warning('Unable to resume the session with the master, '
+                            'signing in again')
+                raise tornado.gen.Return('retry')
+        else:
+            auth['aes'] = self.verify_master(payload, master_pub='token' in sign_in_payload)
+            if not auth['aes']:
+                log.critical(
+                    'The Salt Master server\'s public key did not authenticate!\n'
+                    'The master may need to be updated if it is a version of Salt '
+                    'lower than %s, or\n'
+                    'If you are confident that you are connecting to a valid Salt '
+                    'Master, then remove the master public key and restart the '
+                    'Salt Minion.\nThe master public key can be found '
+                    'at:\n%s', salt.version.__version__, m_pub_fn
+                )
+                raise SaltClientError('Invalid master key')
+            self.save_session(payload, auth['aes'])
         if self.opts.get('syndic_master', False):  # Is syndic
             syndic_finger = self.opts.get('syndic_finger', self.opts.get('master_finger', False))
             if syndic_finger:
@@ -753,6 +850,15 @@ class AsyncAuth(object):
                 if salt.utils.crypt.pem_finger(m_pub_fn, sum_type=self.opts['hash_type']) != self.opts['master_finger']:
                     self._finger_fail(self.opts['master_finger'], m_pub_fn)
         auth['publish_port'] = payload['publish_port']
+        # Masters which read loads serialized with the bin type say so
+        auth['serial_bin_type'] = bool(
+            self.opts.get('serial_bin_type') and payload.get('serial_bin_type'))
+        # And the compression algorithms they read
+        auth['compression'] = None
+        for algo in wire_compression(self.opts):
+            if algo in payload.get('compression', []):
+                auth['compression'] = algo
+                break
         raise tornado.gen.Return(auth)
 
     def get_keys(self):
@@ -816,8 +922,80 @@ class AsyncAuth(object):
             pass
         with salt.utils.files.fopen(self.pub_path) as f:
             payload['pub'] = f.read()
+        if self.opts.get('auth_session_resume', True):
+            # Ask for a session, and resume the one we hold while it is valid
+            payload['session'] = True
+            session = AsyncAuth.sessions.get(self.__key(self.opts))
+            if session and session['expires'] > time.time():
+                nonce = Crypticle.generate_key_string()
+                payload['resume'] = {
+                    'nonce': nonce,
+                    'proof': session_proof(session['key'], self.opts['id'], nonce)}
         return payload
 
+    def save_session(self, payload, aes):
+        '''
+        Keep the auth session the master sent in reply to a full sign in. Later
+        sign ins resume the session with a proof made with its key instead of
+        a full RSA handshake, until it expires.
+
+        The session is only kept if the master signed it together with the AES
+        key of the reply, so nobody else can slip in a session of their own.
+
+        :param dict payload: The reply of the master to the sign in
+        :param str aes: The AES key of the verified reply
+        '''
+        key = self.__key(self.opts)
+        AsyncAuth.sessions.pop(key, None)
+        if 'session' not in payload:
+            return
+        try:
+            mkey = get_rsa_pub_key(os.path.join(self.opts['pki_dir'], self.mpub))
+            if not HAS_M2:
+                mkey = mkey.publickey()
+            digest = public_decrypt(mkey, payload['session_sig'])
+        except Exception as exc:
+            log.warning('Unable to verify the auth session: %s', exc)
+            return
+        if digest != session_digest(aes, payload['session'], payload['session_ttl']):
+            log.warning('The auth session is not signed by the master, '
+                        'ignoring it')
+            return
+        try:
+            if HAS_M2:
+                session_key = self.get_keys().private_decrypt(
+                    payload['session'], RSA.pkcs1_oaep_padding)
+            else:
+                session_key = PKCS1_OAEP.new(self.get_keys()).decrypt(
+                    payload['session'])
+        except Exception as exc:
+            log.debug('Unable to decrypt the auth session: %s', exc)
+            return
+        AsyncAuth.sessions[key] = {
+            'key': salt.utils.stringutils.to_str(session_key),
+            'expires': time.time() + payload['session_ttl']}
+
+    def resume_aes(self, payload, sign_in_payload):
+        '''
+        Return the AES key the master sent in reply to a resumed sign in, or an
+        empty string, and drop the session, if the reply cannot be read with
+        the session key.
+
+        :param dict payload: The reply of the master to the sign in
+        :param dict sign_in_payload: The sign in request
+        '''
+        key = self.__key(self.opts)
+        try:
+            data = Crypticle(self.opts, AsyncAuth.sessions[key]['key']).loads(
+                payload['resume'])
+            # Make sure this is the reply to our request
+            if data['nonce'] == sign_in_payload['resume']['nonce']:
+                return data['aes']
+        except Exception as exc:
+            log.debug('Unable to read the resumed auth session: %s', exc)
+        AsyncAuth.sessions.pop(key, None)
+        return ''
+
     def decrypt_aes(self, payload, master_pub=True):
         '''
         This function is used to decrypt the AES seed phrase returned from
@@ -1216,7 +1394,10 @@ class SAuth(AsyncAuth):
                 continue
             break
         self._creds = creds
-        self._crypticle = Crypticle(self.opts, creds['aes'])
+        self._crypticle = Crypticle(
+            self.opts, creds['aes'],
+            use_bin_type=creds.get('serial_bin_type', False),
+            compression=creds.get('compression'))
 
     def sign_in(self, timeout=60, safe=True, tries=1, channel=None):
         '''
@@ -1289,6 +1470,14 @@ class SAuth(AsyncAuth):
                 # has the master returned that its maxed out with minions?
                 elif payload['load']['ret'] == 'full':
                     return 'full'
+                elif payload['load']['ret'] == 'busy':
+                    log.warning(
+                        'The Salt Master is busy authenticating other minions, '
+                        'this salt minion will wait for %s seconds before '
+                        'attempting to re-authenticate',
+                        self.opts['acceptance_wait_time']
+                    )
+                    return 'retry'
                 else:
                     log.error(
                         'The Salt Master has cached the public key for this '
@@ -1300,18 +1489,28 @@ class SAuth(AsyncAuth):
                         self.opts['id'], self.opts['acceptance_wait_time']
                     )
                     return 'retry'
-        auth['aes'] = self.verify_master(payload, master_pub='token' in sign_in_payload)
-        if not auth['aes']:
-            log.critical(
-                'The Salt Master server\'s public key did not authenticate!\n'
-                'The master may need to be updated if it is a version of Salt '
-                'lower than %s, or\n'
-                'If you are confident that you are connecting to a valid Salt '
-                'Master, then remove the master public key and restart the '
-                'Salt Minion.\nThe master public key can be found '
-                'at:\n%s', salt.version.__version__, m_pub_fn
-            )
-            sys.exit(42)
+        if 'resume' in payload and 'resume' in sign_in_payload:
+            # The master resumed our session, the reply is encrypted with the
+            # session key so the master does not need to be verified again
+            auth['aes'] = self.resume_aes(payload, sign_in_payload)
+            if not auth['aes']:
+                log.warning('Unable to resume the session with the master, '
+                            'signing in again')
+                return 'retry'
+        else:
+            auth['aes'] = self.verify_master(payload, master_pub='token' in sign_in_payload)
+            if not auth['aes']:
+                log.critical(
+                    'The Salt Master server\'s public key did not authenticate!\n'
+                    'The master may need to be updated if it is a version of Salt '
+                    'lower than %s, or\n'
+                    'If you are confident that you are connecting to a valid Salt '
+                    'Master, then remove the master public key and restart the '
+                    'Salt Minion.\nThe master public key can be found '
+                    'at:\n%s', salt.version.__version__, m_pub_fn
+                )
+                sys.exit(42)
+            self.save_session(payload, auth['aes'])
         if self.opts.get('syndic_master', False):  # Is syndic
             syndic_finger = self.opts.get('syndic_finger', self.opts.get('master_finger', False))
             if syndic_finger:
@@ -1322,6 +1521,15 @@ class SAuth(AsyncAuth):
                 if salt.utils.crypt.pem_finger(m_pub_fn, sum_type=self.opts['hash_type']) != self.opts['master_finger']:
                     self._finger_fail(self.opts['master_finger'], m_pub_fn)
         auth['publish_port'] = payload['publish_port']
+        # Masters which read loads serialized with the bin type say so
+        auth['serial_bin_type'] = bool(
+            self.opts.get('serial_bin_type') and payload.get('serial_bin_type'))
+        # And the compression algorithms they read
+        auth['compression'] = None
+        for algo in wire_compression(self.opts):
+            if algo in payload.get('compression', []):
+                auth['compression'] = algo
+                break
         return auth
 
 
@@ -1334,14 +1542,35 @@ class Crypticle(object):
     '''
 
     PICKLE_PAD = b'pickle::'
+    # Marks loads which were serialized with use_bin_type, see
+    # serial_bin_type
+    BIN_PAD = b'pickleb:'
+    # Mark compressed loads, which hold one of the above when decompressed,
+    # see wire_compression
+    COMPRESS_PADS = {'zlib': b'pickzl::', 'lz4': b'pickl4::'}
     AES_BLOCK_SIZE = 16
     SIG_SIZE = hashlib.sha256().digest_size
 
-    def __init__(self, opts, key_string, key_size=192):
+    def __init__(self, opts, key_string, key_size=192, use_bin_type=False,
+                 compression=None):
         self.key_string = key_string
         self.keys = self.extract_keys(self.key_string, key_size)
         self.key_size = key_size
         self.serial = salt.payload.Serial(opts)
+        # Only a peer which announced that it reads the bin type format may
+        # be sent it, and Python 2 can not tell its str from bytes
+        self.use_bin_type = use_bin_type and six.PY3
+        # The same goes for compression
+        self.compression = compression if compression in COMPRESSORS else None
+        self.compression_threshold = opts.get(
+            'wire_compression_threshold', 16384)
+        # Only loads compressed with an algorithm enabled here are read, and
+        # only up to wire_compression_max_size bytes
+        self.decompression = wire_compression(opts)
+        self.decompression_max_size = opts.get(
+            'wire_compression_max_size', 104857600)
+        self.compression_stats = collections.defaultdict(
+            lambda: {'runs': 0, 'time': 0.0, 'bytes_in': 0, 'bytes_out': 0})
 
     @classmethod
     def generate_key_string(cls, key_size=192):
@@ -1421,19 +1650,99 @@ class Crypticle(object):
         else:
             return data[:-data[-1]]
 
-    def dumps(self, obj):
+    def dumps(self, obj, use_bin_type=None, compression=None):
         '''
         Serialize and encrypt a python object
+
+        :param use_bin_type: Serialize with msgpack's bin type, so that the
+                             peer can tell str from bytes without walking
+                             through the load. Defaults to what the
+                             Crypticle was created with.
+        :param compression: The algorithm to compress loads larger than
+                            wire_compression_threshold with, or False to
+                            not compress. Defaults to what the Crypticle
+                            was created with.
+        '''
+        if use_bin_type is None:
+            use_bin_type = self.use_bin_type
+        if compression is None:
+            compression = self.compression
+        if use_bin_type and six.PY3:
+            data = self.BIN_PAD + self.serial.dumps(obj, use_bin_type=True)
+        else:
+            data = self.PICKLE_PAD + self.serial.dumps(obj)
+        if compression in COMPRESSORS \
+                and len(data) >= self.compression_threshold:
+            data = self._compress(data, compression)
+        return self.encrypt(data)
+
+    def _compress(self, data, algo):
+        start = time.time()
+        compressed = COMPRESSORS[algo][0](data)
+        duration = time.time() - start
+        stat = self.compression_stats[algo]
+        stat['runs'] += 1
+        stat['time'] += duration
+        stat['bytes_in'] += len(data)
+        stat['bytes_out'] += len(compressed)
+        log.trace(
+            'Compressed a load of %d bytes to %d bytes with %s in %.1f ms',
+            len(data), len(compressed), algo, duration * 1000
+        )
+        if len(compressed) >= len(data):
+            return data
+        return self.COMPRESS_PADS[algo] + compressed
+
+    def pop_compression_stats(self):
         '''
-        return self.encrypt(self.PICKLE_PAD + self.serial.dumps(obj))
+        Return and reset the number of compressed loads, the time spent
+        compressing them and their sizes before and after, per algorithm
+        '''
+        stats = self.compression_stats
+        self.compression_stats = collections.defaultdict(
+            lambda: {'runs': 0, 'time': 0.0, 'bytes_in': 0, 'bytes_out': 0})
+        return stats
 
     def loads(self, data, raw=False):
         '''
         Decrypt and un-serialize a python object
         '''
+        return self.loads_format(data, raw)[0]
+
+    def loads_format(self, data, raw=False):
+        '''
+        Decrypt and un-serialize a python object, return it along with the
+        format it was sent in, a dict with ``serial_bin_type``, whether it
+        was serialized with msgpack's bin type, and ``compression``, the
+        algorithm it was compressed with or None
+        '''
         data = self.decrypt(data)
+        fmt = {'serial_bin_type': False, 'compression': None}
+        for algo, pad in six.iteritems(self.COMPRESS_PADS):
+            if data.startswith(pad):
+                if algo not in self.decompression:
+                    log.error('Received a load compressed with %s, which '
+                              'is not enabled in wire_compression', algo)
+                    return {}, fmt
+                try:
+                    data = COMPRESSORS[algo][1](
+                        data[len(pad):], self.decompression_max_size)
+                except ValueError as exc:
+                    log.error('Dropping a load compressed with %s: %s',
+                              algo, exc)
+                    return {}, fmt
+                fmt['compression'] = algo
+                break
         # simple integrity check to verify that we got meaningful data
+        if data.startswith(self.BIN_PAD):
+            # The str and bytes are told apart by msgpack already
+            load = self.serial.loads(
+                data[len(self.BIN_PAD):],
+                encoding=None if raw else 'utf-8',
+                raw=raw)
+            fmt['serial_bin_type'] = True
+            return load, fmt
         if not data.startswith(self.PICKLE_PAD):
-            return {}
+            return {}, fmt
         load = self.serial.loads(data[len(self.PICKLE_PAD):], raw=raw)
-        return load
+        return load, fmt
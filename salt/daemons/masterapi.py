@@ -50,6 +50,7 @@ from salt.pillar import git_pillar
 
 # Import 3rd-party libs
 from salt.ext import six
+from salt.ext.six.moves import zip  # pylint: disable=import-error,redefined-builtin
 
 try:
     import pwd
@@ -158,6 +159,48 @@ def clean_pub_auth(opts):
         log.error('Unable to delete pub auth file')
 
 
+def auth_session_path(opts, minion_id):
+    '''
+    Return the path of the auth session of a minion, see auth_session_ttl
+    '''
+    return os.path.join(opts['cachedir'], 'auth_sessions', minion_id)
+
+
+def remove_auth_session(opts, minion_id):
+    '''
+    Remove the auth session of a minion, e.g. when its key is deleted
+    '''
+    try:
+        os.remove(auth_session_path(opts, minion_id))
+    except OSError:
+        pass
+
+
+def clean_auth_sessions(opts):
+    '''
+    Remove the expired auth sessions of the minions
+    '''
+    session_dir = os.path.join(opts['cachedir'], 'auth_sessions')
+    try:
+        minion_ids = os.listdir(session_dir)
+    except OSError:
+        return
+    serial = salt.payload.Serial(opts)
+    now = time.time()
+    for minion_id in minion_ids:
+        path = os.path.join(session_dir, minion_id)
+        try:
+            with salt.utils.files.fopen(path, 'rb') as fp_:
+                expires = serial.loads(fp_.read())['expires']
+        except (IOError, OSError):
+            continue
+        except Exception:
+            # A session which can not be read can not be resumed either
+            expires = 0
+        if expires < now:
+            remove_auth_session(opts, minion_id)
+
+
 def clean_old_jobs(opts):
     '''
     Clean out the old jobs from the job cache
@@ -585,8 +628,9 @@ class RemoteFuncs(object):
                 greedy=False
                 )
         minions = _res['minions']
-        for minion in minions:
-            fdata = self.cache.fetch('minions/{0}'.format(minion), 'mine')
+        cdata = self.cache.iter_many(
+            ('minions/{0}'.format(minion), 'mine') for minion in minions)
+        for minion, (_, fdata) in zip(minions, cdata):
             if isinstance(fdata, dict):
                 fdata = fdata.get(load['fun'])
                 if fdata:
@@ -713,9 +757,12 @@ class RemoteFuncs(object):
                 pillar_override=load.get('pillar_override', {}))
         data = pillar.compile_pillar()
         if self.opts.get('minion_data_cache', False):
+            minion_data = {'grains': load['grains'], 'pillar': data}
             self.cache.store('minions/{0}'.format(load['id']),
                              'data',
-                             {'grains': load['grains'], 'pillar': data})
+                             minion_data)
+            if self.ckminions.index is not None:
+                self.ckminions.index.update(load['id'], minion_data)
             if self.opts.get('minion_data_cache_events') is True:
                 self.event.fire_event({'comment': 'Minion data cache refresh'}, salt.utils.event.tagify(load['id'], 'refresh', 'minion'))
         return data
@@ -5,6 +5,7 @@ Classes that manage file clients
 from __future__ import absolute_import, print_function, unicode_literals
 
 # Import python libs
+import collections
 import contextlib
 import errno
 import logging
@@ -13,20 +14,23 @@ import string
 import shutil
 import ftplib
 from tornado.httputil import parse_response_start_line, HTTPHeaders, HTTPInputError
+import tornado.gen
 import salt.utils.atomicfile
 
 # Import salt libs
 from salt.exceptions import (
-    CommandExecutionError, MinionError
+    CommandExecutionError, MinionError, SaltClientError, SaltReqTimeoutError
 )
 import salt.client
 import salt.crypt
 import salt.loader
 import salt.payload
 import salt.transport
+import salt.transport.client
 import salt.fileserver
 import salt.utils.data
 import salt.utils.files
+import salt.utils.filestore
 import salt.utils.gzip_util
 import salt.utils.hashutils
 import salt.utils.http
@@ -36,6 +40,7 @@ import salt.utils.stringutils
 import salt.utils.templates
 import salt.utils.url
 import salt.utils.versions
+import salt.utils.zeromq
 from salt.utils.openstack.swift import SaltSwift
 
 # pylint: disable=no-name-in-module,import-error
@@ -106,6 +111,17 @@ class Client(object):
     def __getstate__(self):
         return {'opts': self.opts}
 
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.destroy()
+
+    def destroy(self):
+        '''
+        Release the resources held by the client
+        '''
+
     def _check_proto(self, path):
         '''
         Make sure that this path is intended for the salt master and trim it
@@ -234,13 +250,21 @@ class Client(object):
         log.info(
             'Caching directory \'%s\' for environment \'%s\'', path, saltenv
         )
-        # go through the list of all files finding ones that are in
-        # the target directory and caching them
-        for fn_ in self.file_list(saltenv):
+        # go through the files in the target directory and cache the ones
+        # which are missing or changed. The hashes of all files are fetched
+        # in one request, so unchanged files cost no request at all.
+        hashes = self.hash_and_stat_files(saltenv=saltenv, prefix=path)
+        files_dest = salt.utils.path.join(
+            self.get_cachedir(cachedir), 'files', saltenv)
+        for fn_ in sorted(hashes):
             fn_ = salt.utils.data.decode(fn_)
             if fn_.strip() and fn_.startswith(path):
                 if salt.utils.stringutils.check_include_exclude(
                         fn_, include_pat, exclude_pat):
+                    dest = salt.utils.path.join(files_dest, fn_)
+                    if self._is_current(dest, hashes[fn_][0]):
+                        ret.append(dest)
+                        continue
                     fn_ = self.cache_file(
                         salt.utils.url.create(fn_), saltenv, cachedir=cachedir)
                     if fn_:
@@ -311,6 +335,46 @@ class Client(object):
         '''
         return {}
 
+    def hash_and_stat_files(self, paths=None, saltenv='base', prefix=''):
+        '''
+        Return the hashes and stat results of many files on the master, as a
+        dict mapping each path to a ``(hash, stat)`` tuple like
+        hash_and_stat_file returns. Pass either a list of salt:// paths, or
+        the directory whose files should all be included as ``prefix``.
+        Files which are not found are left out.
+        '''
+        if paths is None:
+            paths = self._prefix_paths(saltenv, prefix)
+        ret = {}
+        for path in paths:
+            path = salt.utils.url.parse(path)[0]
+            hash_stat = self.hash_and_stat_file(
+                salt.utils.url.create(path), saltenv)
+            if hash_stat[0]:
+                ret[path] = tuple(hash_stat)
+        return ret
+
+    def _prefix_paths(self, saltenv, prefix):
+        '''
+        Return the files on the master below the directory ``prefix``
+        '''
+        prefix = salt.utils.url.parse(prefix)[0].strip('/')
+        paths = self.file_list(saltenv, prefix)
+        if prefix:
+            # Leave out "foobar/baz" when asked for "foo"
+            paths = [x for x in paths if x.startswith(prefix + '/')]
+        return paths
+
+    def _is_current(self, dest, hash_server):
+        '''
+        Return True if the file at ``dest`` exists and matches the hash of
+        the file on the master
+        '''
+        if not hash_server or not os.path.isfile(dest):
+            return False
+        return salt.utils.hashutils.get_hash(
+            dest, hash_server.get('hash_type', 'md5')) == hash_server['hsum']
+
     def is_cached(self, path, saltenv='base', cachedir=None):
         '''
         Returns the full path to a file if it is cached locally on the minion
@@ -432,8 +496,9 @@ class Client(object):
         else:
             prefix = separated[0]
 
-        # Copy files from master
-        for fn_ in self.file_list(saltenv, prefix=path):
+        # Copy files from master, skipping the ones which are unchanged
+        hashes = self.hash_and_stat_files(saltenv=saltenv, prefix=path)
+        for fn_ in sorted(hashes):
             # Prevent files in "salt://foobar/" (or salt://foo.sh) from
             # matching a path of "salt://foo"
             try:
@@ -444,10 +509,14 @@ class Client(object):
             # Remove the leading directories from path to derive
             # the relative path on the minion.
             minion_relpath = fn_[len(prefix):].lstrip('/')
+            fn_dest = '{0}/{1}'.format(dest, minion_relpath)
+            if self._is_current(fn_dest, hashes[fn_][0]):
+                ret.append(fn_dest)
+                continue
             ret.append(
                self.get_file(
                   salt.utils.url.create(fn_),
-                  '{0}/{1}'.format(dest, minion_relpath),
+                  fn_dest,
                   True, saltenv, gzip
                )
             )
@@ -1047,6 +1116,12 @@ class RemoteClient(Client):
     '''
     Interact with the salt master file server.
     '''
+    # The channel used for streaming transfers, see _stream_file()
+    _stream_channel = None
+    _stream_io_loop = None
+    # The content-addressed file store, see _get_file_store()
+    _file_store = None
+
     def __init__(self, opts):
         Client.__init__(self, opts)
         self.channel = salt.transport.Channel.factory(self.opts)
@@ -1062,6 +1137,20 @@ class RemoteClient(Client):
         self.channel = salt.transport.Channel.factory(self.opts)
         return self.channel
 
+    def destroy(self):
+        '''
+        Close the channel used for streaming transfers and its IOLoop
+        '''
+        channel, self._stream_channel = self._stream_channel, None
+        io_loop, self._stream_io_loop = self._stream_io_loop, None
+        if channel is not None:
+            if hasattr(channel, 'close'):
+                channel.close()
+            elif hasattr(channel, 'message_client'):
+                channel.message_client.destroy()
+        if io_loop is not None:
+            io_loop.close()
+
     def get_file(self,
                  path,
                  dest='',
@@ -1087,7 +1176,7 @@ class RemoteClient(Client):
                 mode_server = None
         else:
             hash_server = self.hash_file(path, saltenv)
-            mode_server = None
+            stat_server = mode_server = None
 
         # Check if file exists on server, before creating files and
         # directories
@@ -1141,10 +1230,43 @@ class RemoteClient(Client):
             if hash_local == hash_server:
                 return dest2check
 
+        # Files in the minion cache are hard links into the file store, so
+        # content which was fetched before at another path or for another
+        # saltenv is not downloaded again
+        store = self._get_file_store() if not dest else None
+        if store is not None and hash_server:
+            if store.link(hash_server, dest2check):
+                log.debug(
+                    'In saltenv \'%s\', linked \'%s\' from the file store',
+                    saltenv, path
+                )
+                return dest2check
+
         log.debug(
             'Fetching file from saltenv \'%s\', ** attempting ** \'%s\'',
             saltenv, path
         )
+        if self.opts.get('file_client_stream', False) \
+                and dest2check and hash_server \
+                and isinstance(stat_server, (list, tuple)) \
+                and len(stat_server) > 6 \
+                and not isinstance(self.channel, salt.fileserver.FSChan):
+            destdir = os.path.dirname(dest2check)
+            if not os.path.isdir(destdir):
+                if dest and not makedirs:
+                    return False
+                try:
+                    os.makedirs(destdir)
+                except OSError as exc:
+                    if exc.errno != errno.EEXIST:
+                        raise
+            ret = self._stream_file(
+                self._check_proto(path), saltenv, dest2check,
+                hash_server, stat_server[6], gzip)
+            if ret is not None:
+                if store is not None:
+                    store.add(ret, hash_server)
+                return ret
         d_tries = 0
         transport_tries = 0
         path = self._check_proto(path)
@@ -1250,6 +1372,8 @@ class RemoteClient(Client):
 
         if fn_:
             fn_.close()
+            if store is not None and hash_server:
+                store.add(dest, hash_server)
             log.info(
                 'Fetching file from saltenv \'%s\', ** done ** \'%s\'',
                 saltenv, path
@@ -1262,6 +1386,172 @@ class RemoteClient(Client):
 
         return dest
 
+    def _stream_file(self, path, saltenv, dest, hash_server, size, gzip=None):
+        '''
+        Download a file with up to ``file_client_stream_window`` chunk
+        requests in flight. The chunks are appended in order to
+        ``<dest>.partial``, so a download which was interrupted, e.g. by a
+        dropped connection, is resumed from there by the next call.
+
+        Returns the destination path, or None if the file could not be
+        streamed and should be fetched the regular way.
+        '''
+        partial = dest + '.partial'
+        # Holds the hash of the file being downloaded, so that only a partial
+        # download of the same file is resumed
+        marker = partial + '.hsum'
+        offset = 0
+        try:
+            with salt.utils.files.fopen(marker, 'r') as fp_:
+                if fp_.read() == hash_server['hsum']:
+                    offset = os.path.getsize(partial)
+        except (IOError, OSError):
+            pass
+        if offset > size:
+            offset = 0
+        if offset:
+            log.debug(
+                'Resuming download of \'%s\' at byte %d of %d',
+                path, offset, size
+            )
+        else:
+            with salt.utils.files.fopen(marker, 'w') as fp_:
+                fp_.write(hash_server['hsum'])
+
+        load = {'path': path,
+                'saltenv': saltenv,
+                'cmd': '_serve_file',
+                'stream': True}
+        if gzip:
+            load['gzip'] = int(gzip)
+        channel, io_loop = self._get_stream_channel()
+        try:
+            with salt.utils.files.fopen(
+                    partial, 'ab' if offset else 'wb') as fp_:
+                streamed = io_loop.run_sync(
+                    lambda: self._stream_chunks(
+                        channel, load, fp_, offset, size))
+            if streamed:
+                hsum = salt.utils.hashutils.get_hash(
+                    partial, hash_server.get('hash_type', 'md5'))
+                if hsum != hash_server['hsum']:
+                    log.warning(
+                        'Bad streamed download of file %s, fetching it again',
+                        path
+                    )
+                    streamed = False
+        except (SaltClientError, SaltReqTimeoutError):
+            # The connection was interrupted, keep the partial download to
+            # resume it from there
+            raise
+        except Exception:
+            self._remove_partial(partial, marker)
+            raise
+        if not streamed:
+            self._remove_partial(partial, marker)
+            return None
+
+        # If a directory was formerly cached at this path, then remove it to
+        # avoid a traceback trying to write the file
+        if os.path.isdir(dest):
+            salt.utils.files.rm_rf(dest)
+        salt.utils.files.rename(partial, dest)
+        os.remove(marker)
+        log.info(
+            'Fetching file from saltenv \'%s\', ** done ** \'%s\'',
+            saltenv, path
+        )
+        return dest
+
+    @staticmethod
+    def _remove_partial(partial, marker):
+        '''
+        Remove a partial streamed download and its hash marker
+        '''
+        for fn_ in (partial, marker):
+            try:
+                os.remove(fn_)
+            except OSError:
+                pass
+
+    def _get_file_store(self):
+        '''
+        Return the content-addressed file store, or None if
+        ``file_cache_store`` is disabled
+        '''
+        if not self.opts.get('file_cache_store', False):
+            return None
+        if self._file_store is None:
+            self._file_store = salt.utils.filestore.FileStore(
+                os.path.join(self.opts['cachedir'], 'file_store'),
+                self.opts.get('file_cache_store_max_size', 0))
+        return self._file_store
+
+    def _get_stream_channel(self):
+        '''
+        Return an async channel with its own IOLoop and one socket per chunk
+        request which may be in flight, and the IOLoop
+        '''
+        if self._stream_channel is None:
+            opts = dict(self.opts)
+            opts['sock_pool_size'] = max(
+                opts.get('sock_pool_size', 1),
+                opts.get('file_client_stream_window', 4))
+            self._stream_io_loop = salt.utils.zeromq.ZMQDefaultLoop()
+            self._stream_channel = salt.transport.client.AsyncReqChannel.factory(
+                opts, io_loop=self._stream_io_loop)
+        return self._stream_channel, self._stream_io_loop
+
+    @staticmethod
+    def _stream_data(data):
+        '''
+        Return the chunk, the file size and the chunk size of a streamed
+        _serve_file reply, or None if the reply is not a streamed one
+        '''
+        data = decode_dict_keys_to_str(data)
+        try:
+            chunk = data['data']
+            if data.get('gzip', None) and chunk:
+                chunk = salt.utils.gzip_util.uncompress(chunk)
+            if six.PY3 and isinstance(chunk, str):
+                chunk = chunk.encode()
+            return chunk, data['size'], data['chunk_size']
+        except (TypeError, KeyError):
+            return None
+
+    @tornado.gen.coroutine
+    def _stream_chunks(self, channel, load, fp_, offset, size):
+        '''
+        Fetch the chunks of a file from ``offset`` on and append them to
+        ``fp_`` in order. Returns False if the master does not stream the
+        file, or if the file changed on the master.
+        '''
+        if offset >= size:
+            raise tornado.gen.Return(True)
+        window = max(self.opts.get('file_client_stream_window', 4), 1)
+        # The first reply tells the chunk size of the master
+        ret = self._stream_data(
+            (yield channel.send(dict(load, loc=offset), raw=True)))
+        if ret is None or ret[1] != size or not ret[0]:
+            raise tornado.gen.Return(False)
+        chunk, _, chunk_size = ret
+        fp_.write(chunk)
+        written = next_loc = offset + len(chunk)
+        pending = collections.deque()
+        while written < size:
+            while next_loc < size and len(pending) < window:
+                pending.append((
+                    next_loc,
+                    channel.send(dict(load, loc=next_loc), raw=True)))
+                next_loc += chunk_size
+            loc, future = pending.popleft()
+            ret = self._stream_data((yield future))
+            if ret is None or len(ret[0]) != min(chunk_size, size - loc):
+                raise tornado.gen.Return(False)
+            fp_.write(ret[0])
+            written += len(ret[0])
+        raise tornado.gen.Return(True)
+
     def file_list(self, saltenv='base', prefix=''):
         '''
         List the files on the master
@@ -1326,6 +1616,34 @@ class RemoteClient(Client):
                 'cmd': '_file_hash'}
         return self.channel.send(load)
 
+    def hash_and_stat_files(self, paths=None, saltenv='base', prefix=''):
+        '''
+        Return the hashes and stat results of many files on the master with
+        one request per ``file_hash_bulk_size`` files, see
+        Client.hash_and_stat_files
+        '''
+        if paths is None:
+            paths = self._prefix_paths(saltenv, prefix)
+        paths = [salt.utils.url.parse(x)[0] for x in paths]
+        size = max(self.opts.get('file_hash_bulk_size', 500), 1)
+        ret = {}
+        for idx in range(0, len(paths), size):
+            chunk = paths[idx:idx + size]
+            load = {'saltenv': saltenv,
+                    'paths': chunk,
+                    'cmd': '_file_hash_and_stat_bulk'}
+            hashes = self.channel.send(load)
+            if not isinstance(hashes, dict):
+                # The master does not know the bulk request, or refused it
+                ret.update(super(RemoteClient, self).hash_and_stat_files(
+                    chunk, saltenv))
+                continue
+            if six.PY2:
+                hashes = salt.utils.data.decode(hashes)
+            ret.update((path, tuple(hash_stat))
+                       for path, hash_stat in six.iteritems(hashes))
+        return ret
+
     def hash_file(self, path, saltenv='base'):
         '''
         Return the hash of a file, to get the hash of a file on the salt
@@ -654,6 +654,42 @@ class Fileserver(object):
         except (IndexError, TypeError):
             return '', None
 
+    def file_hash_and_stat_bulk(self, load):
+        '''
+        Return the hashes and stat results of the files passed as ``paths``,
+        as a dict mapping each path to a ``[hash, stat]`` pair like the one
+        returned by file_hash_and_stat. Files which are not found are left
+        out. Returns False if more than ``file_hash_bulk_size`` paths are
+        passed.
+        '''
+        if 'env' in load:
+            # "env" is not supported; Use "saltenv".
+            load.pop('env')
+
+        ret = {}
+        if 'saltenv' not in load:
+            return ret
+        if not isinstance(load['saltenv'], six.string_types):
+            load['saltenv'] = six.text_type(load['saltenv'])
+
+        paths = load.get('paths')
+        if not isinstance(paths, list):
+            return ret
+        max_paths = self.opts.get('file_hash_bulk_size', 500)
+        if len(paths) > max_paths:
+            log.warning(
+                'Refusing to hash %d files with one request, the limit is %d '
+                '(file_hash_bulk_size)', len(paths), max_paths
+            )
+            return False
+        for path in paths:
+            path = salt.utils.stringutils.to_unicode(path)
+            hash_stat = self.file_hash_and_stat(
+                {'path': path, 'saltenv': load['saltenv']})
+            if hash_stat[0]:
+                ret[path] = list(hash_stat)
+        return ret
+
     def clear_file_list_cache(self, load):
         '''
         Deletes the file_lists cache files
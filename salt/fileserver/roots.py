@@ -21,10 +21,13 @@ from __future__ import absolute_import, print_function, unicode_literals
 import os
 import errno
 import logging
+import threading
+from collections import OrderedDict
 
 # Import salt libs
 import salt.fileserver
 import salt.utils.event
+import salt.utils.fileindex
 import salt.utils.files
 import salt.utils.gzip_util
 import salt.utils.hashutils
@@ -36,6 +39,14 @@ from salt.ext import six
 
 log = logging.getLogger(__name__)
 
+# Memory-mapped file list snapshots, by saltenv
+_SNAPSHOTS = {}
+
+# Files kept open for streamed transfers, by path, least recently used first
+_SERVE_FILES = OrderedDict()
+_SERVE_FILES_MAX = 32
+_SERVE_FILES_LOCK = threading.Lock()
+
 
 def find_file(path, saltenv='base', **kwargs):
     '''
@@ -109,6 +120,33 @@ def envs():
     return sorted(__opts__['file_roots'])
 
 
+def _read_served_file(fpath, loc, size):
+    '''
+    Read a chunk of a file which is kept open for the next chunk requests.
+    The file is reopened if it was replaced or changed since it was opened.
+    Returns the chunk and the size of the file.
+    '''
+    stat = os.stat(fpath)
+    key = (stat.st_ino, stat.st_mtime, stat.st_size)
+    with _SERVE_FILES_LOCK:
+        cached = _SERVE_FILES.pop(fpath, None)
+        if cached is not None and cached[0] != key:
+            cached[1].close()
+            cached = None
+        if cached is None:
+            cached = (key, salt.utils.files.fopen(fpath, 'rb'))  # pylint: disable=resource-leakage
+        _SERVE_FILES[fpath] = cached
+        while len(_SERVE_FILES) > _SERVE_FILES_MAX:
+            _SERVE_FILES.popitem(last=False)[1][1].close()
+        fp_ = cached[1]
+        if hasattr(os, 'pread'):
+            data = os.pread(fp_.fileno(), size, loc)
+        else:
+            fp_.seek(loc)
+            data = fp_.read(size)
+    return data, stat.st_size
+
+
 def serve_file(load, fnd):
     '''
     Return a chunk from a file based on the data received
@@ -126,6 +164,18 @@ def serve_file(load, fnd):
     ret['dest'] = fnd['rel']
     gzip = load.get('gzip', None)
     fpath = os.path.normpath(fnd['path'])
+    if load.get('stream'):
+        # Streamed transfers request many chunks of the same file, which are
+        # returned as they are, together with the size of the file so that
+        # the client can request the remaining chunks all at once.
+        data, ret['size'] = _read_served_file(
+            fpath, load['loc'], __opts__['file_buffer_size'])
+        ret['chunk_size'] = __opts__['file_buffer_size']
+        if gzip and data:
+            data = salt.utils.gzip_util.compress(data, gzip)
+            ret['gzip'] = gzip
+        ret['data'] = data
+        return ret
     with salt.utils.files.fopen(fpath, 'rb') as fp_:
         fp_.seek(load['loc'])
         data = fp_.read(__opts__['file_buffer_size'])
@@ -287,6 +337,28 @@ def file_hash(load, fnd):
     return ret
 
 
+def _get_snapshot(saltenv):
+    '''
+    Return the file list snapshot of a saltenv written by the FileserverUpdate
+    process, mapping it again if it was replaced. Returns None if there is no
+    snapshot yet.
+    '''
+    snapshot = _SNAPSHOTS.get(saltenv)
+    if snapshot is not None and snapshot.is_current():
+        return snapshot
+    path = salt.utils.fileindex.snapshot_path(__opts__, saltenv)
+    try:
+        new = salt.utils.fileindex.FileListSnapshot(path)
+    except (IOError, OSError, ValueError) as exc:
+        if getattr(exc, 'errno', None) != errno.ENOENT:
+            log.error('Unable to read file list snapshot %s: %s', path, exc)
+        return None
+    if snapshot is not None:
+        snapshot.close()
+    _SNAPSHOTS[saltenv] = new
+    return new
+
+
 def _file_lists(load, form):
     '''
     Return a dict containing the file lists for files, dirs, emtydirs and symlinks
@@ -298,6 +370,11 @@ def _file_lists(load, form):
     if load['saltenv'] not in __opts__['file_roots']:
         return []
 
+    if __opts__.get('fileserver_list_index', False):
+        snapshot = _get_snapshot(load['saltenv'])
+        if snapshot is not None:
+            return snapshot.query(form, load.get('prefix', '').strip('/'))
+
     list_cachedir = os.path.join(__opts__['cachedir'], 'file_lists', 'roots')
     if not os.path.isdir(list_cachedir):
         try:
@@ -321,83 +398,14 @@ def _file_lists(load, form):
             'links': {}
         }
 
-        def _add_to(tgt, fs_root, parent_dir, items):
-            '''
-            Add the files to the target set
-            '''
-            def _translate_sep(path):
-                '''
-                Translate path separators for Windows masterless minions
-                '''
-                return path.replace('\\', '/') if os.path.sep == '\\' else path
-
-            for item in items:
-                abs_path = os.path.join(parent_dir, item)
-                log.trace('roots: Processing %s', abs_path)
-                is_link = salt.utils.path.islink(abs_path)
-                log.trace(
-                    'roots: %s is %sa link',
-                    abs_path, 'not ' if not is_link else ''
-                )
-                if is_link and __opts__['fileserver_ignoresymlinks']:
-                    continue
-                rel_path = _translate_sep(os.path.relpath(abs_path, fs_root))
-                log.trace('roots: %s relative path is %s', abs_path, rel_path)
-                if salt.fileserver.is_file_ignored(__opts__, rel_path):
-                    continue
-                tgt.add(rel_path)
-                try:
-                    if not os.listdir(abs_path):
-                        ret['empty_dirs'].add(rel_path)
-                except Exception:
-                    # Generic exception because running os.listdir() on a
-                    # non-directory path raises an OSError on *NIX and a
-                    # WindowsError on Windows.
-                    pass
-                if is_link:
-                    link_dest = salt.utils.path.readlink(abs_path)
-                    log.trace(
-                        'roots: %s symlink destination is %s',
-                        abs_path, link_dest
-                    )
-                    if salt.utils.platform.is_windows() \
-                            and link_dest.startswith('\\\\'):
-                        # Symlink points to a network path. Since you can't
-                        # join UNC and non-UNC paths, just assume the original
-                        # path.
-                        log.trace(
-                            'roots: %s is a UNC path, using %s instead',
-                            link_dest, abs_path
-                        )
-                        link_dest = abs_path
-                    if link_dest.startswith('..'):
-                        joined = os.path.join(abs_path, link_dest)
-                    else:
-                        joined = os.path.join(
-                            os.path.dirname(abs_path), link_dest
-                        )
-                    rel_dest = _translate_sep(
-                        os.path.relpath(
-                            os.path.realpath(os.path.normpath(joined)),
-                            fs_root
-                        )
-                    )
-                    log.trace(
-                        'roots: %s relative path is %s',
-                        abs_path, rel_dest
-                    )
-                    if not rel_dest.startswith('..'):
-                        # Only count the link if it does not point
-                        # outside of the root dir of the fileserver
-                        # (i.e. the "path" variable)
-                        ret['links'][rel_path] = link_dest
-
         for path in __opts__['file_roots'][load['saltenv']]:
             for root, dirs, files in salt.utils.path.os_walk(
                     path,
                     followlinks=__opts__['fileserver_followsymlinks']):
-                _add_to(ret['dirs'], path, root, dirs)
-                _add_to(ret['files'], path, root, files)
+                salt.utils.fileindex.add_entries(
+                    __opts__, ret, 'dirs', path, root, dirs)
+                salt.utils.fileindex.add_entries(
+                    __opts__, ret, 'files', path, root, files)
 
         ret['files'] = sorted(ret['files'])
         ret['dirs'] = sorted(ret['dirs'])
@@ -455,7 +463,7 @@ def symlink_list(load):
     else:
         prefix = ''
 
-    symlinks = _file_lists(load, 'links')
+    symlinks = _file_lists(dict(load, prefix=prefix), 'links')
     return dict([(key, val)
                  for key, val in six.iteritems(symlinks)
                  if key.startswith(prefix)])
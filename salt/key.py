@@ -787,6 +787,7 @@ class Key(object):
                                       'master AES key is rotated or auth is revoked '
                                       'with \'saltutil.revoke_auth\'.'.format(key))
                     os.remove(os.path.join(self.opts['pki_dir'], status, key))
+                    salt.daemons.masterapi.remove_auth_session(self.opts, key)
                     eload = {'result': True,
                              'act': 'delete',
                              'id': key}
@@ -832,6 +833,7 @@ class Key(object):
             for key in keys:
                 try:
                     os.remove(os.path.join(self.opts['pki_dir'], status, key))
+                    salt.daemons.masterapi.remove_auth_session(self.opts, key)
                     eload = {'result': True,
                              'act': 'delete',
                              'id': key}
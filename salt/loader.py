@@ -28,8 +28,10 @@ import salt.utils.dictupdate
 import salt.utils.event
 import salt.utils.files
 import salt.utils.lazy
+import salt.utils.loadercache
 import salt.utils.odict
 import salt.utils.platform
+import salt.utils.process
 import salt.utils.versions
 from salt.exceptions import LoaderError
 from salt.template import check_render_pipe_str
@@ -572,12 +574,18 @@ def ssh_wrapper(opts, functions=None, context=None):
     )
 
 
-def render(opts, functions, states=None, proxy=None):
+def render(opts, functions, states=None, proxy=None, mod_opts=None):
     '''
     Returns the render modules
+
+    mod_opts
+        The opts which the renderers see as ``__opts__``, when they are not
+        the ones they are loaded with
     '''
     pack = {'__salt__': functions,
             '__grains__': opts.get('grains', {})}
+    if mod_opts is not None:
+        pack['__opts__'] = mod_opts
     if states:
         pack['__states__'] = states
     pack['__proxy__'] = proxy or {}
@@ -726,50 +734,20 @@ def grains(opts, force_refresh=False, proxy=None):
     funcs = grain_funcs(opts, proxy=proxy)
     if force_refresh:  # if we refresh, lets reload grain modules
         funcs.clear()
-    # Run core grains
-    for key in funcs:
-        if not key.startswith('core.'):
-            continue
-        log.trace('Loading %s grain', key)
-        ret = funcs[key]()
-        if not isinstance(ret, dict):
-            continue
-        if grains_deep_merge:
-            salt.utils.dictupdate.update(grains_data, ret)
-        else:
-            grains_data.update(ret)
-
-    # Run the rest of the grains
-    for key in funcs:
-        if key.startswith('core.') or key == '_errors':
-            continue
-        try:
-            # Grains are loaded too early to take advantage of the injected
-            # __proxy__ variable.  Pass an instance of that LazyLoader
-            # here instead to grains functions if the grains functions take
-            # one parameter.  Then the grains can have access to the
-            # proxymodule for retrieving information from the connected
-            # device.
-            log.trace('Loading %s grain', key)
-            if funcs[key].__code__.co_argcount == 1:
-                ret = funcs[key](proxy)
-            else:
-                ret = funcs[key]()
-        except Exception:
-            if salt.utils.platform.is_proxy():
-                log.info('The following CRITICAL message may not be an error; the proxy may not be completely established yet.')
-            log.critical(
-                'Failed to load grains defined in grain file %s in '
-                'function %s, error:\n', key, funcs[key],
-                exc_info=True
-            )
-            continue
+    # Run core grains first, then the rest of the grains
+    keys = [key for key in funcs if key.startswith('core.')]
+    keys.extend(key for key in funcs
+                if not key.startswith('core.') and key != '_errors')
+    timings = {}
+    for key, ret in _run_grain_funcs(opts, funcs, keys, proxy, timings):
         if not isinstance(ret, dict):
             continue
         if grains_deep_merge:
             salt.utils.dictupdate.update(grains_data, ret)
         else:
             grains_data.update(ret)
+    if opts.get('grains_timing', False):
+        grains_data['grains_timing'] = timings
 
     if opts.get('proxy_merge_grains_in_module', True) and proxy:
         try:
@@ -823,6 +801,104 @@ def grains(opts, force_refresh=False, proxy=None):
     return salt.utils.data.decode(grains_data, preserve_tuples=True)
 
 
+def _call_grain_func(func, key, proxy):
+    '''
+    Run one grains function
+    '''
+    log.trace('Loading %s grain', key)
+    if key.startswith('core.'):
+        return func()
+    # Grains are loaded too early to take advantage of the injected
+    # __proxy__ variable.  Pass an instance of that LazyLoader
+    # here instead to grains functions if the grains functions take
+    # one parameter.  Then the grains can have access to the
+    # proxymodule for retrieving information from the connected
+    # device.
+    if func.__code__.co_argcount == 1:
+        return func(proxy)
+    return func()
+
+
+def _run_grain_funcs(opts, funcs, keys, proxy, timings):
+    '''
+    Run the grains functions and yield their keys and returns in the order of
+    ``keys``, so that the returns are merged in the same order no matter how
+    the functions were run. The seconds each function took are added to
+    ``timings``, None for the ones which timed out.
+
+    With ``grains_parallel_workers`` above 1 up to that many functions run at
+    the same time in threads, and a function which takes longer than
+    ``grains_func_timeout`` seconds is given up on. Otherwise they run one
+    after the other.
+
+    Errors in core grains are raised, errors in the other grains are logged.
+    '''
+    workers = opts.get('grains_parallel_workers', 0)
+    calls = [(key, funcs[key]) for key in keys]
+    results = {}
+    if workers > 1:
+        _run_grain_funcs_parallel(
+            calls, proxy, workers, opts.get('grains_func_timeout', 0),
+            timings, results)
+    for key, func in calls:
+        if workers > 1:
+            if key not in results:
+                continue
+            ret, exc_info = results[key]
+        else:
+            start = time.time()
+            try:
+                ret, exc_info = _call_grain_func(func, key, proxy), None
+            except Exception:
+                ret, exc_info = None, sys.exc_info()
+            timings[key] = round(time.time() - start, 3)
+        if exc_info is not None:
+            if key.startswith('core.'):
+                six.reraise(*exc_info)
+            if salt.utils.platform.is_proxy():
+                log.info('The following CRITICAL message may not be an error; the proxy may not be completely established yet.')
+            log.critical(
+                'Failed to load grains defined in grain file %s in '
+                'function %s, error:\n', key, func,
+                exc_info=exc_info
+            )
+            continue
+        yield key, ret
+    slowest = sorted(
+        ((secs, key) for key, secs in six.iteritems(timings)
+         if secs is not None), reverse=True)[:5]
+    log.debug('Slowest grains functions: %s',
+              ', '.join('{0} ({1}s)'.format(key, secs)
+                        for secs, key in slowest))
+
+
+def _run_grain_funcs_parallel(calls, proxy, workers, timeout, timings,
+                              results):
+    '''
+    Run the grains functions in daemon threads, at most ``workers`` at a time,
+    and put their ``(return, exc_info)`` into ``results``. A function which
+    runs for longer than ``timeout`` seconds no longer counts against the
+    limit and its thread is left behind.
+    '''
+    def _timed_out(key, seconds):
+        log.error(
+            'The %s grain did not return within %s seconds, skipping it',
+            key, timeout
+        )
+        timings[key] = None
+
+    ret = salt.utils.process.run_in_threads(
+        [(key, functools.partial(_call_grain_func, func, key, proxy))
+         for key, func in calls],
+        workers,
+        timeout,
+        name='grains',
+        on_timeout=_timed_out)
+    for key, (val, exc_info, seconds) in six.iteritems(ret):
+        timings[key] = seconds
+        results[key] = (val, exc_info)
+
+
 # TODO: get rid of? Does anyone use this? You should use raw() instead
 def call(fun, **kwargs):
     '''
@@ -1126,6 +1202,15 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         )
 
         self._lock = threading.RLock()
+        self._cache = None
+        if self.opts.get('loader_cache', False) and 'cachedir' in self.opts:
+            try:
+                self._cache = salt.utils.loadercache.LoaderCache(
+                    self.opts, self.tag, self.module_dirs,
+                    [self.static_modules, self.virtual_enable,
+                     self.virtual_funcs])
+            except (TypeError, ValueError) as exc:
+                log.debug('Not using the loader cache: %s', exc)
         self._refresh_file_mapping()
 
         super(LazyLoader, self).__init__()  # late init the lazy loader
@@ -1229,7 +1314,18 @@ class LazyLoader(salt.utils.lazy.LazyDict):
         # The files are added in order of priority, so order *must* be retained.
         self.file_mapping = salt.utils.odict.OrderedDict()
 
-        for mod_dir in self.module_dirs:
+        # Reuse the file mapping from the loader cache if none of the module
+        # dirs changed
+        cached = None
+        module_dirs = self.module_dirs
+        if self._cache is not None:
+            cached = self._cache.get_file_mapping(self.module_dirs)
+        if cached is not None:
+            for f_noext, fpath, ext in cached:
+                self.file_mapping[f_noext] = (fpath, ext)
+            module_dirs = []
+
+        for mod_dir in module_dirs:
             try:
                 # Make sure we have a sorted listdir in order to have
                 # expectable override results
@@ -1302,6 +1398,8 @@ class LazyLoader(salt.utils.lazy.LazyDict):
 
                 except OSError:
                     continue
+        if cached is None and self._cache is not None:
+            self._cache.set_file_mapping(self.module_dirs, self.file_mapping)
         for smod in self.static_modules:
             f_noext = smod.split('.')[-1]
             self.file_mapping[f_noext] = (smod, '.o')
@@ -1371,10 +1469,29 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 reload_module(submodule)
                 self._reload_submodules(submodule)
 
+    def _cache_missing(self, fpath, names, error):
+        '''
+        Remember in the loader cache that a module is not available
+        '''
+        if self._cache is not None:
+            self._cache.set_missing(fpath, names, error)
+
+    def _write_cache(self):
+        if self._cache is not None:
+            self._cache.write()
+
     def _load_module(self, name):
         mod = None
         fpath, suffix = self.file_mapping[name]
         self.loaded_files.add(name)
+        if self._cache is not None:
+            # Don't import a module which is known to be unavailable
+            cached = self._cache.get_missing(fpath)
+            if cached is not None:
+                names, error = cached
+                for missing in names:
+                    self.missing_modules[missing] = error
+                return False
         fpath_dirname = os.path.dirname(fpath)
         try:
             sys.path.append(fpath_dirname)
@@ -1471,6 +1588,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 self.tag, name, exc_info=True
             )
             self.missing_modules[name] = exc
+            self._cache_missing(fpath, [name], exc)
             return False
         except Exception as error:
             log.error(
@@ -1536,6 +1654,10 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                     # If a module has information about why it could not be loaded, record it
                     self.missing_modules[module_name] = virtual_err
                     self.missing_modules[name] = virtual_err
+                    if salt.utils.loadercache.cacheable_virtual(
+                            getattr(mod, virtual_func, None)):
+                        self._cache_missing(
+                            fpath, [module_name, name], virtual_err)
                     return False
         else:
             virtual_aliases = ()
@@ -1662,6 +1784,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                         self._refresh_file_mapping()
                         reloaded = True
                     continue
+            self._write_cache()
 
         return ret
 
@@ -1676,6 +1799,7 @@ class LazyLoader(salt.utils.lazy.LazyDict):
                 self._load_module(name)
 
             self.loaded = True
+            self._write_cache()
 
     def reload_modules(self):
         with self._lock:
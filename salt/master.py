@@ -43,6 +43,7 @@ import salt.wheel
 import salt.minion
 import salt.key
 import salt.acl
+import salt.cache
 import salt.engines
 import salt.daemons.masterapi
 import salt.defaults.exitcodes
@@ -61,6 +62,7 @@ import salt.utils.master
 import salt.utils.minions
 import salt.utils.platform
 import salt.utils.process
+import salt.utils.rendercache
 import salt.utils.schedule
 import salt.utils.ssdp
 import salt.utils.stringutils
@@ -230,14 +232,35 @@ class Maintenance(salt.utils.process.SignalHandlingMultiprocessingProcess):
                 salt.daemons.masterapi.clean_old_jobs(self.opts)
                 salt.daemons.masterapi.clean_expired_tokens(self.opts)
                 salt.daemons.masterapi.clean_pub_auth(self.opts)
+                salt.daemons.masterapi.clean_auth_sessions(self.opts)
             self.handle_git_pillar()
             self.handle_schedule()
             self.handle_key_cache()
+            self.handle_minion_index()
             self.handle_presence(old_present)
             self.handle_key_rotate(now)
             salt.utils.verify.check_max_open_files(self.opts)
             last = now
-            time.sleep(self.loop_interval)
+            self.sleep_until_next_loop(now)
+
+    def sleep_until_next_loop(self, start):
+        '''
+        Sleep until the next maintenance loop, waking up in between whenever
+        a scheduled job is due
+        '''
+        end = start + self.loop_interval
+        while True:
+            wait = end - time.time()
+            if wait <= 0:
+                return
+            due = self.schedule.time_to_next_eval()
+            if due is None or due >= wait:
+                time.sleep(wait)
+                return
+            # A schedule which changed, or failed to evaluate, is reported
+            # as due right away, do not spin on it
+            time.sleep(due or 1)
+            self.handle_schedule()
 
     def handle_key_cache(self):
         '''
@@ -260,6 +283,18 @@ class Maintenance(salt.utils.process.SignalHandlingMultiprocessingProcess):
             with salt.utils.atomicfile.atomic_open(os.path.join(self.opts['pki_dir'], acc, '.key_cache')) as cache_file:
                 self.serial.dump(keys, cache_file)
 
+    def handle_minion_index(self):
+        '''
+        Build the minion data index, or fold the updates the workers have
+        journaled since the last run into a new snapshot of it
+        '''
+        if self.ckminions.index is None or not self.opts.get('minion_data_cache', False):
+            return
+        try:
+            self.ckminions.index.build(self.ckminions.cache)
+        except Exception as exc:
+            log.error('Unable to update the minion data index: %s', exc)
+
     def handle_key_rotate(self, now):
         '''
         Rotate the AES key rotation
@@ -317,10 +352,6 @@ class Maintenance(salt.utils.process.SignalHandlingMultiprocessingProcess):
         '''
         try:
             self.schedule.eval()
-            # Check if scheduler requires lower loop interval than
-            # the loop_interval setting
-            if self.schedule.loop_interval < self.loop_interval:
-                self.loop_interval = self.schedule.loop_interval
         except Exception as exc:
             log.error('Exception %s occurred in scheduled job', exc)
 
@@ -478,6 +509,16 @@ class FileserverUpdate(salt.utils.process.SignalHandlingMultiprocessingProcess):
             )
             self.update_threads[interval].start()
 
+        if self.opts.get('fileserver_list_index', False) \
+                and 'roots' in self.fileserver.backends():
+            # Avoid circular import
+            import salt.utils.fileindex
+            indexer = salt.utils.fileindex.FileListIndexer(self.opts)
+            self.update_threads['roots_index'] = threading.Thread(
+                target=indexer.run,
+            )
+            self.update_threads['roots_index'].start()
+
         # Keep the process alive
         while True:
             time.sleep(60)
@@ -912,6 +953,24 @@ class ReqServer(salt.utils.process.SignalHandlingMultiprocessingProcess):
                                                        name),
                                                  kwargs=kwargs,
                                                  name=name)
+            # The sign ins of the minions have their own workers, if the
+            # transports support it
+            auth_channels = [chan for chan in req_channels
+                             if getattr(chan, 'has_auth_workers', False)]
+            auth_workers = int(self.opts['auth_workers']) if auth_channels else 0
+            if self.opts['auth_workers'] and not auth_channels:
+                log.warning('auth_workers is only supported by the zeromq '
+                            'transport, the workers answer the sign ins')
+            for ind in range(auth_workers):
+                name = 'MWorker-auth-{0}'.format(ind)
+                self.process_manager.add_process(MWorker,
+                                                 args=(self.opts,
+                                                       self.master_key,
+                                                       self.key,
+                                                       auth_channels,
+                                                       name),
+                                                 kwargs=dict(kwargs, auth=True),
+                                                 name=name)
         self.process_manager.run()
 
     def run(self):
@@ -941,6 +1000,7 @@ class MWorker(salt.utils.process.SignalHandlingMultiprocessingProcess):
                  key,
                  req_channels,
                  name,
+                 auth=False,
                  **kwargs):
         '''
         Create a salt master worker process
@@ -948,6 +1008,7 @@ class MWorker(salt.utils.process.SignalHandlingMultiprocessingProcess):
         :param dict opts: The salt options
         :param dict mkey: The user running the salt master and the AES key
         :param dict key: The user running the salt master and the RSA key
+        :param bool auth: Only answer the sign ins of the minions
 
         :rtype: MWorker
         :return: Master worker
@@ -957,6 +1018,7 @@ class MWorker(salt.utils.process.SignalHandlingMultiprocessingProcess):
         super(MWorker, self).__init__(**kwargs)
         self.opts = opts
         self.req_channels = req_channels
+        self.auth = auth
 
         self.mkey = mkey
         self.key = key
@@ -977,6 +1039,7 @@ class MWorker(salt.utils.process.SignalHandlingMultiprocessingProcess):
         )
         self.opts = state['opts']
         self.req_channels = state['req_channels']
+        self.auth = state['auth']
         self.mkey = state['mkey']
         self.key = state['key']
         self.k_mtime = state['k_mtime']
@@ -986,6 +1049,7 @@ class MWorker(salt.utils.process.SignalHandlingMultiprocessingProcess):
         return {
             'opts': self.opts,
             'req_channels': self.req_channels,
+            'auth': self.auth,
             'mkey': self.mkey,
             'key': self.key,
             'k_mtime': self.k_mtime,
@@ -1008,6 +1072,8 @@ class MWorker(salt.utils.process.SignalHandlingMultiprocessingProcess):
         self.io_loop = ZMQDefaultLoop()
         self.io_loop.make_current()
         for req_channel in self.req_channels:
+            if self.auth:
+                req_channel.auth_worker = True
             req_channel.post_fork(self._handle_payload, io_loop=self.io_loop)  # TODO: cleaner? Maybe lazily?
         try:
             self.io_loop.start()
@@ -1051,11 +1117,84 @@ class MWorker(salt.utils.process.SignalHandlingMultiprocessingProcess):
         duration = end - start
         self.stats[cmd]['mean'] = (self.stats[cmd]['mean'] * (self.stats[cmd]['runs'] - 1) + duration) / self.stats[cmd]['runs']
         if end - self.stat_clock > self.opts['master_stats_event_iter']:
+            self._merge_crypto_stats()
+            self._merge_compression_stats()
+            self._merge_render_cache_stats()
+            self._merge_memcache_stats()
             # Fire the event with the stats and wipe the tracker
             self.aes_funcs.event.fire_event({'time': end - self.stat_clock, 'worker': self.name, 'stats': self.stats}, tagify(self.name, 'stats'))
             self.stats = collections.defaultdict(lambda: {'mean': 0, 'runs': 0})
             self.stat_clock = end
 
+    def _merge_crypto_stats(self):
+        '''
+        Add the time spent encrypting and signing publishes to the stats, as
+        ``publish_encrypt`` and ``publish_sign``
+        '''
+        for chan in getattr(self.clear_funcs, '_pub_channels', ()):
+            if not hasattr(chan, 'pop_crypto_stats'):
+                continue
+            for name, stat in six.iteritems(chan.pop_crypto_stats()):
+                total = self.stats['publish_{0}'.format(name)]
+                runs = total['runs'] + stat['runs']
+                if runs:
+                    total['mean'] = (total['mean'] * total['runs'] + stat['mean'] * stat['runs']) / runs
+                total['runs'] = runs
+
+    def _merge_compression_stats(self):
+        '''
+        Add the compression of the replies and publishes sent by this worker
+        to the stats, as ``compress_<algorithm>`` with the mean time per load
+        and the ratio of the compressed to the uncompressed size
+        '''
+        crypticles = [getattr(chan, 'crypticle', None)
+                      for chan in self.req_channels]
+        crypticles.extend(getattr(chan, '_crypticle', None)
+                          for chan in getattr(self.clear_funcs, '_pub_channels', ()))
+        for crypticle in crypticles:
+            if crypticle is None:
+                continue
+            for algo, stat in six.iteritems(crypticle.pop_compression_stats()):
+                total = self.stats['compress_{0}'.format(algo)]
+                runs = total['runs'] + stat['runs']
+                if runs:
+                    total['mean'] = (total['mean'] * total['runs'] + stat['time']) / runs
+                total['runs'] = runs
+                total['bytes_in'] = total.get('bytes_in', 0) + stat['bytes_in']
+                total['bytes_out'] = total.get('bytes_out', 0) + stat['bytes_out']
+                if total['bytes_in']:
+                    total['ratio'] = float(total['bytes_out']) / total['bytes_in']
+
+    def _merge_render_cache_stats(self):
+        '''
+        Add the hits, misses and uncacheable renders of the pillar render
+        cache of this worker to the stats, as ``pillar_render_cache``
+        '''
+        stat = salt.utils.rendercache.pop_stats()
+        if not stat:
+            return
+        total = self.stats['pillar_render_cache']
+        for name in ('hits', 'misses', 'uncacheable'):
+            total[name] = total.get(name, 0) + stat[name]
+        renders = total['hits'] + total['misses']
+        if renders:
+            total['hit_rate'] = float(total['hits']) / renders
+
+    def _merge_memcache_stats(self):
+        '''
+        Add the hits, misses, evictions and invalidations of the minion data
+        memcache of this worker to the stats, as ``memcache``
+        '''
+        stat = salt.cache.pop_stats()
+        if not stat:
+            return
+        total = self.stats['memcache']
+        for name in ('hits', 'misses', 'evictions', 'invalidations'):
+            total[name] = total.get(name, 0) + stat[name]
+        lookups = total['hits'] + total['misses']
+        if lookups:
+            total['hit_rate'] = float(total['hits']) / lookups
+
     def _handle_clear(self, load):
         '''
         Process a cleartext command
@@ -1156,6 +1295,7 @@ class AESFuncs(object):
         self._file_find = self.fs_._find_file
         self._file_hash = self.fs_.file_hash
         self._file_hash_and_stat = self.fs_.file_hash_and_stat
+        self._file_hash_and_stat_bulk = self.fs_.file_hash_and_stat_bulk
         self._file_list = self.fs_.file_list
         self._file_list_emptydirs = self.fs_.file_list_emptydirs
         self._dir_list = self.fs_.dir_list
@@ -1514,10 +1654,12 @@ class AESFuncs(object):
         data = pillar.compile_pillar()
         self.fs_.update_opts()
         if self.opts.get('minion_data_cache', False):
+            minion_data = {'grains': load['grains'], 'pillar': data}
             self.masterapi.cache.store('minions/{0}'.format(load['id']),
                                        'data',
-                                       {'grains': load['grains'],
-                                        'pillar': data})
+                                       minion_data)
+            if self.ckminions.index is not None:
+                self.ckminions.index.update(load['id'], minion_data)
             if self.opts.get('minion_data_cache_events') is True:
                 self.event.fire_event({'Minion data cache refresh': load['id']}, tagify(load['id'], 'refresh', 'minion'))
         return data
@@ -2165,10 +2307,22 @@ class ClearFuncs(object):
         '''
         Take a load and send it across the network to connected minions
         '''
-        for transport, opts in iter_transport_opts(self.opts):
-            chan = salt.transport.server.PubServerChannel.factory(opts)
+        for chan in self.pub_channels:
             chan.publish(load)
 
+    @property
+    def pub_channels(self):
+        '''
+        The publish channels of this worker, which keep their connection to
+        the publish daemon open across publishes
+        '''
+        if not hasattr(self, '_pub_channels'):
+            self._pub_channels = [
+                salt.transport.server.PubServerChannel.factory(opts)
+                for transport, opts in iter_transport_opts(self.opts)
+            ]
+        return self._pub_channels
+
     @property
     def ssh_client(self):
         if not hasattr(self, '_ssh_client'):
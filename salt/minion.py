@@ -1056,6 +1056,9 @@ class Minion(MinionBase):
     This class instantiates a minion, runs connections for a minion,
     and loads all of the functions into the minion
     '''
+    # Set in the processes of the job pool, which run jobs without daemonizing
+    job_pool_worker = False
+
     def __init__(self, opts, timeout=60, safe=True, loaded_base_name=None, io_loop=None, jid_queue=None):  # pylint: disable=W0231
         '''
         Pass in the options dict
@@ -1075,6 +1078,9 @@ class Minion(MinionBase):
         self.ready = False
         self.jid_queue = jid_queue or []
         self.periodic_callbacks = {}
+        self.job_pool = None
+        self._job_pool_key = None
+        self._job_pool_stats = None
 
         if io_loop is None:
             install_zmq()
@@ -1449,6 +1455,12 @@ class Minion(MinionBase):
                 self.functions, self.returners, self.function_errors, self.executors = self._load_modules()
                 self.schedule.functions = self.functions
                 self.schedule.returners = self.returners
+                self._stop_job_pool()
+
+        if self.opts.get('job_pool_workers', 0) > 0 and \
+                self.opts.get('multiprocessing', True):
+            self._submit_job(data)
+            return
 
         process_count_max = self.opts.get('process_count_max')
         if process_count_max > 0:
@@ -1495,6 +1507,69 @@ class Minion(MinionBase):
         else:
             self.win_proc.append(process)
 
+    def _submit_job(self, data):
+        '''
+        Queue a job to the pool of job worker processes, (re)starting the pool
+        if it is not running yet or was started with stale master settings
+        '''
+        key = (self.opts.get('master_uri'), self.connected)
+        if self.job_pool is not None and key != self._job_pool_key:
+            log.debug('Master connection changed, restarting the job pool')
+            self._stop_job_pool()
+        if self.job_pool is None:
+            # See _handle_decoded_payload for why the instance is not passed
+            # on windows
+            instance = None if salt.utils.platform.is_windows() else self
+            self.job_pool = salt.utils.minion.JobPool(
+                self.opts,
+                self._job_handler,
+                args=(instance, self.opts, self.connected))
+            self.job_pool.start()
+            self._job_pool_key = key
+        self.job_pool.submit(data)
+
+    def _stop_job_pool(self, wait=False):
+        '''
+        Stop the job pool, letting the workers finish the jobs already queued.
+        A new pool is started with the current modules, pillar and master
+        settings on the next job.
+        '''
+        if self.job_pool is not None:
+            self.job_pool.stop(wait=wait)
+            self.job_pool = None
+
+    def _report_job_pool(self):
+        '''
+        Replace exited job pool workers and fire the pool statistics on the
+        minion event bus when they changed
+        '''
+        if self.job_pool is None:
+            return
+        self.job_pool.maintain()
+        stats = self.job_pool.stats()
+        if stats == self._job_pool_stats:
+            return
+        self._job_pool_stats = stats
+        log.debug('Job pool: %s', stats)
+        evt = salt.utils.event.get_event('minion', opts=self.opts, listen=False)
+        try:
+            evt.fire_event(stats, tagify([self.opts['id'], 'job_pool'], 'minion'))
+        finally:
+            evt.destroy()
+
+    @classmethod
+    def _job_handler(cls, minion_instance, opts, connected):
+        '''
+        Prepare the minion instance of a job pool worker and return the
+        function which runs a job in it
+        '''
+        minion_instance = cls._target_instance(minion_instance, opts, connected)
+        minion_instance.job_pool_worker = True
+
+        def handle(data):
+            cls._target(minion_instance, opts, data, connected)
+        return handle
+
     def ctx(self):
         '''
         Return a single context manager for the minion's data
@@ -1513,7 +1588,11 @@ class Minion(MinionBase):
             return exitstack
 
     @classmethod
-    def _target(cls, minion_instance, opts, data, connected):
+    def _target_instance(cls, minion_instance, opts, connected):
+        '''
+        Return the minion instance to run a job in, creating it if the job
+        process did not inherit one
+        '''
         if not minion_instance:
             minion_instance = cls(opts)
             minion_instance.connected = connected
@@ -1532,7 +1611,11 @@ class Minion(MinionBase):
                 minion_instance.proc_dir = (
                     get_proc_dir(opts['cachedir'], uid=uid)
                     )
+        return minion_instance
 
+    @classmethod
+    def _target(cls, minion_instance, opts, data, connected):
+        minion_instance = cls._target_instance(minion_instance, opts, connected)
         with tornado.stack_context.StackContext(minion_instance.ctx):
             if isinstance(data['fun'], tuple) or isinstance(data['fun'], list):
                 Minion._thread_multi_return(minion_instance, opts, data)
@@ -1547,7 +1630,8 @@ class Minion(MinionBase):
         '''
         fn_ = os.path.join(minion_instance.proc_dir, data['jid'])
 
-        if opts['multiprocessing'] and not salt.utils.platform.is_windows():
+        if opts['multiprocessing'] and not salt.utils.platform.is_windows() \
+                and not minion_instance.job_pool_worker:
             # Shutdown the multiprocessing before daemonizing
             salt.log.setup.shutdown_multiprocessing_logging()
 
@@ -1738,7 +1822,8 @@ class Minion(MinionBase):
         '''
         fn_ = os.path.join(minion_instance.proc_dir, data['jid'])
 
-        if opts['multiprocessing'] and not salt.utils.platform.is_windows():
+        if opts['multiprocessing'] and not salt.utils.platform.is_windows() \
+                and not minion_instance.job_pool_worker:
             # Shutdown the multiprocessing before daemonizing
             salt.log.setup.shutdown_multiprocessing_logging()
 
@@ -2087,6 +2172,7 @@ class Minion(MinionBase):
 
         self.schedule.functions = self.functions
         self.schedule.returners = self.returners
+        self._stop_job_pool()
 
     def beacons_refresh(self):
         '''
@@ -2446,6 +2532,8 @@ class Minion(MinionBase):
         # Add an extra fallback in case a forked process leaks through
         multiprocessing.active_children()
 
+        self._report_job_pool()
+
         # Cleanup Windows threads
         if not salt.utils.platform.is_windows():
             return
@@ -2690,6 +2778,8 @@ class Minion(MinionBase):
         Tear down the minion
         '''
         self._running = False
+        if getattr(self, 'job_pool', None) is not None:
+            self._stop_job_pool(wait=True)
         if hasattr(self, 'schedule'):
             del self.schedule
         if hasattr(self, 'pub_channel') and self.pub_channel is not None:
@@ -3705,7 +3795,11 @@ class ProxyMinion(Minion):
         self.ready = True
 
     @classmethod
-    def _target(cls, minion_instance, opts, data, connected):
+    def _target_instance(cls, minion_instance, opts, connected):
+        '''
+        Return the proxy minion instance to run a job in, creating it and
+        initializing the proxy module if the job process did not inherit one
+        '''
         if not minion_instance:
             minion_instance = cls(opts)
             minion_instance.connected = connected
@@ -3757,6 +3851,11 @@ class ProxyMinion(Minion):
                     get_proc_dir(opts['cachedir'], uid=uid)
                     )
 
+        return minion_instance
+
+    @classmethod
+    def _target(cls, minion_instance, opts, data, connected):
+        minion_instance = cls._target_instance(minion_instance, opts, connected)
         with tornado.stack_context.StackContext(minion_instance.ctx):
             if isinstance(data['fun'], tuple) or isinstance(data['fun'], list):
                 Minion._thread_multi_return(minion_instance, opts, data)
@@ -722,9 +722,74 @@ def hash_file(path, saltenv='base'):
     if senv:
         saltenv = senv
 
+    # Use a hash which was fetched for a whole directory by hash_dir
+    prefetched = __context__.get('cp.hash_dir', {}).pop(
+        (saltenv, salt.utils.url.parse(path)[0]), None)
+    if prefetched is not None:
+        return prefetched
+
     return _client().hash_file(path, saltenv)
 
 
+def hash_dir(path, saltenv='base', prefetch=False):
+    '''
+    .. versionadded:: Fluorine
+
+    Return the hashes of all files under a directory on the salt master file
+    server, fetched with a single request
+
+    prefetch : False
+        A list of ``salt://`` URLs of files under the directory, or True for
+        all of them. Their hashes are kept, so that the next
+        :py:func:`cp.hash_file <salt.modules.cp.hash_file>` call for each of
+        these files returns the kept hash instead of asking the master again.
+        Kept hashes which are not used should be dropped with
+        :py:func:`cp.clear_prefetched_hashes
+        <salt.modules.cp.clear_prefetched_hashes>` once they may be outdated.
+        Used by :py:func:`file.recurse <salt.states.file.recurse>`.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' cp.hash_dir salt://path/to/dir
+    '''
+    path, senv = salt.utils.url.split_env(path)
+    if senv:
+        saltenv = senv
+
+    hashes = _client().hash_and_stat_files(saltenv=saltenv, prefix=path)
+    if prefetch:
+        wanted = None
+        if prefetch is not True:
+            wanted = set()
+            for url in prefetch:
+                fn_, senv = salt.utils.url.parse(url)
+                wanted.add((senv or saltenv, fn_))
+        kept = __context__.setdefault('cp.hash_dir', {})
+        for fn_, hash_stat in six.iteritems(hashes):
+            if wanted is None or (saltenv, fn_) in wanted:
+                kept[(saltenv, fn_)] = hash_stat[0]
+    return dict((salt.utils.url.create(fn_), hash_stat[0])
+                for fn_, hash_stat in six.iteritems(hashes))
+
+
+def clear_prefetched_hashes():
+    '''
+    .. versionadded:: Fluorine
+
+    Drop the hashes kept by :py:func:`cp.hash_dir <salt.modules.cp.hash_dir>`
+    with ``prefetch`` which were not used yet
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' cp.clear_prefetched_hashes
+    '''
+    __context__.pop('cp.hash_dir', None)
+
+
 def stat_file(path, saltenv='base', octal=True):
     '''
     Return the permissions of a file, to get the permissions of a file on the
@@ -131,6 +131,8 @@ class Serial(object):
                          been lost in this case) to what the encoding is
                          set as. In this case, it will fail if any of
                          the contents cannot be converted.
+        :param raw: Under Python 3, do not try to decode the 'bytes' in
+                    data which was not encoded using "use_bin_type=True".
         '''
         try:
             def ext_type_decoder(code, data):
@@ -140,6 +142,16 @@ class Serial(object):
                 return data
 
             gc.disable()  # performance optimization for msgpack
+            if six.PY3 and encoding is None and not raw \
+                    and msgpack.version >= (0, 4, 0):
+                # Decoding all strings as utf-8 while unpacking gives the same
+                # result as the decode_embedded_strs walk below, without a
+                # second pass over the whole message. Only messages which
+                # carry binary data need the walk.
+                try:
+                    return msgpack.loads(msg, use_list=True, ext_hook=ext_type_decoder, encoding='utf-8')
+                except UnicodeDecodeError:
+                    pass
             if msgpack.version >= (0, 4, 0):
                 # msgpack only supports 'encoding' starting in 0.4.0.
                 # Due to this, if we don't need it, don't pass it at all so
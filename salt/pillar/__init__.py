@@ -26,9 +26,10 @@ import salt.utils.cache
 import salt.utils.crypt
 import salt.utils.data
 import salt.utils.dictupdate
+import salt.utils.rendercache
 import salt.utils.url
 from salt.exceptions import SaltClientError
-from salt.template import compile_template
+from salt.template import compile_template, template_shebang
 from salt.utils.odict import OrderedDict
 from salt.version import __version__
 # Even though dictupdate is imported, invoking salt.utils.dictupdate.merge here
@@ -356,6 +357,20 @@ class Pillar(object):
         if opts.get('file_client', '') == 'local':
             opts['grains'] = grains
 
+        # The render cache needs to see what the execution functions read,
+        # so it is only used when they are loaded with the pillar opts. It
+        # can not see every read on Python 2, see salt.utils.rendercache.
+        self.render_tracker = None
+        if opts.get('pillar_render_cache', False) and six.PY3 \
+                and functions is None \
+                and opts.get('file_client', '') != 'local':
+            self.render_tracker = salt.utils.rendercache.Tracker(
+                self.opts, self.opts.get('pillar_render_cache_functions', []))
+            self.opts['grains'] = self.render_tracker.track(
+                'grains', self.opts['grains'])
+            self.opts['pillar'] = self.render_tracker.track(
+                'pillar', self.opts.get('pillar'))
+
         # if we didn't pass in functions, lets load them
         if functions is None:
             utils = salt.loader.utils(opts)
@@ -367,7 +382,7 @@ class Pillar(object):
             self.functions = functions
 
         self.matcher = salt.minion.Matcher(self.opts, self.functions)
-        self.rend = salt.loader.render(self.opts, self.functions)
+        self.rend = self._load_renderers()
         ext_pillar_opts = copy.deepcopy(self.opts)
         # Fix self.opts['file_roots'] so that ext_pillars know the real
         # location of file_roots. Issue 5951
@@ -474,6 +489,22 @@ class Pillar(object):
                 opts['file_roots'].pop('__env__')
         return opts
 
+    def _load_renderers(self):
+        '''
+        Load the renderers, which see tracked copies of the grains, pillar
+        and opts when the render cache is enabled
+        '''
+        if self.render_tracker is None:
+            return salt.loader.render(self.opts, self.functions)
+        if not isinstance(self.opts.get('pillar'),
+                          salt.utils.rendercache.TrackedDict):
+            self.opts['pillar'] = self.render_tracker.track(
+                'pillar', self.opts.get('pillar'))
+        return salt.loader.render(
+            self.opts,
+            self.render_tracker.functions(self.functions),
+            mod_opts=self.render_tracker.track('opts', self.opts))
+
     def _get_envs(self):
         '''
         Pull the file server environments out of the master options
@@ -663,6 +694,33 @@ class Pillar(object):
                             env_matches.append(item)
         return matches
 
+    def _render_sls(self, fn_, saltenv, sls, defaults):
+        '''
+        Render a single pillar sls file, through the render cache when it is
+        enabled
+        '''
+        def _compile():
+            return compile_template(fn_,
+                                    self.rend,
+                                    self.opts['renderer'],
+                                    self.opts['renderer_blacklist'],
+                                    self.opts['renderer_whitelist'],
+                                    saltenv,
+                                    sls,
+                                    _pillar_rend=True,
+                                    **defaults)
+
+        if self.render_tracker is None or not os.path.isfile(fn_):
+            return _compile()
+        render_pipe = template_shebang(fn_,
+                                       self.rend,
+                                       self.opts['renderer'],
+                                       self.opts['renderer_blacklist'],
+                                       self.opts['renderer_whitelist'],
+                                       '')
+        return self.render_tracker.render(
+            fn_, saltenv, sls, render_pipe, defaults, _compile)
+
     def render_pstate(self, sls, saltenv, mods, defaults=None):
         '''
         Collect a single pillar sls file and render it
@@ -705,15 +763,7 @@ class Pillar(object):
                 return None, mods, errors
         state = None
         try:
-            state = compile_template(fn_,
-                                     self.rend,
-                                     self.opts['renderer'],
-                                     self.opts['renderer_blacklist'],
-                                     self.opts['renderer_whitelist'],
-                                     saltenv,
-                                     sls,
-                                     _pillar_rend=True,
-                                     **defaults)
+            state = self._render_sls(fn_, saltenv, sls, defaults)
         except Exception as exc:
             msg = 'Rendering SLS \'{0}\' failed, render error:\n{1}'.format(
                 sls, exc
@@ -981,7 +1031,7 @@ class Pillar(object):
         if ext:
             if self.opts.get('ext_pillar_first', False):
                 self.opts['pillar'], errors = self.ext_pillar(self.pillar_override)
-                self.rend = salt.loader.render(self.opts, self.functions)
+                self.rend = self._load_renderers()
                 matches = self.top_matches(top)
                 pillar, errors = self.render_pillar(matches, errors=errors)
                 pillar = merge(
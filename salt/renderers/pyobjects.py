@@ -494,7 +494,10 @@ def render(template, saltenv='base', sls='', salt_data=True, **kwargs):
         return "\n".join(template_data), template_globals
 
     # process the template that triggered the render
-    final_template, final_globals = process_template(template)
+    try:
+        final_template, final_globals = process_template(template)
+    finally:
+        client.destroy()
     _globals.update(final_globals)
 
     # re-enable the registry
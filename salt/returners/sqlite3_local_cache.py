@@ -0,0 +1,421 @@
+# -*- coding: utf-8 -*-
+'''
+Use an embedded SQLite database for the master job cache.
+
+.. versionadded:: Fluorine
+
+This is a drop-in replacement for the default
+:mod:`local_cache <salt.returners.local_cache>` job cache. Instead of one
+directory per job and one msgpack file per load, minion list and return,
+jobs are stored in a single SQLite database in WAL mode, indexed by jid,
+function, target and creation time. Listing jobs and cleaning out expired
+jobs therefore no longer need to walk and unpack the whole job cache.
+
+:maintainer:    SaltStack
+:maturity:      New
+:depends:       sqlite3
+:platform:      all
+
+To enable this job cache set the following in the master config:
+
+.. code-block:: yaml
+
+    master_job_cache: sqlite3_local_cache
+
+The database is created on first use. Its location and the time to wait for
+a lock held by another master process can be changed with:
+
+.. code-block:: yaml
+
+    master_job_cache.sqlite3.database: /var/cache/salt/master/jobs.sqlite
+    master_job_cache.sqlite3.timeout: 10.0
+'''
+from __future__ import absolute_import, print_function, unicode_literals
+
+# Import python libs
+import logging
+import os
+import time
+
+# Import salt libs
+import salt.payload
+import salt.utils.jid
+import salt.utils.minions
+import salt.utils.stringutils
+import salt.exceptions
+
+# Import 3rd-party libs
+from salt.ext import six
+
+# Better safe than sorry here. Even though sqlite3 is included in python
+try:
+    import sqlite3
+    HAS_SQLITE3 = True
+except ImportError:
+    HAS_SQLITE3 = False
+
+log = logging.getLogger(__name__)
+
+__virtualname__ = 'sqlite3_local_cache'
+
+_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS jids (
+         jid TEXT PRIMARY KEY,
+         created REAL NOT NULL,
+         nocache INTEGER NOT NULL DEFAULT 0,
+         fun TEXT,
+         tgt TEXT,
+         load BLOB,
+         endtime TEXT
+       )''',
+    'CREATE INDEX IF NOT EXISTS jids_created ON jids (created)',
+    'CREATE INDEX IF NOT EXISTS jids_fun ON jids (fun)',
+    'CREATE INDEX IF NOT EXISTS jids_tgt ON jids (tgt)',
+    '''CREATE TABLE IF NOT EXISTS minions (
+         jid TEXT NOT NULL,
+         syndic_id TEXT NOT NULL,
+         minions BLOB NOT NULL,
+         PRIMARY KEY (jid, syndic_id)
+       )''',
+    '''CREATE TABLE IF NOT EXISTS returns (
+         jid TEXT NOT NULL,
+         id TEXT NOT NULL,
+         ret BLOB NOT NULL,
+         out BLOB,
+         PRIMARY KEY (jid, id)
+       )''',
+    '''CREATE TABLE IF NOT EXISTS register (
+         id INTEGER PRIMARY KEY,
+         data BLOB NOT NULL
+       )''',
+)
+
+# Connections can not be shared with forked children, they are kept per pid
+_CONN = {}
+
+
+def __virtual__():
+    if not HAS_SQLITE3:
+        return (False, 'Could not import sqlite3; sqlite3_local_cache disabled')
+    return __virtualname__
+
+
+def _database():
+    '''
+    Return the path to the job cache database
+    '''
+    return __opts__.get(
+        'master_job_cache.sqlite3.database',
+        os.path.join(__opts__['cachedir'], 'jobs.sqlite'))
+
+
+def _get_conn():
+    '''
+    Return the sqlite3 connection of this process, creating the database
+    schema on first use
+    '''
+    database = _database()
+    key = (os.getpid(), database)
+    if key in _CONN:
+        return _CONN[key]
+    dirname = os.path.dirname(database)
+    if dirname and not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    conn = sqlite3.connect(
+        database,
+        timeout=float(__opts__.get('master_job_cache.sqlite3.timeout', 10.0)))
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    with conn:
+        for statement in _SCHEMA:
+            conn.execute(statement)
+    _CONN[key] = conn
+    return conn
+
+
+def _now():
+    '''
+    Return the current time, for use where ``time`` is shadowed
+    '''
+    return time.time()
+
+
+def _dumps(data):
+    return sqlite3.Binary(salt.payload.Serial(__opts__).dumps(data))
+
+
+def _loads(data):
+    return salt.payload.Serial(__opts__).loads(bytes(data))
+
+
+def prep_jid(nocache=False, passed_jid=None, recurse_count=0):
+    '''
+    Return a job id and register it in the job cache.
+
+    This is the function responsible for making sure jids don't collide (unless
+    it is passed a jid).
+    '''
+    if recurse_count >= 5:
+        err = 'prep_jid could not store a jid after {0} tries.'.format(recurse_count)
+        log.error(err)
+        raise salt.exceptions.SaltCacheError(err)
+    if passed_jid is None:  # this can be a None or an empty string.
+        jid = salt.utils.jid.gen_jid(__opts__)
+    else:
+        jid = passed_jid
+
+    conn = _get_conn()
+    try:
+        with conn:
+            conn.execute(
+                'INSERT INTO jids (jid, created, nocache) VALUES (?, ?, ?)',
+                (jid, time.time(), int(bool(nocache))))
+    except sqlite3.IntegrityError:
+        if passed_jid is None:
+            # Someone else is using this jid, get a new one
+            return prep_jid(nocache=nocache, recurse_count=recurse_count + 1)
+    except sqlite3.OperationalError as exc:
+        log.warning('Could not store jid %s: %s. Retrying.', jid, exc)
+        time.sleep(0.1)
+        return prep_jid(nocache=nocache, passed_jid=passed_jid,
+                        recurse_count=recurse_count + 1)
+    return jid
+
+
+def returner(load):
+    '''
+    Return data to the job cache
+    '''
+    # if a minion is returning a standalone job, get a jobid
+    if load['jid'] == 'req':
+        load['jid'] = prep_jid(nocache=load.get('nocache', False))
+
+    conn = _get_conn()
+    row = conn.execute('SELECT nocache FROM jids WHERE jid = ?',
+                       (load['jid'],)).fetchone()
+    if row is None:
+        log.error(
+            'An inconsistency occurred, a job was received with a job id '
+            '(%s) that is not present in the local cache', load['jid']
+        )
+        return False
+    if row[0]:
+        return
+
+    ret = dict((key, load[key]) for key in ['return', 'retcode', 'success'] if key in load)
+    try:
+        with conn:
+            conn.execute(
+                'INSERT INTO returns (jid, id, ret, out) VALUES (?, ?, ?, ?)',
+                (load['jid'],
+                 load['id'],
+                 _dumps(ret),
+                 _dumps(load['out']) if 'out' in load else None))
+    except sqlite3.IntegrityError:
+        # Minion has already returned this jid and it should be dropped
+        log.error(
+            'An extra return was detected from minion %s, please verify '
+            'the minion, this could be a replay attack', load['id']
+        )
+        return False
+
+
+def save_load(jid, clear_load, minions=None):
+    '''
+    Save the load to the specified jid
+
+    minions argument is to provide a pre-computed list of matched minions for
+    the job, for cases when this function can't compute that list itself (such
+    as for salt-ssh)
+    '''
+    conn = _get_conn()
+    try:
+        with conn:
+            conn.execute(
+                'INSERT OR IGNORE INTO jids (jid, created) VALUES (?, ?)',
+                (jid, time.time()))
+            conn.execute(
+                'UPDATE jids SET fun = ?, tgt = ?, load = ? WHERE jid = ?',
+                (clear_load.get('fun'),
+                 six.text_type(clear_load.get('tgt', '')),
+                 _dumps(clear_load),
+                 jid))
+    except sqlite3.OperationalError as exc:
+        err = 'Could not write job invocation to the job cache: {0}'.format(exc)
+        log.error(err)
+        raise salt.exceptions.SaltCacheError(err)
+
+    # if you have a tgt, save that for the UI etc
+    if 'tgt' in clear_load and clear_load['tgt'] != '':
+        if minions is None:
+            ckminions = salt.utils.minions.CkMinions(__opts__)
+            # Retrieve the minions list
+            _res = ckminions.check_minions(
+                    clear_load['tgt'],
+                    clear_load.get('tgt_type', 'glob')
+                    )
+            minions = _res['minions']
+        # save the minions to a cache so we can see in the UI
+        save_minions(jid, minions)
+
+
+def save_minions(jid, minions, syndic_id=None):
+    '''
+    Save/update the list of minions for a given job
+    '''
+    # Ensure we have a list for Python 3 compatability
+    minions = list(minions)
+
+    log.debug(
+        'Adding minions for job %s%s: %s',
+        jid,
+        ' from syndic master \'{0}\''.format(syndic_id) if syndic_id else '',
+        minions
+    )
+    conn = _get_conn()
+    try:
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO minions (jid, syndic_id, minions) '
+                'VALUES (?, ?, ?)',
+                (jid, syndic_id or '', _dumps(minions)))
+    except sqlite3.OperationalError as exc:
+        log.error(
+            'Failed to write minion list %s to the job cache for job %s: %s',
+            minions, jid, exc
+        )
+
+
+def get_load(jid):
+    '''
+    Return the load data that marks a specified jid
+    '''
+    conn = _get_conn()
+    row = conn.execute('SELECT load FROM jids WHERE jid = ?', (jid,)).fetchone()
+    if row is None or row[0] is None:
+        return {}
+    ret = _loads(row[0]) or {}
+    all_minions = set()
+    for (minions,) in conn.execute('SELECT minions FROM minions WHERE jid = ?',
+                                   (jid,)):
+        all_minions.update(_loads(minions))
+    if all_minions:
+        ret['Minions'] = sorted(all_minions)
+    return ret
+
+
+def get_jid(jid):
+    '''
+    Return the information returned when the specified job id was executed
+    '''
+    conn = _get_conn()
+    ret = {}
+    for minion_id, ret_data, out in conn.execute(
+            'SELECT id, ret, out FROM returns WHERE jid = ?', (jid,)):
+        ret_data = _loads(ret_data)
+        if not isinstance(ret_data, dict) or 'return' not in ret_data:
+            ret_data = {'return': ret_data}
+        if out is not None:
+            ret_data['out'] = _loads(out)
+        ret[minion_id] = ret_data
+    return ret
+
+
+def get_jids():
+    '''
+    Return a dict mapping all job ids to job information
+    '''
+    conn = _get_conn()
+    ret = {}
+    for jid, load, endtime in conn.execute(
+            'SELECT jid, load, endtime FROM jids WHERE load IS NOT NULL'):
+        ret[jid] = salt.utils.jid.format_jid_instance(jid, _loads(load))
+        if __opts__.get('job_cache_store_endtime') and endtime:
+            ret[jid]['EndTime'] = endtime
+    return ret
+
+
+def get_jids_filter(count, filter_find_job=True):
+    '''
+    Return a list of all jobs information filtered by the given criteria.
+    :param int count: show not more than the count of most recent jobs
+    :param bool filter_find_jobs: filter out 'saltutil.find_job' jobs
+    '''
+    sql = 'SELECT jid, load FROM jids WHERE load IS NOT NULL'
+    if filter_find_job:
+        sql += ' AND (fun IS NULL OR fun != \'saltutil.find_job\')'
+    # jids sort by their start time, so the newest jobs can be read off the
+    # primary key index
+    sql += ' ORDER BY jid DESC LIMIT ?'
+    conn = _get_conn()
+    ret = [salt.utils.jid.format_jid_instance_ext(jid, _loads(load))
+           for jid, load in conn.execute(sql, (count,))]
+    ret.reverse()
+    return ret
+
+
+def clean_old_jobs():
+    '''
+    Clean out the old jobs from the job cache
+    '''
+    if __opts__['keep_jobs'] == 0:
+        return
+    cutoff = time.time() - __opts__['keep_jobs'] * 3600.0
+    conn = _get_conn()
+    with conn:
+        for table in ('returns', 'minions'):
+            conn.execute(
+                'DELETE FROM {0} WHERE jid IN '
+                '(SELECT jid FROM jids WHERE created < ?)'.format(table),
+                (cutoff,))
+        conn.execute('DELETE FROM jids WHERE created < ?', (cutoff,))
+
+
+def update_endtime(jid, time):
+    '''
+    Update (or store) the end time for a given job
+    '''
+    conn = _get_conn()
+    try:
+        with conn:
+            conn.execute(
+                'INSERT OR IGNORE INTO jids (jid, created) VALUES (?, ?)',
+                (jid, _now()))
+            conn.execute('UPDATE jids SET endtime = ? WHERE jid = ?',
+                         (salt.utils.stringutils.to_unicode(time), jid))
+    except sqlite3.OperationalError as exc:
+        log.warning('Could not write job end time to the job cache: %s', exc)
+
+
+def get_endtime(jid):
+    '''
+    Retrieve the stored endtime for a given job
+
+    Returns False if no endtime is present
+    '''
+    conn = _get_conn()
+    row = conn.execute('SELECT endtime FROM jids WHERE jid = ?', (jid,)).fetchone()
+    if row is None or row[0] is None:
+        return False
+    return row[0]
+
+
+def save_reg(data):
+    '''
+    Save the thorium register
+    '''
+    conn = _get_conn()
+    with conn:
+        conn.execute('INSERT OR REPLACE INTO register (id, data) VALUES (0, ?)',
+                     (_dumps(data),))
+
+
+def load_reg():
+    '''
+    Load the thorium register
+    '''
+    conn = _get_conn()
+    row = conn.execute('SELECT data FROM register WHERE id = 0').fetchone()
+    if row is None:
+        return {}
+    return _loads(row[0])
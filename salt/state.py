@@ -269,6 +269,131 @@ def find_sls_ids(sls, high):
     return ret
 
 
+def _index_high_sls(high):
+    '''
+    Return the result of find_sls_ids for every sls in the high data, as a
+    dict of sls to lists of (ID, state) tuples
+    '''
+    ret = {}
+    for nid, item in six.iteritems(high):
+        if not isinstance(item, dict) or '__sls__' not in item:
+            continue
+        ids = ret.setdefault(item['__sls__'], [])
+        for st_ in item:
+            if st_.startswith('__'):
+                continue
+            ids.append((nid, st_))
+    return ret
+
+
+def _index_high_names(high):
+    '''
+    Map each name argument in the high data to {state: ID} of the first state
+    declaring it
+    '''
+    ret = {}
+    for nid, item in six.iteritems(high):
+        if not isinstance(item, dict):
+            continue
+        for state in item:
+            if state.startswith('__') or not isinstance(item[state], list):
+                continue
+            for arg in item[state]:
+                if isinstance(arg, dict) and 'name' in arg:
+                    try:
+                        ret.setdefault(arg['name'], {state: nid})
+                    except TypeError:
+                        continue
+    return ret
+
+
+def _is_glob(pattern):
+    '''
+    Return True if the requisite value is a glob rather than a literal
+    '''
+    return isinstance(pattern, six.string_types) \
+        and any(char in pattern for char in '*?[')
+
+
+class ChunkIndex(object):
+    '''
+    Lookup tables over a compiled chunk list, keyed by id, name and sls and
+    by (state, id) and (state, name), so that requisites are resolved
+    without scanning all chunks for every requisite.
+
+    Literal values are looked up directly, globs fall back to fnmatch, so the
+    matches are the same as those of fnmatch over all chunks.
+    '''
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.size = len(chunks)
+        self.position = {}
+        self.by_id = {}
+        self.by_name = {}
+        self.by_sls = {}
+        for pos, chunk in enumerate(chunks):
+            self.position[id(chunk)] = pos
+            self._add(self.by_id, chunk.get('__id__'), chunk)
+            self._add(self.by_name, chunk.get('name'), chunk)
+            if '__sls__' in chunk:
+                self.by_sls.setdefault(
+                    self._key(chunk['__sls__']), []).append(chunk)
+
+    @staticmethod
+    def _key(value):
+        # fnmatch normalizes the case of both sides on Windows
+        if isinstance(value, six.string_types):
+            return os.path.normcase(value)
+        return value
+
+    def _add(self, table, value, chunk):
+        try:
+            key = self._key(value)
+            table.setdefault(key, []).append(chunk)
+            table.setdefault((chunk.get('state'), key), []).append(chunk)
+        except TypeError:
+            # Unhashable values can only be matched by the fnmatch fallback
+            pass
+
+    def _merge(self, matches):
+        '''
+        Return the chunks of several lookups once each, in chunk order
+        '''
+        matches = [match for match in matches if match]
+        if len(matches) == 1:
+            return list(matches[0])
+        ret = {}
+        for match in matches:
+            for chunk in match:
+                ret[id(chunk)] = chunk
+        return sorted(six.itervalues(ret),
+                      key=lambda chunk: self.position[id(chunk)])
+
+    def match(self, req_key, req_val):
+        '''
+        Return the chunks matching the requisite ``{req_key: req_val}``, in
+        chunk order. Only a string ``req_val`` matches any chunk.
+        '''
+        if not isinstance(req_val, six.string_types):
+            return []
+        if req_key == 'sls':
+            # Allow requisite tracking of entire sls files
+            if _is_glob(req_val):
+                return self._merge(
+                    [chunks for sls, chunks in six.iteritems(self.by_sls)
+                     if fnmatch.fnmatch(sls, req_val)])
+            return list(self.by_sls.get(self._key(req_val), ()))
+        if _is_glob(req_val):
+            return [chunk for chunk in self.chunks
+                    if (fnmatch.fnmatch(chunk['name'], req_val) or
+                        fnmatch.fnmatch(chunk['__id__'], req_val)) and
+                    (req_key == 'id' or chunk['state'] == req_key)]
+        key = self._key(req_val)
+        if req_key != 'id':
+            key = (req_key, key)
+        return self._merge([self.by_name.get(key), self.by_id.get(key)])
+
+
 def format_log(ret):
     '''
     Format the state into a log message
@@ -739,6 +864,7 @@ class State(object):
         self.active = set()
         self.mod_init = set()
         self.pre = {}
+        self._chunk_index = None
         self.__run_num = 0
         self.jid = jid
         self.instance_id = six.text_type(id(self))
@@ -1511,6 +1637,9 @@ class State(object):
         req_in_all = req_in.union({'require', 'watch', 'onfail', 'onfail_stop', 'onchanges'})
         extend = {}
         errors = []
+        # Lookup tables over the high data, built when first needed
+        name_refs = None
+        sls_refs = None
         for id_, body in six.iteritems(high):
             if not isinstance(body, dict):
                 continue
@@ -1584,25 +1713,20 @@ class State(object):
                                                      if not x.startswith('__')]
                                         ind = {_ind_high[0]: ind}
                                     else:
-                                        found = False
-                                        for _id in iter(high):
-                                            for state in [state for state
-                                                          in iter(high[_id])
-                                                          if not state.startswith('__')]:
-                                                for j in iter(high[_id][state]):
-                                                    if isinstance(j, dict) and 'name' in j:
-                                                        if j['name'] == ind:
-                                                            ind = {state: _id}
-                                                            found = True
-                                        if not found:
+                                        if name_refs is None:
+                                            name_refs = _index_high_names(high)
+                                        if ind not in name_refs:
                                             continue
+                                        ind = name_refs[ind]
                                 if len(ind) < 1:
                                     continue
                                 pstate = next(iter(ind))
                                 pname = ind[pstate]
                                 if pstate == 'sls':
                                     # Expand hinges here
-                                    hinges = find_sls_ids(pname, high)
+                                    if sls_refs is None:
+                                        sls_refs = _index_high_sls(high)
+                                    hinges = list(sls_refs.get(pname, ()))
                                 else:
                                     hinges.append((pname, pstate))
                                 if '.' in pstate:
@@ -2230,6 +2354,17 @@ class State(object):
                     retset.add(False)
         return False not in retset
 
+    def _get_chunk_index(self, chunks):
+        '''
+        Return the ChunkIndex of the given chunk list, it is only rebuilt
+        when a different or changed chunk list is passed
+        '''
+        index = self._chunk_index
+        if index is None or index.chunks is not chunks \
+                or index.size != len(chunks):
+            index = self._chunk_index = ChunkIndex(chunks)
+        return index
+
     def check_requisite(self, low, running, chunks, pre=False):
         '''
         Look into the running data to check the status of all requisite
@@ -2284,46 +2419,26 @@ class State(object):
                 'onchanges_any': []}
         if pre:
             reqs['prerequired'] = []
+        index = self._get_chunk_index(chunks)
         for r_state in reqs:
             if r_state in low and low[r_state] is not None:
                 for req in low[r_state]:
                     if isinstance(req, six.string_types):
                         req = {'id': req}
                     req = trim_req(req)
-                    found = False
-                    for chunk in chunks:
-                        req_key = next(iter(req))
-                        req_val = req[req_key]
-                        if req_val is None:
-                            continue
-                        if req_key == 'sls':
-                            # Allow requisite tracking of entire sls files
-                            if fnmatch.fnmatch(chunk['__sls__'], req_val):
-                                found = True
-                                reqs[r_state].append(chunk)
-                            continue
-                        try:
-                            if isinstance(req_val, six.string_types):
-                                if (fnmatch.fnmatch(chunk['name'], req_val) or
-                                    fnmatch.fnmatch(chunk['__id__'], req_val)):
-                                    if req_key == 'id' or chunk['state'] == req_key:
-                                        found = True
-                                        reqs[r_state].append(chunk)
-                            else:
-                                raise KeyError
-                        except KeyError as exc:
-                            raise SaltRenderError(
-                                'Could not locate requisite of [{0}] present in state with name [{1}]'.format(
-                                    req_key, chunk['name']))
-                        except TypeError:
-                            # On Python 2, the above req_val, being an OrderedDict, will raise a KeyError,
-                            # however on Python 3 it will raise a TypeError
-                            # This was found when running tests.unit.test_state.StateCompilerTestCase.test_render_error_on_invalid_requisite
-                            raise SaltRenderError(
-                                'Could not locate requisite of [{0}] present in state with name [{1}]'.format(
-                                    req_key, chunk['name']))
+                    req_key = next(iter(req))
+                    req_val = req[req_key]
+                    if req_val is None or not chunks:
+                        return 'unmet', ()
+                    if req_key != 'sls' and \
+                            not isinstance(req_val, six.string_types):
+                        raise SaltRenderError(
+                            'Could not locate requisite of [{0}] present in state with name [{1}]'.format(
+                                req_key, chunks[0]['name']))
+                    found = index.match(req_key, req_val)
                     if not found:
                         return 'unmet', ()
+                    reqs[r_state].extend(found)
         fun_stats = set()
         for r_state, chunks in six.iteritems(reqs):
             req_stats = set()
@@ -2466,6 +2581,7 @@ class State(object):
         else:
             status, reqs = self.check_requisite(low, running, chunks)
         if status == 'unmet':
+            index = self._get_chunk_index(chunks)
             lost = {}
             reqs = []
             for requisite in requisites:
@@ -2479,26 +2595,15 @@ class State(object):
                     found = False
                     req_key = next(iter(req))
                     req_val = req[req_key]
-                    for chunk in chunks:
-                        if req_val is None:
-                            continue
-                        if req_key == 'sls':
-                            # Allow requisite tracking of entire sls files
-                            if fnmatch.fnmatch(chunk['__sls__'], req_val):
-                                if requisite == 'prereq':
-                                    chunk['__prereq__'] = True
-                                reqs.append(chunk)
-                                found = True
-                            continue
-                        if (fnmatch.fnmatch(chunk['name'], req_val) or
-                            fnmatch.fnmatch(chunk['__id__'], req_val)):
-                            if req_key == 'id' or chunk['state'] == req_key:
-                                if requisite == 'prereq':
-                                    chunk['__prereq__'] = True
-                                elif requisite == 'prerequired':
-                                    chunk['__prerequired__'] = True
-                                reqs.append(chunk)
-                                found = True
+                    if req_val is not None:
+                        for chunk in index.match(req_key, req_val):
+                            if requisite == 'prereq':
+                                chunk['__prereq__'] = True
+                            elif requisite == 'prerequired' and \
+                                    req_key != 'sls':
+                                chunk['__prerequired__'] = True
+                            reqs.append(chunk)
+                            found = True
                     if not found:
                         lost[requisite].append(req)
             if lost['require'] or lost['watch'] or lost['prereq'] \
@@ -2684,22 +2789,30 @@ class State(object):
                 for l_in in chunk['listen_in']:
                     for key, val in six.iteritems(l_in):
                         listeners.append({(key, val, 'lookup'): [{chunk['state']: chunk['__id__']}]})
+        # Map (state, value) to the chunks whose cref holds that value, so a
+        # listen is resolved without scanning all crefs
+        lrefs = {}
+        for cref, data in six.iteritems(crefs):
+            for val in set(cref):
+                lrefs.setdefault((cref[0], val), []).append(data)
+        index = self._get_chunk_index(chunks)
         mod_watchers = []
         errors = {}
         for l_dict in listeners:
             for key, val in six.iteritems(l_dict):
                 for listen_to in val:
                     if not isinstance(listen_to, dict):
-                        found = False
-                        for chunk in chunks:
-                            if chunk['__id__'] == listen_to or \
-                               chunk['name'] == listen_to:
-                                listen_to = {chunk['state']: chunk['__id__']}
-                                found = True
+                        found = [
+                            chunk for chunk in
+                            index.match('id', listen_to)
+                            if chunk['__id__'] == listen_to or
+                            chunk['name'] == listen_to
+                        ]
                         if not found:
                             continue
+                        listen_to = {found[0]['state']: found[0]['__id__']}
                     for lkey, lval in six.iteritems(listen_to):
-                        if not any(lkey == cref[0] and lval in cref for cref in crefs):
+                        if (lkey, lval) not in lrefs:
                             rerror = {_l_tag(lkey, lval):
                                       {
                                           'comment': 'Referenced state {0}: {1} does not exist'.format(lkey, lval),
@@ -2709,14 +2822,12 @@ class State(object):
                                       }}
                             errors.update(rerror)
                             continue
-                        to_tags = [
-                            _gen_tag(data) for cref, data in six.iteritems(crefs) if lkey == cref[0] and lval in cref
-                        ]
+                        to_tags = [_gen_tag(data) for data in lrefs[(lkey, lval)]]
                         for to_tag in to_tags:
                             if to_tag not in running:
                                 continue
                             if running[to_tag]['changes']:
-                                if not any(key[0] == cref[0] and key[1] in cref for cref in crefs):
+                                if (key[0], key[1]) not in lrefs:
                                     rerror = {_l_tag(key[0], key[1]):
                                                  {'comment': 'Referenced state {0}: {1} does not exist'.format(key[0], key[1]),
                                                   'name': 'listen_{0}:{1}'.format(key[0], key[1]),
@@ -2725,7 +2836,7 @@ class State(object):
                                     errors.update(rerror)
                                     continue
 
-                                new_chunks = [data for cref, data in six.iteritems(crefs) if key[0] == cref[0] and key[1] in cref]
+                                new_chunks = lrefs[(key[0], key[1])]
                                 for chunk in new_chunks:
                                     low = chunk.copy()
                                     low['sfun'] = chunk['fun']
@@ -4084,7 +4195,8 @@ class HighState(BaseHighState):
 
     @classmethod
     def pop_active(cls):
-        cls.stack.pop()
+        # The state run is done, close the channel of its file client
+        cls.stack.pop().client.destroy()
 
     @classmethod
     def get_active(cls):
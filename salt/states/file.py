@@ -3592,8 +3592,20 @@ def recurse(name,
         merge_ret(os.path.join(name, srelpath), _ret)
     for dirname in mng_dirs:
         manage_directory(dirname)
-    for dest, src in mng_files:
-        manage_file(dest, src, replace)
+    if mng_files:
+        # Fetch the hashes of all files with one request, instead of one
+        # request per file when each of them is managed
+        __salt__['cp.hash_dir'](
+            salt.utils.url.create(srcpath), senv,
+            prefetch=[src for dest, src in mng_files])
+    try:
+        for dest, src in mng_files:
+            manage_file(dest, src, replace)
+    finally:
+        if mng_files:
+            # The kept hashes outlive this state in the execution module
+            # context, where they would be outdated by the next job
+            __salt__['cp.clear_prefetched_hashes']()
 
     if clean:
         # TODO: Use directory(clean=True) instead
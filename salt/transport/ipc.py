@@ -24,6 +24,7 @@ from tornado.iostream import IOStream
 # Import Salt libs
 import salt.transport.client
 import salt.transport.frame
+import salt.utils.stringutils
 from salt.ext import six
 
 log = logging.getLogger(__name__)
@@ -491,6 +492,14 @@ class IPCMessagePublisher(object):
         self.io_loop = io_loop or IOLoop.current()
         self._closing = False
         self.streams = set()
+        # The tag prefixes subscribed to by a stream, streams which did not
+        # subscribe receive every message
+        self.filters = {}
+        # The number of messages waiting to be written to a stream, and the
+        # number of messages dropped because it reached the high-water mark
+        self.pending = {}
+        self.drops = {}
+        self.hwm = self.opts.get('ipc_subscriber_hwm', 0)
 
     def start(self):
         '''
@@ -523,25 +532,97 @@ class IPCMessagePublisher(object):
             yield stream.write(pack)
         except tornado.iostream.StreamClosedError:
             log.trace('Client disconnected from IPC %s', self.socket_path)
-            self.streams.discard(stream)
+            self._discard(stream)
         except Exception as exc:
             log.error('Exception occurred while handling stream: %s', exc)
             if not stream.closed():
                 stream.close()
-            self.streams.discard(stream)
-
-    def publish(self, msg):
+            self._discard(stream)
+        finally:
+            if stream in self.pending:
+                self.pending[stream] -= 1
+
+    def _discard(self, stream):
+        self.streams.discard(stream)
+        self.filters.pop(stream, None)
+        self.pending.pop(stream, None)
+        drops = self.drops.pop(stream, 0)
+        if drops:
+            log.warning('IPC subscriber on %s disconnected after %s messages '
+                        'were dropped for it', self.socket_path, drops)
+
+    def publish(self, msg, tag=None):
         '''
         Send message to all connected sockets
+
+        If the ``tag`` of the message is passed, it is only sent to the
+        sockets which subscribed to a prefix of it or did not subscribe at all.
         '''
         if not len(self.streams):
             return
 
-        pack = salt.transport.frame.frame_msg_ipc(msg, raw_body=True)
-
+        if tag is not None:
+            tag = salt.utils.stringutils.to_bytes(tag)
+        pack = None
         for stream in self.streams:
+            prefixes = self.filters.get(stream)
+            if prefixes is not None and tag is not None \
+                    and not tag.startswith(prefixes):
+                continue
+            if self.hwm and self.pending[stream] >= self.hwm:
+                # A slow subscriber must not make the publisher buffer
+                # messages without bounds
+                if not self.drops[stream]:
+                    log.warning('IPC subscriber on %s reached the high-water '
+                                'mark of %s messages, dropping messages',
+                                self.socket_path, self.hwm)
+                self.drops[stream] += 1
+                continue
+            if self.drops.get(stream):
+                log.warning('IPC subscriber on %s is receiving messages '
+                            'again, %s messages were dropped',
+                            self.socket_path, self.drops[stream])
+                self.drops[stream] = 0
+            if pack is None:
+                pack = salt.transport.frame.frame_msg_ipc(msg, raw_body=True)
+            self.pending[stream] += 1
             self.io_loop.spawn_callback(self._write, stream, pack)
 
+    @tornado.gen.coroutine
+    def _read_subscriptions(self, stream):
+        '''
+        Read the subscription messages sent by a subscriber. A subscription
+        message is a dict with the list of tag prefixes to receive under the
+        ``subscribe`` key, ``None`` to receive all messages again.
+        '''
+        if six.PY2:
+            encoding = None
+        else:
+            encoding = 'utf-8'
+        unpacker = msgpack.Unpacker(encoding=encoding)
+        while not stream.closed():
+            try:
+                wire_bytes = yield stream.read_bytes(4096, partial=True)
+                unpacker.feed(wire_bytes)
+                for framed_msg in unpacker:
+                    body = framed_msg['body']
+                    if not isinstance(body, dict) or 'subscribe' not in body:
+                        continue
+                    prefixes = body['subscribe']
+                    if prefixes is None:
+                        self.filters.pop(stream, None)
+                    else:
+                        self.filters[stream] = tuple(
+                            salt.utils.stringutils.to_bytes(prefix)
+                            for prefix in prefixes)
+                    log.trace('IPC subscriber on %s subscribed to %s',
+                              self.socket_path, prefixes)
+            except tornado.iostream.StreamClosedError:
+                break
+            except Exception as exc:
+                log.error('Exception occurred while reading subscriptions: %s', exc)
+                break
+
     def handle_connection(self, connection, address):
         log.trace('IPCServer: Handling connection to address: %s', address)
         try:
@@ -555,11 +636,14 @@ class IPCMessagePublisher(object):
                     **kwargs
                 )
             self.streams.add(stream)
+            self.pending[stream] = 0
+            self.drops[stream] = 0
 
             def discard_after_closed():
-                self.streams.discard(stream)
+                self._discard(stream)
 
             stream.set_close_callback(discard_after_closed)
+            self.io_loop.spawn_callback(self._read_subscriptions, stream)
         except Exception as exc:
             log.error('IPC streaming error: %s', exc)
 
@@ -575,6 +659,9 @@ class IPCMessagePublisher(object):
         for stream in self.streams:
             stream.close()
         self.streams.clear()
+        self.filters.clear()
+        self.pending.clear()
+        self.drops.clear()
         if hasattr(self.sock, 'close'):
             self.sock.close()
 
@@ -623,6 +710,42 @@ class IPCMessageSubscriber(IPCClient):
         self._sync_ioloop_running = False
         self.saved_data = []
         self._sync_read_in_progress = Semaphore()
+        self.subscription = None
+
+    @tornado.gen.coroutine
+    def _connect(self, timeout=None):
+        yield super(IPCMessageSubscriber, self)._connect(timeout=timeout)
+        if self.subscription is not None and self.connected():
+            yield self._send_subscription()
+
+    @tornado.gen.coroutine
+    def _send_subscription(self):
+        pack = salt.transport.frame.frame_msg_ipc(
+            {'subscribe': self.subscription}, raw_body=True)
+        try:
+            yield self.stream.write(pack)
+        except tornado.iostream.StreamClosedError:
+            # Sent again on reconnect
+            pass
+
+    @tornado.gen.coroutine
+    def subscribe(self, prefixes):
+        '''
+        Ask the publisher to only send the messages whose tag starts with one
+        of ``prefixes``. ``None`` receives all messages again. The
+        subscription is sent again whenever the subscriber reconnects.
+
+        The publisher applies the subscription asynchronously. Until it did,
+        messages are filtered by the previous subscription, so callers must
+        keep filtering the messages they receive.
+        '''
+        if prefixes is not None:
+            prefixes = sorted(set(prefixes))
+        if prefixes == self.subscription:
+            raise tornado.gen.Return()
+        self.subscription = prefixes
+        if self.connected():
+            yield self._send_subscription()
 
     @tornado.gen.coroutine
     def _read_sync(self, timeout):
@@ -2,19 +2,24 @@
 
 # Import Python Libs
 from __future__ import absolute_import, print_function, unicode_literals
+import collections
 import multiprocessing
 import ctypes
 import logging
 import os
 import hashlib
+import hmac
 import shutil
 import binascii
+import time
 
 # Import Salt Libs
 import salt.crypt
+import salt.daemons.masterapi
 import salt.payload
 import salt.master
 import salt.transport.frame
+import salt.utils.atomicfile
 import salt.utils.event
 import salt.utils.files
 import salt.utils.minions
@@ -38,6 +43,10 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
+# How long the ids of the connected minions are reused for the max_minions
+# check, in seconds
+CONNECTED_IDS_TTL = 5
+
 
 # TODO: rename
 class AESPubClientMixin(object):
@@ -66,11 +75,77 @@ class AESPubClientMixin(object):
         raise tornado.gen.Return(payload)
 
 
+class AESPubServerMixin(object):
+    '''
+    Mixin to house the master-side crypto of the publish channels
+    '''
+    _crypticle = None
+    _crypto_stats = None
+
+    @property
+    def crypticle(self):
+        '''
+        The Crypticle for the current AES key, which is only rebuilt when the
+        master rotates its key
+        '''
+        key_string = salt.master.SMaster.secrets['aes']['secret'].value
+        if self._crypticle is None or self._crypticle.key_string != key_string:
+            compression = None
+            if self.opts.get('publish_compression'):
+                # All minions have to read it, which is up to the admin
+                compression = (salt.crypt.wire_compression(self.opts) or [None])[0]
+            self._crypticle = salt.crypt.Crypticle(
+                self.opts, key_string, compression=compression)
+        return self._crypticle
+
+    @property
+    def crypto_stats(self):
+        '''
+        The mean duration and number of runs of each publish crypto operation
+        since the stats were last popped
+        '''
+        if self._crypto_stats is None:
+            self._crypto_stats = collections.defaultdict(lambda: {'mean': 0, 'runs': 0})
+        return self._crypto_stats
+
+    def pop_crypto_stats(self):
+        '''
+        Return and reset the publish crypto stats
+        '''
+        stats = self.crypto_stats
+        self._crypto_stats = None
+        return stats
+
+    def _post_crypto_stats(self, name, start):
+        if not self.opts.get('master_stats'):
+            return
+        stat = self.crypto_stats[name]
+        stat['runs'] += 1
+        stat['mean'] += (time.time() - start - stat['mean']) / stat['runs']
+
+    def _encrypt_publish(self, load):
+        '''
+        Encrypt and, if sign_pub_messages is set, sign a load for publishing
+        '''
+        payload = {'enc': 'aes'}
+        start = time.time()
+        payload['load'] = self.crypticle.dumps(load)
+        self._post_crypto_stats('encrypt', start)
+        if self.opts['sign_pub_messages']:
+            master_pem_path = os.path.join(self.opts['pki_dir'], 'master.pem')
+            log.debug("Signing data packet")
+            start = time.time()
+            payload['sig'] = salt.crypt.sign_message(master_pem_path, payload['load'])
+            self._post_crypto_stats('sign', start)
+        return payload
+
+
 # TODO: rename?
 class AESReqServerMixin(object):
     '''
     Mixin to house all of the master-side auth crypto
     '''
+    _connected_ids_cache = None
 
     def pre_fork(self, _):
         '''
@@ -107,7 +182,8 @@ class AESReqServerMixin(object):
 
         self.master_key = salt.crypt.MasterKeys(self.opts)
 
-    def _encrypt_private(self, ret, dictkey, target):
+    def _encrypt_private(self, ret, dictkey, target, use_bin_type=False,
+                         compression=False):
         '''
         The server equivalent of ReqChannel.crypted_transfer_decode_dictentry
         '''
@@ -118,7 +194,9 @@ class AESReqServerMixin(object):
         key = salt.crypt.Crypticle.generate_key_string()
         pcrypt = salt.crypt.Crypticle(
             self.opts,
-            key)
+            key,
+            use_bin_type=use_bin_type,
+            compression=compression)
         try:
             pub = salt.crypt.get_rsa_pub_key(pubfn)
         except (ValueError, IndexError, TypeError):
@@ -154,13 +232,157 @@ class AESReqServerMixin(object):
         # we need to decrypt it
         if payload['enc'] == 'aes':
             try:
-                payload['load'] = self.crypticle.loads(payload['load'])
+                payload['load'], fmt = \
+                    self.crypticle.loads_format(payload['load'])
             except salt.crypt.AuthenticationError:
                 if not self._update_aes():
                     raise
-                payload['load'] = self.crypticle.loads(payload['load'])
+                payload['load'], fmt = \
+                    self.crypticle.loads_format(payload['load'])
+            # Answer in the format the minion used, compressed if it asked
+            # for it, even when its request was too small to be compressed
+            payload['serial_bin_type'] = fmt['serial_bin_type']
+            if payload.get('compression') not in salt.crypt.wire_compression(self.opts):
+                payload['compression'] = fmt['compression']
         return payload
 
+    def _connected_ids(self):
+        '''
+        Return the ids of the connected minions for the max_minions check. They
+        are reused for CONNECTED_IDS_TTL seconds, so that a storm of auth
+        requests does not look them up once per request.
+        '''
+        # use the ConCache if enabled, else use the minion utils
+        if self.cache_cli:
+            return self.cache_cli.get_cached()
+        now = time.time()
+        if self._connected_ids_cache is None \
+                or now - self._connected_ids_cache[0] > CONNECTED_IDS_TTL:
+            minions = self.ckminions.connected_ids()
+            if len(minions) > 1000:
+                log.info('With large numbers of minions it is advised '
+                         'to enable the ConCache with \'con_cache: True\' '
+                         'in the masters configuration file.')
+            self._connected_ids_cache = (now, minions)
+        return self._connected_ids_cache[1]
+
+    def _wire_formats(self):
+        '''
+        Return the serialization and compression the minion may use for its
+        loads, to add to the reply to a sign in
+        '''
+        ret = {}
+        if self.opts.get('serial_bin_type'):
+            # Tell the minion that it may send loads serialized with the
+            # bin type, older masters would drop them
+            ret['serial_bin_type'] = True
+        if salt.crypt.wire_compression(self.opts):
+            # The same goes for compressed loads
+            ret['compression'] = salt.crypt.wire_compression(self.opts)
+        return ret
+
+    def _session_path(self, minion_id):
+        return salt.daemons.masterapi.auth_session_path(self.opts, minion_id)
+
+    def _new_session(self, load, pub, ret):
+        '''
+        Start an auth session for the minion and add its key, encrypted with
+        the public key of the minion, to the reply. Until the session expires
+        the minion can sign in again with a proof made with the session key,
+        see _resume_session.
+
+        The encrypted key is signed together with the AES key of the reply, as
+        anybody can encrypt a key of their own with the public key of the
+        minion.
+        '''
+        session_key = salt.crypt.Crypticle.generate_key_string()
+        session = {'key': session_key,
+                   'pub': hashlib.sha256(salt.utils.stringutils.to_bytes(
+                       load['pub'].strip())).hexdigest(),
+                   'expires': time.time() + self.opts['auth_session_ttl']}
+        path = self._session_path(load['id'])
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                try:
+                    os.makedirs(os.path.dirname(path), 0o700)
+                except OSError:
+                    if not os.path.isdir(os.path.dirname(path)):
+                        raise
+            with salt.utils.files.set_umask(0o077):
+                with salt.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+                    fp_.write(self.serial.dumps(session))
+        except (IOError, OSError) as exc:
+            log.error('Unable to save the auth session of %s: %s',
+                      load['id'], exc)
+            return
+        session_key = salt.utils.stringutils.to_bytes(session_key)
+        if HAS_M2:
+            ret['session'] = pub.public_encrypt(session_key,
+                                                RSA.pkcs1_oaep_padding)
+        else:
+            ret['session'] = PKCS1_OAEP.new(pub).encrypt(session_key)
+        ret['session_ttl'] = self.opts['auth_session_ttl']
+        ret['session_sig'] = salt.crypt.private_encrypt(
+            self.master_key.key,
+            salt.crypt.session_digest(
+                salt.master.SMaster.secrets['aes']['secret'].value,
+                ret['session'],
+                ret['session_ttl']))
+
+    def _resume_session(self, load):
+        '''
+        Return the reply to a minion which resumes its auth session, or None if
+        the minion has to sign in fully.
+
+        The session is resumed if it has not expired, the key of the minion is
+        still accepted and is the one the session was started with, and the
+        proof of the minion was made with the session key. The reply holds the
+        AES key encrypted with the session key, so no RSA operation is needed.
+        '''
+        pubfn = os.path.join(self.opts['pki_dir'], 'minions', load['id'])
+        try:
+            with salt.utils.files.fopen(self._session_path(load['id']), 'rb') as fp_:
+                session = self.serial.loads(fp_.read())
+            with salt.utils.files.fopen(pubfn, 'r') as fp_:
+                pub = fp_.read().strip()
+            if session['expires'] < time.time():
+                log.debug('The auth session of %s has expired', load['id'])
+                return None
+            if pub != load['pub'].strip() or session['pub'] != hashlib.sha256(
+                    salt.utils.stringutils.to_bytes(pub)).hexdigest():
+                log.debug('The key of %s has changed since its auth session '
+                          'started', load['id'])
+                return None
+            nonce = load['resume']['nonce']
+            proof = salt.crypt.session_proof(session['key'], load['id'], nonce)
+            if not hmac.compare_digest(
+                    salt.utils.stringutils.to_str(proof),
+                    salt.utils.stringutils.to_str(load['resume']['proof'])):
+                log.warning('Invalid auth session proof from %s', load['id'])
+                return None
+        except (IOError, OSError):
+            return None
+        except Exception as exc:
+            log.debug('Unable to resume the auth session of %s: %s',
+                      load['id'], exc)
+            return None
+
+        aes = salt.utils.stringutils.to_str(
+            salt.master.SMaster.secrets['aes']['secret'].value)
+        ret = {'enc': 'pub',
+               'publish_port': self.opts['publish_port'],
+               'resume': salt.crypt.Crypticle(self.opts, session['key']).dumps(
+                   {'aes': aes, 'nonce': nonce})}
+        ret.update(self._wire_formats())
+        eload = {'result': True,
+                 'act': 'accept',
+                 'id': load['id'],
+                 'pub': load['pub'],
+                 'resume': True}
+        if self.opts.get('auth_events') is True:
+            self.event.fire_event(eload, salt.utils.event.tagify(prefix='auth'))
+        return ret
+
     def _auth(self, load):
         '''
         Authenticate the client, use the sent public key to encrypt the AES key
@@ -183,18 +405,15 @@ class AESReqServerMixin(object):
                     'load': {'ret': False}}
         log.info('Authentication request from %s', load['id'])
 
+        if 'resume' in load and self.opts.get('auth_session_ttl'):
+            ret = self._resume_session(load)
+            if ret is not None:
+                log.info('Authentication session resumed by %s', load['id'])
+                return ret
+
         # 0 is default which should be 'unlimited'
         if self.opts['max_minions'] > 0:
-            # use the ConCache if enabled, else use the minion utils
-            if self.cache_cli:
-                minions = self.cache_cli.get_cached()
-            else:
-                minions = self.ckminions.connected_ids()
-                if len(minions) > 1000:
-                    log.info('With large numbers of minions it is advised '
-                             'to enable the ConCache with \'con_cache: True\' '
-                             'in the masters configuration file.')
-
+            minions = self._connected_ids()
             if not len(minions) <= self.opts['max_minions']:
                 # we reject new minions, minions that are already
                 # connected must be allowed for the mine, highstate, etc.
@@ -444,6 +663,7 @@ class AESReqServerMixin(object):
         ret = {'enc': 'pub',
                'pub_key': self.master_key.get_pub_str(),
                'publish_port': self.opts['publish_port']}
+        ret.update(self._wire_formats())
 
         # sign the master's pubkey (if enabled) before it is
         # sent to the minion that was just authenticated
@@ -511,6 +731,8 @@ class AESReqServerMixin(object):
         # Be aggressive about the signature
         digest = salt.utils.stringutils.to_bytes(hashlib.sha256(aes).hexdigest())
         ret['sig'] = salt.crypt.private_encrypt(self.master_key.key, digest)
+        if load.get('session') and self.opts.get('auth_session_ttl'):
+            self._new_session(load, pub, ret)
         eload = {'result': True,
                  'act': 'accept',
                  'id': load['id'],
@@ -106,4 +106,11 @@ class PubServerChannel(object):
         '''
         raise NotImplementedError()
 
+    def publish_batch(self, loads):
+        '''
+        Publish several loads to minions
+        '''
+        for load in loads:
+            self.publish(load)
+
 # EOF
@@ -295,10 +295,15 @@ class AsyncTCPReqChannel(salt.transport.client.ReqChannel):
         self.close()
 
     def _package_load(self, load):
-        return {
+        ret = {
             'enc': self.crypt,
             'load': load,
         }
+        if self.crypt == 'aes' and self.auth.crypticle.compression:
+            # Let the master compress the reply as well, which is where
+            # the large loads are, like the pillar
+            ret['compression'] = self.auth.crypticle.compression
+        return ret
 
     @tornado.gen.coroutine
     def crypted_transfer_decode_dictentry(self, load, dictkey=None, tries=3, timeout=60):
@@ -312,9 +317,8 @@ class AsyncTCPReqChannel(salt.transport.client.ReqChannel):
             cipher = PKCS1_OAEP.new(key)
             aes = cipher.decrypt(ret['key'])
         pcrypt = salt.crypt.Crypticle(self.opts, aes)
+        # Crypticle.loads decodes the strings already
         data = pcrypt.loads(ret[dictkey])
-        if six.PY3:
-            data = salt.transport.frame.decode_embedded_strs(data)
         raise tornado.gen.Return(data)
 
     @tornado.gen.coroutine
@@ -335,9 +339,8 @@ class AsyncTCPReqChannel(salt.transport.client.ReqChannel):
             # communication, we do not subscribe to return events, we just
             # upload the results to the master
             if data:
+                # Crypticle.loads decodes the strings already
                 data = self.auth.crypticle.loads(data)
-                if six.PY3:
-                    data = salt.transport.frame.decode_embedded_strs(data)
             raise tornado.gen.Return(data)
 
         if not self.auth.authenticated:
@@ -672,14 +675,19 @@ class TCPReqServerChannel(salt.transport.mixins.auth.AESReqServerMixin, salt.tra
                 raise tornado.gen.Return()
 
             req_fun = req_opts.get('fun', 'send')
+            bin_type = payload.get('serial_bin_type', False)
+            compression = payload.get('compression') or False
             if req_fun == 'send_clear':
                 stream.write(salt.transport.frame.frame_msg(ret, header=header))
             elif req_fun == 'send':
-                stream.write(salt.transport.frame.frame_msg(self.crypticle.dumps(ret), header=header))
+                stream.write(salt.transport.frame.frame_msg(self.crypticle.dumps(
+                    ret, use_bin_type=bin_type, compression=compression), header=header))
             elif req_fun == 'send_private':
                 stream.write(salt.transport.frame.frame_msg(self._encrypt_private(ret,
                                                              req_opts['key'],
                                                              req_opts['tgt'],
+                                                             bin_type,
+                                                             compression,
                                                              ), header=header))
             else:
                 log.error('Unknown req_fun %s', req_fun)
@@ -1347,7 +1355,8 @@ class PubServer(tornado.tcpserver.TCPServer, object):
         log.trace('TCP PubServer finished publishing payload')
 
 
-class TCPPubServerChannel(salt.transport.server.PubServerChannel):
+class TCPPubServerChannel(salt.transport.mixins.auth.AESPubServerMixin,
+                          salt.transport.server.PubServerChannel):
     # TODO: opts!
     # Based on default used in tornado.netutil.bind_sockets()
     backlog = 128
@@ -1439,14 +1448,7 @@ class TCPPubServerChannel(salt.transport.server.PubServerChannel):
         '''
         Publish "load" to minions
         '''
-        payload = {'enc': 'aes'}
-
-        crypticle = salt.crypt.Crypticle(self.opts, salt.master.SMaster.secrets['aes']['secret'].value)
-        payload['load'] = crypticle.dumps(load)
-        if self.opts['sign_pub_messages']:
-            master_pem_path = os.path.join(self.opts['pki_dir'], 'master.pem')
-            log.debug("Signing data packet")
-            payload['sig'] = salt.crypt.sign_message(master_pem_path, payload['load'])
+        payload = self._encrypt_publish(load)
         # Use the Salt IPC server
         if self.opts.get('ipc_mode', '') == 'tcp':
             pull_uri = int(self.opts.get('tcp_master_publish_pull', 4514))
@@ -12,6 +12,7 @@ import errno
 import signal
 import hashlib
 import logging
+import time
 import weakref
 from random import randint
 
@@ -216,10 +217,15 @@ class AsyncZeroMQReqChannel(salt.transport.client.ReqChannel):
         return self.opts['master_uri']
 
     def _package_load(self, load):
-        return {
+        ret = {
             'enc': self.crypt,
             'load': load,
         }
+        if self.crypt == 'aes' and self.auth.crypticle.compression:
+            # Let the master compress the reply as well, which is where
+            # the large loads are, like the pillar
+            ret['compression'] = self.auth.crypticle.compression
+        return ret
 
     @tornado.gen.coroutine
     def crypted_transfer_decode_dictentry(self, load, dictkey=None, tries=3, timeout=60):
@@ -248,9 +254,8 @@ class AsyncZeroMQReqChannel(salt.transport.client.ReqChannel):
             cipher = PKCS1_OAEP.new(key)
             aes = cipher.decrypt(ret['key'])
         pcrypt = salt.crypt.Crypticle(self.opts, aes)
+        # Crypticle.loads decodes the strings already
         data = pcrypt.loads(ret[dictkey])
-        if six.PY3:
-            data = salt.transport.frame.decode_embedded_strs(data)
         raise tornado.gen.Return(data)
 
     @tornado.gen.coroutine
@@ -281,9 +286,8 @@ class AsyncZeroMQReqChannel(salt.transport.client.ReqChannel):
             # communication, we do not subscribe to return events, we just
             # upload the results to the master
             if data:
+                # Unless raw is set, Crypticle.loads decodes the strings
                 data = self.auth.crypticle.loads(data, raw)
-            if six.PY3 and not raw:
-                data = salt.transport.frame.decode_embedded_strs(data)
             raise tornado.gen.Return(data)
         if not self.auth.authenticated:
             # Return control back to the caller, resume when authentication succeeds
@@ -498,13 +502,195 @@ class AsyncZeroMQPubChannel(salt.transport.mixins.auth.AESPubClientMixin, salt.t
         return self.stream.on_recv(wrap_callback)
 
 
+class AuthQueue(object):
+    '''
+    Admission control and stats of the auth requests waiting for an auth
+    worker. At most ``auth_queue_size`` requests wait at once.
+    '''
+    # Requests which are not answered in this many seconds are forgotten, the
+    # minions which sent them have given up and sign in again
+    STALE = 60
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.size = opts.get('auth_queue_size', 1000)
+        # mapping of the envelope of a request -> time it was admitted
+        self.pending = {}
+        self.event = None
+        self.clock = time.time()
+        self.stats = self._new_stats()
+
+    @staticmethod
+    def _new_stats():
+        return {'admitted': 0, 'rejected': 0, 'answered': 0,
+                'wait': 0, 'max_depth': 0}
+
+    def _expire(self, now):
+        for envelope, admitted in list(self.pending.items()):
+            if now - admitted > self.STALE:
+                del self.pending[envelope]
+
+    def admit(self, envelope):
+        '''
+        Return True if the request with the ``envelope`` may wait for an auth
+        worker, False if the queue is full
+        '''
+        now = time.time()
+        if len(self.pending) >= self.size:
+            self._expire(now)
+            if len(self.pending) >= self.size:
+                self.stats['rejected'] += 1
+                return False
+        self.pending[tuple(envelope)] = now
+        self.stats['admitted'] += 1
+        self.stats['max_depth'] = max(self.stats['max_depth'], len(self.pending))
+        return True
+
+    def done(self, envelope):
+        '''
+        Forget the request with the ``envelope``, which an auth worker answered
+        '''
+        admitted = self.pending.pop(tuple(envelope), None)
+        if admitted is None:
+            return
+        self.stats['answered'] += 1
+        self.stats['wait'] += (time.time() - admitted - self.stats['wait']) / self.stats['answered']
+
+    def report(self):
+        '''
+        Fire the stats of the queue every ``master_stats_event_iter`` seconds
+        if ``master_stats`` is set, and warn about rejected requests
+        '''
+        now = time.time()
+        if now - self.clock <= self.opts.get('master_stats_event_iter', 60):
+            return
+        stats = self.stats
+        stats['depth'] = len(self.pending)
+        if stats['rejected']:
+            log.warning(
+                'The auth queue is full, told %d minions that the master is '
+                'busy in the last %d seconds. Consider raising auth_workers.',
+                stats['rejected'], now - self.clock)
+        if self.opts.get('master_stats'):
+            if self.event is None:
+                self.event = salt.utils.event.get_master_event(
+                    self.opts, self.opts['sock_dir'], listen=False)
+            self.event.fire_event(
+                {'time': now - self.clock,
+                 'worker': 'MWorkerQueue',
+                 'stats': {'auth_queue': stats}},
+                salt.utils.event.tagify('MWorkerQueue', 'stats'))
+        self.stats = self._new_stats()
+        self.clock = now
+
+
 class ZeroMQReqServerChannel(salt.transport.mixins.auth.AESReqServerMixin,
                              salt.transport.server.ReqServerChannel):
+    # Set in the auth workers, which only answer the auth requests
+    auth_worker = False
+    # The most messages the auth device forwards from one socket before it
+    # polls again
+    DEVICE_BATCH = 100
 
     def __init__(self, opts):
         salt.transport.server.ReqServerChannel.__init__(self, opts)
         self._closing = False
 
+    @property
+    def has_auth_workers(self):
+        '''
+        Whether the auth requests are answered by their own workers
+        '''
+        return bool(self.opts.get('auth_workers'))
+
+    def _workers_uri(self, auth=False):
+        '''
+        Return the uri the workers, or the auth workers, connect to
+        '''
+        if self.opts.get('ipc_mode', '') == 'tcp':
+            if auth:
+                port = self.opts.get('tcp_master_auth_workers', 4516)
+            else:
+                port = self.opts.get('tcp_master_workers', 4515)
+            return 'tcp://127.0.0.1:{0}'.format(port)
+        return 'ipc://{0}'.format(
+            os.path.join(self.opts['sock_dir'],
+                         'auth_workers.ipc' if auth else 'workers.ipc'))
+
+    @staticmethod
+    def _is_auth_request(serial, frame):
+        '''
+        Return True if the request in ``frame`` is a sign in
+        '''
+        # Only unpack the requests which may be sign ins
+        if b'_auth' not in frame:
+            return False
+        try:
+            payload = serial.loads(frame)
+        except Exception:
+            return False
+        return isinstance(payload, dict) \
+            and payload.get('enc') == 'clear' \
+            and isinstance(payload.get('load'), dict) \
+            and payload['load'].get('cmd') == '_auth'
+
+    @staticmethod
+    def _recv_ready(sock, limit=DEVICE_BATCH):
+        '''
+        Yield the messages which are ready on ``sock``, at most ``limit`` of
+        them so that a busy socket does not hold up the others
+        '''
+        for _ in range(limit):
+            try:
+                yield sock.recv_multipart(zmq.NOBLOCK)
+            except zmq.Again:
+                return
+
+    def _auth_device(self):
+        '''
+        Forward the requests of the minions to the workers, except the sign
+        ins, which go to the auth workers. The minions whose sign in does not
+        fit in the auth queue are told that the master is busy and sign in
+        again later.
+        '''
+        serial = salt.payload.Serial(self.opts)
+        busy = serial.dumps({'enc': 'clear', 'load': {'ret': 'busy'}})
+        queue = AuthQueue(self.opts)
+        self.auth_workers = self.context.socket(zmq.DEALER)
+        self.auth_workers.bind(self._workers_uri(auth=True))
+        poller = zmq.Poller()
+        poller.register(self.clients, zmq.POLLIN)
+        poller.register(self.workers, zmq.POLLIN)
+        poller.register(self.auth_workers, zmq.POLLIN)
+
+        while True:
+            if self.clients.closed or self.workers.closed or self.auth_workers.closed:
+                break
+            try:
+                socks = dict(poller.poll(1000))
+                if socks.get(self.clients):
+                    for frames in self._recv_ready(self.clients):
+                        if not self._is_auth_request(serial, frames[-1]):
+                            self.workers.send_multipart(frames)
+                        elif queue.admit(frames[:-1]):
+                            self.auth_workers.send_multipart(frames)
+                        else:
+                            self.clients.send_multipart(frames[:-1] + [busy])
+                if socks.get(self.workers):
+                    for frames in self._recv_ready(self.workers):
+                        self.clients.send_multipart(frames)
+                if socks.get(self.auth_workers):
+                    for frames in self._recv_ready(self.auth_workers):
+                        queue.done(frames[:-1])
+                        self.clients.send_multipart(frames)
+                queue.report()
+            except zmq.ZMQError as exc:
+                if exc.errno == errno.EINTR:
+                    continue
+                raise exc
+            except (KeyboardInterrupt, SystemExit):
+                break
+
     def zmq_device(self):
         '''
         Multiprocessing target for the zmq queue device
@@ -521,20 +707,16 @@ class ZeroMQReqServerChannel(salt.transport.mixins.auth.AESReqServerMixin,
         self.clients.setsockopt(zmq.BACKLOG, self.opts.get('zmq_backlog', 1000))
         self._start_zmq_monitor()
         self.workers = self.context.socket(zmq.DEALER)
-
-        if self.opts.get('ipc_mode', '') == 'tcp':
-            self.w_uri = 'tcp://127.0.0.1:{0}'.format(
-                self.opts.get('tcp_master_workers', 4515)
-                )
-        else:
-            self.w_uri = 'ipc://{0}'.format(
-                os.path.join(self.opts['sock_dir'], 'workers.ipc')
-                )
+        self.w_uri = self._workers_uri()
 
         log.info('Setting up the master communication server')
         self.clients.bind(self.uri)
         self.workers.bind(self.w_uri)
 
+        if self.has_auth_workers:
+            self._auth_device()
+            return
+
         while True:
             if self.clients.closed or self.workers.closed:
                 break
@@ -566,6 +748,8 @@ class ZeroMQReqServerChannel(salt.transport.mixins.auth.AESReqServerMixin,
             self.clients.close()
         if hasattr(self, 'workers') and self.workers.closed is False:
             self.workers.close()
+        if hasattr(self, 'auth_workers') and self.auth_workers.closed is False:
+            self.auth_workers.close()
         if hasattr(self, 'stream'):
             self.stream.close()
         if hasattr(self, '_socket') and self._socket.closed is False:
@@ -614,14 +798,7 @@ class ZeroMQReqServerChannel(salt.transport.mixins.auth.AESReqServerMixin,
         self._socket = self.context.socket(zmq.REP)
         self._start_zmq_monitor()
 
-        if self.opts.get('ipc_mode', '') == 'tcp':
-            self.w_uri = 'tcp://127.0.0.1:{0}'.format(
-                self.opts.get('tcp_master_workers', 4515)
-                )
-        else:
-            self.w_uri = 'ipc://{0}'.format(
-                os.path.join(self.opts['sock_dir'], 'workers.ipc')
-                )
+        self.w_uri = self._workers_uri(auth=self.auth_worker)
         log.info('Worker binding to socket %s', self.w_uri)
         self._socket.connect(self.w_uri)
 
@@ -692,14 +869,19 @@ class ZeroMQReqServerChannel(salt.transport.mixins.auth.AESReqServerMixin,
             raise tornado.gen.Return()
 
         req_fun = req_opts.get('fun', 'send')
+        bin_type = payload.get('serial_bin_type', False)
+        compression = payload.get('compression') or False
         if req_fun == 'send_clear':
             stream.send(self.serial.dumps(ret))
         elif req_fun == 'send':
-            stream.send(self.serial.dumps(self.crypticle.dumps(ret)))
+            stream.send(self.serial.dumps(self.crypticle.dumps(
+                ret, use_bin_type=bin_type, compression=compression)))
         elif req_fun == 'send_private':
             stream.send(self.serial.dumps(self._encrypt_private(ret,
                                                                 req_opts['key'],
                                                                 req_opts['tgt'],
+                                                                bin_type,
+                                                                compression,
                                                                 )))
         else:
             log.error('Unknown req_fun %s', req_fun)
@@ -755,7 +937,8 @@ def _set_tcp_keepalive(zmq_socket, opts):
             )
 
 
-class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
+class ZeroMQPubServerChannel(salt.transport.mixins.auth.AESPubServerMixin,
+                             salt.transport.server.PubServerChannel):
     '''
     Encapsulate synchronous operations for a publisher channel
     '''
@@ -763,10 +946,55 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
         self.opts = opts
         self.serial = salt.payload.Serial(self.opts)  # TODO: in init?
         self.ckminions = salt.utils.minions.CkMinions(self.opts)
+        # The push connection to the publish daemon is created lazily and
+        # kept open across publishes. It is never shared with a forked child.
+        self._push_context = None
+        self._push_sock = None
+        self._push_pid = None
 
     def connect(self):
         return tornado.gen.sleep(5)
 
+    @property
+    def pull_uri(self):
+        '''
+        The URI the publish daemon pulls loads to publish from
+        '''
+        if self.opts.get('ipc_mode', '') == 'tcp':
+            return 'tcp://127.0.0.1:{0}'.format(
+                self.opts.get('tcp_master_publish_pull', 4514)
+                )
+        return 'ipc://{0}'.format(
+            os.path.join(self.opts['sock_dir'], 'publish_pull.ipc')
+            )
+
+    def pub_connect(self):
+        '''
+        Return the PUSH socket connected to the publish daemon, creating it
+        first if this process does not hold one yet
+        '''
+        if self._push_sock is not None and self._push_pid == os.getpid():
+            return self._push_sock
+        # A socket inherited from the parent process is left alone
+        self._push_context = zmq.Context(1)
+        self._push_sock = self._push_context.socket(zmq.PUSH)
+        self._push_sock.connect(self.pull_uri)
+        self._push_pid = os.getpid()
+        return self._push_sock
+
+    def pub_close(self):
+        '''
+        Disconnect from the publish daemon. Loads which were already queued
+        are still delivered before the socket is closed.
+        '''
+        if self._push_sock is not None and self._push_pid == os.getpid():
+            self._push_sock.close()
+            self._push_context.term()
+        self._push_context = self._push_sock = self._push_pid = None
+
+    def destroy(self):
+        self.pub_close()
+
     def _publish_daemon(self):
         '''
         Bind to the interface specified in the configuration file
@@ -794,14 +1022,7 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
         # Prepare minion pull socket
         pull_sock = context.socket(zmq.PULL)
 
-        if self.opts.get('ipc_mode', '') == 'tcp':
-            pull_uri = 'tcp://127.0.0.1:{0}'.format(
-                self.opts.get('tcp_master_publish_pull', 4514)
-                )
-        else:
-            pull_uri = 'ipc://{0}'.format(
-                os.path.join(self.opts['sock_dir'], 'publish_pull.ipc')
-                )
+        pull_uri = self.pull_uri
         salt.utils.zeromq.check_ipc_path_max_len(pull_uri)
 
         # Start the minion command publisher
@@ -819,34 +1040,10 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
                 # SIGUSR1 gracefully so we don't choke and die horribly
                 try:
                     log.trace('Getting data from puller %s', pull_uri)
-                    package = pull_sock.recv()
-                    unpacked_package = salt.payload.unpackage(package)
-                    if six.PY3:
-                        unpacked_package = salt.transport.frame.decode_embedded_strs(unpacked_package)
-                    payload = unpacked_package['payload']
-                    log.trace('Accepted unpacked package from puller')
-                    if self.opts['zmq_filtering']:
-                        # if you have a specific topic list, use that
-                        if 'topic_lst' in unpacked_package:
-                            for topic in unpacked_package['topic_lst']:
-                                log.trace('Sending filtered data over publisher %s', pub_uri)
-                                # zmq filters are substring match, hash the topic
-                                # to avoid collisions
-                                htopic = hashlib.sha1(topic).hexdigest()
-                                pub_sock.send(htopic, flags=zmq.SNDMORE)
-                                pub_sock.send(payload)
-                                log.trace('Filtered data has been sent')
-                                # otherwise its a broadcast
-                        else:
-                            # TODO: constants file for "broadcast"
-                            log.trace('Sending broadcasted data over publisher %s', pub_uri)
-                            pub_sock.send('broadcast', flags=zmq.SNDMORE)
-                            pub_sock.send(payload)
-                            log.trace('Broadcasted data has been sent')
-                    else:
-                        log.trace('Sending ZMQ-unfiltered data over publisher %s', pub_uri)
-                        pub_sock.send(payload)
-                        log.trace('Unfiltered data has been sent')
+                    # Several loads may be batched into one multipart message
+                    packages = pull_sock.recv_multipart()
+                    for package in packages:
+                        self._publish_package(pub_sock, pub_uri, package)
                 except zmq.ZMQError as exc:
                     if exc.errno == errno.EINTR:
                         continue
@@ -863,6 +1060,38 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
             if context.closed is False:
                 context.term()
 
+    def _publish_package(self, pub_sock, pub_uri, package):
+        '''
+        Send one package pulled from a master worker out to the minions
+        '''
+        unpacked_package = salt.payload.unpackage(package)
+        if six.PY3:
+            unpacked_package = salt.transport.frame.decode_embedded_strs(unpacked_package)
+        payload = unpacked_package['payload']
+        log.trace('Accepted unpacked package from puller')
+        if self.opts['zmq_filtering']:
+            # if you have a specific topic list, use that
+            if 'topic_lst' in unpacked_package:
+                for topic in unpacked_package['topic_lst']:
+                    log.trace('Sending filtered data over publisher %s', pub_uri)
+                    # zmq filters are substring match, hash the topic
+                    # to avoid collisions
+                    htopic = hashlib.sha1(topic).hexdigest()
+                    pub_sock.send(htopic, flags=zmq.SNDMORE)
+                    pub_sock.send(payload)
+                    log.trace('Filtered data has been sent')
+                    # otherwise its a broadcast
+            else:
+                # TODO: constants file for "broadcast"
+                log.trace('Sending broadcasted data over publisher %s', pub_uri)
+                pub_sock.send('broadcast', flags=zmq.SNDMORE)
+                pub_sock.send(payload)
+                log.trace('Broadcasted data has been sent')
+        else:
+            log.trace('Sending ZMQ-unfiltered data over publisher %s', pub_uri)
+            pub_sock.send(payload)
+            log.trace('Unfiltered data has been sent')
+
     def pre_fork(self, process_manager):
         '''
         Do anything necessary pre-fork. Since this is on the master side this will
@@ -879,26 +1108,33 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
 
         :param dict load: A load to be sent across the wire to minions
         '''
-        payload = {'enc': 'aes'}
+        self.publish_batch([load])
 
-        crypticle = salt.crypt.Crypticle(self.opts, salt.master.SMaster.secrets['aes']['secret'].value)
-        payload['load'] = crypticle.dumps(load)
-        if self.opts['sign_pub_messages']:
-            master_pem_path = os.path.join(self.opts['pki_dir'], 'master.pem')
-            log.debug("Signing data packet")
-            payload['sig'] = salt.crypt.sign_message(master_pem_path, payload['load'])
-        # Send 0MQ to the publisher
-        context = zmq.Context(1)
-        pub_sock = context.socket(zmq.PUSH)
-        if self.opts.get('ipc_mode', '') == 'tcp':
-            pull_uri = 'tcp://127.0.0.1:{0}'.format(
-                self.opts.get('tcp_master_publish_pull', 4514)
-                )
-        else:
-            pull_uri = 'ipc://{0}'.format(
-                os.path.join(self.opts['sock_dir'], 'publish_pull.ipc')
-                )
-        pub_sock.connect(pull_uri)
+    def publish_batch(self, loads):
+        '''
+        Publish several loads to minions, handing them to the publish daemon
+        in a single multipart message
+
+        :param list loads: The loads to be sent across the wire to minions
+        '''
+        frames = [self._pack_load(load) for load in loads]
+        if not frames:
+            return
+        try:
+            self.pub_connect().send_multipart(frames)
+        except zmq.ZMQError as exc:
+            # The context or socket went bad underneath us, reconnect and
+            # try once more
+            log.warning('Failed to send loads to the publish daemon, '
+                        'reconnecting: %s', exc)
+            self.pub_close()
+            self.pub_connect().send_multipart(frames)
+
+    def _pack_load(self, load):
+        '''
+        Encrypt, sign and serialize a load for the publish daemon
+        '''
+        payload = self._encrypt_publish(load)
         int_payload = {'payload': self.serial.dumps(payload)}
 
         # add some targeting stuff for lists only (for now)
@@ -917,9 +1153,7 @@ class ZeroMQPubServerChannel(salt.transport.server.PubServerChannel):
             # Send list of miions thru so zmq can target them
             int_payload['topic_lst'] = match_ids
 
-        pub_sock.send(self.serial.dumps(int_payload))
-        pub_sock.close()
-        context.term()
+        return self.serial.dumps(int_payload)
 
 
 class AsyncReqMessageClientPool(salt.transport.MessageClientPool):
@@ -60,6 +60,8 @@ import hashlib
 import logging
 import datetime
 import sys
+import threading
+import collections
 from collections import MutableMapping
 from multiprocessing.util import Finalize
 from salt.ext.six.moves import range
@@ -73,6 +75,7 @@ import tornado.iostream
 import salt.config
 import salt.payload
 import salt.utils.async
+import salt.utils.atomicfile
 import salt.utils.cache
 import salt.utils.dicttrim
 import salt.utils.files
@@ -207,6 +210,17 @@ def tagify(suffix='', prefix='', base=SALT):
     return TAGPARTER.join([part for part in parts if part])
 
 
+def _package_tag(package):
+    '''
+    Return the tag of an event packed by ``SaltEvent.fire_event``, or None if
+    the package is not a packed event
+    '''
+    if not isinstance(package, six.binary_type):
+        return None
+    tag, sep, _ = package.partition(salt.utils.stringutils.to_bytes(TAGEND))
+    return tag if sep else None
+
+
 class SaltEvent(object):
     '''
     Warning! Use the get_event function or the code will not be
@@ -259,6 +273,7 @@ class SaltEvent(object):
         self.puburi, self.pulluri = self.__load_uri(sock_dir, node)
         self.pending_tags = []
         self.pending_events = []
+        self.tag_prefixes = None
         self.__load_cache_regex()
         if listen and not self.cpub:
             # Only connect to the publisher at initialization time if
@@ -353,6 +368,25 @@ class SaltEvent(object):
             if any(pmatch_func(evt['tag'], ptag) for ptag, pmatch_func in self.pending_tags):
                 self.pending_events.append(evt)
 
+    def subscribe_prefixes(self, prefixes):
+        '''
+        Have the event publisher only send the events whose tag starts with
+        one of ``prefixes`` to this listener, so that the events nobody asked
+        for are neither sent nor unpacked. Pass ``None`` to receive all events
+        again.
+
+        This only narrows down the events received, ``get_event`` still
+        returns the events matching the tag it is passed. It is ignored by
+        listeners sharing the IO loop of the caller, whose connection to the
+        publisher may be shared with other listeners.
+        '''
+        if not self._run_io_loop_sync:
+            return
+        self.tag_prefixes = prefixes
+        if self.subscriber is not None:
+            with salt.utils.async.current_ioloop(self.io_loop):
+                self.io_loop.run_sync(lambda: self.subscriber.subscribe(prefixes))
+
     def connect_pub(self, timeout=None):
         '''
         Establish the publish connection
@@ -367,6 +401,8 @@ class SaltEvent(object):
                     self.puburi,
                     io_loop=self.io_loop
                 )
+                    if self.tag_prefixes is not None:
+                        self.subscriber.subscribe(self.tag_prefixes)
                 try:
                     self.io_loop.run_sync(
                         lambda: self.subscriber.connect(timeout=timeout))
@@ -1031,7 +1067,7 @@ class AsyncEventPublisher(object):
         Get something from epull, publish it out epub, and return the package (or None)
         '''
         try:
-            self.publisher.publish(package)
+            self.publisher.publish(package, tag=_package_tag(package))
             return package
         # Add an extra fallback in case a forked process leeks through
         except Exception:
@@ -1134,7 +1170,7 @@ class EventPublisher(salt.utils.process.SignalHandlingMultiprocessingProcess):
         Get something from epull, publish it out epub, and return the package (or None)
         '''
         try:
-            self.publisher.publish(package)
+            self.publisher.publish(package, tag=_package_tag(package))
             return package
         # Add an extra fallback in case a forked process leeks through
         except Exception:
@@ -1161,10 +1197,127 @@ class EventPublisher(salt.utils.process.SignalHandlingMultiprocessingProcess):
         self.close()
 
 
+class EventReturnBuffer(object):
+    '''
+    A bounded ring buffer of events waiting to be passed to one event
+    returner, together with the flush statistics of that returner.
+
+    Once the buffer holds ``size`` events the oldest event is dropped for
+    every new one, so that a slow returner can not grow the master's memory
+    without bounds.
+    '''
+    def __init__(self, name, batch_size, size, max_seconds):
+        self.name = name
+        self.batch_size = max(batch_size, 1)
+        self.size = max(size, self.batch_size)
+        self.max_seconds = max_seconds
+        self.events = collections.deque(maxlen=self.size)
+        self.cond = threading.Condition()
+        self.stats_lock = threading.Lock()
+        self.stopping = False
+        self.dropped = 0
+        self.flushes = 0
+        self.flushed = 0
+        self.failures = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.spill_files = 0
+        self._latencies = []
+
+    def put(self, event):
+        '''
+        Append an event to the buffer and wake up a flush worker if a batch
+        is ready
+        '''
+        with self.cond:
+            if len(self.events) == self.size:
+                self.dropped += 1
+            self.events.append((time.time(), event))
+            if self.ready():
+                self.cond.notify()
+
+    def ready(self):
+        '''
+        Return True if the buffered events should be flushed now. Must be
+        called with ``cond`` held.
+        '''
+        if not self.events:
+            return False
+        if self.stopping or len(self.events) >= self.batch_size:
+            return True
+        return bool(self.max_seconds) \
+            and time.time() - self.events[0][0] >= self.max_seconds
+
+    def take(self):
+        '''
+        Wait for a batch of events to become ready and return it. Returns
+        None once the buffer is stopping and empty.
+        '''
+        with self.cond:
+            while not self.ready():
+                if self.stopping:
+                    return None
+                self.cond.wait(1)
+            count = min(len(self.events), self.batch_size)
+            return [self.events.popleft()[1] for _ in range(count)]
+
+    def drain(self):
+        '''
+        Remove and return all buffered events
+        '''
+        with self.cond:
+            events = [item[1] for item in self.events]
+            self.events.clear()
+            return events
+
+    def stop(self):
+        with self.cond:
+            self.stopping = True
+            self.cond.notify_all()
+
+    def record_flush(self, count, latency):
+        with self.stats_lock:
+            self.flushes += 1
+            self.flushed += count
+            self._latencies.append(latency)
+
+    def stats(self):
+        '''
+        Return the statistics of this returner. The flush latencies are
+        reported for the flushes since the previous call.
+        '''
+        with self.stats_lock:
+            latencies, self._latencies = self._latencies, []
+            ret = {
+                'queue_depth': len(self.events),
+                'queue_size': self.size,
+                'flushes': self.flushes,
+                'flushed': self.flushed,
+                'failures': self.failures,
+                'dropped': self.dropped,
+                'spilled': self.spilled,
+                'replayed': self.replayed,
+                'spill_files': self.spill_files,
+            }
+        if latencies:
+            ret['flush_latency'] = {
+                'last': latencies[-1],
+                'avg': sum(latencies) / len(latencies),
+                'max': max(latencies),
+            }
+        return ret
+
+
 class EventReturn(salt.utils.process.SignalHandlingMultiprocessingProcess):
     '''
     A dedicated process which listens to the master event bus and queues
     and forwards events to the specified returner.
+
+    Every configured returner gets its own bounded buffer and its own flush
+    worker thread, so a slow returner neither blocks the event bus listener
+    nor the other returners, and a returner is never called concurrently.
+    Batches which a returner fails to store are spilled to disk and passed to
+    it again after its next successful flush.
     '''
     def __new__(cls, *args, **kwargs):
         if sys.platform.startswith('win'):
@@ -1189,7 +1342,23 @@ class EventReturn(salt.utils.process.SignalHandlingMultiprocessingProcess):
         local_minion_opts = self.opts.copy()
         local_minion_opts['file_client'] = 'local'
         self.minion = salt.minion.MasterMinion(local_minion_opts)
-        self.event_queue = []
+        self.serial = salt.payload.Serial(self.opts)
+        returners = self.opts['event_return']
+        if not isinstance(returners, list):
+            returners = [returners]
+        self.buffers = [
+            EventReturnBuffer(
+                returner,
+                self.event_return_queue,
+                self.opts.get('event_return_queue_max_size', 10000),
+                self.opts.get('event_return_queue_max_seconds', 0))
+            for returner in returners
+        ]
+        self.workers = []
+        self.spill_dir = os.path.join(self.opts['cachedir'], 'event_return')
+        self._spill_count = 0
+        self._spill_lock = threading.Lock()
+        self._last_stats = time.time()
         self.stop = False
 
     # __setstate__ and __getstate__ are only used on Windows.
@@ -1211,44 +1380,174 @@ class EventReturn(salt.utils.process.SignalHandlingMultiprocessingProcess):
         }
 
     def _handle_signals(self, signum, sigframe):
-        # Flush and terminate
-        if self.event_queue:
-            self.flush_events()
+        # Only stop the main loop, which flushes the queued events and joins
+        # the flush workers on its way out. Joining them here could block on
+        # a lock held by the interrupted code.
+        log.debug('%s received signal %s. Exiting',
+                  self.__class__.__name__, signum)
         self.stop = True
-        super(EventReturn, self)._handle_signals(signum, sigframe)
+
+    def start_workers(self):
+        '''
+        Start the flush worker thread of each configured returner
+        '''
+        for buf in self.buffers:
+            event_return = '{0}.event_return'.format(buf.name)
+            if event_return not in self.minion.returners:
+                log.error('Could not store return for event(s) - returner '
+                          '\'%s\' not found.', event_return)
+                continue
+            if self.opts.get('event_return_spill', True):
+                buf.spill_files = len(self._spill_files(buf))
+            worker = threading.Thread(
+                target=self._flush_worker,
+                args=(buf, self.minion.returners[event_return]),
+                name='EventReturn-{0}'.format(buf.name))
+            worker.daemon = True
+            worker.start()
+            self.workers.append(worker)
+            log.debug('Started the flush worker for event returner %s',
+                      buf.name)
+
+    def stop_workers(self, timeout=5):
+        '''
+        Flush the remaining events and stop the flush workers. Events which
+        could not be flushed within ``timeout`` seconds are spilled to disk.
+        '''
+        for buf in self.buffers:
+            buf.stop()
+        deadline = time.time() + timeout
+        for worker in self.workers:
+            worker.join(max(deadline - time.time(), 0))
+        self.workers = [worker for worker in self.workers if worker.is_alive()]
+        for buf in self.buffers:
+            events = buf.drain()
+            if events:
+                log.warning('Event returner %s did not store %s event(s) '
+                            'before shutdown', buf.name, len(events))
+                self._spill(buf, events)
 
     def flush_events(self):
-        if isinstance(self.opts['event_return'], list):
-            # Multiple event returners
-            for r in self.opts['event_return']:
-                log.debug('Calling event returner {0}, one of many.'.format(r))
-                event_return = '{0}.event_return'.format(r)
-                self._flush_event_single(event_return)
-        else:
-            # Only a single event returner
-            log.debug('Calling event returner {0}, only one '
-                      'configured.'.format(self.opts['event_return']))
-            event_return = '{0}.event_return'.format(
-                self.opts['event_return']
-                )
-            self._flush_event_single(event_return)
-        del self.event_queue[:]
+        '''
+        Wake up the flush worker of all returners which have buffered events
+        '''
+        for buf in self.buffers:
+            with buf.cond:
+                buf.cond.notify_all()
 
-    def _flush_event_single(self, event_return):
-        if event_return in self.minion.returners:
+    def _flush_worker(self, buf, event_return):
+        while True:
+            events = buf.take()
+            if events is None:
+                return
+            self._flush_event_single(buf, event_return, events)
+
+    def _flush_event_single(self, buf, event_return, events):
+        log.debug('Calling event returner %s with %s event(s)',
+                  buf.name, len(events))
+        start = time.time()
+        try:
+            event_return(events)
+        except Exception as exc:
+            with buf.stats_lock:
+                buf.failures += 1
+            log.error('Could not store events - returner \'{0}\' raised '
+                      'exception: {1}'.format(buf.name, exc))
+            # don't waste processing power unnecessarily on converting a
+            # potentially huge dataset to a string
+            if log.level <= logging.DEBUG:
+                log.debug('Event data that caused an exception: {0}'.format(
+                    events))
+            self._spill(buf, events)
+            return
+        buf.record_flush(len(events), time.time() - start)
+        if buf.spill_files:
+            self._replay(buf, event_return)
+
+    def _spill_files(self, buf):
+        spill_dir = os.path.join(self.spill_dir, buf.name)
+        try:
+            return sorted(
+                os.path.join(spill_dir, fn) for fn in os.listdir(spill_dir)
+                if fn.endswith('.p')
+            )
+        except OSError:
+            return []
+
+    def _spill(self, buf, events):
+        '''
+        Write a batch of events which the returner could not store to disk
+        '''
+        if not self.opts.get('event_return_spill', True):
+            with buf.stats_lock:
+                buf.dropped += len(events)
+            return
+        spill_dir = os.path.join(self.spill_dir, buf.name)
+        with self._spill_lock:
+            self._spill_count += 1
+            path = os.path.join(
+                spill_dir,
+                '{0:.6f}-{1:08d}.p'.format(time.time(), self._spill_count))
+        try:
+            if not os.path.isdir(spill_dir):
+                os.makedirs(spill_dir)
+            with salt.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+                self.serial.dump(events, fp_)
+        except (IOError, OSError) as exc:
+            log.error('Could not spill %s event(s) for returner %s to %s: %s',
+                      len(events), buf.name, path, exc)
+            with buf.stats_lock:
+                buf.dropped += len(events)
+            return
+        with buf.stats_lock:
+            buf.spilled += len(events)
+            buf.spill_files += 1
+
+    def _replay(self, buf, event_return):
+        '''
+        Pass the spilled batches of a returner to it again, oldest first.
+        Stops at the first batch the returner fails to store.
+        '''
+        for path in self._spill_files(buf):
             try:
-                self.minion.returners[event_return](self.event_queue)
+                with salt.utils.files.fopen(path, 'rb') as fp_:
+                    events = self.serial.load(fp_)
             except Exception as exc:
-                log.error('Could not store events - returner \'{0}\' raised '
-                          'exception: {1}'.format(event_return, exc))
-                # don't waste processing power unnecessarily on converting a
-                # potentially huge dataset to a string
-                if log.level <= logging.DEBUG:
-                    log.debug('Event data that caused an exception: {0}'.format(
-                        self.event_queue))
-        else:
-            log.error('Could not store return for event(s) - returner '
-                      '\'%s\' not found.', event_return)
+                log.error('Could not read spilled events from %s: %s',
+                          path, exc)
+                events = None
+            if events:
+                start = time.time()
+                try:
+                    event_return(events)
+                except Exception as exc:
+                    log.error('Could not store spilled events - returner '
+                              '\'%s\' raised exception: %s', buf.name, exc)
+                    with buf.stats_lock:
+                        buf.failures += 1
+                    return
+                buf.record_flush(len(events), time.time() - start)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            with buf.stats_lock:
+                buf.spill_files = max(buf.spill_files - 1, 0)
+                if events:
+                    buf.replayed += len(events)
+
+    def _fire_stats(self):
+        '''
+        Fire the queue depth, flush latency and drop counts of the returners
+        as a master event every ``event_return_stats_interval`` seconds
+        '''
+        interval = self.opts.get('event_return_stats_interval', 60)
+        if not interval or time.time() - self._last_stats < interval:
+            return
+        self._last_stats = time.time()
+        stats = dict((buf.name, buf.stats()) for buf in self.buffers)
+        self.event.fire_event({'returners': stats},
+                              tagify('stats', 'event_return'))
 
     def run(self):
         '''
@@ -1256,21 +1555,22 @@ class EventReturn(salt.utils.process.SignalHandlingMultiprocessingProcess):
         '''
         salt.utils.process.appendproctitle(self.__class__.__name__)
         self.event = get_event('master', opts=self.opts, listen=True)
-        events = self.event.iter_events(full=True)
+        self.start_workers()
         self.event.fire_event({}, 'salt/event_listen/start')
         try:
-            for event in events:
-                if event['tag'] == 'salt/event/exit':
-                    self.stop = True
-                if self._filter(event):
-                    self.event_queue.append(event)
-                if len(self.event_queue) >= self.event_return_queue:
-                    self.flush_events()
-                if self.stop:
-                    break
+            while not self.stop:
+                # Wake up at least every second, so the time based flush and
+                # the statistics also happen on an idle bus
+                event = self.event.get_event(wait=1, full=True)
+                if event is not None:
+                    if event['tag'] == 'salt/event/exit':
+                        self.stop = True
+                    if self._filter(event):
+                        for buf in self.buffers:
+                            buf.put(event)
+                self._fire_stats()
         finally:  # flush all we have at this moment
-            if self.event_queue:
-                self.flush_events()
+            self.stop_workers()
 
     def _filter(self, event):
         '''
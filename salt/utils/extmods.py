@@ -13,6 +13,7 @@ import shutil
 import salt.fileclient
 import salt.utils.files
 import salt.utils.hashutils
+import salt.utils.loadercache
 import salt.utils.path
 import salt.utils.url
 
@@ -84,54 +85,54 @@ def sync(opts,
                         'Cannot create cache module directory %s. Check '
                         'permissions.', mod_dir
                     )
-            fileclient = salt.fileclient.get_file_client(opts)
-            for sub_env in saltenv:
-                log.info(
-                    'Syncing %s for environment \'%s\'', form, sub_env
-                )
-                cache = []
-                log.info(
-                    'Loading cache from {0}, for {1})'.format(source, sub_env)
-                )
-                # Grab only the desired files (.py, .pyx, .so)
-                cache.extend(
-                    fileclient.cache_dir(
-                        source, sub_env, include_empty=False,
-                        include_pat=r'E@\.(pyx?|so|zip)$', exclude_pat=None
+            with salt.fileclient.get_file_client(opts) as fileclient:
+                for sub_env in saltenv:
+                    log.info(
+                        'Syncing %s for environment \'%s\'', form, sub_env
                     )
-                )
-                local_cache_dir = os.path.join(
-                        opts['cachedir'],
-                        'files',
-                        sub_env,
-                        '_{0}'.format(form)
+                    cache = []
+                    log.info(
+                        'Loading cache from {0}, for {1})'.format(source, sub_env)
+                    )
+                    # Grab only the desired files (.py, .pyx, .so)
+                    cache.extend(
+                        fileclient.cache_dir(
+                            source, sub_env, include_empty=False,
+                            include_pat=r'E@\.(pyx?|so|zip)$', exclude_pat=None
                         )
-                log.debug('Local cache dir: \'%s\'', local_cache_dir)
-                for fn_ in cache:
-                    relpath = os.path.relpath(fn_, local_cache_dir)
-                    relname = os.path.splitext(relpath)[0].replace(os.sep, '.')
-                    if extmod_whitelist and form in extmod_whitelist and relname not in extmod_whitelist[form]:
-                        continue
-                    if extmod_blacklist and form in extmod_blacklist and relname in extmod_blacklist[form]:
-                        continue
-                    remote.add(relpath)
-                    dest = os.path.join(mod_dir, relpath)
-                    log.info('Copying \'%s\' to \'%s\'', fn_, dest)
-                    if os.path.isfile(dest):
-                        # The file is present, if the sum differs replace it
-                        hash_type = opts.get('hash_type', 'md5')
-                        src_digest = salt.utils.hashutils.get_hash(fn_, hash_type)
-                        dst_digest = salt.utils.hashutils.get_hash(dest, hash_type)
-                        if src_digest != dst_digest:
-                            # The downloaded file differs, replace!
+                    )
+                    local_cache_dir = os.path.join(
+                            opts['cachedir'],
+                            'files',
+                            sub_env,
+                            '_{0}'.format(form)
+                            )
+                    log.debug('Local cache dir: \'%s\'', local_cache_dir)
+                    for fn_ in cache:
+                        relpath = os.path.relpath(fn_, local_cache_dir)
+                        relname = os.path.splitext(relpath)[0].replace(os.sep, '.')
+                        if extmod_whitelist and form in extmod_whitelist and relname not in extmod_whitelist[form]:
+                            continue
+                        if extmod_blacklist and form in extmod_blacklist and relname in extmod_blacklist[form]:
+                            continue
+                        remote.add(relpath)
+                        dest = os.path.join(mod_dir, relpath)
+                        log.info('Copying \'%s\' to \'%s\'', fn_, dest)
+                        if os.path.isfile(dest):
+                            # The file is present, if the sum differs replace it
+                            hash_type = opts.get('hash_type', 'md5')
+                            src_digest = salt.utils.hashutils.get_hash(fn_, hash_type)
+                            dst_digest = salt.utils.hashutils.get_hash(dest, hash_type)
+                            if src_digest != dst_digest:
+                                # The downloaded file differs, replace!
+                                shutil.copyfile(fn_, dest)
+                                ret.append('{0}.{1}'.format(form, relname))
+                        else:
+                            dest_dir = os.path.dirname(dest)
+                            if not os.path.isdir(dest_dir):
+                                os.makedirs(dest_dir)
                             shutil.copyfile(fn_, dest)
                             ret.append('{0}.{1}'.format(form, relname))
-                    else:
-                        dest_dir = os.path.dirname(dest)
-                        if not os.path.isdir(dest_dir):
-                            os.makedirs(dest_dir)
-                        shutil.copyfile(fn_, dest)
-                        ret.append('{0}.{1}'.format(form, relname))
 
             touched = bool(ret)
             if opts['clean_dynamic_modules'] is True:
@@ -151,4 +152,7 @@ def sync(opts,
                         shutil.rmtree(emptydir, ignore_errors=True)
         except Exception as exc:
             log.error('Failed to sync %s module: %s', form, exc)
+    if touched:
+        # Synced modules may change what other modules find in __virtual__
+        salt.utils.loadercache.clear(opts)
     return ret, touched
@@ -0,0 +1,519 @@
+# -*- coding: utf-8 -*-
+'''
+Incrementally maintained file lists for the roots fileserver backend
+
+When :conf_master:`fileserver_list_index` is enabled, the FileserverUpdate
+process keeps a :class:`FileListIndex` for every saltenv in
+:conf_master:`file_roots`. The index remembers the entries of every directory
+below the roots, so after a change only the directories which changed are read
+again instead of walking the whole tree. Changed directories are reported by
+inotify if pyinotify is installed, otherwise they are found by comparing the
+mtimes of the known directories every
+:conf_master:`fileserver_list_index_interval` seconds.
+
+After every change the file lists are written to a snapshot file, which the
+MWorkers memory-map with :class:`FileListSnapshot`. The paths in a snapshot are
+sorted, so prefix queries are answered with a binary search, without reading
+the whole list.
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function, unicode_literals
+import json
+import logging
+import mmap
+import os
+import threading
+import time
+
+# Import salt libs
+import salt.fileserver
+import salt.utils.atomicfile
+import salt.utils.files
+import salt.utils.path
+import salt.utils.platform
+import salt.utils.stringutils
+from salt.ext import six
+
+# Import 3rd-party libs
+try:
+    import pyinotify
+    HAS_PYINOTIFY = True
+except ImportError:
+    HAS_PYINOTIFY = False
+
+log = logging.getLogger(__name__)
+
+SNAPSHOT_MAGIC = b'SALTFLI1\n'
+FORMS = ('files', 'dirs', 'empty_dirs', 'links')
+
+
+def snapshot_path(opts, saltenv):
+    '''
+    Return the path of the file list snapshot of a saltenv
+    '''
+    return os.path.join(
+        opts['cachedir'], 'file_lists', 'roots', '{0}.idx'.format(saltenv))
+
+
+def _translate_sep(path):
+    '''
+    Translate path separators for Windows masterless minions
+    '''
+    return path.replace('\\', '/') if os.path.sep == '\\' else path
+
+
+def add_entries(opts, ret, tgt, fs_root, parent_dir, items):
+    '''
+    Add the entries ``items`` of ``parent_dir`` to ``ret[tgt]``, as well as to
+    the empty_dirs and links of ``ret``
+    '''
+    for item in items:
+        abs_path = os.path.join(parent_dir, item)
+        log.trace('roots: Processing %s', abs_path)
+        is_link = salt.utils.path.islink(abs_path)
+        log.trace(
+            'roots: %s is %sa link',
+            abs_path, 'not ' if not is_link else ''
+        )
+        if is_link and opts['fileserver_ignoresymlinks']:
+            continue
+        rel_path = _translate_sep(os.path.relpath(abs_path, fs_root))
+        log.trace('roots: %s relative path is %s', abs_path, rel_path)
+        if salt.fileserver.is_file_ignored(opts, rel_path):
+            continue
+        ret[tgt].add(rel_path)
+        try:
+            if not os.listdir(abs_path):
+                ret['empty_dirs'].add(rel_path)
+        except Exception:
+            # Generic exception because running os.listdir() on a
+            # non-directory path raises an OSError on *NIX and a
+            # WindowsError on Windows.
+            pass
+        if is_link:
+            link_dest = salt.utils.path.readlink(abs_path)
+            log.trace(
+                'roots: %s symlink destination is %s',
+                abs_path, link_dest
+            )
+            if salt.utils.platform.is_windows() \
+                    and link_dest.startswith('\\\\'):
+                # Symlink points to a network path. Since you can't
+                # join UNC and non-UNC paths, just assume the original
+                # path.
+                log.trace(
+                    'roots: %s is a UNC path, using %s instead',
+                    link_dest, abs_path
+                )
+                link_dest = abs_path
+            if link_dest.startswith('..'):
+                joined = os.path.join(abs_path, link_dest)
+            else:
+                joined = os.path.join(
+                    os.path.dirname(abs_path), link_dest
+                )
+            rel_dest = _translate_sep(
+                os.path.relpath(
+                    os.path.realpath(os.path.normpath(joined)),
+                    fs_root
+                )
+            )
+            log.trace(
+                'roots: %s relative path is %s',
+                abs_path, rel_dest
+            )
+            if not rel_dest.startswith('..'):
+                # Only count the link if it does not point
+                # outside of the root dir of the fileserver
+                # (i.e. the "path" variable)
+                ret['links'][rel_path] = link_dest
+
+
+def _new_lists():
+    return {'files': set(), 'dirs': set(), 'empty_dirs': set(), 'links': {}}
+
+
+class FileListIndex(object):
+    '''
+    The file lists of one saltenv, kept as the entries of every directory
+    below its roots so that they can be updated one directory at a time
+    '''
+    def __init__(self, opts, saltenv):
+        self.opts = opts
+        self.saltenv = saltenv
+        self.roots = [os.path.normpath(root)
+                      for root in opts['file_roots'].get(saltenv, [])]
+        # Maps the absolute path of every walked directory to a tuple of the
+        # root it belongs to, its mtime, the walked subdirectories and the
+        # file list entries of its own entries
+        self.tree = {}
+
+    def build(self):
+        '''
+        Walk all roots of the saltenv
+        '''
+        self.tree = {}
+        for root in self.roots:
+            self._scan_tree(root, root)
+
+    def _read_dir(self, root, abs_dir):
+        '''
+        Read one directory the way os.walk does. Returns None if it can not be
+        read.
+        '''
+        try:
+            mtime = os.stat(abs_dir).st_mtime
+            names = sorted(
+                salt.utils.stringutils.to_unicode(name)
+                for name in os.listdir(salt.utils.stringutils.to_str(abs_dir))
+            )
+        except OSError:
+            return None
+        dirs, files = [], []
+        for name in names:
+            if os.path.isdir(os.path.join(abs_dir, name)):
+                dirs.append(name)
+            else:
+                files.append(name)
+        lists = _new_lists()
+        add_entries(self.opts, lists, 'dirs', root, abs_dir, dirs)
+        add_entries(self.opts, lists, 'files', root, abs_dir, files)
+        subdirs = [
+            os.path.join(abs_dir, name) for name in dirs
+            if self.opts['fileserver_followsymlinks']
+            or not os.path.islink(os.path.join(abs_dir, name))
+        ]
+        return root, mtime, subdirs, lists
+
+    def _scan_tree(self, root, abs_dir):
+        stack = [abs_dir]
+        while stack:
+            path = stack.pop()
+            entry = self._read_dir(root, path)
+            if entry is None:
+                continue
+            self.tree[path] = entry
+            stack.extend(sub for sub in entry[2] if sub not in self.tree)
+
+    def _drop_tree(self, abs_dir):
+        stack = [abs_dir]
+        while stack:
+            entry = self.tree.pop(stack.pop(), None)
+            if entry is not None:
+                stack.extend(entry[2])
+
+    def changed_dirs(self):
+        '''
+        Return the known directories whose mtime changed, and roots which
+        are not walked yet
+        '''
+        ret = set()
+        for path, entry in list(six.iteritems(self.tree)):
+            try:
+                if os.stat(path).st_mtime != entry[1]:
+                    ret.add(path)
+            except OSError:
+                ret.add(path)
+        ret.update(root for root in self.roots if root not in self.tree)
+        return ret
+
+    def refresh(self, paths=None):
+        '''
+        Read the given directories again, or those found by
+        :meth:`changed_dirs` if none are given. Returns True if the file
+        lists changed.
+        '''
+        if paths is None:
+            paths = self.changed_dirs()
+        # The parent of a changed directory knows whether it is empty
+        paths = set(paths)
+        paths.update([os.path.dirname(path) for path in paths
+                      if os.path.dirname(path) in self.tree])
+        changed = False
+        for path in paths:
+            old = self.tree.get(path)
+            if old is not None:
+                root = old[0]
+            elif path in self.roots:
+                root = path
+            else:
+                # New directories are found through their parent
+                continue
+            new = self._read_dir(root, path)
+            if new is None:
+                if old is not None:
+                    self._drop_tree(path)
+                    changed = True
+                continue
+            self.tree[path] = new
+            if old is None or old[3] != new[3]:
+                changed = True
+            old_subdirs = set(old[2]) if old is not None else set()
+            for sub in old_subdirs.difference(new[2]):
+                self._drop_tree(sub)
+                changed = True
+            for sub in new[2]:
+                if sub not in self.tree:
+                    self._scan_tree(root, sub)
+                    changed = True
+        return changed
+
+    def _root_of(self, path):
+        for root in self.roots:
+            if path == root or path.startswith(root.rstrip(os.sep) + os.sep):
+                return root
+        return None
+
+    def lists(self):
+        '''
+        Return the merged file lists of all directories
+        '''
+        ret = _new_lists()
+        by_root = dict((root, []) for root in self.roots)
+        for path in sorted(self.tree):
+            by_root.setdefault(self.tree[path][0], []).append(self.tree[path][3])
+        # Later roots win for links, like they do when walking the roots
+        for root in self.roots:
+            for lists in by_root.get(root, []):
+                for form in ('files', 'dirs', 'empty_dirs'):
+                    ret[form].update(lists[form])
+                ret['links'].update(lists['links'])
+        return ret
+
+    def write(self, path=None):
+        '''
+        Atomically write the file lists to the snapshot file
+        '''
+        if path is None:
+            path = snapshot_path(self.opts, self.saltenv)
+        write_snapshot(path, self.lists())
+
+
+def _encode_lines(entries):
+    lines = []
+    for entry in entries:
+        if any('\n' in part or '\0' in part for part in entry):
+            log.warning('Not indexing path with a newline or null byte: %r', entry)
+            continue
+        lines.append(b'\0'.join(
+            salt.utils.stringutils.to_bytes(part) for part in entry))
+    # A null byte sorts before any path byte, so links sort by their path
+    lines.sort()
+    return lines
+
+
+def write_snapshot(path, lists):
+    '''
+    Write file lists to a snapshot file. Every form is stored as a block of
+    sorted, newline terminated paths, links as ``path\\0dest`` lines.
+    '''
+    blocks = []
+    for form in FORMS:
+        if form == 'links':
+            lines = _encode_lines(six.iteritems(lists['links']))
+        else:
+            lines = _encode_lines((entry,) for entry in lists[form])
+        blocks.append((form, b''.join(line + b'\n' for line in lines), len(lines)))
+    header = {}
+    offset = 0
+    for form, block, count in blocks:
+        header[form] = [offset, len(block), count]
+        offset += len(block)
+    header_line = salt.utils.stringutils.to_bytes(json.dumps(header)) + b'\n'
+    # The offsets in the header are relative to the end of the header
+    dirname = os.path.dirname(path)
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    with salt.utils.atomicfile.atomic_open(path, 'wb') as fp_:
+        fp_.write(SNAPSHOT_MAGIC)
+        fp_.write(header_line)
+        for _, block, _ in blocks:
+            fp_.write(block)
+
+
+class FileListSnapshot(object):
+    '''
+    A memory-mapped file list snapshot written by :func:`write_snapshot`
+    '''
+    def __init__(self, path):
+        self.path = path
+        with salt.utils.files.fopen(path, 'rb') as fp_:
+            self.stat = os.fstat(fp_.fileno())
+            if self.stat.st_size <= len(SNAPSHOT_MAGIC):
+                raise ValueError('Truncated file list snapshot {0}'.format(path))
+            self.mmap = mmap.mmap(fp_.fileno(), 0, access=mmap.ACCESS_READ)
+        if self.mmap[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC:
+            self.close()
+            raise ValueError('Invalid file list snapshot {0}'.format(path))
+        header_end = self.mmap.find(b'\n', len(SNAPSHOT_MAGIC))
+        header = json.loads(salt.utils.stringutils.to_unicode(
+            self.mmap[len(SNAPSHOT_MAGIC):header_end]))
+        base = header_end + 1
+        self.blocks = dict(
+            (form, (base + offset, base + offset + length))
+            for form, (offset, length, _) in six.iteritems(header)
+        )
+
+    def close(self):
+        self.mmap.close()
+
+    def is_current(self):
+        '''
+        Return False if the snapshot file was replaced since it was mapped
+        '''
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_ino, stat.st_mtime, stat.st_size) == \
+            (self.stat.st_ino, self.stat.st_mtime, self.stat.st_size)
+
+    def _lower_bound(self, start, end, prefix):
+        '''
+        Return the offset of the first line in [start, end) which is not
+        less than ``prefix``
+        '''
+        lo, hi = start, end
+        while lo < hi:
+            mid = (lo + hi) // 2
+            line_start = self.mmap.rfind(b'\n', start, mid) + 1 or start
+            line_end = self.mmap.find(b'\n', line_start, end)
+            if self.mmap[line_start:line_end] < prefix:
+                lo = line_end + 1
+            else:
+                hi = line_start
+        return lo
+
+    def _lines(self, form, prefix):
+        start, end = self.blocks[form]
+        prefix = salt.utils.stringutils.to_bytes(prefix)
+        pos = self._lower_bound(start, end, prefix) if prefix else start
+        while pos < end:
+            line_end = self.mmap.find(b'\n', pos, end)
+            line = self.mmap[pos:line_end]
+            if not line.startswith(prefix):
+                break
+            yield salt.utils.stringutils.to_unicode(line)
+            pos = line_end + 1
+
+    def query(self, form, prefix=''):
+        '''
+        Return the sorted paths of a form starting with ``prefix``, or a dict
+        of the links starting with it for the ``links`` form
+        '''
+        if form == 'links':
+            return dict(line.split('\0', 1) for line in self._lines(form, prefix))
+        return list(self._lines(form, prefix))
+
+
+class FileListIndexer(object):
+    '''
+    Keep the file list snapshots of all saltenvs of the roots backend up to
+    date. Runs in a thread of the FileserverUpdate process.
+    '''
+    def __init__(self, opts):
+        self.opts = opts
+        self.interval = opts.get('fileserver_list_index_interval', 20)
+        self.indexes = dict(
+            (saltenv, FileListIndex(opts, saltenv))
+            for saltenv in opts['file_roots']
+        )
+        self.pending = set()
+        self.lock = threading.Lock()
+
+    def build(self):
+        for saltenv, index in six.iteritems(self.indexes):
+            start = time.time()
+            index.build()
+            self._write(index)
+            log.debug(
+                'Indexed %d directories of saltenv %s in %.3f seconds',
+                len(index.tree), saltenv, time.time() - start
+            )
+
+    def _write(self, index):
+        try:
+            index.write()
+        except (IOError, OSError) as exc:
+            log.error(
+                'Unable to write file list snapshot of saltenv %s: %s',
+                index.saltenv, exc
+            )
+
+    def refresh(self, paths=None):
+        '''
+        Update the indexes for the given changed directories, or poll all
+        known directories if none are given
+        '''
+        for index in six.itervalues(self.indexes):
+            if paths is None:
+                changed = index.refresh()
+            else:
+                own = [path for path in paths if index._root_of(path)]
+                changed = index.refresh(own) if own else False
+            if changed:
+                self._write(index)
+
+    def _watch(self):
+        '''
+        Set up inotify watches on all roots. Returns the notifier or None if
+        inotify can not be used.
+        '''
+        if not HAS_PYINOTIFY:
+            return None
+        pending = self.pending
+        lock = self.lock
+
+        class _Handler(pyinotify.ProcessEvent):
+            def process_default(self, event):
+                with lock:
+                    pending.add(os.path.normpath(
+                        salt.utils.stringutils.to_unicode(event.path)))
+                    if event.dir:
+                        pending.add(os.path.normpath(
+                            salt.utils.stringutils.to_unicode(event.pathname)))
+
+        mask = pyinotify.IN_CREATE | pyinotify.IN_DELETE | \
+            pyinotify.IN_MOVED_FROM | pyinotify.IN_MOVED_TO | \
+            pyinotify.IN_DELETE_SELF | pyinotify.IN_ATTRIB
+        try:
+            manager = pyinotify.WatchManager()
+            notifier = pyinotify.Notifier(manager, default_proc_fun=_Handler())
+            for index in six.itervalues(self.indexes):
+                for root in index.roots:
+                    if os.path.isdir(root):
+                        manager.add_watch(root, mask, rec=True, auto_add=True)
+        except Exception as exc:
+            log.warning(
+                'Unable to watch file_roots with inotify, polling them '
+                'instead: %s', exc
+            )
+            return None
+        return notifier
+
+    def run(self):
+        '''
+        Build the indexes, then keep them up to date
+        '''
+        notifier = self._watch()
+        self.build()
+        last_poll = time.time()
+        while True:
+            if notifier is None:
+                time.sleep(self.interval)
+                self.refresh()
+                continue
+            if notifier.check_events(timeout=1000):
+                notifier.read_events()
+                notifier.process_events()
+            with self.lock:
+                paths = set(self.pending)
+                self.pending.clear()
+            if paths:
+                self.refresh(paths)
+            if time.time() - last_poll >= self.interval:
+                # Catch changes inotify does not report, e.g. below symlinked
+                # directories or after an event queue overflow
+                self.refresh()
+                last_poll = time.time()
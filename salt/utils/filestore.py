@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+'''
+Content-addressed store for files fetched from the salt master
+
+When :conf_minion:`file_cache_store` is enabled, every file which the file
+client caches from the master is also kept in a :class:`FileStore` under
+``<cachedir>/file_store``, named after its hash on the fileserver. The cached
+copies below ``<cachedir>/files/<saltenv>`` are hard links to the stored
+files, so identical content which appears in several saltenvs or at several
+paths is kept on disk once, and is only downloaded the first time.
+
+The store is capped at :conf_minion:`file_cache_store_max_size` bytes. Only
+stored files which are no longer linked from the per-saltenv cache count
+against it, since removing a linked file frees no space. When they grow beyond
+the cap, the least recently used of them are removed. The time a stored file
+was last used is kept on a ``.used`` marker file next to it, because the
+stored file shares its inode, and so its mtime, with the cached copies.
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function, unicode_literals
+import errno
+import logging
+import os
+import shutil
+import threading
+import time
+
+# Import salt libs
+import salt.utils.files
+import salt.utils.hashutils
+import salt.utils.path
+import salt.utils.stringutils
+
+log = logging.getLogger(__name__)
+
+# The suffix of the marker files which hold the last use of a stored file
+USED_SUFFIX = '.used'
+# Rescan the store at least this often while files are added, to find the
+# stored files which were unlinked from the cache since the last scan
+SCAN_INTERVAL = 300
+
+
+class FileStore(object):
+    '''
+    Files stored by their hash, below ``root``, with a size cap of
+    ``max_size`` bytes, or no cap if it is 0
+    '''
+    def __init__(self, root, max_size=0):
+        self.root = root
+        self.max_size = max_size
+        # The size of the unlinked stored files found by the last scan, plus
+        # the size of the files added since
+        self._size = None
+        self._scanned = 0
+        self._lock = threading.Lock()
+
+    def path(self, hash_server):
+        '''
+        Return the path of the stored file for a hash as returned by the
+        fileserver, a dict with ``hsum`` and ``hash_type``
+        '''
+        hsum = salt.utils.stringutils.to_unicode(hash_server['hsum'])
+        return os.path.join(
+            self.root,
+            salt.utils.stringutils.to_unicode(
+                hash_server.get('hash_type', 'md5')),
+            hsum[:2],
+            hsum)
+
+    def link(self, hash_server, dest):
+        '''
+        Put the stored file with the given hash at ``dest``, replacing what
+        is there. Returns False if the file is not in the store.
+        '''
+        blob = self.path(hash_server)
+        if not os.path.isfile(blob):
+            return False
+        # The stored file is shared by all its links, make sure that nothing
+        # changed it in place
+        if salt.utils.hashutils.get_hash(
+                blob, hash_server.get('hash_type', 'md5')) \
+                != hash_server['hsum']:
+            log.warning('Removing corrupt file %s from the file store', blob)
+            self._remove(blob)
+            self._remove(blob + USED_SUFFIX)
+            return False
+        try:
+            linked = os.path.samefile(blob, dest)
+        except (AttributeError, OSError):
+            linked = False
+        if linked:
+            # Renaming a link over another link of the same file does
+            # nothing, and would leave the temporary link behind
+            self._touch(blob)
+            return True
+        tmp = '{0}.{1}.tmp'.format(dest, os.getpid())
+        try:
+            os.link(blob, tmp)
+        except (AttributeError, OSError):
+            # No hard links on this platform, or the store is on another
+            # filesystem
+            shutil.copyfile(blob, tmp)
+        if os.path.isdir(dest):
+            salt.utils.files.rm_rf(dest)
+        salt.utils.files.rename(tmp, dest)
+        self._touch(blob)
+        return True
+
+    def add(self, path, hash_server):
+        '''
+        Add the file at ``path``, which has the given hash, to the store
+        '''
+        blob = self.path(hash_server)
+        if os.path.isfile(blob):
+            self._touch(blob)
+            return
+        if salt.utils.hashutils.get_hash(
+                path, hash_server.get('hash_type', 'md5')) \
+                != hash_server['hsum']:
+            # Never store a bad download under the hash of the good one
+            return
+        blob_dir = os.path.dirname(blob)
+        try:
+            os.makedirs(blob_dir)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+        tmp = '{0}.{1}.tmp'.format(blob, os.getpid())
+        try:
+            try:
+                os.link(path, tmp)
+            except (AttributeError, OSError):
+                shutil.copyfile(path, tmp)
+            salt.utils.files.rename(tmp, blob)
+        except (IOError, OSError) as exc:
+            log.warning('Failed to add %s to the file store: %s', path, exc)
+            self._remove(tmp)
+            return
+        self._touch(blob)
+        with self._lock:
+            if self._size is not None:
+                self._size += os.path.getsize(blob)
+        self.evict()
+
+    def evict(self):
+        '''
+        Remove the least recently used files which are not linked from the
+        cache, until they are no larger than the cap
+        '''
+        if not self.max_size:
+            return
+        with self._lock:
+            if self._size is not None and self._size <= self.max_size \
+                    and time.time() - self._scanned < SCAN_INTERVAL:
+                return
+            self._scanned = time.time()
+            blobs = []
+            for root, _, files in salt.utils.path.os_walk(self.root):
+                names = set(files)
+                for name in files:
+                    path = os.path.join(root, name)
+                    if name.endswith(USED_SUFFIX):
+                        if name[:-len(USED_SUFFIX)] not in names:
+                            self._remove(path)
+                        continue
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    if stat.st_nlink > 1:
+                        # Removing it would free no space
+                        continue
+                    used = stat.st_mtime
+                    if name + USED_SUFFIX in names:
+                        try:
+                            used = os.path.getmtime(path + USED_SUFFIX)
+                        except OSError:
+                            pass
+                    blobs.append((used, stat.st_size, path))
+            self._size = sum(x[1] for x in blobs)
+            blobs.sort()
+            for _, size, path in blobs:
+                if self._size <= self.max_size:
+                    break
+                log.debug('Evicting %s from the file store', path)
+                self._remove(path)
+                self._remove(path + USED_SUFFIX)
+                self._size -= size
+
+    @staticmethod
+    def _touch(blob):
+        '''
+        Record that a stored file was used now
+        '''
+        marker = blob + USED_SUFFIX
+        try:
+            os.utime(marker, None)
+        except OSError:
+            try:
+                with salt.utils.files.fopen(marker, 'a'):
+                    pass
+            except (IOError, OSError):
+                pass
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
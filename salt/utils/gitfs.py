@@ -5,10 +5,12 @@ Classes which provide the shared base for GitFS, git_pillar, and winrepo
 
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import binascii
 import copy
 import contextlib
 import errno
 import fnmatch
+import functools
 import glob
 import hashlib
 import logging
@@ -17,6 +19,7 @@ import shlex
 import shutil
 import stat
 import subprocess
+import threading
 import time
 import tornado.ioloop
 import weakref
@@ -26,11 +29,13 @@ from datetime import datetime
 import salt.utils.configparser
 import salt.utils.data
 import salt.utils.files
+import salt.utils.gitindex
 import salt.utils.gzip_util
 import salt.utils.hashutils
 import salt.utils.itertools
 import salt.utils.path
 import salt.utils.platform
+import salt.utils.process
 import salt.utils.stringutils
 import salt.utils.url
 import salt.utils.user
@@ -58,8 +63,17 @@ PER_REMOTE_ONLY = ('name',)
 # Params which are global only and cannot be overridden for a single remote.
 GLOBAL_ONLY = ()
 
+# The (role, remote id) of the fetches which changed the remote after
+# fetch_remotes stopped waiting for them, to be reported by the next call
+_LATE_FETCHES = set()
+_LATE_FETCHES_LOCK = threading.Lock()
+
 SYMLINK_RECURSE_DEPTH = 100
 
+# The tree indexes opened by this process, by their path
+_TREE_INDEXES = OrderedDict()
+_TREE_INDEXES_MAX = 64
+
 # Auth support (auth params can be global or per-remote, too)
 AUTH_PROVIDERS = ('pygit2',)
 AUTH_PARAMS = ('user', 'password', 'pubkey', 'privkey', 'passphrase',
@@ -211,6 +225,15 @@ def failhard(role):
     raise FileserverConfigError('Failed to load {0}'.format(role))
 
 
+class IndexedBlob(object):
+    '''
+    A blob found in a tree index, which is only looked up in the repo once it
+    needs to be written to the cache
+    '''
+    def __init__(self, hexsha):
+        self.hexsha = hexsha
+
+
 class GitProvider(object):
     '''
     Base class for gitfs/git_pillar provider classes. Should never be used
@@ -441,6 +464,11 @@ class GitProvider(object):
         self.linkdir = salt.utils.path.join(cache_root,
                                             'links',
                                             self.cachedir_basename)
+        self.tree_index = self.role == 'gitfs' \
+            and self.opts.get('gitfs_tree_index', False)
+        self.index_dir = salt.utils.path.join(cache_root,
+                                              'index',
+                                              self.cachedir_basename)
 
         if not os.path.isdir(self.cachedir):
             os.makedirs(self.cachedir)
@@ -1016,6 +1044,121 @@ class GitProvider(object):
         # No matches found
         return None
 
+    def get_tree_sha(self, tree):
+        '''
+        This function must be overridden in a sub-class
+        '''
+        raise NotImplementedError()
+
+    def walk_tree(self, tree):
+        '''
+        This function must be overridden in a sub-class
+        '''
+        raise NotImplementedError()
+
+    def get_tree_index(self, tree):
+        '''
+        Return the index of the paths in the tree, writing it if this is the
+        first time that any process looks up a path in the tree
+        '''
+        index_path = salt.utils.path.join(self.index_dir,
+                                          self.get_tree_sha(tree))
+        index = _TREE_INDEXES.pop(index_path, None)
+        if index is None:
+            if not os.path.isfile(index_path):
+                salt.utils.gitindex.write(index_path, self.walk_tree(tree))
+            index = salt.utils.gitindex.TreeIndex(index_path)
+        _TREE_INDEXES[index_path] = index
+        while len(_TREE_INDEXES) > _TREE_INDEXES_MAX:
+            _TREE_INDEXES.popitem(last=False)[1].close()
+        return index
+
+    def prune_tree_indexes(self, envs):
+        '''
+        Remove the indexes of the trees which none of the environments points
+        to any more
+        '''
+        if not os.path.isdir(self.index_dir):
+            return
+        keep = set()
+        for tgt_env in envs:
+            tree = self.get_tree(tgt_env)
+            if tree:
+                keep.add(self.get_tree_sha(tree))
+        for name in os.listdir(self.index_dir):
+            # Leave alone the temporary files of the indexes being written
+            if name in keep or not salt.utils.stringutils.is_hex(name):
+                continue
+            index_path = salt.utils.path.join(self.index_dir, name)
+            index = _TREE_INDEXES.pop(index_path, None)
+            if index is not None:
+                index.close()
+            try:
+                os.remove(index_path)
+            except OSError:
+                pass
+
+    def find_file_in_index(self, tree, path):
+        '''
+        Find the specified file in the index of the tree, following symlinks
+        like the find_file function of the sub-classes
+        '''
+        index = self.get_tree_index(tree)
+        depth = 0
+        while depth < SYMLINK_RECURSE_DEPTH:
+            depth += 1
+            entry = index.get(path)
+            if entry is None or entry.kind == salt.utils.gitindex.TREE:
+                break
+            if entry.kind == salt.utils.gitindex.LINK:
+                path = salt.utils.path.join(
+                    os.path.dirname(path), entry.target, use_posixpath=True)
+                continue
+            return IndexedBlob(entry.hexsha), entry.hexsha, entry.mode
+        return None, None, None
+
+    def _index_lists(self, tree, tgt_env):
+        '''
+        Return the files, symlinks and directories below the root of the
+        environment from the index of the tree
+        '''
+        files = set()
+        symlinks = {}
+        dirs = set()
+        root = self.root(tgt_env)
+        if root:
+            relpath = lambda path: os.path.relpath(path, root)
+        else:
+            relpath = lambda path: path
+        add_mountpoint = lambda path: salt.utils.path.join(
+            self.mountpoint(tgt_env), path, use_posixpath=True)
+        for entry in self.get_tree_index(tree).walk(root):
+            path = add_mountpoint(relpath(entry.path))
+            if entry.kind == salt.utils.gitindex.TREE:
+                dirs.add(path)
+                continue
+            files.add(path)
+            if entry.kind == salt.utils.gitindex.LINK:
+                symlinks[path] = entry.target
+        return files, symlinks, dirs
+
+    def file_list_from_index(self, tree, tgt_env):
+        '''
+        Get file list for the target environment from the index of the tree
+        '''
+        files, symlinks, _ = self._index_lists(tree, tgt_env)
+        return files, symlinks
+
+    def dir_list_from_index(self, tree, tgt_env):
+        '''
+        Get list of directories for the target environment from the index of
+        the tree
+        '''
+        ret = self._index_lists(tree, tgt_env)[2]
+        if self.mountpoint(tgt_env):
+            ret.add(self.mountpoint(tgt_env))
+        return ret
+
     def get_url(self):
         '''
         Examine self.id and assign self.url (and self.branch, for git_pillar)
@@ -1199,6 +1342,8 @@ class GitPython(GitProvider):
         tree = self.get_tree(tgt_env)
         if not tree:
             return ret
+        if self.tree_index:
+            return self.dir_list_from_index(tree, tgt_env)
         if self.root(tgt_env):
             try:
                 tree = tree / self.root(tgt_env)
@@ -1272,6 +1417,8 @@ class GitPython(GitProvider):
         if not tree:
             # Not found, return empty objects
             return files, symlinks
+        if self.tree_index:
+            return self.file_list_from_index(tree, tgt_env)
         if self.root(tgt_env):
             try:
                 tree = tree / self.root(tgt_env)
@@ -1304,6 +1451,8 @@ class GitPython(GitProvider):
         if not tree:
             # Branch/tag/SHA not found in repo
             return None, None, None
+        if self.tree_index:
+            return self.find_file_in_index(tree, path)
         blob = None
         depth = 0
         while True:
@@ -1371,10 +1520,38 @@ class GitPython(GitProvider):
         except (gitdb.exc.ODBError, AttributeError):
             return None
 
+    def get_tree_sha(self, tree):
+        '''
+        Return the SHA of a git.Tree object
+        '''
+        return tree.hexsha
+
+    def walk_tree(self, tree):
+        '''
+        Yield the path, kind, SHA, mode and symlink target of the blobs and
+        trees within a git.Tree object
+        '''
+        for obj in tree.traverse():
+            if isinstance(obj, git.Tree):
+                yield (obj.path, salt.utils.gitindex.TREE, obj.hexsha,
+                       obj.mode, None)
+            elif isinstance(obj, git.Blob):
+                if stat.S_ISLNK(obj.mode):
+                    stream = six.StringIO()
+                    obj.stream_data(stream)
+                    yield (obj.path, salt.utils.gitindex.LINK, obj.hexsha,
+                           obj.mode, stream.getvalue())
+                    stream.close()
+                else:
+                    yield (obj.path, salt.utils.gitindex.BLOB, obj.hexsha,
+                           obj.mode, None)
+
     def write_file(self, blob, dest):
         '''
         Using the blob object, write the file to the destination path
         '''
+        if isinstance(blob, IndexedBlob):
+            blob = git.Blob(self.repo, binascii.unhexlify(blob.hexsha))
         with salt.utils.files.fopen(dest, 'wb+') as fp_:
             blob.stream_data(fp_)
 
@@ -1650,6 +1827,8 @@ class Pygit2(GitProvider):
         tree = self.get_tree(tgt_env)
         if not tree:
             return ret
+        if self.tree_index:
+            return self.dir_list_from_index(tree, tgt_env)
         if self.root(tgt_env):
             try:
                 oid = tree[self.root(tgt_env)].oid
@@ -1773,6 +1952,8 @@ class Pygit2(GitProvider):
         if not tree:
             # Not found, return empty objects
             return files, symlinks
+        if self.tree_index:
+            return self.file_list_from_index(tree, tgt_env)
         if self.root(tgt_env):
             try:
                 # This might need to be changed to account for a root that
@@ -1805,6 +1986,8 @@ class Pygit2(GitProvider):
         if not tree:
             # Branch/tag/SHA not found in repo
             return None, None, None
+        if self.tree_index:
+            return self.find_file_in_index(tree, path)
         blob = None
         mode = None
         depth = 0
@@ -1867,6 +2050,34 @@ class Pygit2(GitProvider):
         except (KeyError, TypeError, ValueError, AttributeError):
             return None
 
+    def get_tree_sha(self, tree):
+        '''
+        Return the SHA of a pygit2.Tree object
+        '''
+        return tree.hex
+
+    def walk_tree(self, tree, prefix=''):
+        '''
+        Yield the path, kind, SHA, mode and symlink target of the blobs and
+        trees within a pygit2.Tree object
+        '''
+        for entry in iter(tree):
+            if entry.oid not in self.repo:
+                # Entry is a submodule, skip it
+                continue
+            path = salt.utils.path.join(prefix, entry.name, use_posixpath=True)
+            if stat.S_ISDIR(entry.filemode):
+                yield (path, salt.utils.gitindex.TREE, entry.hex,
+                       entry.filemode, None)
+                for item in self.walk_tree(self.repo[entry.oid], path):
+                    yield item
+            elif stat.S_ISLNK(entry.filemode):
+                yield (path, salt.utils.gitindex.LINK, entry.hex,
+                       entry.filemode, self.repo[entry.oid].data)
+            else:
+                yield (path, salt.utils.gitindex.BLOB, entry.hex,
+                       entry.filemode, None)
+
     def setup_callbacks(self):
         '''
         Assign attributes for pygit2 callbacks
@@ -2017,6 +2228,8 @@ class Pygit2(GitProvider):
         '''
         Using the blob object, write the file to the destination path
         '''
+        if isinstance(blob, IndexedBlob):
+            blob = self.repo[blob.hexsha]
         with salt.utils.files.fopen(dest, 'wb+') as fp_:
             fp_.write(blob.data)
 
@@ -2087,6 +2300,7 @@ class GitBase(object):
         self.hash_cachedir = salt.utils.path.join(self.cache_root, 'hash')
         self.file_list_cachedir = salt.utils.path.join(
             self.opts['cachedir'], 'file_lists', self.role)
+        self.fetch_results = {}
         if init_remotes:
             self.init_remotes(
                 remotes if remotes is not None else [],
@@ -2235,11 +2449,14 @@ class GitBase(object):
                 pass
         to_remove = []
         for item in cachedir_ls:
-            if item in ('hash', 'refs'):
+            if item in ('hash', 'refs', 'index'):
                 continue
             path = salt.utils.path.join(self.cache_root, item)
             if os.path.isdir(path):
                 to_remove.append(path)
+                index_dir = salt.utils.path.join(self.cache_root, 'index', item)
+                if os.path.isdir(index_dir):
+                    to_remove.append(index_dir)
         failed = []
         if to_remove:
             for rdir in to_remove:
@@ -2260,6 +2477,22 @@ class GitBase(object):
             self.write_remote_map()
         return ret
 
+    def prune_tree_indexes(self):
+        '''
+        Remove the indexes of the trees which the remotes no longer point to
+        '''
+        for repo in self.remotes:
+            if not repo.tree_index:
+                continue
+            try:
+                repo.prune_tree_indexes(repo.envs())
+            except Exception as exc:
+                log.error(
+                    'Unable to prune the tree indexes of %s remote \'%s\': %s',
+                    self.role, repo.id, exc,
+                    exc_info_on_loglevel=logging.DEBUG
+                )
+
     def clear_cache(self):
         '''
         Completely clear cache
@@ -2301,6 +2534,12 @@ class GitBase(object):
         '''
         Fetch all remotes and return a boolean to let the calling function know
         whether or not any remotes were updated in the process of fetching
+
+        With ``<role>_fetch_workers`` above 1, up to that many remotes are
+        fetched at the same time, and a fetch which takes longer than
+        ``<role>_fetch_timeout`` seconds is no longer waited for. Whether each
+        remote changed, how long its fetch took and the error it failed with,
+        if any, are kept in ``fetch_results``.
         '''
         if remotes is None:
             remotes = []
@@ -2311,27 +2550,98 @@ class GitBase(object):
             )
             remotes = []
 
-        changed = False
-        for repo in self.remotes:
-            name = getattr(repo, 'name', None)
-            if not remotes or (repo.id, name) in remotes:
-                try:
-                    if repo.fetch():
-                        # We can't just use the return value from repo.fetch()
-                        # because the data could still have changed if old
-                        # remotes were cleared above. Additionally, we're
-                        # running this in a loop and later remotes without
-                        # changes would override this value and make it
-                        # incorrect.
-                        changed = True
-                except Exception as exc:
-                    log.error(
-                        'Exception caught while fetching %s remote \'%s\': %s',
-                        self.role, repo.id, exc,
-                        exc_info=True
-                    )
+        repos = [repo for repo in self.remotes
+                 if not remotes
+                 or (repo.id, getattr(repo, 'name', None)) in remotes]
+        self.fetch_results = {}
+        workers = self.opts.get('{0}_fetch_workers'.format(self.role), 1)
+        if workers > 1 and len(repos) > 1:
+            self._fetch_remotes_parallel(
+                repos,
+                workers,
+                self.opts.get('{0}_fetch_timeout'.format(self.role), 0))
+        else:
+            for repo in repos:
+                self.fetch_results[repo.id] = self._fetch_remote(repo)
+
+        # We can't just use the return value from the last repo.fetch()
+        # because the data could still have changed if old remotes were
+        # cleared above, or by the fetches which finished after they timed
+        # out in an earlier call.
+        changed = any(result['changed']
+                      for result in six.itervalues(self.fetch_results))
+        with _LATE_FETCHES_LOCK:
+            for repo in repos:
+                if (self.role, repo.id) in _LATE_FETCHES:
+                    _LATE_FETCHES.discard((self.role, repo.id))
+                    changed = True
+        if self.fetch_results:
+            log.debug(
+                'Fetched %s remotes: %s',
+                self.role,
+                ', '.join(['\'{0}\' ({1}s{2})'.format(
+                    repo_id,
+                    result['duration'],
+                    ', failed' if 'error' in result else '')
+                    for repo_id, result in sorted(
+                        six.iteritems(self.fetch_results),
+                        key=lambda item: -item[1]['duration'])])
+            )
         return changed
 
+    def _fetch_remote(self, repo):
+        '''
+        Fetch one remote, return whether it changed, the seconds the fetch
+        took and the error it failed with, if any
+        '''
+        start = time.time()
+        result = {'changed': False}
+        try:
+            result['changed'] = bool(repo.fetch())
+        except Exception as exc:
+            log.error(
+                'Exception caught while fetching %s remote \'%s\': %s',
+                self.role, repo.id, exc,
+                exc_info=True
+            )
+            result['error'] = six.text_type(exc)
+        result['duration'] = round(time.time() - start, 3)
+        return result
+
+    def _fetch_remotes_parallel(self, repos, workers, timeout):
+        '''
+        Fetch the remotes in daemon threads, at most ``workers`` at a time,
+        and put their results into ``fetch_results``. A fetch which runs for
+        longer than ``timeout`` seconds no longer counts against the limit.
+        Its thread is left behind, holding the update lock of the remote until
+        it finishes, so that later updates skip the remote in the meantime.
+        '''
+        def _timed_out(repo_id, seconds):
+            log.error(
+                'Fetch of %s remote \'%s\' did not finish within %s seconds, '
+                'no longer waiting for it', self.role, repo_id, timeout
+            )
+            self.fetch_results[repo_id] = {
+                'changed': False,
+                'duration': seconds,
+                'error': 'Timed out after {0} seconds'.format(timeout)}
+
+        def _late(repo_id, result, exc_info):
+            if result['changed']:
+                with _LATE_FETCHES_LOCK:
+                    _LATE_FETCHES.add((self.role, repo_id))
+
+        ret = salt.utils.process.run_in_threads(
+            [(repo.id, functools.partial(self._fetch_remote, repo))
+             for repo in repos],
+            workers,
+            timeout,
+            name='{0}-fetch'.format(self.role),
+            on_timeout=_timed_out,
+            on_late=_late)
+        for repo_id, (result, _, _) in six.iteritems(ret):
+            self.fetch_results[repo_id] = result
+
     def lock(self, remote=None):
         '''
         Place an update.lk
@@ -2371,6 +2681,9 @@ class GitBase(object):
         data['changed'] = self.clear_old_remotes()
         if self.fetch_remotes(remotes=remotes):
             data['changed'] = True
+        # Whether each remote changed, the seconds its fetch took and the
+        # error it failed with, if any
+        data['remotes'] = self.fetch_results
 
         # A masterless minion will need a new env cache file even if no changes
         # were fetched.
@@ -2389,6 +2702,9 @@ class GitBase(object):
                 fp_.write(serial.dumps(new_envs))
                 log.trace('Wrote env cache data to %s', self.env_cache)
 
+        if data['changed'] is True:
+            self.prune_tree_indexes()
+
         # if there is a change, fire an event
         if self.opts.get('fileserver_events', False):
             event = salt.utils.event.get_event(
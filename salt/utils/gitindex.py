@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+'''
+Index of the paths in a git tree, shared between processes
+
+The index of a tree is written once, to a file named after the SHA of the
+tree, so it never changes. Every process which reads it maps the file into
+memory, which lets the processes share the pages of the index and look up a
+path without reading the whole index.
+
+The file holds the entries sorted by path, followed by the offsets of the
+entries and a trailer with the number of entries and where the offsets start.
+An entry is its path, kind, SHA, mode and symlink target, each followed by a
+NUL byte.
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function, unicode_literals
+import collections
+import logging
+import mmap
+import os
+import struct
+
+# Import salt libs
+import salt.utils.files
+import salt.utils.stringutils
+
+log = logging.getLogger(__name__)
+
+MAGIC = b'SALTGITIDX1\n'
+
+# The kinds of entries
+TREE = 'tree'
+BLOB = 'blob'
+LINK = 'link'
+
+_OFFSET = struct.Struct(str('<Q'))
+_TRAILER = struct.Struct(str('<QQ'))
+
+Entry = collections.namedtuple('Entry', 'path kind hexsha mode target')
+
+
+def write(path, entries):
+    '''
+    Write the index of ``entries`` to ``path``. The entries are tuples of the
+    path, kind, SHA, mode and symlink target (or None) of the objects in a
+    tree, in any order.
+
+    The index is written to a temporary file which is then renamed, so that
+    the processes which write the same index at the same time do not see a
+    partial one.
+    '''
+    records = []
+    for entry_path, kind, hexsha, mode, target in entries:
+        records.append(b'\0'.join([
+            salt.utils.stringutils.to_bytes(entry_path),
+            salt.utils.stringutils.to_bytes(kind),
+            salt.utils.stringutils.to_bytes(hexsha),
+            salt.utils.stringutils.to_bytes(str(mode)),  # future lint: disable=blacklisted-function
+            salt.utils.stringutils.to_bytes(target or ''),
+            b'']))
+    records.sort()
+    index_dir = os.path.dirname(path)
+    if not os.path.isdir(index_dir):
+        try:
+            os.makedirs(index_dir)
+        except OSError:
+            if not os.path.isdir(index_dir):
+                raise
+    tmp_path = salt.utils.files.mkstemp(dir=index_dir)
+    try:
+        with salt.utils.files.fopen(tmp_path, 'wb') as fp_:
+            fp_.write(MAGIC)
+            offsets = []
+            offset = len(MAGIC)
+            for record in records:
+                offsets.append(offset)
+                fp_.write(record)
+                offset += len(record)
+            for record_offset in offsets:
+                fp_.write(_OFFSET.pack(record_offset))
+            fp_.write(_TRAILER.pack(len(offsets), offset))
+        salt.utils.files.rename(tmp_path, path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    log.debug('Wrote git tree index %s with %d entries', path, len(records))
+
+
+class TreeIndex(object):
+    '''
+    A memory-mapped index written by :py:func:`write`
+    '''
+    def __init__(self, path):
+        self.path = path
+        with salt.utils.files.fopen(path, 'rb') as fp_:
+            self._map = mmap.mmap(fp_.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError('{0} is not a git tree index'.format(path))
+        self._count, self._offsets = _TRAILER.unpack_from(
+            self._map, len(self._map) - _TRAILER.size)
+
+    def close(self):
+        self._map.close()
+
+    def __len__(self):
+        return self._count
+
+    def _offset(self, idx):
+        return _OFFSET.unpack_from(
+            self._map, self._offsets + idx * _OFFSET.size)[0]
+
+    def _path(self, idx):
+        offset = self._offset(idx)
+        return self._map[offset:self._map.find(b'\0', offset)]
+
+    def _entry(self, idx):
+        offset = self._offset(idx)
+        fields = []
+        for _ in range(5):
+            end = self._map.find(b'\0', offset)
+            fields.append(salt.utils.stringutils.to_unicode(
+                self._map[offset:end]))
+            offset = end + 1
+        return Entry(fields[0],
+                     fields[1],
+                     fields[2],
+                     int(fields[3]),
+                     fields[4] if fields[1] == LINK else None)
+
+    def _bisect(self, key):
+        '''
+        Return the position of the first entry with a path not below ``key``
+        '''
+        low, high = 0, self._count
+        while low < high:
+            mid = (low + high) // 2
+            if self._path(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def get(self, path):
+        '''
+        Return the entry of ``path``, or None if it is not in the tree
+        '''
+        key = salt.utils.stringutils.to_bytes(path)
+        idx = self._bisect(key)
+        if idx < self._count and self._path(idx) == key:
+            return self._entry(idx)
+        return None
+
+    def walk(self, prefix=''):
+        '''
+        Yield the entries below the directory ``prefix``, or all of them if it
+        is empty, sorted by path
+        '''
+        if prefix:
+            key = salt.utils.stringutils.to_bytes(prefix.rstrip('/') + '/')
+        else:
+            key = b''
+        for idx in range(self._bisect(key), self._count):
+            if not self._path(idx).startswith(key):
+                break
+            yield self._entry(idx)
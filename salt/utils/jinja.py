@@ -30,6 +30,7 @@ import salt.fileclient
 import salt.utils.data
 import salt.utils.files
 import salt.utils.json
+import salt.utils.rendercache
 import salt.utils.stringutils
 import salt.utils.url
 import salt.utils.yaml
@@ -78,10 +79,18 @@ class SaltCacheLoader(BaseLoader):
         Return a file client. Instantiates on first call.
         '''
         if not self._file_client:
-            self._file_client = salt.fileclient.get_file_client(
-                self.opts, self.pillar_rend)
+            with salt.utils.rendercache.untracked():
+                self._file_client = salt.fileclient.get_file_client(
+                    self.opts, self.pillar_rend)
         return self._file_client
 
+    def destroy(self):
+        '''
+        Release the file client
+        '''
+        if self._file_client:
+            self._file_client.destroy()
+
     def cache_file(self, template):
         '''
         Cache a file from the salt master
@@ -94,7 +103,8 @@ class SaltCacheLoader(BaseLoader):
         Cache a file only once
         '''
         if template not in self.cached:
-            self.cache_file(template)
+            with salt.utils.rendercache.untracked():
+                self.cache_file(template)
             self.cached.append(template)
 
     def get_source(self, environment, template):
@@ -120,6 +130,7 @@ class SaltCacheLoader(BaseLoader):
         # pylint: disable=cell-var-from-loop
         for spath in self.searchpath:
             filepath = os.path.join(spath, template)
+            salt.utils.rendercache.read_file(filepath)
             try:
                 with salt.utils.files.fopen(filepath, 'rb') as ifile:
                     contents = ifile.read().decode(self.encoding)
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+'''
+Persistent cache of what the LazyLoader found out about its modules
+
+When :conf_minion:`loader_cache` is enabled, every
+:class:`salt.loader.LazyLoader` keeps a :class:`LoaderCache` below
+``<cachedir>/loader``. It remembers
+
+- the file mapping of the module directories, which is reused as long as the
+  mtimes of the directories did not change, instead of listing them again,
+- the modules which could not be imported or whose ``__virtual__`` function
+  returned False, keyed by the mtime of the module file. A warm loader marks
+  them as missing without importing them. A False ``__virtual__`` result is
+  only kept if the function, or a function of its module which it calls, does
+  not look at other execution modules, the pillar or files, see
+  :func:`cacheable_virtual`.
+
+Both only hold as long as the environment did not change, so the cache is
+keyed by a fingerprint of the grains, the options, the Salt and Python
+versions, and the mtimes of the directories on ``sys.path`` and ``PATH``,
+where installing a package or a binary which a ``__virtual__`` function looks
+for shows up. Syncing modules with ``saltutil.sync_*`` clears the cache.
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function, unicode_literals
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sys
+
+# Import salt libs
+import salt.utils.atomicfile
+import salt.utils.files
+import salt.utils.stringutils
+import salt.version
+from salt.ext import six
+
+log = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+
+# Names which show that a __virtual__ function depends on something the
+# fingerprint does not cover: other execution modules (e.g. config.get), the
+# pillar, or files outside of the directories on sys.path and PATH
+_UNCACHEABLE_NAMES = frozenset((
+    '__salt__', '__pillar__', 'open', 'fopen', 'exists', 'lexists', 'isfile',
+    'isdir', 'islink', 'access', 'listdir', 'stat', 'glob'))
+
+
+def cache_dir(opts):
+    '''
+    Return the directory of the loader caches
+    '''
+    return os.path.join(opts['cachedir'], 'loader')
+
+
+def clear(opts):
+    '''
+    Remove all loader caches, e.g. after modules were synced
+    '''
+    cdir = cache_dir(opts)
+    try:
+        names = os.listdir(cdir)
+    except OSError:
+        return
+    for name in names:
+        try:
+            os.remove(os.path.join(cdir, name))
+        except OSError:
+            pass
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _json_default(obj):
+    # Objects in the opts, like loggers or loaders, do not change what a
+    # module finds, and their repr is different in every process
+    return type(obj).__name__
+
+
+def fingerprint(opts):
+    '''
+    Return a hash of everything outside of the module files which decides
+    whether a module is available
+    '''
+    env_dirs = [x for x in sys.path if x] + \
+        os.environ.get('PATH', '').split(os.pathsep)
+    data = {
+        'salt': salt.version.__version__,
+        'python': [sys.executable, list(sys.version_info)],
+        # The grains_timing grain is different on every run
+        'grains': dict((key, val)
+                       for key, val in six.iteritems(opts.get('grains', {}))
+                       if key != 'grains_timing'),
+        'opts': dict((key, val) for key, val in six.iteritems(opts)
+                     if key not in ('grains', 'pillar')),
+        'dirs': [(x, _mtime(x)) for x in env_dirs],
+    }
+    return hashlib.sha1(salt.utils.stringutils.to_bytes(
+        json.dumps(data, sort_keys=True, default=_json_default))).hexdigest()
+
+
+def cacheable_virtual(func):
+    '''
+    Return True if a False result of the virtual function ``func`` only
+    depends on what the fingerprint covers, so that it may be cached. The
+    names used by the function, by the functions it defines and by the
+    functions of its module which it calls are checked.
+    '''
+    if not inspect.isfunction(func):
+        return True
+    module_globals = func.__globals__
+    seen = set()
+    codes = [six.get_function_code(func)]
+    while codes:
+        code = codes.pop()
+        if code in seen:
+            continue
+        seen.add(code)
+        for name in code.co_names:
+            if name in _UNCACHEABLE_NAMES:
+                return False
+            helper = module_globals.get(name)
+            if inspect.isfunction(helper) \
+                    and helper.__globals__ is module_globals:
+                codes.append(six.get_function_code(helper))
+        codes.extend(x for x in code.co_consts if inspect.iscode(x))
+    return True
+
+
+class LoaderCache(object):
+    '''
+    The cache of one loader, identified by its ``tag`` and module directories
+    '''
+    def __init__(self, opts, tag, module_dirs, extra=None):
+        key = hashlib.sha1(salt.utils.stringutils.to_bytes(json.dumps(
+            [tag, module_dirs, extra], sort_keys=True,
+            default=_json_default))).hexdigest()
+        self.path = os.path.join(
+            cache_dir(opts), '{0}-{1}.json'.format(tag, key[:16]))
+        self.fingerprint = fingerprint(opts)
+        self.dirty = False
+        self.dirs = {}
+        self.file_mapping = None
+        self.missing = {}
+        self._read()
+
+    def _read(self):
+        try:
+            with salt.utils.files.fopen(self.path, 'r') as fp_:
+                data = json.load(fp_)
+        except (IOError, OSError, ValueError):
+            return
+        if data.get('version') != CACHE_VERSION \
+                or data.get('fingerprint') != self.fingerprint:
+            log.debug('Discarding outdated loader cache %s', self.path)
+            return
+        self.dirs = data.get('dirs', {})
+        self.file_mapping = data.get('file_mapping')
+        self.missing = data.get('missing', {})
+
+    def write(self):
+        '''
+        Write the cache if anything was added to it
+        '''
+        if not self.dirty:
+            return
+        data = {'version': CACHE_VERSION,
+                'fingerprint': self.fingerprint,
+                'dirs': self.dirs,
+                'file_mapping': self.file_mapping,
+                'missing': self.missing}
+        try:
+            cdir = os.path.dirname(self.path)
+            if not os.path.isdir(cdir):
+                os.makedirs(cdir)
+            with salt.utils.atomicfile.atomic_open(self.path, 'w') as fp_:
+                fp_.write(json.dumps(data))
+            self.dirty = False
+        except (IOError, OSError) as exc:
+            log.debug('Failed to write loader cache %s: %s', self.path, exc)
+
+    @staticmethod
+    def _dir_mtimes(module_dirs):
+        ret = {}
+        for mod_dir in module_dirs:
+            ret[mod_dir] = _mtime(mod_dir)
+            ret[os.path.join(mod_dir, '__pycache__')] = \
+                _mtime(os.path.join(mod_dir, '__pycache__'))
+        return ret
+
+    def get_file_mapping(self, module_dirs):
+        '''
+        Return the cached file mapping as a list of ``(name, path, ext)``,
+        or None if a module directory changed since it was cached
+        '''
+        if self.file_mapping is None \
+                or self.dirs != self._dir_mtimes(module_dirs):
+            return None
+        return self.file_mapping
+
+    def set_file_mapping(self, module_dirs, file_mapping):
+        '''
+        Remember a file mapping, a dict of name to ``(path, ext)``
+        '''
+        mapping = [[name, fpath, ext]
+                   for name, (fpath, ext) in six.iteritems(file_mapping)]
+        dirs = self._dir_mtimes(module_dirs)
+        if mapping != self.file_mapping or dirs != self.dirs:
+            self.file_mapping = mapping
+            self.dirs = dirs
+            # Entries of modules which are gone are of no use anymore
+            paths = set(x[1] for x in mapping)
+            self.missing = dict((key, val)
+                                for key, val in six.iteritems(self.missing)
+                                if key in paths)
+            self.dirty = True
+
+    def get_missing(self, fpath):
+        '''
+        Return the names the module at ``fpath`` was missing under with the
+        reason, or None if it is not known to be missing
+        '''
+        entry = self.missing.get(fpath)
+        if entry is None or entry['mtime'] != _mtime(fpath):
+            return None
+        return entry['names'], entry['error']
+
+    def set_missing(self, fpath, names, error):
+        '''
+        Remember that the module at ``fpath`` is not available
+        '''
+        mtime = _mtime(fpath)
+        if mtime is None:
+            return
+        self.missing[fpath] = {
+            'mtime': mtime,
+            'names': list(names),
+            'error': None if error is None else six.text_type(error)}
+        self.dirty = True
@@ -66,6 +66,13 @@ if HAS_MAKO:
                     self.opts, self.pillar_rend)
             return self._file_client
 
+        def destroy(self):
+            '''
+            Release the file client
+            '''
+            if self._file_client:
+                self._file_client.destroy()
+
         def adjust_uri(self, uri, filename):
             scheme = urlparse(uri).scheme
             if scheme in ('salt', 'file'):
@@ -21,6 +21,7 @@ import salt.client
 import salt.pillar
 import salt.utils.atomicfile
 import salt.utils.files
+import salt.utils.minion_index
 import salt.utils.minions
 import salt.utils.platform
 import salt.utils.stringutils
@@ -109,10 +110,13 @@ class MasterPillarUtil(object):
             return mine_data
         if not minion_ids:
             minion_ids = self.cache.list('minions')
+        minion_ids = [minion_id for minion_id in minion_ids
+                      if salt.utils.verify.valid_id(self.opts, minion_id)]
+        cdata = self.cache.fetch_many(
+            ('minions/{0}'.format(minion_id), 'mine')
+            for minion_id in minion_ids)
         for minion_id in minion_ids:
-            if not salt.utils.verify.valid_id(self.opts, minion_id):
-                continue
-            mdata = self.cache.fetch('minions/{0}'.format(minion_id), 'mine')
+            mdata = cdata.get(('minions/{0}'.format(minion_id), 'mine'))
             if isinstance(mdata, dict):
                 mine_data[minion_id] = mdata
         return mine_data
@@ -128,10 +132,13 @@ class MasterPillarUtil(object):
             return grains, pillars
         if not minion_ids:
             minion_ids = self.cache.list('minions')
+        minion_ids = [minion_id for minion_id in minion_ids
+                      if salt.utils.verify.valid_id(self.opts, minion_id)]
+        cdata = self.cache.fetch_many(
+            ('minions/{0}'.format(minion_id), 'data')
+            for minion_id in minion_ids)
         for minion_id in minion_ids:
-            if not salt.utils.verify.valid_id(self.opts, minion_id):
-                continue
-            mdata = self.cache.fetch('minions/{0}'.format(minion_id), 'data')
+            mdata = cdata.get(('minions/{0}'.format(minion_id), 'data'))
             if not isinstance(mdata, dict):
                 log.warning(
                     'cache.fetch should always return a dict. ReturnedType: %s, MinionId: %s',
@@ -350,6 +357,9 @@ class MasterPillarUtil(object):
             # to read in the pillar/grains data since they are both stored
             # in the same file, 'data.p'
             grains, pillars = self._get_cached_minion_data(*minion_ids)
+        index = None
+        if self.opts.get('minion_data_index', False):
+            index = salt.utils.minion_index.MinionIndex(self.opts)
         try:
             c_minions = self.cache.list('minions')
             for minion_id in minion_ids:
@@ -367,10 +377,16 @@ class MasterPillarUtil(object):
                     (clear_grains and not minion_pillar)):
                     # Not saving pillar or grains, so just delete the cache file
                     self.cache.flush(bank, 'data')
+                    if index is not None:
+                        index.update(minion_id, None)
                 elif clear_pillar and minion_grains:
                     self.cache.store(bank, 'data', {'grains': minion_grains})
+                    if index is not None:
+                        index.update(minion_id, {'grains': minion_grains})
                 elif clear_grains and minion_pillar:
                     self.cache.store(bank, 'data', {'pillar': minion_pillar})
+                    if index is not None:
+                        index.update(minion_id, {'pillar': minion_pillar})
                 if clear_mine:
                     # Delete the whole mine file
                     self.cache.flush(bank, 'mine')
@@ -5,8 +5,10 @@ Utility functions for minions
 
 # Import Python Libs
 from __future__ import absolute_import, unicode_literals
+import ctypes
 import os
 import logging
+import multiprocessing
 import threading
 
 # Import Salt Libs
@@ -15,6 +17,9 @@ import salt.utils.files
 import salt.utils.platform
 import salt.utils.process
 
+# Import 3rd-party libs
+from salt.ext.six.moves import queue
+
 log = logging.getLogger(__name__)
 
 
@@ -144,3 +149,146 @@ def _check_cmdline(data):
                 return True
     except (OSError, IOError):
         return False
+
+
+def _job_pool_worker(target, args, jobs, busy, slot, counters, max_jobs, parent_pid):
+    '''
+    Run jobs from the job pool queue until told to stop, ``max_jobs`` jobs
+    were run or the minion went away
+    '''
+    handler = target(*args)
+    title = None
+    if salt.utils.process.HAS_SETPROCTITLE:
+        title = salt.utils.process.setproctitle.getproctitle()
+    # Every job starts in the working directory and with the environment the
+    # worker started with, like a job in a process of its own would
+    cwd = os.getcwd()
+    environ = dict(os.environ)
+    done = 0
+    while True:
+        try:
+            data = jobs.get(timeout=1)
+        except queue.Empty:
+            if parent_pid is not None and os.getppid() != parent_pid:
+                log.debug('Minion process has exited, stopping job pool worker')
+                break
+            continue
+        if data is None:
+            break
+        busy[slot] = 1
+        with counters.get_lock():
+            counters[0] += 1
+        try:
+            os.chdir(cwd)
+            os.environ.clear()
+            os.environ.update(environ)
+            handler(data)
+        except Exception:
+            log.exception('Job pool worker failed to run job %s', data.get('jid'))
+        finally:
+            busy[slot] = 0
+            if title is not None:
+                salt.utils.process.setproctitle.setproctitle(title)
+        done += 1
+        if max_jobs and done >= max_jobs:
+            log.debug('Job pool worker ran %s jobs, recycling', done)
+            break
+
+
+class JobPool(object):
+    '''
+    A pool of long lived processes which run the jobs published to the
+    minion, instead of forking a new process for every job.
+
+    ``target`` is called once in every worker with ``args`` and must return
+    the function which runs a single job, so the (expensive) loading of the
+    execution modules is only done when a worker starts.
+    '''
+    def __init__(self, opts, target, args=()):
+        self.opts = opts
+        self.target = target
+        self.args = args
+        self.size = max(int(opts.get('job_pool_workers', 0)), 1)
+        self.max_jobs = int(opts.get('job_pool_max_jobs', 0))
+        self.jobs = multiprocessing.Queue()
+        # One busy flag per worker slot, so that a worker which is killed in
+        # the middle of a job can not leave the busy count behind.
+        self.busy = multiprocessing.Array(ctypes.c_int, self.size)
+        # Number of jobs taken off the queue by the workers
+        self.counters = multiprocessing.Array(ctypes.c_long, 1)
+        self.submitted = 0
+        self.workers = [None] * self.size
+        self.stopped = False
+
+    def _spawn(self, slot):
+        self.busy[slot] = 0
+        process = salt.utils.process.SignalHandlingMultiprocessingProcess(
+            target=_job_pool_worker,
+            args=(self.target, self.args, self.jobs, self.busy, slot,
+                  self.counters, self.max_jobs,
+                  None if salt.utils.platform.is_windows() else os.getpid()),
+        )
+        process.start()
+        self.workers[slot] = process
+        log.debug('Started job pool worker %s with pid %s', slot, process.pid)
+
+    def start(self):
+        '''
+        Start the worker processes
+        '''
+        for slot in range(self.size):
+            self._spawn(slot)
+
+    def maintain(self):
+        '''
+        Replace the workers which exited, because they were recycled, crashed
+        or a job running in them was killed
+        '''
+        if self.stopped:
+            return
+        for slot, process in enumerate(self.workers):
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                process.join()
+                log.debug('Job pool worker %s exited with %s', slot, process.exitcode)
+            self._spawn(slot)
+
+    def submit(self, data):
+        '''
+        Queue a job for the next idle worker
+        '''
+        self.maintain()
+        self.jobs.put(data)
+        self.submitted += 1
+
+    def stats(self):
+        '''
+        Return the number of workers, busy workers and queued jobs
+        '''
+        return {
+            'workers': sum(1 for process in self.workers
+                           if process is not None and process.is_alive()),
+            'busy': sum(self.busy),
+            'queued': max(self.submitted - self.counters[0], 0),
+            'completed': self.counters[0] - sum(self.busy),
+        }
+
+    def stop(self, wait=True, timeout=10):
+        '''
+        Stop the workers once they have run the jobs already queued. Unless
+        ``wait`` is False, wait up to ``timeout`` seconds for them to finish
+        before terminating them.
+        '''
+        self.stopped = True
+        for _ in self.workers:
+            self.jobs.put(None)
+        if not wait:
+            return
+        for process in self.workers:
+            if process is None:
+                continue
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
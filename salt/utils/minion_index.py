@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+'''
+    salt.utils.minion_index
+    -----------------------
+
+    An inverted index of the grains and pillar data held in the minion data
+    cache, used by :py:class:`salt.utils.minions.CkMinions` to resolve grain
+    and pillar targets without fetching the cached data of every minion.
+
+    The index is shared by all processes of a master through two files in the
+    ``minion_index`` directory below the master cachedir:
+
+    ``index.<generation>.p``
+        A snapshot of the indexed entries of every minion.
+
+    ``journal.<generation>.p``
+        An append-only log of the minions which were (re-)indexed since the
+        snapshot was written.
+
+    Writers append to the journal, readers load the newest snapshot once and
+    then only read the journal records they have not seen yet. The Maintenance
+    process periodically folds the journal into a new snapshot generation.
+
+    The entries of a minion record when they were indexed. When it folds the
+    journal, the Maintenance process also indexes again the minions whose
+    cached data was stored after that by a process which did not update the
+    index.
+
+    .. versionadded:: Fluorine
+'''
+
+# Import python libs
+from __future__ import absolute_import, unicode_literals
+import errno
+import fnmatch
+import logging
+import os
+import re
+import struct
+import time
+
+# Import salt libs
+import salt.payload
+import salt.utils.atomicfile
+import salt.utils.files
+from salt.defaults import DEFAULT_TARGET_DELIM
+from salt.exceptions import FileLockError
+
+# Import 3rd-party libs
+from salt.ext import six
+from salt.ext.six.moves import zip  # pylint: disable=import-error,redefined-builtin
+
+log = logging.getLogger(__name__)
+
+SEARCH_TYPES = ('grains', 'pillar')
+
+# Journal records are length prefixed so that a reader never consumes a record
+# which is still being written.
+_RECORD_HEADER = struct.Struct(str('>I'))
+_SNAPSHOT_REX = re.compile(r'^index\.(\d+)\.p$')
+
+# Entry kinds
+_KEY = 'k'
+_VALUE = 'v'
+
+
+class Unindexable(Exception):
+    '''
+    Raised when a target expression cannot be answered from the index
+    '''
+
+
+def flatten(data):
+    '''
+    Flatten a grains or pillar dict into a list of index entries.
+
+    Every entry is a ``[kind, path, value]`` list. ``path`` is the list of keys
+    which :py:func:`salt.utils.data.traverse_dict_and_list` would walk to reach
+    the node. Kind ``k`` entries record the (case-sensitive) keys of a dict
+    node and kind ``v`` entries the lowercased text of a scalar node or of the
+    scalar members of a list node, which is what
+    :py:func:`salt.utils.data.subdict_match` compares against.
+    '''
+    entries = []
+
+    def _walk(node, path):
+        if isinstance(node, dict):
+            for key, val in six.iteritems(node):
+                key = six.text_type(key)
+                entries.append([_KEY, path, key])
+                _walk(val, path + [key])
+        elif isinstance(node, (list, tuple)):
+            for idx, member in enumerate(node):
+                if isinstance(member, (dict, list, tuple)):
+                    # Embedded dicts are reachable both by list index and,
+                    # through traverse_dict_and_list, by their own keys.
+                    _walk(member, path + [six.text_type(idx)])
+                    if isinstance(member, dict):
+                        _walk(member, path)
+                else:
+                    value = six.text_type(member).lower()
+                    entries.append([_VALUE, path, value])
+                    entries.append([_VALUE, path + [six.text_type(idx)], value])
+        elif path:
+            entries.append([_VALUE, path, six.text_type(node).lower()])
+
+    if isinstance(data, dict):
+        _walk(data, [])
+    return entries
+
+
+class MinionIndex(object):
+    '''
+    Inverted index of grains and pillar key paths to sets of minion ids
+    '''
+    def __init__(self, opts):
+        self.opts = opts
+        self.serial = salt.payload.Serial(opts)
+        self.index_dir = os.path.join(opts['cachedir'], 'minion_index')
+        self.lock_fn = os.path.join(self.index_dir, '.lock')
+        self.generation = None
+        self.offset = 0
+        # minion id -> {search_type: entries}
+        self.minions = {}
+        # search_type -> path tuple -> {kind: {value: set(minion ids)}}
+        self.index = dict((stype, {}) for stype in SEARCH_TYPES)
+
+    def _snapshot_path(self, generation):
+        return os.path.join(self.index_dir, 'index.{0}.p'.format(generation))
+
+    def _journal_path(self, generation):
+        return os.path.join(self.index_dir, 'journal.{0}.p'.format(generation))
+
+    def _current_generation(self):
+        '''
+        Return the newest snapshot generation on disk, or None
+        '''
+        try:
+            names = os.listdir(self.index_dir)
+        except OSError:
+            return None
+        generations = [int(m.group(1)) for m in
+                       (_SNAPSHOT_REX.match(name) for name in names) if m]
+        return max(generations) if generations else None
+
+    def _ensure_dir(self):
+        try:
+            os.makedirs(self.index_dir)
+        except OSError as exc:
+            if exc.errno != errno.EEXIST:
+                raise
+
+    def _add(self, minion_id, entries):
+        for stype in SEARCH_TYPES:
+            stype_index = self.index[stype]
+            for kind, path, value in entries.get(stype, ()):
+                node = stype_index.setdefault(tuple(path), {_KEY: {}, _VALUE: {}})
+                node[kind].setdefault(value, set()).add(minion_id)
+        self.minions[minion_id] = entries
+
+    def _discard(self, minion_id):
+        entries = self.minions.pop(minion_id, None)
+        if entries is None:
+            return
+        for stype in SEARCH_TYPES:
+            stype_index = self.index[stype]
+            for kind, path, value in entries.get(stype, ()):
+                path = tuple(path)
+                node = stype_index.get(path)
+                if node is None:
+                    continue
+                ids = node[kind].get(value)
+                if ids is None:
+                    continue
+                ids.discard(minion_id)
+                if not ids:
+                    del node[kind][value]
+                    if not node[_KEY] and not node[_VALUE]:
+                        del stype_index[path]
+
+    def _apply(self, minion_id, entries):
+        self._discard(minion_id)
+        if entries is not None:
+            self._add(minion_id, entries)
+
+    def _load_snapshot(self, generation):
+        with salt.utils.files.fopen(self._snapshot_path(generation), 'rb') as fp_:
+            minions = self.serial.load(fp_)
+        self.minions = {}
+        self.index = dict((stype, {}) for stype in SEARCH_TYPES)
+        for minion_id, entries in six.iteritems(minions or {}):
+            self._add(minion_id, entries)
+        self.generation = generation
+        self.offset = 0
+
+    def _read_journal(self):
+        '''
+        Apply the journal records written since the last call
+        '''
+        with salt.utils.files.fopen(self._journal_path(self.generation), 'rb') as fp_:
+            fp_.seek(self.offset)
+            while True:
+                header = fp_.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    break
+                size = _RECORD_HEADER.unpack(header)[0]
+                payload = fp_.read(size)
+                if len(payload) < size:
+                    # Record is still being written
+                    break
+                record = self.serial.loads(payload)
+                self._apply(record['id'], record['entries'])
+                self.offset += _RECORD_HEADER.size + size
+
+    def available(self):
+        '''
+        Bring the in-memory index up to date with the shared index files and
+        return whether an index has been built at all
+        '''
+        for _ in range(3):
+            generation = self._current_generation()
+            if generation is None:
+                return False
+            try:
+                if generation != self.generation:
+                    self._load_snapshot(generation)
+                self._read_journal()
+                return True
+            except (IOError, OSError):
+                # The snapshot was compacted away between listing the
+                # directory and reading it, try the new generation.
+                self.generation = None
+                continue
+        return False
+
+    def _append(self, records):
+        '''
+        Append records to the journal of the current generation
+        '''
+        payload = b''.join(
+            _RECORD_HEADER.pack(len(data)) + data
+            for data in (self.serial.dumps(record) for record in records)
+        )
+        try:
+            with salt.utils.files.wait_lock(self.index_dir, self.lock_fn):
+                generation = self._current_generation()
+                if generation is None:
+                    # The index has not been built yet, the build will pick
+                    # up this data from the minion data cache.
+                    return
+                with salt.utils.files.fopen(self._journal_path(generation), 'ab') as fp_:
+                    fp_.write(payload)
+        except FileLockError as exc:
+            log.error('Unable to update the minion data index: %s', exc)
+
+    @staticmethod
+    def _entries(data):
+        entries = dict((stype, flatten(data.get(stype)))
+                       for stype in SEARCH_TYPES)
+        entries['time'] = time.time()
+        return entries
+
+    def update(self, minion_id, data):
+        '''
+        (Re-)index the cached ``data`` dict of a minion, or drop the minion
+        from the index if ``data`` is None
+        '''
+        if data is None:
+            entries = None
+        else:
+            entries = self._entries(data)
+        self._append([{'id': minion_id, 'entries': entries}])
+
+    def sync(self, cache, minion_ids):
+        '''
+        Index the minions in ``minion_ids`` which are present in the minion
+        data cache but not in the index yet. Return the set of minions in
+        ``minion_ids`` which have indexed data.
+        '''
+        records = []
+        new_ids = [minion_id for minion_id in minion_ids
+                   if minion_id not in self.minions]
+        cdata = cache.iter_many(('minions/{0}'.format(minion_id), 'data')
+                                for minion_id in new_ids)
+        for minion_id, (_, data) in zip(new_ids, cdata):
+            if data is None:
+                continue
+            entries = self._entries(data)
+            self._apply(minion_id, entries)
+            records.append({'id': minion_id, 'entries': entries})
+        if records:
+            self._append(records)
+        return set(minion_id for minion_id in minion_ids
+                   if minion_id in self.minions)
+
+    def _refresh_stale(self, cache):
+        '''
+        Index again the minions whose cached data was stored after they were
+        indexed, and drop those whose data is gone. Return whether any minion
+        changed.
+        '''
+        stale = []
+        for minion_id, entries in six.iteritems(self.minions):
+            try:
+                updated = cache.updated('minions/{0}'.format(minion_id), 'data') \
+                    if cache.contains('minions/{0}'.format(minion_id), 'data') \
+                    else None
+            except KeyError:
+                # The cache driver does not tell when the data was stored
+                return False
+            # The drivers report whole seconds, so data stored in the second
+            # the minion was indexed in counts as newer
+            if updated is None or updated >= int(entries.get('time', 0)):
+                stale.append(minion_id)
+        if not stale:
+            return False
+        cdata = cache.iter_many(('minions/{0}'.format(minion_id), 'data')
+                                for minion_id in stale)
+        for minion_id, (_, data) in zip(stale, cdata):
+            self._apply(minion_id, self._entries(data) if data else None)
+        return True
+
+    def build(self, cache):
+        '''
+        Build a fresh index from the minion data cache, or fold the journal
+        into a new snapshot generation if an index already exists
+        '''
+        self._ensure_dir()
+        with salt.utils.files.wait_lock(self.index_dir, self.lock_fn, timeout=60):
+            generation = self._current_generation()
+            if generation is None:
+                log.debug('Building the minion data index')
+                minions = {}
+                cdata = cache.list_with_data('minions', 'data')
+                for minion_id, data in six.iteritems(cdata):
+                    minions[minion_id] = self._entries(data)
+                new_generation = 0
+            else:
+                if generation != self.generation:
+                    self._load_snapshot(generation)
+                self._read_journal()
+                changed = self._refresh_stale(cache)
+                if not self.offset and not changed:
+                    # Nothing to compact
+                    return
+                cached = set(cache.list('minions'))
+                for minion_id in list(self.minions):
+                    if minion_id not in cached:
+                        self._discard(minion_id)
+                minions = self.minions
+                new_generation = generation + 1
+            with salt.utils.atomicfile.atomic_open(
+                    self._journal_path(new_generation), 'wb'):
+                pass
+            with salt.utils.atomicfile.atomic_open(
+                    self._snapshot_path(new_generation), 'wb') as fp_:
+                self.serial.dump(minions, fp_)
+            if generation is not None:
+                for path in (self._snapshot_path(generation),
+                             self._journal_path(generation)):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def match(self, search_type, expr, delimiter=DEFAULT_TARGET_DELIM,
+              regex_match=False, exact_match=False):
+        '''
+        Return the set of indexed minions whose ``search_type`` data matches
+        ``expr`` the way :py:func:`salt.utils.data.subdict_match` would.
+
+        Raises :py:exc:`Unindexable` for expressions which need the full data.
+        '''
+        def _match_values(values, pattern):
+            pattern = pattern.lower()
+            if regex_match:
+                try:
+                    rex = re.compile(pattern)
+                except re.error:
+                    log.error('Invalid regex \'%s\' in match', pattern)
+                    return set()
+                hits = [val for val in values if rex.match(val)]
+            elif exact_match or not any(char in pattern for char in '*?['):
+                return set(values.get(pattern, ()))
+            else:
+                hits = fnmatch.filter(values, pattern)
+            ret = set()
+            for val in hits:
+                ret.update(values[val])
+            return ret
+
+        def _node_match(path, node, pattern):
+            if pattern.startswith('*:'):
+                raise Unindexable(pattern)
+            ret = set()
+            keys = node[_KEY]
+            if keys:
+                if pattern == '*':
+                    for ids in six.itervalues(keys):
+                        ret.update(ids)
+                elif pattern in keys:
+                    ret.update(keys[pattern])
+                ret.update(_subdict_match(path, pattern, DEFAULT_TARGET_DELIM))
+            ret.update(_match_values(node[_VALUE], pattern))
+            return ret
+
+        def _subdict_match(base, pattern, delim):
+            ret = set()
+            splits = pattern.split(delim)
+            for idx in range(1, len(splits)):
+                path = base + tuple(splits[:idx])
+                node = self.index[search_type].get(path)
+                if node is None:
+                    continue
+                ret.update(_node_match(path, node, delim.join(splits[idx:])))
+            return ret
+
+        return _subdict_match((), expr, delimiter)
@@ -16,6 +16,7 @@ import salt.payload
 import salt.roster
 import salt.utils.data
 import salt.utils.files
+import salt.utils.minion_index
 import salt.utils.network
 import salt.utils.stringutils
 import salt.utils.versions
@@ -24,6 +25,7 @@ from salt.exceptions import CommandExecutionError, SaltCacheError
 import salt.auth.ldap
 import salt.cache
 from salt.ext import six
+from salt.ext.six.moves import zip  # pylint: disable=import-error,redefined-builtin
 
 # Import 3rd-party libs
 if six.PY3:
@@ -195,6 +197,10 @@ class CkMinions(object):
         self.opts = opts
         self.serial = salt.payload.Serial(opts)
         self.cache = salt.cache.factory(opts)
+        if self.opts.get('minion_data_index', False):
+            self.index = salt.utils.minion_index.MinionIndex(opts)
+        else:
+            self.index = None
         # TODO: this is actually an *auth* check
         if self.opts.get('transport', 'zeromq') in ('zeromq', 'tcp'):
             self.acc = 'minions'
@@ -298,11 +304,29 @@ class CkMinions(object):
             if not cminions:
                 return {'minions': minions,
                         'missing': []}
+            if self.index is not None:
+                matched = self._check_index_minions(cminions,
+                                                    expr,
+                                                    delimiter,
+                                                    search_type,
+                                                    regex_match=regex_match,
+                                                    exact_match=exact_match)
+                if matched is not None:
+                    indexed, matched = matched
+                    if greedy:
+                        # Keep the accepted minions which have no cached data
+                        minions = [x for x in minions
+                                   if x in matched or x not in indexed]
+                    else:
+                        minions = [x for x in minions if x in matched]
+                    return {'minions': minions,
+                            'missing': []}
             minions = set(minions)
-            for id_ in cminions:
-                if greedy and id_ not in minions:
-                    continue
-                mdata = self.cache.fetch('minions/{0}'.format(id_), 'data')
+            if greedy:
+                cminions = [x for x in cminions if x in minions]
+            cdata = self.cache.iter_many(
+                ('minions/{0}'.format(id_), 'data') for id_ in cminions)
+            for id_, (_, mdata) in zip(cminions, cdata):
                 if mdata is None:
                     if not greedy:
                         minions.remove(id_)
@@ -318,6 +342,38 @@ class CkMinions(object):
         return {'minions': minions,
                 'missing': []}
 
+    def _check_index_minions(self,
+                             cminions,
+                             expr,
+                             delimiter,
+                             search_type,
+                             regex_match=False,
+                             exact_match=False):
+        '''
+        Match the cached minions in ``cminions`` against the minion data
+        index. Return a tuple of the set of minions which have indexed data
+        and the set of those which matched, or None if the index cannot
+        answer the expression and the cached data has to be searched.
+        '''
+        try:
+            if not self.index.available():
+                return None
+            indexed = self.index.sync(self.cache, cminions)
+            matched = self.index.match(search_type,
+                                       expr,
+                                       delimiter=delimiter,
+                                       regex_match=regex_match,
+                                       exact_match=exact_match)
+        except salt.utils.minion_index.Unindexable:
+            return None
+        except Exception as exc:
+            log.error(
+                'Failed to search the minion data index, falling back to '
+                'the minion data cache: %s', exc
+            )
+            return None
+        return indexed, matched & indexed
+
     def _check_grain_minions(self, expr, delimiter, greedy):
         '''
         Return the minions found by looking via grains
@@ -1135,8 +1191,9 @@ def mine_get(tgt, fun, tgt_type='glob', opts=None):
             tgt_type)
     minions = _res['minions']
     cache = salt.cache.factory(opts)
-    for minion in minions:
-        mdata = cache.fetch('minions/{0}'.format(minion), 'mine')
+    cdata = cache.iter_many(
+        ('minions/{0}'.format(minion), 'mine') for minion in minions)
+    for minion, (_, mdata) in zip(minions, cdata):
         if mdata is None:
             continue
         fdata = mdata.get(fun)
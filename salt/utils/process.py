@@ -344,6 +344,72 @@ class ThreadPool(object):
                 log.debug(err, exc_info=True)
 
 
+def run_in_threads(calls, workers, timeout=0, name='thread',
+                   on_timeout=None, on_late=None):
+    '''
+    Call the functions of ``calls``, a list of ``(key, func)`` pairs, in
+    daemon threads, at most ``workers`` at a time, and return a dict mapping
+    each key to a ``(return, exc_info, seconds)`` tuple, where ``exc_info``
+    is None unless the function raised an exception.
+
+    A call which runs for longer than ``timeout`` seconds no longer counts
+    against the limit and is left out of the returned dict. Its thread is
+    left behind, ``on_timeout(key, seconds)`` is called when it is given up
+    on, and ``on_late(key, return, exc_info)`` when it returns after that.
+    '''
+    finished = queue.Queue()
+    lock = threading.Lock()
+    given_up = set()
+
+    def _target(key, func):
+        try:
+            ret = (func(), None)
+        except Exception:
+            ret = (None, sys.exc_info())
+        with lock:
+            if key in given_up:
+                if on_late is not None:
+                    on_late(key, *ret)
+                return
+        finished.put((key, ret))
+
+    results = {}
+    pending = list(calls)
+    pending.reverse()
+    running = {}  # key -> start time
+    while pending or running:
+        while pending and len(running) < workers:
+            key, func = pending.pop()
+            thread = threading.Thread(target=_target, args=(key, func),
+                                      name='{0}-{1}'.format(name, key))
+            thread.daemon = True
+            running[key] = time.time()
+            thread.start()
+        wait = None
+        if timeout:
+            wait = max(min(running.values()) + timeout - time.time(), 0)
+        try:
+            key, ret = finished.get(timeout=wait)
+        except queue.Empty:
+            now = time.time()
+            with lock:
+                for key, start in list(running.items()):
+                    if now - start < timeout:
+                        continue
+                    given_up.add(key)
+                    del running[key]
+                    if on_timeout is not None:
+                        on_timeout(key, round(now - start, 3))
+            continue
+        if key not in running:
+            # It returned just before it was given up on
+            if on_late is not None:
+                on_late(key, *ret)
+            continue
+        results[key] = ret + (round(time.time() - running.pop(key), 3),)
+    return results
+
+
 class ProcessManager(object):
     '''
     A class which will manage processes that should be running
@@ -6,19 +6,24 @@ Functions which implement running reactor jobs
 
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import copy
 import fnmatch
 import glob
 import logging
+import os
+import re
 
 # Import salt libs
 import salt.client
 import salt.runner
 import salt.state
+import salt.template
 import salt.utils.args
 import salt.utils.cache
 import salt.utils.data
 import salt.utils.event
 import salt.utils.files
+import salt.utils.platform
 import salt.utils.process
 import salt.utils.yaml
 import salt.wheel
@@ -29,6 +34,14 @@ from salt.ext import six
 
 log = logging.getLogger(__name__)
 
+# Characters which make a reactor tag a glob rather than a literal tag
+GLOB_CHARS = re.compile(r'[*?[]')
+
+# Renderers which return a reaction file unchanged if it contains no
+# template markup
+STATIC_RENDERERS = frozenset(['jinja', 'yaml'])
+TEMPLATE_MARKUP = re.compile(r'\{[{%#]')
+
 REACTOR_INTERNAL_KEYWORDS = frozenset([
     '__id__',
     '__sls__',
@@ -56,6 +69,13 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
         local_minion_opts['file_client'] = 'local'
         self.minion = salt.minion.MasterMinion(local_minion_opts)
         salt.state.Compiler.__init__(self, opts, self.minion.rend)
+        # The compiled reactor map and the map file stamp it was compiled from
+        self._react_map_stamp = None
+        self._react_literal = {}
+        self._react_globs = {}
+        self._react_prefix_lens = []
+        # Rendered reaction files which do not depend on the event, by path
+        self._render_cache = {}
 
     # We need __setstate__ and __getstate__ to avoid pickling errors since
     # 'self.rend' (from salt.state.Compiler) contains a function reference
@@ -77,6 +97,35 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
             'log_queue_level': self.log_queue_level
         }
 
+    def _static_reaction(self, fn_):
+        '''
+        Return the cached rendering of a reaction file whose rendering does
+        not depend on the event, or None. Such files are rendered once and
+        again only after they changed.
+        '''
+        try:
+            stat = os.stat(fn_)
+        except OSError:
+            return None
+        stamp = (stat.st_mtime, stat.st_size)
+        cached = self._render_cache.get(fn_)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        res = None
+        renderer = self.opts['renderer']
+        renderer = salt.template.OLD_STYLE_RENDERERS.get(renderer, renderer)
+        if set(part.strip() for part in renderer.split('|')) <= STATIC_RENDERERS:
+            with salt.utils.files.fopen(fn_, 'r') as fp_:
+                content = fp_.read()
+            if not content.startswith('#!') and not TEMPLATE_MARKUP.search(content):
+                res = self.render_template(fn_)
+                if not isinstance(res, dict):
+                    res = None
+        # Files which need the event to be rendered are cached as None, so
+        # they are only checked again after they changed
+        self._render_cache[fn_] = (stamp, res)
+        return res
+
     def render_reaction(self, glob_ref, tag, data):
         '''
         Execute the render system against a single reaction file and return
@@ -91,10 +140,16 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
             log.error('Can not render SLS %s for tag %s. File missing or not found.', glob_ref, tag)
         for fn_ in globbed_ref:
             try:
-                res = self.render_template(
-                    fn_,
-                    tag=tag,
-                    data=data)
+                res = self._static_reaction(fn_)
+                if res is not None:
+                    # The cached rendering is modified when compiling the
+                    # reaction
+                    res = copy.deepcopy(res)
+                else:
+                    res = self.render_template(
+                        fn_,
+                        tag=tag,
+                        data=data)
 
                 # for #20841, inject the sls name here since verify_high()
                 # assumes it exists in case there are any errors
@@ -106,14 +161,48 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
                 log.exception('Failed to render "%s": ', fn_)
         return react
 
-    def list_reactors(self, tag):
+    def _compile_reactor_map(self, react_map):
         '''
-        Take in the tag from an event and return a list of the reactors to
-        process
+        Index the reactor map by tag. Literal tags are looked up directly,
+        globs are grouped by the literal prefix before their first wildcard
+        so only the globs which can match a tag are tried.
+        '''
+        self._react_literal = {}
+        self._react_globs = {}
+        for idx, ropt in enumerate(react_map or []):
+            if not isinstance(ropt, dict):
+                continue
+            if len(ropt) != 1:
+                continue
+            key = next(six.iterkeys(ropt))
+            val = ropt[key]
+            if isinstance(val, six.string_types):
+                val = [val]
+            elif not isinstance(val, list):
+                continue
+            key = os.path.normcase(six.text_type(key))
+            wildcard = GLOB_CHARS.search(key)
+            if wildcard is None:
+                self._react_literal.setdefault(key, []).append((idx, val))
+            else:
+                self._react_globs.setdefault(key[:wildcard.start()], []).append(
+                    (idx, re.compile(fnmatch.translate(key)), val))
+        self._react_prefix_lens = sorted(set(len(prefix) for prefix in self._react_globs))
+
+    def _refresh_reactor_map(self):
+        '''
+        Compile the reactor map if it has not been compiled yet or the
+        reactor map file changed
         '''
-        log.debug('Gathering reactors for tag %s', tag)
-        reactors = []
         if isinstance(self.opts['reactor'], six.string_types):
+            try:
+                stat = os.stat(self.opts['reactor'])
+                stamp = (self.opts['reactor'], stat.st_mtime, stat.st_size)
+            except OSError:
+                stamp = (self.opts['reactor'], None, None)
+            if stamp == self._react_map_stamp:
+                return
+            react_map = []
             try:
                 with salt.utils.files.fopen(self.opts['reactor']) as fp_:
                     react_map = salt.utils.yaml.safe_load(fp_)
@@ -122,19 +211,53 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
             except Exception:
                 log.error('Failed to parse YAML in reactor map: "%s"', self.opts['reactor'])
         else:
+            # The reactor map in the config only changes through the reactor
+            # management events, which reset the stamp
+            stamp = 'opts'
+            if stamp == self._react_map_stamp:
+                return
             react_map = self.opts['reactor']
-        for ropt in react_map:
-            if not isinstance(ropt, dict):
-                continue
-            if len(ropt) != 1:
-                continue
-            key = next(six.iterkeys(ropt))
-            val = ropt[key]
-            if fnmatch.fnmatch(tag, key):
-                if isinstance(val, six.string_types):
-                    reactors.append(val)
-                elif isinstance(val, list):
-                    reactors.extend(val)
+        log.debug('Compiling the reactor map')
+        self._compile_reactor_map(react_map)
+        self._react_map_stamp = stamp
+        self._subscribe_reactor_tags()
+
+    def _subscribe_reactor_tags(self):
+        '''
+        Have the event publisher only send the events to the reactor which
+        the reactor map or the reactor management can match
+        '''
+        event = getattr(self, 'event', None)
+        if event is None:
+            return
+        prefixes = set(self._react_literal)
+        prefixes.update(self._react_globs)
+        prefixes.add('salt/reactors/manage/')
+        if '' in prefixes or salt.utils.platform.is_windows():
+            # Tags are matched case-insensitively on windows
+            prefixes = None
+        event.subscribe_prefixes(prefixes)
+
+    def list_reactors(self, tag):
+        '''
+        Take in the tag from an event and return a list of the reactors to
+        process
+        '''
+        log.debug('Gathering reactors for tag %s', tag)
+        self._refresh_reactor_map()
+        ntag = os.path.normcase(tag)
+        matches = list(self._react_literal.get(ntag, []))
+        for length in self._react_prefix_lens:
+            if length > len(ntag):
+                break
+            for idx, regex, val in self._react_globs.get(ntag[:length], ()):
+                if regex.match(ntag):
+                    matches.append((idx, val))
+        # Keep the order of the reactor map
+        matches.sort(key=lambda match: match[0])
+        reactors = []
+        for _, val in matches:
+            reactors.extend(val)
         return reactors
 
     def list_all(self):
@@ -241,20 +364,32 @@ class Reactor(salt.utils.process.SignalHandlingMultiprocessingProcess, salt.stat
                 opts=self.opts,
                 listen=True)
         self.wrap = ReactWrap(self.opts)
-
-        for data in self.event.iter_events(full=True):
+        self._refresh_reactor_map()
+
+        while True:
+            data = self.event.get_event(full=True)
+            if data is None:
+                # The reactor does not receive the events of tags which are
+                # not in the reactor map, pick up changes of the map file
+                # while no events arrive.
+                self._refresh_reactor_map()
+                continue
             # skip all events fired by ourselves
             if data['data'].get('user') == self.wrap.event_user:
                 continue
             if data['tag'].endswith('salt/reactors/manage/add'):
                 _data = data['data']
                 res = self.add_reactor(_data['event'], _data['reactors'])
+                self._react_map_stamp = None
+                self._refresh_reactor_map()
                 self.event.fire_event({'reactors': self.list_all(),
                                        'result': res},
                                       'salt/reactors/manage/add-complete')
             elif data['tag'].endswith('salt/reactors/manage/delete'):
                 _data = data['data']
                 res = self.delete_reactor(_data['event'])
+                self._react_map_stamp = None
+                self._refresh_reactor_map()
                 self.event.fire_event({'reactors': self.list_all(),
                                        'result': res},
                                       'salt/reactors/manage/delete-complete')
@@ -0,0 +1,506 @@
+# -*- coding: utf-8 -*-
+'''
+Cache of rendered pillar SLS files, shared between minions
+
+When :conf_master:`pillar_render_cache` is enabled, the pillar hands the
+renderers the grains, pillar and opts of the minion wrapped in
+:class:`TrackedDict` objects, which remember the keys that a render reads.
+The templates which the render imports are remembered as well. The rendered
+SLS file is cached along with what it read, and every following render of
+the same file, for any minion which has the same values for those keys, is
+served from the cache, as long as neither the file nor the templates it
+imported changed.
+
+A render is only cached when its result follows from what it read, so it is
+not cached if it
+
+- uses a renderer other than the ones in ``CACHEABLE_RENDERERS``,
+- calls an execution function which is not in
+  :conf_master:`pillar_render_cache_functions`,
+- uses a jinja filter or global in ``UNCACHEABLE_JINJA``, whose result is
+  different on every call,
+- changes the grains, pillar or opts it was given.
+
+The cache lives in the memory of the process, so it is shared by the minions
+whose pillar is compiled by the same master worker.
+
+The cache is only used on Python 3. On Python 2, ``dict(grains)``,
+``{}.update(grains)`` and ``**grains`` copy a dict subclass without calling
+its methods, so such reads could not be recorded.
+'''
+
+# Import python libs
+from __future__ import absolute_import, print_function, unicode_literals
+import collections
+import contextlib
+import copy
+import functools
+import hashlib
+import json
+import logging
+import threading
+
+# Import salt libs
+import salt.utils.hashutils
+import salt.utils.stringutils
+from salt.ext import six
+
+log = logging.getLogger(__name__)
+
+# The renderers which only see what the pillar hands them
+CACHEABLE_RENDERERS = ('jinja', 'yaml', 'yamlex', 'json')
+
+# The jinja filters and globals whose result is different on every call
+UNCACHEABLE_JINJA = ('random', 'random_str', 'random_hash', 'rand_str',
+                     'uuid', 'strftime', 'date_format', 'lipsum')
+
+# The render being recorded in this thread
+_LOCAL = threading.local()
+
+# Stands for the whole of a TrackedDict in the keys that were read
+_ALL = ('__all__',)
+# Stands for a key or file which does not exist
+_MISSING = '__missing__'
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def _recording():
+    return getattr(_LOCAL, 'recording', None)
+
+
+@contextlib.contextmanager
+def untracked():
+    '''
+    Do not record what is read within this block, for reads which do not
+    end up in the rendered data, like the configuration of a file client
+    '''
+    recording = _recording()
+    _LOCAL.recording = None
+    try:
+        yield
+    finally:
+        _LOCAL.recording = recording
+
+
+def read_file(path):
+    '''
+    Record that the render read the template at ``path``
+    '''
+    recording = _recording()
+    if recording is not None:
+        recording.files.add(path)
+
+
+def _uncacheable_call(func, name):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        recording = _recording()
+        if recording is not None:
+            recording.uncacheable = 'the render used {0}'.format(name)
+        return func(*args, **kwargs)
+    return wrapper
+
+
+def guard_jinja(env):
+    '''
+    Make a render which uses one of the ``UNCACHEABLE_JINJA`` filters or
+    globals of the jinja environment ``env`` uncacheable
+    '''
+    if _recording() is None:
+        return
+    for funcs in (env.filters, env.globals):
+        for name in UNCACHEABLE_JINJA:
+            if name in funcs:
+                funcs[name] = _uncacheable_call(funcs[name], name)
+
+
+class TrackedDict(dict):
+    '''
+    A copy of a dict which tells its :class:`Tracker` which keys are read
+    while a render is recorded
+    '''
+    def __init__(self, data, name, tracker):
+        super(TrackedDict, self).__init__(data)
+        # Not plain names, so that they do not shadow the keys which
+        # templates look up as attributes
+        self._tracked_name = name
+        self._tracked_by = tracker
+
+    def _read(self, key):
+        recording = _recording()
+        if recording is not None:
+            recording.read(self, key)
+
+    def _write(self):
+        recording = _recording()
+        if recording is not None:
+            recording.uncacheable = 'the render changed the {0}'.format(
+                self._tracked_name)
+
+    def __getitem__(self, key):
+        self._read(key)
+        return super(TrackedDict, self).__getitem__(key)
+
+    def get(self, key, default=None):
+        self._read(key)
+        return super(TrackedDict, self).get(key, default)
+
+    def __contains__(self, key):
+        self._read(key)
+        return super(TrackedDict, self).__contains__(key)
+
+    if six.PY2:
+        def has_key(self, key):
+            return key in self
+
+    def __iter__(self):
+        self._read(_ALL)
+        return super(TrackedDict, self).__iter__()
+
+    def __len__(self):
+        self._read(_ALL)
+        return super(TrackedDict, self).__len__()
+
+    def __repr__(self):
+        self._read(_ALL)
+        return super(TrackedDict, self).__repr__()
+
+    def __eq__(self, other):
+        self._read(_ALL)
+        return super(TrackedDict, self).__eq__(other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def keys(self):
+        self._read(_ALL)
+        return super(TrackedDict, self).keys()
+
+    def values(self):
+        self._read(_ALL)
+        return super(TrackedDict, self).values()
+
+    def items(self):
+        self._read(_ALL)
+        return super(TrackedDict, self).items()
+
+    if six.PY2:
+        def iterkeys(self):
+            self._read(_ALL)
+            return super(TrackedDict, self).iterkeys()
+
+        def itervalues(self):
+            self._read(_ALL)
+            return super(TrackedDict, self).itervalues()
+
+        def iteritems(self):
+            self._read(_ALL)
+            return super(TrackedDict, self).iteritems()
+
+    def copy(self):
+        self._read(_ALL)
+        return dict(super(TrackedDict, self).items())
+
+    def __copy__(self):
+        return self.copy()
+
+    def __deepcopy__(self, memo):
+        return copy.deepcopy(self.copy(), memo)
+
+    def __reduce__(self):
+        # Pickle a plain dict, the tracker stays in this process
+        return (dict, (self.copy(),))
+
+    def __setitem__(self, key, val):
+        self._write()
+        super(TrackedDict, self).__setitem__(key, val)
+
+    def __delitem__(self, key):
+        self._write()
+        super(TrackedDict, self).__delitem__(key)
+
+    def update(self, *args, **kwargs):
+        self._write()
+        super(TrackedDict, self).update(*args, **kwargs)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self._write()
+        return super(TrackedDict, self).setdefault(key, default)
+
+    def pop(self, key, *args):
+        self._write()
+        return super(TrackedDict, self).pop(key, *args)
+
+    def popitem(self):
+        self._write()
+        return super(TrackedDict, self).popitem()
+
+    def clear(self):
+        self._write()
+        super(TrackedDict, self).clear()
+
+
+class _TrackedModule(object):
+    '''
+    Allows the ``salt.module.function`` syntax of the templates
+    '''
+    def __init__(self, functions, mod_name):
+        self._functions = functions
+        self._mod_name = mod_name
+
+    def __getattr__(self, fun_name):
+        try:
+            return self._functions['{0}.{1}'.format(self._mod_name, fun_name)]
+        except KeyError:
+            raise AttributeError(fun_name)
+
+
+class TrackedFunctions(collections.Mapping):
+    '''
+    The execution functions, which make a render uncacheable when it uses
+    one which is not known to only depend on what is tracked
+    '''
+    def __init__(self, functions, pure):
+        self._functions = functions
+        self._pure = pure
+
+    def __getitem__(self, key):
+        recording = _recording()
+        if recording is not None and key not in self._pure:
+            recording.uncacheable = 'the render used {0}'.format(key)
+        return self._functions[key]
+
+    def __getattr__(self, mod_name):
+        if mod_name.startswith('_'):
+            raise AttributeError(mod_name)
+        return _TrackedModule(self, mod_name)
+
+    def __contains__(self, key):
+        return key in self._functions
+
+    def __iter__(self):
+        return iter(self._functions)
+
+    def __len__(self):
+        return len(self._functions)
+
+
+class Recording(object):
+    '''
+    What one render read
+    '''
+    def __init__(self, tracker):
+        self.tracker = tracker
+        self.reads = set()
+        self.files = set()
+        self.uncacheable = None
+
+    def read(self, tracked, key):
+        if tracked._tracked_by is not self.tracker:  # pylint: disable=protected-access
+            self.uncacheable = 'the render read the data of another minion'
+            return
+        try:
+            self.reads.add((tracked._tracked_name, key))  # pylint: disable=protected-access
+        except TypeError:
+            self.uncacheable = 'the render read an unhashable key'
+
+    def variant(self):
+        '''
+        Return what was read, in a stable order
+        '''
+        return (tuple(sorted(self.reads, key=repr)), tuple(sorted(self.files)))
+
+
+def _digest(value):
+    try:
+        data = json.dumps(value, sort_keys=True, default=repr)
+    except (TypeError, ValueError):
+        data = repr(value)
+    return hashlib.sha1(salt.utils.stringutils.to_bytes(data)).hexdigest()
+
+
+class Tracker(object):
+    '''
+    Hands out the tracked grains, pillar and opts of one minion, and looks
+    up and stores its renders in the cache of the process
+    '''
+    def __init__(self, opts, pure_functions=()):
+        self.cache = get_cache(opts)
+        self.pure_functions = set(pure_functions)
+        self.sources = {}
+
+    def track(self, name, data):
+        '''
+        Return a tracked copy of ``data``. The copies which were tracked
+        before under the same name are still tracked, under a numbered name.
+        '''
+        if name in self.sources:
+            name = '{0}.{1}'.format(name, len(self.sources))
+        self.sources[name] = TrackedDict(data or {}, name, self)
+        return self.sources[name]
+
+    def functions(self, functions):
+        '''
+        Return the tracked execution functions
+        '''
+        return TrackedFunctions(functions, self.pure_functions)
+
+    def _inputs(self, variant):
+        '''
+        Return the digest of the current values of what a render read, or
+        None if they can not be told
+        '''
+        reads, files = variant
+        values = []
+        for name, key in reads:
+            source = self.sources.get(name)
+            if source is None:
+                return None
+            if key == _ALL:
+                value = dict.copy(source)
+            else:
+                value = dict.get(source, key, _MISSING)
+            values.append(_digest(value))
+        for path in files:
+            try:
+                values.append(salt.utils.hashutils.get_hash(path, 'sha256'))
+            except (IOError, OSError):
+                values.append(_MISSING)
+        return _digest(values)
+
+    @contextlib.contextmanager
+    def record(self):
+        '''
+        Record what a render reads
+        '''
+        recording = Recording(self)
+        previous = _recording()
+        _LOCAL.recording = recording
+        try:
+            yield recording
+        finally:
+            _LOCAL.recording = previous
+
+    def render(self, path, saltenv, sls, render_pipe, defaults, render):
+        '''
+        Return the render of the SLS file at ``path`` from the cache, or call
+        ``render`` and cache what it returns
+
+        render_pipe
+            The renderers and their arguments, as returned by
+            :py:func:`salt.template.template_shebang`
+        '''
+        renderers = [(func.__module__.rsplit('.', 1)[-1], argline)
+                     for func, argline in render_pipe or ()]
+        if not renderers or \
+                any(name not in CACHEABLE_RENDERERS for name, _ in renderers):
+            self.cache.count('uncacheable')
+            return render()
+        with untracked():
+            base = (path,
+                    sls,
+                    saltenv,
+                    salt.utils.hashutils.get_hash(path, 'sha256'),
+                    _digest(renderers),
+                    _digest(defaults))
+            data = self.cache.get(base, self._inputs)
+        if data is not None:
+            return data
+        with self.record() as recording:
+            data = render()
+        with untracked():
+            if recording.uncacheable:
+                log.debug('Not caching the render of SLS \'%s\', because %s',
+                          sls, recording.uncacheable)
+                self.cache.count('uncacheable')
+            elif data is not None:
+                variant = recording.variant()
+                inputs = self._inputs(variant)
+                if inputs is not None:
+                    self.cache.put(base, variant, inputs, data)
+        return data
+
+
+class RenderCache(object):
+    '''
+    The renders of a process, at most ``max_size`` of them, keyed by the
+    file and the values of what they read
+    '''
+    # The number of sets of read keys remembered per file
+    MAX_VARIANTS = 16
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self.variants = {}
+        self.entries = collections.OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'uncacheable': 0}
+        self._lock = threading.Lock()
+
+    def count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, base, inputs):
+        with self._lock:
+            variants = list(self.variants.get(base, ()))
+        for variant in variants:
+            digest = inputs(variant)
+            if digest is None:
+                continue
+            with self._lock:
+                data = self.entries.pop((base, digest), None)
+                if data is not None:
+                    self.entries[(base, digest)] = data
+                    self.stats['hits'] += 1
+            if data is not None:
+                log.debug('Pillar render cache hit for %s', base[1])
+                return copy.deepcopy(data)
+        self.count('misses')
+        return None
+
+    def put(self, base, variant, digest, data):
+        with self._lock:
+            variants = self.variants.setdefault(base, [])
+            if variant not in variants:
+                variants.append(variant)
+                del variants[:-self.MAX_VARIANTS]
+            self.entries.pop((base, digest), None)
+            self.entries[(base, digest)] = copy.deepcopy(data)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def pop_stats(self):
+        '''
+        Return and reset the number of hits, misses and uncacheable renders
+        '''
+        with self._lock:
+            stats = self.stats
+            self.stats = {'hits': 0, 'misses': 0, 'uncacheable': 0}
+        return stats
+
+
+def get_cache(opts):
+    '''
+    Return the render cache of this process
+    '''
+    global _CACHE  # pylint: disable=global-statement
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = RenderCache(opts.get('pillar_render_cache_size', 1024))
+        return _CACHE
+
+
+def pop_stats():
+    '''
+    Return and reset the stats of the render cache of this process, or None
+    if it was not used
+    '''
+    if _CACHE is None:
+        return None
+    return _CACHE.pop_stats()
+
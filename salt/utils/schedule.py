@@ -22,6 +22,7 @@ import itertools
 import threading
 import logging
 import errno
+import heapq
 import random
 import weakref
 
@@ -68,6 +69,9 @@ except ImportError:
 
 log = logging.getLogger(__name__)
 
+# The items of a schedule which are settings for all of its jobs
+SCHEDULE_SETTINGS = ('enabled', 'skip_function', 'skip_during_range', 'splay')
+
 
 class Schedule(object):
     '''
@@ -148,6 +152,14 @@ class Schedule(object):
         self.schedule_returner = self.option('schedule_returner')
         # Keep track of the lowest loop interval needed in this variable
         self.loop_interval = six.MAXSIZE
+        # The jobs by the time eval() has to evaluate them next, as a heap of
+        # (time, name), and the time of every job which was evaluated. A job
+        # which is not in _due is evaluated by the next call to eval().
+        self._queue = []
+        self._due = {}
+        # What the queue was built from, see _queue_key()
+        self._queue_state = None
+        self._last_eval = None
         if not self.standalone:
             clean_proc_dir(opts)
         if cleanup:
@@ -192,6 +204,140 @@ class Schedule(object):
                         del schedule[job][item]
         return schedule
 
+    def _queue_key(self, schedule):
+        '''
+        Return what the jobs are evaluated from, the queue has to be rebuilt
+        when it changes
+        '''
+        pillar = self.opts.get('pillar')
+        return (self.opts.get('schedule'),
+                pillar,
+                pillar.get('schedule') if isinstance(pillar, dict) else None,
+                self.opts.get('grains'),
+                self.opts.get('loop_interval'),
+                tuple(schedule.get(item) for item in SCHEDULE_SETTINGS))
+
+    def _queue_outdated(self, key):
+        '''
+        Check whether the queue was built from something else than ``key``
+        '''
+        if self._queue_state is None:
+            return True
+        # The schedules, pillar and grains are replaced rather than changed,
+        # so they are compared by identity
+        return any(new is not old for new, old in
+                   zip(key[:4], self._queue_state[:4])) \
+            or key[4:] != self._queue_state[4:]
+
+    def _requeue(self, name=None):
+        '''
+        Have the next call to eval() evaluate the named job, or every job
+        '''
+        if name is None:
+            self._queue = []
+            self._due = {}
+            self._queue_state = None
+        else:
+            self._due.pop(name, None)
+
+    def _pop_due(self, schedule, now):
+        '''
+        Return the names of the jobs of ``schedule`` which eval() has to
+        evaluate at ``now``: the new and changed ones, and the ones whose
+        time has come
+        '''
+        key = self._queue_key(schedule)
+        if self._queue_outdated(key) or \
+                (self._last_eval is not None and now < self._last_eval):
+            self._requeue()
+        self._queue_state = key
+        self._last_eval = now
+
+        due = set()
+        for job in schedule:
+            if job in SCHEDULE_SETTINGS:
+                self._due[job] = None
+            elif job not in self._due:
+                due.add(job)
+        while self._queue and self._queue[0][0] <= now:
+            when, job = heapq.heappop(self._queue)
+            # Jobs which were queued again have stale entries left behind
+            if self._due.get(job) == when:
+                del self._due[job]
+                due.add(job)
+        return due
+
+    @staticmethod
+    def _next_eval(data, now, loop_interval):
+        '''
+        Return when a job which was just evaluated has to be evaluated next,
+        or None if it does not until it is changed
+        '''
+        if not isinstance(data, dict) or data.get('_error'):
+            return None
+        due = []
+        if data.get('_run_on_start'):
+            due.append(now)
+        if 'run_explicit' in data:
+            for run_time in data['run_explicit']:
+                if not isinstance(run_time, datetime.datetime):
+                    try:
+                        run_time = datetime.datetime.strptime(
+                            run_time['time'], run_time['time_fmt'])
+                    except (KeyError, TypeError, ValueError):
+                        run_time = now + loop_interval
+                if run_time > now:
+                    due.append(run_time)
+        if '_seconds' in data:
+            due.append(data['_splay'] or data['_next_fire_time'])
+        elif 'once' in data:
+            if data['_next_fire_time'] and data['_next_fire_time'] > now:
+                due.append(data['_next_fire_time'])
+        elif 'when' in data:
+            # Which of the times comes next is only decided once the earlier
+            # ones are more than loop_interval in the past
+            if data.get('_run') and data['_next_fire_time'] \
+                    and data['_next_fire_time'] > now:
+                due.append(data['_next_fire_time'])
+            else:
+                due.append(now + loop_interval)
+        elif 'cron' in data:
+            due.append(data['_splay'] or data['_next_fire_time'] or now)
+        due = [when for when in due if when is not None]
+        return min(due) if due else None
+
+    def _queue_job(self, name, data, now, loop_interval):
+        '''
+        Queue a job which was just evaluated for its next evaluation
+        '''
+        due = self._next_eval(data, now, loop_interval)
+        if due is not None and due <= now:
+            due = now + datetime.timedelta(seconds=1)
+        self._due[name] = due
+        if due is not None:
+            heapq.heappush(self._queue, (due, name))
+
+    def time_to_next_eval(self, now=None):
+        '''
+        Return the number of seconds until eval() has a job to evaluate, 0 if
+        the schedule changed since it last ran, or None if no job is due
+        '''
+        if now is None:
+            now = datetime.datetime.now()
+        try:
+            schedule = self._get_schedule()
+        except ValueError:
+            return None
+        if self._queue_outdated(self._queue_key(schedule)) or \
+                any(job not in self._due for job in schedule):
+            return 0
+        while self._queue and \
+                self._due.get(self._queue[0][1]) != self._queue[0][0]:
+            heapq.heappop(self._queue)
+        if not self._queue:
+            return None
+        return max((self._queue[0][0] - now).total_seconds(), 0)
+
     def _check_max_running(self, func, data, opts, now):
         '''
         Return the schedule data structure
@@ -289,6 +435,7 @@ class Schedule(object):
         # remove from self.intervals
         if name in self.intervals:
             del self.intervals[name]
+        self._requeue(name)
 
         if persist:
             self.persist()
@@ -302,6 +449,7 @@ class Schedule(object):
         self.enabled = True
         self.splay = None
         self.opts['schedule'] = {}
+        self._requeue()
 
     def delete_job_prefix(self, name, persist=True):
         '''
@@ -325,6 +473,9 @@ class Schedule(object):
         for job in list(self.intervals.keys()):
             if job.startswith(name):
                 del self.intervals[job]
+        for job in list(self._due):
+            if job.startswith(name):
+                self._requeue(job)
 
         if persist:
             self.persist()
@@ -361,6 +512,7 @@ class Schedule(object):
         else:
             log.info('Added new job %s to scheduler', new_job)
             self.opts['schedule'].update(data)
+        self._requeue(new_job)
 
         # Fire the complete event back along with updated list of schedule
         evt = salt.utils.event.get_event('minion', opts=self.opts, listen=False)
@@ -378,6 +530,7 @@ class Schedule(object):
         # ensure job exists, then enable it
         if name in self.opts['schedule']:
             self.opts['schedule'][name]['enabled'] = True
+            self._requeue(name)
             log.info('Enabling job %s in scheduler', name)
         elif name in self._get_schedule(include_opts=False):
             log.warning("Cannot modify job %s, it's in the pillar!", name)
@@ -398,6 +551,7 @@ class Schedule(object):
         # ensure job exists, then disable it
         if name in self.opts['schedule']:
             self.opts['schedule'][name]['enabled'] = False
+            self._requeue(name)
             log.info('Disabling job %s in scheduler', name)
         elif name in self._get_schedule(include_opts=False):
             log.warning("Cannot modify job %s, it's in the pillar!", name)
@@ -423,6 +577,7 @@ class Schedule(object):
             return
 
         self.opts['schedule'][name] = schedule
+        self._requeue(name)
 
         if persist:
             self.persist()
@@ -467,6 +622,7 @@ class Schedule(object):
         Enable the scheduler.
         '''
         self.opts['schedule']['enabled'] = True
+        self._requeue()
 
         # Fire the complete event back along with updated list of schedule
         evt = salt.utils.event.get_event('minion', opts=self.opts, listen=False)
@@ -478,6 +634,7 @@ class Schedule(object):
         Disable the scheduler.
         '''
         self.opts['schedule']['enabled'] = False
+        self._requeue()
 
         # Fire the complete event back along with updated list of schedule
         evt = salt.utils.event.get_event('minion', opts=self.opts, listen=False)
@@ -490,6 +647,7 @@ class Schedule(object):
         '''
         # Remove all jobs from self.intervals
         self.intervals = {}
+        self._requeue()
 
         if 'schedule' in schedule:
             schedule = schedule['schedule']
@@ -542,6 +700,7 @@ class Schedule(object):
                 self.opts['schedule'][name]['run_explicit'] = []
             self.opts['schedule'][name]['run_explicit'].append({'time': new_time,
                                                                 'time_fmt': time_fmt})
+            self._requeue(name)
 
         elif name in self._get_schedule(include_opts=False):
             log.warning("Cannot modify job %s, it's in the pillar!", name)
@@ -566,6 +725,7 @@ class Schedule(object):
                 self.opts['schedule'][name]['skip_explicit'] = []
             self.opts['schedule'][name]['skip_explicit'].append({'time': time,
                                                                  'time_fmt': time_fmt})
+            self._requeue(name)
 
         elif name in self._get_schedule(include_opts=False):
             log.warning("Cannot modify job %s, it's in the pillar!", name)
@@ -830,6 +990,10 @@ class Schedule(object):
         '''
         Evaluate and execute the schedule
 
+        Only the jobs which are new or changed, or whose next fire time has
+        come, are evaluated. See time_to_next_eval() for how long the caller
+        can wait before calling it again.
+
         :param datetime now: Override current time with a datetime object instance``
 
         '''
@@ -1323,16 +1487,23 @@ class Schedule(object):
         if 'splay' in schedule:
             self.splay = schedule['splay']
 
-        _hidden = ['enabled',
-                   'skip_function',
-                   'skip_during_range',
-                   'splay']
+        if not now:
+            now = datetime.datetime.now()
+
+        _hidden = SCHEDULE_SETTINGS
+        due_jobs = self._pop_due(schedule, now)
+        evaluated = []
         for job, data in six.iteritems(schedule):
 
             # Skip anything that is a global setting
             if job in _hidden:
                 continue
 
+            # Skip the jobs which are not due yet
+            if job not in due_jobs:
+                continue
+            evaluated.append(job)
+
             # Clear these out between runs
             for item in ['_continue',
                          '_error',
@@ -1377,9 +1548,6 @@ class Schedule(object):
                     '_run_on_start' not in data:
                 data['_run_on_start'] = True
 
-            if not now:
-                now = datetime.datetime.now()
-
             # Used for quick lookups when detecting invalid option
             # combinations.
             schedule_keys = set(data.keys())
@@ -1601,9 +1769,14 @@ class Schedule(object):
                 if run:
                     data['_last_run'] = now
                     data['_splay'] = None
-                if '_seconds' in data:
+                # Only move the next fire time once it has come, so that
+                # evaluating a job early does not postpone it
+                if '_seconds' in data and seconds <= 0:
                     data['_next_fire_time'] = now + datetime.timedelta(seconds=data['_seconds'])
 
+        for job in evaluated:
+            self._queue_job(job, schedule[job], now, loop_interval)
+
     def _run_job(self, func, data):
         job_dry_run = data.get('dry_run', False)
         if job_dry_run:
@@ -32,6 +32,7 @@ import salt.utils.dateutils
 import salt.utils.http
 import salt.utils.files
 import salt.utils.platform
+import salt.utils.rendercache
 import salt.utils.yamlencoding
 import salt.utils.hashutils
 import salt.utils.stringutils
@@ -360,6 +361,7 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
     jinja_env.tests.update(JinjaTest.salt_jinja_tests)
     jinja_env.filters.update(JinjaFilter.salt_jinja_filters)
     jinja_env.globals.update(JinjaGlobal.salt_jinja_globals)
+    salt.utils.rendercache.guard_jinja(jinja_env)
 
     # globals
     jinja_env.globals['odict'] = OrderedDict
@@ -435,6 +437,9 @@ def render_jinja_tmpl(tmplstr, context, tmplpath=None):
                               line,
                               tmplstr,
                               trace=tracestr)
+    finally:
+        if saltenv:
+            loader.destroy()
 
     # Workaround a bug in Jinja that removes the final newline
     # (https://github.com/mitsuhiko/jinja2/issues/75)
@@ -471,6 +476,9 @@ def render_mako_tmpl(tmplstr, context, tmplpath=None):
         ).render(**context)
     except:
         raise SaltRenderError(mako.exceptions.text_error_template().render())
+    finally:
+        if saltenv:
+            lookup.destroy()
 
 
 def render_wempy_tmpl(tmplstr, context, tmplpath=None):
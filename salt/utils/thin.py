@@ -80,6 +80,9 @@ import salt.version
 
 log = logging.getLogger(__name__)
 
+# The checksums of the thin tarballs hashed by this process
+_THIN_SUMS = {}
+
 
 def _get_salt_call(*dirs, **namespaces):
     '''
@@ -551,7 +554,18 @@ def thin_sum(cachedir, form='sha1'):
     else:
         code_checksum = "'0'"
 
-    return code_checksum, salt.utils.hashutils.get_hash(thintar, form)
+    # salt-ssh asks for it with every command, only hash the tarball again
+    # once it was regenerated
+    try:
+        stat = os.stat(thintar)
+    except OSError:
+        return code_checksum, salt.utils.hashutils.get_hash(thintar, form)
+    signature = (stat.st_mtime, stat.st_ctime, stat.st_size, stat.st_ino)
+    cached = _THIN_SUMS.get((thintar, form))
+    if cached is None or cached[0] != signature:
+        cached = (signature, salt.utils.hashutils.get_hash(thintar, form))
+        _THIN_SUMS[(thintar, form)] = cached
+    return code_checksum, cached[1]
 
 
 def gen_min(cachedir, extra_mods='', overwrite=False, so_mods='',
@@ -0,0 +1,65 @@
+# -*- encoding: utf-8 -*-
+'''
+Measure how long a new process takes to load the grains and all execution
+modules, like a salt-call or a minion job process does, without the loader
+cache, with a cold loader cache and with a warm one.
+
+Every run happens in a fresh Python process, so that nothing is left in
+sys.modules from the run before.
+
+Usage: python tests/perf/loader_startup_bench.py [runs]
+'''
+
+from __future__ import absolute_import, print_function
+# Import system libs
+import shutil
+import subprocess
+import sys
+import tempfile
+
+CHILD = '''
+import sys
+import time
+import salt.config
+import salt.loader
+opts = salt.config.minion_config(None)
+opts['cachedir'] = sys.argv[1]
+opts['loader_cache'] = sys.argv[2] == '1'
+start = time.time()
+opts['grains'] = salt.loader.grains(opts)
+mods = salt.loader.minion_mods(opts)
+mods._load_all()
+print('{0} {1} {2}'.format(
+    time.time() - start, len(mods.loaded_modules), len(mods.missing_modules)))
+'''
+
+
+def run_child(cachedir, cache):
+    out = subprocess.check_output(
+        [sys.executable, '-c', CHILD, cachedir, '1' if cache else '0'])
+    secs, loaded, missing = out.decode().split()[-3:]
+    return float(secs), int(loaded), int(missing)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    cachedir = tempfile.mkdtemp()
+    try:
+        results = {'none': [], 'cold': [], 'warm': []}
+        for _ in range(runs):
+            results['none'].append(run_child(cachedir, False))
+            shutil.rmtree(cachedir)
+            results['cold'].append(run_child(cachedir, True))
+            results['warm'].append(run_child(cachedir, True))
+        for name in ('none', 'cold', 'warm'):
+            secs = sorted(x[0] for x in results[name])
+            print('{0:>5}: median {1:>7.3f}s, best {2:>7.3f}s '
+                  '({3} modules loaded, {4} missing)'.format(
+                      name, secs[len(secs) // 2], secs[0],
+                      results[name][-1][1], results[name][-1][2]))
+    finally:
+        shutil.rmtree(cachedir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
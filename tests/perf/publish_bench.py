@@ -0,0 +1,117 @@
+# -*- encoding: utf-8 -*-
+'''
+Measure how many publishes per second a master worker can hand to the
+ZeroMQ publish daemon.
+
+Three modes are compared:
+
+* ``connect-per-publish``: a new context, PUSH socket and connection for every
+  publish, which is how ``ZeroMQPubServerChannel.publish`` used to work
+* ``persistent``: the long-lived connection held by the channel
+* ``batched``: the long-lived connection, sending batches of loads as one
+  multipart message
+
+Usage: python tests/perf/publish_bench.py [count] [batch_size]
+'''
+
+from __future__ import absolute_import, print_function
+# Import system libs
+import ctypes
+import multiprocessing
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Import salt libs
+import salt.config
+import salt.crypt
+import salt.master
+import salt.transport.zeromq
+import salt.utils.stringutils
+from salt.utils.zeromq import zmq
+
+
+def make_opts(sock_dir):
+    opts = salt.config.master_config(None)
+    opts.update({
+        'sock_dir': sock_dir,
+        'pki_dir': sock_dir,
+        'cachedir': sock_dir,
+        'sign_pub_messages': False,
+        'zmq_filtering': False,
+        'transport': 'zeromq',
+    })
+    return opts
+
+
+def drain(pull_uri, expected, done):
+    '''
+    Stand in for the publish daemon: pull loads until all have arrived
+    '''
+    context = zmq.Context(1)
+    pull_sock = context.socket(zmq.PULL)
+    pull_sock.bind(pull_uri)
+    received = 0
+    while received < expected:
+        received += len(pull_sock.recv_multipart())
+    pull_sock.close()
+    context.term()
+    done.set()
+
+
+def publish_connect_per_publish(chan, load):
+    context = zmq.Context(1)
+    pub_sock = context.socket(zmq.PUSH)
+    pub_sock.connect(chan.pull_uri)
+    pub_sock.send(chan._pack_load(load))
+    pub_sock.close()
+    context.term()
+
+
+def run(name, chan, count, send):
+    done = threading.Event()
+    drainer = threading.Thread(target=drain, args=(chan.pull_uri, count, done))
+    drainer.start()
+    # Give the puller time to bind
+    time.sleep(0.5)
+    start = time.time()
+    send()
+    done.wait()
+    elapsed = time.time() - start
+    drainer.join()
+    chan.pub_close()
+    print('{0:>22}: {1:>10.1f} publishes/sec ({2} in {3:.3f}s)'.format(
+        name, count / elapsed, count, elapsed))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    count -= count % batch_size
+    sock_dir = tempfile.mkdtemp()
+    try:
+        opts = make_opts(sock_dir)
+        salt.master.SMaster.secrets['aes'] = {
+            'secret': multiprocessing.Array(
+                ctypes.c_char,
+                salt.utils.stringutils.to_bytes(salt.crypt.Crypticle.generate_key_string())),
+        }
+        chan = salt.transport.zeromq.ZeroMQPubServerChannel(opts)
+        load = {'fun': 'test.ping', 'arg': [], 'tgt': '*', 'tgt_type': 'glob',
+                'jid': '20180101000000000000', 'ret': '', 'user': 'root'}
+
+        run('connect-per-publish', chan, count,
+            lambda: [publish_connect_per_publish(chan, load) for _ in range(count)])
+        run('persistent', chan, count,
+            lambda: [chan.publish(load) for _ in range(count)])
+        run('batched ({0})'.format(batch_size), chan, count,
+            lambda: [chan.publish_batch([load] * batch_size)
+                     for _ in range(count // batch_size)])
+    finally:
+        shutil.rmtree(sock_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+# -*- encoding: utf-8 -*-
+'''
+Measure the throughput of salt.payload.Serial over representative Salt
+payloads: a publication, a highstate return, a pkg.list_pkgs return, a
+rendered pillar and an event.
+
+Every payload is unpacked the way it was before the utf-8 fast path (unpack,
+then walk through it with decode_embedded_strs), with Serial.loads from the
+old wire format, and with Serial.loads from the bin type format which peers
+with serial_bin_type enabled use. Then every payload is compressed with the
+algorithms available for wire_compression.
+
+Usage: python tests/perf/serial_bench.py [seconds per measurement]
+'''
+
+from __future__ import absolute_import, print_function, unicode_literals
+# Import system libs
+import datetime
+import sys
+import timeit
+
+# Import salt libs
+import salt.crypt
+import salt.payload
+import salt.transport.frame
+from salt.payload import msgpack
+
+
+def publish_load():
+    return {'fun': 'state.apply',
+            'arg': ['webserver', {'test': True, '__kwarg__': True}],
+            'tgt': 'web*',
+            'tgt_type': 'glob',
+            'ret': '',
+            'user': 'root',
+            'jid': '20180227140750302662',
+            'metadata': {}}
+
+
+def highstate_return(states=500):
+    ret = {}
+    for idx in range(states):
+        ret['file_|-/etc/app/conf{0}_|-/etc/app/conf{0}_|-managed'.format(idx)] = {
+            'name': '/etc/app/conf{0}'.format(idx),
+            'changes': {'diff': '--- \n+++ \n@@ -1 +1 @@\n-old\n+new {0}\n'.format(idx)},
+            'result': True,
+            'comment': 'File /etc/app/conf{0} updated'.format(idx),
+            '__sls__': 'app.config',
+            '__run_num__': idx,
+            'start_time': '14:07:50.302662',
+            'duration': 12.5,
+            '__id__': '/etc/app/conf{0}'.format(idx)}
+    return {'id': 'web01', 'jid': '20180227140750302662', 'fun': 'state.apply',
+            'fun_args': ['webserver'], 'retcode': 0, 'success': True,
+            'return': ret}
+
+
+def list_pkgs_return(pkgs=2000):
+    return {'id': 'web01', 'jid': '20180227140750302662', 'fun': 'pkg.list_pkgs',
+            'return': dict(('package-{0}'.format(idx), '1.{0}.3-1ubuntu1'.format(idx))
+                           for idx in range(pkgs))}
+
+
+def pillar(users=200):
+    return {'users': dict(
+        ('user{0}'.format(idx), {'uid': 2000 + idx,
+                                 'groups': ['users', 'wheel'],
+                                 'shell': '/bin/bash',
+                                 'fullname': 'Üser Nümber {0}'.format(idx),
+                                 'ssh_keys': ['ssh-rsa AAAAB3NzaC1yc2E{0} user{0}'.format(idx)]})
+        for idx in range(users)),
+        'app': {'version': '2.3.1', 'workers': 8, 'debug': False}}
+
+
+def event():
+    return {'tag': 'salt/job/20180227140750302662/ret/web01',
+            'data': {'id': 'web01', 'cmd': '_return', 'fun': 'test.ping',
+                     'return': True, 'retcode': 0, 'success': True,
+                     'jid': '20180227140750302662',
+                     '_stamp': datetime.datetime.utcnow().isoformat()}}
+
+
+PAYLOADS = [
+    ('publish', publish_load()),
+    ('highstate', highstate_return()),
+    ('list_pkgs', list_pkgs_return()),
+    ('pillar', pillar()),
+    ('event', event()),
+]
+
+
+def old_loads(msg):
+    # What Serial.loads did before the utf-8 fast path
+    return salt.transport.frame.decode_embedded_strs(
+        msgpack.loads(msg, use_list=True))
+
+
+def rate(func, arg, seconds):
+    # Run for about the given time, return the calls per second
+    number = 1
+    while True:
+        elapsed = timeit.timeit(lambda: func(arg), number=number)
+        if elapsed >= seconds / 10.0:
+            break
+        number *= 2
+    number = max(1, int(number * seconds / elapsed))
+    return number / timeit.timeit(lambda: func(arg), number=number)
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    serial = salt.payload.Serial('msgpack')
+    print('{0:>10} {1:>8} {2:>12} {3:>12} {4:>12} {5:>12}'.format(
+        'payload', 'bytes', 'dumps/s', 'old loads/s', 'loads/s', 'bin loads/s'))
+    for name, load in PAYLOADS:
+        packed = serial.dumps(load)
+        packed_bin = serial.dumps(load, use_bin_type=True)
+        print('{0:>10} {1:>8} {2:>12.0f} {3:>12.0f} {4:>12.0f} {5:>12.0f}'.format(
+            name,
+            len(packed),
+            rate(serial.dumps, load, seconds),
+            rate(old_loads, packed, seconds),
+            rate(serial.loads, packed, seconds),
+            rate(lambda msg: serial.loads(msg, encoding='utf-8'), packed_bin, seconds)))
+    print()
+    print('{0:>10} {1:>6} {2:>8} {3:>12} {4:>14}'.format(
+        'payload', 'algo', 'ratio', 'compress/s', 'decompress/s'))
+    for name, load in PAYLOADS:
+        packed = serial.dumps(load)
+        for algo in sorted(salt.crypt.COMPRESSORS):
+            compress, decompress = salt.crypt.COMPRESSORS[algo]
+            print('{0:>10} {1:>6} {2:>8.3f} {3:>12.0f} {4:>14.0f}'.format(
+                name,
+                algo,
+                float(len(compress(packed))) / len(packed),
+                rate(compress, packed, seconds),
+                rate(lambda msg: decompress(msg, len(packed)),
+                     compress(packed), seconds)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# -*- encoding: utf-8 -*-
+'''
+Measure how long a highstate with many generated states takes to compile and
+run, with requisites resolved through the ChunkIndex and through the linear
+scans of all chunks and all high data which State used before it.
+
+The generated high data has one ``base`` sls with 10 states, which every
+other state requires with ``require: - sls: base``. The other states are
+spread over sls files of 100 states, each of them requires the state before
+it by name and every tenth one is ``require_in``'d by its sls neighbour.
+
+Usage: python tests/perf/state_requisite_bench.py [count]
+'''
+
+from __future__ import absolute_import, print_function
+# Import system libs
+import fnmatch
+import shutil
+import sys
+import tempfile
+import time
+
+# Import salt libs
+import salt.config
+import salt.state
+from salt.utils.odict import OrderedDict
+from tests.support.mock import patch
+
+
+def make_opts(root_dir):
+    opts = salt.config.minion_config(None)
+    opts.update({
+        'root_dir': root_dir,
+        'cachedir': root_dir,
+        'pki_dir': root_dir,
+        'sock_dir': root_dir,
+        'file_client': 'local',
+        'file_roots': {'base': [root_dir]},
+        'pillar_roots': {'base': [root_dir]},
+        'state_events': False,
+    })
+    return opts
+
+
+def make_high(count):
+    high = OrderedDict()
+    for num in range(10):
+        high['base{0}'.format(num)] = OrderedDict([
+            ('test', ['succeed_without_changes']),
+            ('__sls__', 'base'), ('__env__', 'base')])
+    for num in range(count - 10):
+        args = ['succeed_without_changes',
+                {'name': 'name{0}'.format(num)},
+                {'require': [{'sls': 'base'}]}]
+        if num % 100:
+            args[2]['require'].append({'test': 'name{0}'.format(num - 1)})
+        if num % 10 == 0:
+            args.append({'require_in': [{'sls': 'app{0}'.format(num // 100 + 1)}]})
+        high['state{0}'.format(num)] = OrderedDict([
+            ('test', args),
+            ('__sls__', 'app{0}'.format(num // 100)), ('__env__', 'base')])
+    return high
+
+
+class LinearSlsIds(object):
+    '''
+    Scan the high data for every sls lookup, like requisite_in used to
+    '''
+    def __init__(self, high):
+        self.high = high
+
+    def get(self, sls, default=None):
+        return salt.state.find_sls_ids(sls, self.high)
+
+
+def linear_match(self, req_key, req_val):
+    '''
+    Scan all chunks for every requisite, like check_requisite used to
+    '''
+    ret = []
+    for chunk in self.chunks:
+        if req_key == 'sls':
+            if fnmatch.fnmatch(chunk['__sls__'], req_val):
+                ret.append(chunk)
+            continue
+        if (fnmatch.fnmatch(chunk['name'], req_val) or
+                fnmatch.fnmatch(chunk['__id__'], req_val)):
+            if req_key == 'id' or chunk['state'] == req_key:
+                ret.append(chunk)
+    return ret
+
+
+def run(name, state, count):
+    high = make_high(count)
+    start = time.time()
+    high, errors = state.requisite_in(high)
+    chunks = state.compile_high_data(high)
+    compiled = time.time()
+    ret = state.call_listen(chunks, state.call_chunks(chunks))
+    done = time.time()
+    assert not errors, errors
+    failed = [tag for tag, data in ret.items() if not data['result']]
+    assert not failed, failed[:5]
+    print('{0:>8}: compile {1:>8.3f}s, run {2:>8.3f}s ({3} states)'.format(
+        name, compiled - start, done - compiled, len(ret)))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    root_dir = tempfile.mkdtemp()
+    try:
+        state = salt.state.State(make_opts(root_dir))
+        with patch('salt.state._index_high_sls', LinearSlsIds), \
+                patch('salt.state.ChunkIndex.match', linear_match):
+            run('linear', state, count)
+        run('indexed', state, count)
+    finally:
+        shutil.rmtree(root_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,6 +5,8 @@ unit tests for the localfs cache
 
 # Import Python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import os
+import time
 
 # Import Salt Testing libs
 # import integration
@@ -12,6 +14,8 @@ from tests.support.unit import skipIf, TestCase
 from tests.support.mock import (
     NO_MOCK,
     NO_MOCK_REASON,
+    MagicMock,
+    call,
     patch,
 )
 
@@ -217,3 +221,195 @@ class MemCacheTest(TestCase):
         # Check debug data
         self.assertEqual(self.cache.call, 6)
         self.assertEqual(self.cache.hit, 3)
+
+    @patch('salt.cache.Cache.store')
+    @patch('salt.cache.Cache.fetch_many')
+    @patch('salt.loader.cache', return_value={})
+    def test_fetch_many(self, loader_mock, cache_fetch_many_mock, cache_store_mock):
+        cache_fetch_many_mock.side_effect = lambda bank_keys: dict(
+            (bank_key, 'fake_data') for bank_key in bank_keys)
+        with patch('time.time', return_value=0):
+            self.cache.store('bank', 'key1', 'cached_data')
+        with patch('time.time', return_value=1):
+            ret = self.cache.fetch_many([('bank', 'key1'), ('bank', 'key2')])
+        self.assertEqual(ret, {('bank', 'key1'): 'cached_data',
+                               ('bank', 'key2'): 'fake_data'})
+        # Only the key which was not in memory is fetched from the driver
+        cache_fetch_many_mock.assert_called_once_with([('bank', 'key2')])
+        self.assertDictEqual(salt.cache.MemCache.data, {
+            'fake_driver': {
+                ('bank', 'key1'): [1, 'cached_data'],
+                ('bank', 'key2'): [1, 'fake_data'],
+                }})
+
+
+class CacheBulkTest(TestCase):
+    '''
+    Validate the fallbacks of the bulk methods for drivers without them
+    '''
+    def setUp(self):
+        self.data = {('minions/web1', 'data'): {'grains': {'os': 'Ubuntu'}},
+                     ('minions/web2', 'data'): {}}
+        modules = {
+            'fake_driver.fetch': lambda bank, key: self.data.get((bank, key), {}),
+            'fake_driver.store':
+                lambda bank, key, data: self.data.__setitem__((bank, key), data),
+            'fake_driver.list': lambda bank: ['web1', 'web2'],
+        }
+        self.cache = salt.cache.Cache({'cache': 'fake_driver'})
+        self.cache._modules = modules
+        self.cache._kwargs = {}
+
+    def test_fetch_many(self):
+        self.assertEqual(
+            self.cache.fetch_many([('minions/web1', 'data'),
+                                   ('minions/web3', 'data')]),
+            {('minions/web1', 'data'): {'grains': {'os': 'Ubuntu'}},
+             ('minions/web3', 'data'): {}})
+
+    def test_iter_many(self):
+        bank_keys = [('minions/web{0}'.format(num), 'data') for num in range(5)]
+        with patch.object(self.cache, 'fetch_many',
+                          MagicMock(side_effect=self.cache.fetch_many)) \
+                as fetch_many:
+            ret = list(self.cache.iter_many(iter(bank_keys), chunk_size=2))
+        self.assertEqual([bank_key for bank_key, _ in ret], bank_keys)
+        self.assertEqual(ret[1][1], {'grains': {'os': 'Ubuntu'}})
+        self.assertEqual(fetch_many.call_args_list,
+                         [call(bank_keys[:2]), call(bank_keys[2:4]),
+                          call(bank_keys[4:])])
+
+    def test_store_many(self):
+        self.cache.store_many([('minions/web2', 'data', {'pillar': {}}),
+                               ('minions/web3', 'mine', {'ip': []})])
+        self.assertEqual(self.data[('minions/web2', 'data')], {'pillar': {}})
+        self.assertEqual(self.data[('minions/web3', 'mine')], {'ip': []})
+
+    def test_list_with_data(self):
+        self.assertEqual(self.cache.list_with_data('minions', 'data'),
+                         {'web1': {'grains': {'os': 'Ubuntu'}}})
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class MemCacheInvalidationTest(TestCase):
+    '''
+    Validate the invalidation of the memcache values and its stats
+    '''
+    def setUp(self):
+        salt.cache.MemCache.data = {}
+        salt.cache.pop_stats()
+        self.opts = {'cache': 'fake_driver',
+                     '__role': 'master',
+                     'sock_dir': '/tmp',
+                     'memcache_expire_seconds': 10,
+                     'memcache_max_items': 2,
+                     'memcache_full_cleanup': False,
+                     'memcache_debug': False,
+                     'memcache_event_invalidation': True}
+        self.event = MagicMock()
+        self.events = []
+        self.event.get_event_noblock.side_effect = \
+            lambda: self.events.pop(0) if self.events else None
+        patcher = patch('salt.utils.event.get_master_event',
+                        MagicMock(return_value=self.event))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, salt.cache.MemCache, '_event', None)
+        self.addCleanup(setattr, salt.cache.MemCache, '_listener', None)
+        self.cache = salt.cache.factory(self.opts)
+        self.cache._modules = {'fake_driver.fetch': MagicMock(return_value='fake_data'),
+                               'fake_driver.store': MagicMock(),
+                               'fake_driver.flush': MagicMock()}
+        self.cache._kwargs = {}
+
+    def test_store_fires_event(self):
+        self.cache.store('minions/web1', 'data', 'fake_data')
+        self.event.fire_event.assert_called_once_with(
+            {'storage': 'fake_driver',
+             'pid': os.getpid(),
+             'start': salt.cache.MemCache._started,
+             'seq': 1,
+             'items': [('minions/web1', 'data')]},
+            salt.cache.INVALIDATE_TAG)
+
+    def test_invalidation(self):
+        self.cache.fetch('minions/web1', 'data')
+        self.cache.fetch('minions/web2', 'mine')
+        self.events.append({'tag': salt.cache.INVALIDATE_TAG,
+                            'data': {'storage': 'fake_driver',
+                                     'pid': -1,
+                                     'items': [['minions/web1', 'data']]}})
+        self.assertEqual(list(salt.cache.MemCache.data['fake_driver']),
+                         [('minions/web1', 'data'), ('minions/web2', 'mine')])
+        self.cache.fetch('minions/web2', 'mine')
+        self.assertEqual(list(salt.cache.MemCache.data['fake_driver']),
+                         [('minions/web2', 'mine')])
+        # The events fired by this process are skipped
+        self.events.append({'tag': salt.cache.INVALIDATE_TAG,
+                            'data': {'storage': 'fake_driver',
+                                     'pid': os.getpid(),
+                                     'items': [['minions', None]]}})
+        self.cache.fetch('minions/web2', 'mine')
+        self.assertEqual(list(salt.cache.MemCache.data['fake_driver']),
+                         [('minions/web2', 'mine')])
+        self.assertEqual(salt.cache.pop_stats(),
+                         {'hits': 2, 'misses': 2, 'evictions': 0, 'invalidations': 1,
+                          'resets': 0})
+
+    def test_invalidation_after_other_events(self):
+        self.cache.fetch('minions/web1', 'data')
+        self.cache.fetch('minions/web2', 'mine')
+        self.events.extend([
+            {'tag': 'salt/job/123/ret/web3', 'data': {}},
+            {'tag': 'salt/auth', 'data': {}},
+            {'tag': salt.cache.INVALIDATE_TAG,
+             'data': {'storage': 'fake_driver',
+                      'pid': -1,
+                      'items': [['minions/web1', 'data']]}},
+            {'tag': 'salt/job/124/new', 'data': {}},
+            {'tag': salt.cache.INVALIDATE_TAG,
+             'data': {'storage': 'fake_driver',
+                      'pid': -1,
+                      'items': [['minions/web2', 'mine']]}}])
+        self.cache.fetch('minions/web3', 'data')
+        self.assertEqual(self.events, [])
+        self.assertEqual(list(salt.cache.MemCache.data['fake_driver']),
+                         [('minions/web3', 'data')])
+        self.assertEqual(salt.cache.pop_stats()['invalidations'], 2)
+
+    def test_missed_invalidations(self):
+        def _event(seq, start=1.0, pid=-1, items=()):
+            return {'tag': salt.cache.INVALIDATE_TAG,
+                    'data': {'storage': 'other_driver', 'pid': pid,
+                             'start': start, 'seq': seq, 'items': items}}
+        self.cache.fetch('minions/web1', 'data')
+        # Numbered events without gaps keep the values, also for a sender
+        # which fired events before this process started listening
+        self.events.extend([_event(5), _event(6)])
+        self.cache.fetch('minions/web2', 'data')
+        self.assertEqual(len(salt.cache.MemCache.data['fake_driver']), 2)
+        # A missed event clears the values of every storage
+        self.events.append(_event(8))
+        self.cache.fetch('minions/web3', 'data')
+        self.assertEqual(list(salt.cache.MemCache.data['fake_driver']),
+                         [('minions/web3', 'data')])
+        # As does the missed first event of a sender which started later
+        self.events.append(_event(2, start=time.time() + 1, pid=-2))
+        self.cache.fetch('minions/web1', 'data')
+        self.assertEqual(list(salt.cache.MemCache.data['fake_driver']),
+                         [('minions/web1', 'data')])
+        self.assertEqual(salt.cache.pop_stats()['resets'], 2)
+
+    def test_flush_bank(self):
+        self.cache.fetch('minions/web1', 'data')
+        self.cache.fetch('minions/web1/sub', 'data')
+        self.cache.flush('minions/web1')
+        self.assertEqual(salt.cache.MemCache.data['fake_driver'], {})
+
+    def test_evictions(self):
+        for minion_id in ('web1', 'web2', 'web3'):
+            self.cache.fetch('minions/{0}'.format(minion_id), 'data')
+        self.assertEqual(list(salt.cache.MemCache.data['fake_driver']),
+                         [('minions/web2', 'data'), ('minions/web3', 'data')])
+        self.assertEqual(salt.cache.pop_stats()['evictions'], 1)
+        self.assertIsNone(salt.cache.pop_stats())
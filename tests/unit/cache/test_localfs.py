@@ -140,6 +140,25 @@ class LocalFSTest(TestCase, LoaderModuleMockMixin):
             with patch.dict(localfs.__context__, {'serial': serializer}):
                 self.assertIn('payload data', localfs.fetch(bank='bank', key='key', cachedir=tmp_dir))
 
+    # 'fetch_many' function tests: 1
+
+    def test_fetch_many_success(self):
+        '''
+        Tests that the fetch_many function reads the cache files in parallel
+        and returns an empty dict for the missing keys.
+        '''
+        tmp_dir = tempfile.mkdtemp(dir=TMP)
+        serializer = salt.payload.Serial(self)
+        self._create_tmp_cache_file(tmp_dir, serializer)
+
+        bank_keys = [('bank', 'key'), ('bank', 'missing')]
+        with patch.dict(localfs.__opts__, {'cachedir': tmp_dir}):
+            with patch.dict(localfs.__context__, {'serial': serializer}):
+                with patch.object(localfs, '_FETCH_PARALLEL_MIN', 0):
+                    self.assertEqual(localfs.fetch_many(bank_keys, cachedir=tmp_dir),
+                                     {('bank', 'key'): 'payload data',
+                                      ('bank', 'missing'): {}})
+
     # 'updated' function tests: 3
 
     def test_updated_return_when_cache_file_does_not_exist(self):
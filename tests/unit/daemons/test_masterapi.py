@@ -7,6 +7,7 @@ import io
 import stat
 
 # Import Salt libs
+import salt.cache
 import salt.config
 import salt.daemons.masterapi as masterapi
 import salt.utils.platform
@@ -20,6 +21,9 @@ from tests.support.mock import (
     NO_MOCK_REASON
 )
 
+# Import 3rd-party libs
+from salt.ext import six
+
 
 def gen_permissions(owner='', group='', others=''):
     '''
@@ -561,6 +565,14 @@ class FakeCache(object):
     def fetch(self, bank, key):
         return self.data[bank, key]
 
+    def fetch_many(self, bank_keys):
+        return dict((bank_key, self.data.get(bank_key, {}))
+                    for bank_key in bank_keys)
+
+    def iter_many(self, bank_keys):
+        return six.get_unbound_function(salt.cache.Cache.iter_many)(
+            self, bank_keys)
+
 
 class RemoteFuncsTestCase(TestCase):
     '''
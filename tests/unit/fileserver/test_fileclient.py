@@ -5,10 +5,15 @@
 # Import Python libs
 from __future__ import absolute_import
 import errno
+import hashlib
 import logging
 import os
 import shutil
 
+# Import 3rd-party libs
+import tornado.concurrent
+import tornado.ioloop
+
 # Import Salt Testing libs
 from tests.integration import AdaptedConfigurationTestCaseMixin
 from tests.support.mixins import LoaderModuleMockMixin
@@ -19,6 +24,7 @@ from tests.support.mock import MagicMock, patch, NO_MOCK, NO_MOCK_REASON
 # Import salt libs
 import salt.utils.files
 from salt import fileclient
+from salt.exceptions import SaltReqTimeoutError
 from salt.ext import six
 
 log = logging.getLogger(__name__)
@@ -182,6 +188,32 @@ class FileclientCacheTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderMod
                     self.assertTrue(SUBDIR in content)
                     self.assertTrue(saltenv in content)
 
+    def test_cache_dir_unchanged_files(self):
+        '''
+        Ensure that only the files which changed on the master are fetched
+        again when a directory is cached a second time
+        '''
+        patched_opts = dict((x, y) for x, y in six.iteritems(self.minion_opts))
+        patched_opts.update(MOCKED_OPTS)
+
+        with patch.dict(fileclient.__opts__, patched_opts):
+            client = fileclient.get_file_client(fileclient.__opts__, pillar=False)
+            cached = client.cache_dir('salt://{0}'.format(SUBDIR), 'base')
+            self.assertEqual(len(cached), len(SUBDIR_FILES))
+
+            changed = os.path.join(FS_ROOT, 'base', SUBDIR, SUBDIR_FILES[0])
+            with salt.utils.files.fopen(changed, 'w') as fp_:
+                fp_.write('changed')
+            with patch.object(client, 'cache_file',
+                              MagicMock(return_value='/cached')) as cache_file:
+                ret = client.cache_dir('salt://{0}'.format(SUBDIR), 'base')
+            cache_file.assert_called_once_with(
+                'salt://{0}/{1}'.format(SUBDIR, SUBDIR_FILES[0]),
+                'base',
+                cachedir=None)
+            self.assertEqual(len(ret), len(SUBDIR_FILES))
+            self.assertIn('/cached', ret)
+
     def test_cache_dir_with_alternate_cachedir_and_absolute_path(self):
         '''
         Ensure entire directory is cached to correct location when an alternate
@@ -359,3 +391,214 @@ class FileclientCacheTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderMod
                 log.debug('cache_loc = %s', cache_loc)
                 log.debug('content = %s', content)
                 self.assertTrue(saltenv in content)
+
+
+class _StreamChannel(object):
+    '''
+    Serve streamed _serve_file replies for ``content`` and record how many
+    chunk requests were in flight at once
+    '''
+    def __init__(self, io_loop, content, chunk_size, streamed=True):
+        self.io_loop = io_loop
+        self.content = content
+        self.chunk_size = chunk_size
+        self.streamed = streamed
+        self.locs = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def send(self, load, raw=False):
+        loc = load['loc']
+        self.locs.append(loc)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        future = tornado.concurrent.Future()
+        data = {'data': self.content[loc:loc + self.chunk_size],
+                'dest': 'foo.txt'}
+        if self.streamed:
+            data.update(size=len(self.content), chunk_size=self.chunk_size)
+
+        def _reply():
+            self.in_flight -= 1
+            future.set_result(data)
+        self.io_loop.add_callback(_reply)
+        return future
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class RemoteClientStreamTest(TestCase, AdaptedConfigurationTestCaseMixin):
+    '''
+    Tests for the streamed file transfers of the RemoteClient
+    '''
+    CHUNK_SIZE = 16
+
+    def setUp(self):
+        self.tmp_dir = os.path.join(TMP, 'fileclient_stream')
+        os.makedirs(self.tmp_dir)
+        opts = self.get_temp_config('minion')
+        opts['file_client_stream_window'] = 4
+        with patch('salt.transport.Channel.factory', MagicMock()), \
+                patch('salt.loader.utils', MagicMock()):
+            self.client = fileclient.RemoteClient(opts)
+        self.io_loop = tornado.ioloop.IOLoop()
+        self.content = b''.join(
+            six.int2byte(ord('a') + idx) * self.CHUNK_SIZE
+            for idx in range(10)) + b'tail'
+        self.hash_server = {
+            'hsum': hashlib.md5(self.content).hexdigest(),
+            'hash_type': 'md5'}
+        self.dest = os.path.join(self.tmp_dir, 'foo.txt')
+        self.partial = self.dest + '.partial'
+        self.marker = self.partial + '.hsum'
+
+    def tearDown(self):
+        self.io_loop.close()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        del self.client
+
+    def _stream(self, channel):
+        with patch.object(self.client, '_get_stream_channel',
+                          MagicMock(return_value=(channel, self.io_loop))):
+            return self.client._stream_file(
+                'foo.txt', 'base', self.dest, self.hash_server,
+                len(self.content))
+
+    def _read_dest(self):
+        with salt.utils.files.fopen(self.dest, 'rb') as fp_:
+            return fp_.read()
+
+    def test_stream_file_pipelined(self):
+        '''
+        The chunks are requested with up to file_client_stream_window
+        requests in flight and written in order
+        '''
+        channel = _StreamChannel(self.io_loop, self.content, self.CHUNK_SIZE)
+        self.assertEqual(self._stream(channel), self.dest)
+        self.assertEqual(self._read_dest(), self.content)
+        self.assertEqual(
+            channel.locs,
+            list(range(0, len(self.content), self.CHUNK_SIZE)))
+        self.assertEqual(channel.max_in_flight, 4)
+        self.assertFalse(os.path.exists(self.partial))
+        self.assertFalse(os.path.exists(self.marker))
+
+    def test_stream_file_resume(self):
+        '''
+        A partial download of the same file is resumed where it stopped, a
+        partial download of another file is not
+        '''
+        offset = 3 * self.CHUNK_SIZE
+        with salt.utils.files.fopen(self.partial, 'wb') as fp_:
+            fp_.write(self.content[:offset])
+        with salt.utils.files.fopen(self.marker, 'w') as fp_:
+            fp_.write(self.hash_server['hsum'])
+        channel = _StreamChannel(self.io_loop, self.content, self.CHUNK_SIZE)
+        self.assertEqual(self._stream(channel), self.dest)
+        self.assertEqual(channel.locs[0], offset)
+        self.assertEqual(self._read_dest(), self.content)
+        self.assertFalse(os.path.exists(self.marker))
+
+        with salt.utils.files.fopen(self.partial, 'wb') as fp_:
+            fp_.write(b'x' * offset)
+        with salt.utils.files.fopen(self.marker, 'w') as fp_:
+            fp_.write('0' * 32)
+        channel = _StreamChannel(self.io_loop, self.content, self.CHUNK_SIZE)
+        self.assertEqual(self._stream(channel), self.dest)
+        self.assertEqual(channel.locs[0], 0)
+        self.assertEqual(self._read_dest(), self.content)
+
+    def test_stream_file_hash_mismatch(self):
+        '''
+        A streamed file which does not match the hash of the master is
+        removed, and the regular transfer is used
+        '''
+        channel = _StreamChannel(
+            self.io_loop, self.content[:-4] + b'liar', self.CHUNK_SIZE)
+        self.assertIsNone(self._stream(channel))
+        self.assertFalse(os.path.exists(self.dest))
+        self.assertFalse(os.path.exists(self.partial))
+        self.assertFalse(os.path.exists(self.marker))
+
+    def test_stream_file_error(self):
+        '''
+        The partial download is removed on an unexpected error, and kept when
+        the connection is interrupted
+        '''
+        channel = _StreamChannel(self.io_loop, self.content, self.CHUNK_SIZE)
+        with patch('salt.utils.hashutils.get_hash',
+                   MagicMock(side_effect=ValueError)):
+            self.assertRaises(ValueError, self._stream, channel)
+        self.assertFalse(os.path.exists(self.partial))
+        self.assertFalse(os.path.exists(self.marker))
+
+        channel.send = MagicMock(side_effect=SaltReqTimeoutError)
+        self.assertRaises(SaltReqTimeoutError, self._stream, channel)
+        self.assertTrue(os.path.exists(self.partial))
+        self.assertTrue(os.path.exists(self.marker))
+
+    def test_get_file_fallback(self):
+        '''
+        A master which does not stream files is served the regular way
+        '''
+        self.client.opts['file_client_stream'] = True
+        channel = _StreamChannel(
+            self.io_loop, self.content, len(self.content), streamed=False)
+        self.client.channel = MagicMock()
+        self.client.channel.send.side_effect = [
+            {'data': self.content, 'dest': 'foo.txt'},
+            {'data': b'', 'dest': 'foo.txt'}]
+        stat_server = [0o644, 0, 0, 0, 0, 0, len(self.content)]
+        with patch.object(self.client, 'hash_and_stat_file',
+                          MagicMock(return_value=(self.hash_server,
+                                                  stat_server))), \
+                patch.object(self.client, '_get_stream_channel',
+                             MagicMock(return_value=(channel, self.io_loop))):
+            ret = self.client.get_file('salt://foo.txt', self.dest)
+        self.assertEqual(ret, self.dest)
+        self.assertEqual(channel.locs, [0])
+        self.assertEqual(self.client.channel.send.call_count, 2)
+        self.assertEqual(self._read_dest(), self.content)
+        self.assertFalse(os.path.exists(self.partial))
+
+    def test_hash_and_stat_files_chunked(self):
+        '''
+        The hashes are fetched with one request per file_hash_bulk_size
+        files, and one by one for a chunk the master refuses
+        '''
+        self.client.opts['file_hash_bulk_size'] = 2
+        paths = ['foo/{0}'.format(idx) for idx in range(5)]
+        hash_stat = ({'hsum': 'abc', 'hash_type': 'md5'}, [0o644])
+
+        def _send(load):
+            if load['cmd'] == '_file_list':
+                return paths + ['foobar/baz']
+            if load['paths'] == paths[2:4]:
+                return False
+            return dict((path, list(hash_stat)) for path in load['paths'])
+        self.client.channel = MagicMock()
+        self.client.channel.send.side_effect = _send
+        with patch.object(self.client, 'hash_and_stat_file',
+                          MagicMock(return_value=hash_stat)) as single:
+            ret = self.client.hash_and_stat_files(prefix='salt://foo')
+        self.assertEqual(ret, dict((path, hash_stat) for path in paths))
+        self.assertEqual(
+            [call[0][0].get('paths')
+             for call in self.client.channel.send.call_args_list],
+            [None, paths[:2], paths[2:4], paths[4:]])
+        self.assertEqual(
+            [call[0][0] for call in single.call_args_list],
+            ['salt://foo/2', 'salt://foo/3'])
+
+    def test_destroy(self):
+        '''
+        destroy() closes the streaming channel and its IOLoop
+        '''
+        channel = MagicMock()
+        io_loop = MagicMock()
+        self.client._stream_channel = channel
+        self.client._stream_io_loop = io_loop
+        self.client.destroy()
+        channel.close.assert_called_once_with()
+        io_loop.close.assert_called_once_with()
+        self.assertIsNone(self.client._stream_channel)
+        self.assertIsNone(self.client._stream_io_loop)
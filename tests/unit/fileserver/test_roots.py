@@ -19,6 +19,8 @@ from tests.support.mock import patch, NO_MOCK, NO_MOCK_REASON
 # Import Salt libs
 import salt.fileserver.roots as roots
 import salt.fileclient
+import salt.fileserver
+import salt.utils.fileindex
 import salt.utils.files
 import salt.utils.platform
 
@@ -91,6 +93,19 @@ class RootsTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleMockMix
         self.assertIn('testfile', ret)
         self.assertIn(UNICODE_FILENAME, ret)
 
+    def test_file_list_index(self):
+        files = roots.file_list({'saltenv': 'base'})
+        dirs = roots.dir_list({'saltenv': 'base'})
+        with patch.dict(roots.__opts__, {'fileserver_list_index': True}):
+            index = salt.utils.fileindex.FileListIndex(roots.__opts__, 'base')
+            index.build()
+            index.write()
+            self.assertEqual(roots.file_list({'saltenv': 'base'}), files)
+            self.assertEqual(roots.dir_list({'saltenv': 'base'}), dirs)
+            self.assertEqual(
+                roots.file_list({'saltenv': 'base', 'prefix': 'test'}),
+                [path for path in files if path.startswith('test')])
+
     def test_find_file(self):
         ret = roots.find_file('testfile')
         self.assertEqual('testfile', ret['rel'])
@@ -142,6 +157,31 @@ class RootsTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleMockMix
                 {'data': data,
                  'dest': 'testfile'})
 
+    def test_serve_file_stream(self):
+        fpath = os.path.join(self.tmp_dir, 'testfile')
+        with salt.utils.files.fopen(fpath, 'rb') as fp_:
+            contents = fp_.read()
+        load = {'saltenv': 'base',
+                'path': fpath,
+                'loc': 16,
+                'stream': True}
+        fnd = {'path': fpath,
+               'rel': 'testfile'}
+        with patch.dict(roots.__opts__, {'file_buffer_size': 16}):
+            ret = roots.serve_file(load, fnd)
+            self.assertIn(fpath, roots._SERVE_FILES)
+            # The chunk is returned as it is, with the sizes which the
+            # client needs to request the remaining chunks
+            self.assertDictEqual(
+                ret,
+                {'data': contents[16:32],
+                 'dest': 'testfile',
+                 'size': len(contents),
+                 'chunk_size': 16})
+            load['loc'] = len(contents) - 4
+            self.assertEqual(
+                roots.serve_file(load, fnd)['data'], contents[-4:])
+
     def test_envs(self):
         opts = {'file_roots': copy.copy(self.opts['file_roots'])}
         opts['file_roots'][UNICODE_ENVNAME] = opts['file_roots']['base']
@@ -175,6 +215,22 @@ class RootsTest(TestCase, AdaptedConfigurationTestCaseMixin, LoaderModuleMockMix
             }
         )
 
+    def test_file_hash_and_stat_bulk(self):
+        '''
+        The master hashes the files asked for, up to file_hash_bulk_size of
+        them with one request
+        '''
+        fileserver = salt.fileserver.Fileserver(self.opts)
+        load = {'saltenv': 'base', 'paths': ['testfile', 'missing']}
+        ret = fileserver.file_hash_and_stat_bulk(dict(load))
+        self.assertEqual(list(ret), ['testfile'])
+        self.assertEqual(
+            ret['testfile'],
+            list(fileserver.file_hash_and_stat(
+                {'saltenv': 'base', 'path': 'testfile'})))
+        with patch.dict(self.opts, {'file_hash_bulk_size': 1}):
+            self.assertFalse(fileserver.file_hash_and_stat_bulk(dict(load)))
+
     def test_file_list_emptydirs(self):
         ret = roots.file_list_emptydirs({'saltenv': 'base'})
         self.assertIn('empty_dir', ret)
@@ -17,6 +17,7 @@ import collections
 import sys
 import imp
 import copy
+import time
 
 # Import Salt Testing libs
 from tests.support.unit import TestCase
@@ -32,6 +33,7 @@ from salt.ext import six
 from salt.ext.six.moves import range
 # pylint: enable=no-name-in-module,redefined-builtin
 
+import salt.loader
 from salt.loader import LazyLoader, _module_dirs, grains, utils, proxy, minion_mods
 
 log = logging.getLogger(__name__)
@@ -955,3 +957,174 @@ class LazyLoaderDeepSubmodReloadingTest(TestCase):
                 self.update_lib(lib)
                 self.loader.clear()
                 self._verify_libs()
+
+
+virtual_cache_template = '''
+with open({marker!r}, 'a') as fh_:
+    fh_.write('imported\\n')
+
+
+def __virtual__():
+    return {virtual}
+
+
+def ping():
+    return True
+'''
+
+
+class LazyLoaderCacheTest(TestCase):
+    '''
+    Test the persistent loader cache
+    '''
+    module_name = 'virtcache'
+
+    @classmethod
+    def setUpClass(cls):
+        cls.opts = salt.config.minion_config(None)
+        cls.opts['grains'] = grains(cls.opts)
+        if not os.path.isdir(TMP):
+            os.makedirs(TMP)
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=TMP)
+        self.module_dir = os.path.join(self.tmp_dir, 'modules')
+        os.makedirs(self.module_dir)
+        self.marker = os.path.join(self.tmp_dir, 'marker')
+        self.write_module()
+        self.opts = copy.deepcopy(self.opts)
+        self.opts['cachedir'] = self.tmp_dir
+        self.opts['loader_cache'] = True
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    @classmethod
+    def tearDownClass(cls):
+        del cls.opts
+
+    def write_module(self, extra='', virtual="(False, 'not on this system')"):
+        module_path = os.path.join(self.module_dir,
+                                   '{0}.py'.format(self.module_name))
+        with salt.utils.files.fopen(module_path, 'w') as fh:
+            fh.write(virtual_cache_template.format(
+                marker=self.marker, virtual=virtual) + extra)
+        remove_bytecode(module_path)
+
+    def imports(self):
+        with salt.utils.files.fopen(self.marker) as fh:
+            return len(fh.readlines())
+
+    def load(self):
+        loader = LazyLoader([self.module_dir], self.opts, tag='module')
+        self.assertNotIn('{0}.ping'.format(self.module_name), loader)
+        return loader
+
+    def test_unavailable_module_not_imported_again(self):
+        self.load()
+        self.assertEqual(self.imports(), 1)
+        loader = self.load()
+        self.assertEqual(self.imports(), 1)
+        self.assertIn(
+            'not on this system',
+            loader.missing_fun_string('{0}.ping'.format(self.module_name)))
+
+    def test_changed_module_imported_again(self):
+        self.load()
+        self.write_module(extra='\n# changed\n')
+        os.utime(os.path.join(self.module_dir,
+                              '{0}.py'.format(self.module_name)),
+                 (1, 1))
+        self.load()
+        self.assertEqual(self.imports(), 2)
+
+    def test_grains_change_invalidates(self):
+        self.load()
+        self.opts['grains'] = dict(self.opts['grains'], loader_cache_test=1)
+        self.load()
+        self.assertEqual(self.imports(), 2)
+
+    def test_grains_timing_ignored(self):
+        self.opts['grains'] = dict(self.opts['grains'],
+                                   grains_timing={'core.os_data': 0.1})
+        self.load()
+        self.opts['grains'] = dict(self.opts['grains'],
+                                   grains_timing={'core.os_data': 0.2})
+        self.load()
+        self.assertEqual(self.imports(), 1)
+
+    def test_uncacheable_virtual_imported_again(self):
+        '''
+        A __virtual__ function which looks at the pillar, other execution
+        modules or files is run again by every loader
+        '''
+        virtuals = (
+            "__pillar__.get('virtcache', False)",
+            "__salt__['config.get']('virtcache', False)",
+            "os.path.exists('/nonexistent/virtcache')",
+            '_check()\n\n\ndef _check():\n    return open is None',
+        )
+        for idx, virtual in enumerate(virtuals):
+            self.write_module(extra='\nimport os\n', virtual=virtual)
+            os.utime(os.path.join(self.module_dir,
+                                  '{0}.py'.format(self.module_name)),
+                     (idx, idx))
+            imports = self.imports() if os.path.exists(self.marker) else 0
+            for _ in range(2):
+                loader = LazyLoader(
+                    [self.module_dir], self.opts, tag='module',
+                    pack={'__salt__': {'config.get': lambda key, default: default},
+                          '__pillar__': {}})
+                self.assertNotIn('{0}.ping'.format(self.module_name), loader)
+            self.assertEqual(self.imports(), imports + 2, virtual)
+
+
+class GrainFuncsTest(TestCase):
+    '''
+    Test running the grains functions
+    '''
+    def setUp(self):
+        def _grain(name, delay):
+            def func():
+                time.sleep(delay)
+                return {'winner': name, name: True}
+            return func
+
+        def _broken():
+            raise ValueError('broken')
+
+        self.funcs = collections.OrderedDict([
+            ('core.slow', _grain('core.slow', 0.2)),
+            ('core.fast', _grain('core.fast', 0)),
+            ('custom.broken', _broken),
+            ('custom.last', _grain('custom.last', 0.1)),
+        ])
+
+    def run_funcs(self, opts, keys=None):
+        timings = {}
+        ret = list(salt.loader._run_grain_funcs(
+            opts, self.funcs, keys or list(self.funcs), None, timings))
+        return ret, timings
+
+    def test_parallel_merge_order(self):
+        sequential, _ = self.run_funcs({})
+        parallel, timings = self.run_funcs({'grains_parallel_workers': 4})
+        self.assertEqual(parallel, sequential)
+        self.assertEqual([x[0] for x in parallel],
+                         ['core.slow', 'core.fast', 'custom.last'])
+        self.assertEqual(set(timings), set(self.funcs))
+
+    def test_parallel_timeout(self):
+        self.funcs['custom.hung'] = lambda: time.sleep(5)
+        start = time.time()
+        ret, timings = self.run_funcs({'grains_parallel_workers': 2,
+                                       'grains_func_timeout': 1})
+        self.assertLess(time.time() - start, 4)
+        self.assertIsNone(timings['custom.hung'])
+        self.assertEqual([x[0] for x in ret],
+                         ['core.slow', 'core.fast', 'custom.last'])
+
+    def test_core_error_raised(self):
+        self.funcs['core.broken'] = self.funcs['custom.broken']
+        for opts in ({}, {'grains_parallel_workers': 4}):
+            self.assertRaises(ValueError, self.run_funcs, opts)
@@ -109,6 +109,49 @@ class CpTestCase(TestCase, LoaderModuleMockMixin):
                        MagicMock(return_value=dest)):
                 self.assertEqual(cp.get_file_str(path, dest), ret)
 
+    def test_hash_dir_prefetch(self):
+        '''
+        Test that hash_dir keeps the hashes for the next hash_file calls
+        when asked to prefetch them.
+        '''
+        hashes = {'foo/a.txt': ({'hsum': 'aaa', 'hash_type': 'md5'}, []),
+                  'foo/b.txt': ({'hsum': 'bbb', 'hash_type': 'md5'}, [])}
+        client = MagicMock()
+        client.hash_and_stat_files.return_value = hashes
+        client.hash_file.return_value = {'hsum': 'ccc', 'hash_type': 'md5'}
+        with patch('salt.modules.cp._client', MagicMock(return_value=client)), \
+                patch.dict(cp.__context__, {}):
+            self.assertEqual(
+                cp.hash_dir('salt://foo'),
+                {'salt://foo/a.txt': {'hsum': 'aaa', 'hash_type': 'md5'},
+                 'salt://foo/b.txt': {'hsum': 'bbb', 'hash_type': 'md5'}})
+            self.assertNotIn('cp.hash_dir', cp.__context__)
+            client.hash_and_stat_files.assert_called_once_with(
+                saltenv='base', prefix='salt://foo')
+
+            cp.hash_dir('salt://foo', prefetch=True)
+            self.assertEqual(
+                cp.hash_file('salt://foo/a.txt'),
+                {'hsum': 'aaa', 'hash_type': 'md5'})
+            self.assertFalse(client.hash_file.called)
+            # A prefetched hash is only used once, and only for its saltenv
+            self.assertEqual(
+                cp.hash_file('salt://foo/a.txt')['hsum'], 'ccc')
+            self.assertEqual(
+                cp.hash_file('salt://foo/b.txt?saltenv=dev')['hsum'], 'ccc')
+            self.assertEqual(
+                cp.hash_file('salt://foo/b.txt')['hsum'], 'bbb')
+            self.assertEqual(client.hash_file.call_count, 2)
+
+            # Only the hashes of the listed files are kept
+            cp.hash_dir('salt://foo', prefetch=['salt://foo/b.txt?saltenv=base'])
+            self.assertEqual(cp.__context__['cp.hash_dir'],
+                             {('base', 'foo/b.txt'): {'hsum': 'bbb', 'hash_type': 'md5'}})
+            cp.clear_prefetched_hashes()
+            self.assertNotIn('cp.hash_dir', cp.__context__)
+            self.assertEqual(
+                cp.hash_file('salt://foo/b.txt')['hsum'], 'ccc')
+
     def test_push_non_absolute_path(self):
         '''
         Test if push fails on a non absolute path.
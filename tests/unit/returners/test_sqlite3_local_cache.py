@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+'''
+Unit tests for the SQLite backed job cache (sqlite3_local_cache).
+'''
+
+# Import Python libs
+from __future__ import absolute_import, print_function, unicode_literals
+import shutil
+import tempfile
+
+# Import Salt Testing libs
+from tests.support.mixins import LoaderModuleMockMixin
+from tests.support.unit import TestCase, skipIf
+from tests.support.mock import (
+    NO_MOCK,
+    NO_MOCK_REASON,
+)
+
+# Import Salt libs
+import salt.utils.jid
+import salt.returners.sqlite3_local_cache as sqlite3_local_cache
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+@skipIf(not sqlite3_local_cache.HAS_SQLITE3, 'sqlite3 is not available')
+class SQLite3LocalCacheTestCase(TestCase, LoaderModuleMockMixin):
+    '''
+    Tests for the sqlite3_local_cache returner
+    '''
+    def setup_loader_modules(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cachedir, ignore_errors=True)
+        self.addCleanup(sqlite3_local_cache._CONN.clear)
+        return {sqlite3_local_cache: {'__opts__': {'cachedir': self.cachedir,
+                                                   'keep_jobs': 1,
+                                                   'hash_type': 'sha256',
+                                                   'job_cache_store_endtime': True}}}
+
+    def _add_job(self, fun='test.ping', minions=('minion',)):
+        jid = sqlite3_local_cache.prep_jid()
+        load = {'fun': fun, 'jid': jid, 'tgt': 'minion', 'tgt_type': 'glob',
+                'arg': [], 'user': 'root'}
+        sqlite3_local_cache.save_load(jid, load, minions=list(minions))
+        return jid
+
+    def test_prep_jid(self):
+        jid = sqlite3_local_cache.prep_jid()
+        self.assertTrue(salt.utils.jid.is_jid(jid))
+        self.assertEqual(sqlite3_local_cache.prep_jid(passed_jid=jid), jid)
+
+    def test_save_and_get_load(self):
+        jid = self._add_job()
+        sqlite3_local_cache.save_minions(jid, ['syndic_minion'], syndic_id='syndic')
+        load = sqlite3_local_cache.get_load(jid)
+        self.assertEqual(load['fun'], 'test.ping')
+        self.assertEqual(load['Minions'], ['minion', 'syndic_minion'])
+        self.assertEqual(sqlite3_local_cache.get_load('20010101000000000000'), {})
+
+    def test_returner_and_get_jid(self):
+        jid = self._add_job()
+        sqlite3_local_cache.returner({'jid': jid, 'id': 'minion',
+                                      'return': True, 'retcode': 0,
+                                      'out': 'highstate'})
+        self.assertEqual(sqlite3_local_cache.get_jid(jid),
+                         {'minion': {'return': True, 'retcode': 0,
+                                     'out': 'highstate'}})
+        # A second return for the same job is dropped
+        self.assertFalse(sqlite3_local_cache.returner(
+            {'jid': jid, 'id': 'minion', 'return': False}))
+        self.assertEqual(sqlite3_local_cache.get_jid(jid)['minion']['return'], True)
+
+    def test_returner_nocache(self):
+        jid = sqlite3_local_cache.prep_jid(nocache=True)
+        sqlite3_local_cache.returner({'jid': jid, 'id': 'minion', 'return': True})
+        self.assertEqual(sqlite3_local_cache.get_jid(jid), {})
+
+    def test_returner_unknown_jid(self):
+        self.assertFalse(sqlite3_local_cache.returner(
+            {'jid': '20010101000000000000', 'id': 'minion', 'return': True}))
+
+    def test_get_jids(self):
+        jid = self._add_job()
+        sqlite3_local_cache.update_endtime(jid, '2018, Jul 01 00:00:00.000000')
+        ret = sqlite3_local_cache.get_jids()
+        self.assertEqual(list(ret), [jid])
+        self.assertEqual(ret[jid]['Function'], 'test.ping')
+        self.assertEqual(ret[jid]['EndTime'], '2018, Jul 01 00:00:00.000000')
+
+    def test_get_jids_filter(self):
+        jids = []
+        for fun in ('test.ping', 'saltutil.find_job', 'test.arg', 'test.echo'):
+            jids.append(self._add_job(fun=fun))
+        ret = sqlite3_local_cache.get_jids_filter(2)
+        self.assertEqual([job['JID'] for job in ret], jids[2:])
+        ret = sqlite3_local_cache.get_jids_filter(3, filter_find_job=False)
+        self.assertEqual([job['JID'] for job in ret], jids[1:])
+        ret = sqlite3_local_cache.get_jids_filter(10)
+        self.assertEqual([job['Function'] for job in ret],
+                         ['test.ping', 'test.arg', 'test.echo'])
+
+    def test_clean_old_jobs(self):
+        old_jid = self._add_job()
+        sqlite3_local_cache.returner({'jid': old_jid, 'id': 'minion', 'return': True})
+        # Simulate a job which was created before keep_jobs hours ago
+        conn = sqlite3_local_cache._get_conn()
+        with conn:
+            conn.execute('UPDATE jids SET created = 0 WHERE jid = ?', (old_jid,))
+        new_jid = self._add_job()
+        sqlite3_local_cache.clean_old_jobs()
+        self.assertEqual(list(sqlite3_local_cache.get_jids()), [new_jid])
+        self.assertEqual(sqlite3_local_cache.get_jid(old_jid), {})
+        self.assertEqual(sqlite3_local_cache.get_load(old_jid), {})
+
+    def test_register(self):
+        self.assertEqual(sqlite3_local_cache.load_reg(), {})
+        sqlite3_local_cache.save_reg({'foo': {'val': [1, 2]}})
+        self.assertEqual(sqlite3_local_cache.load_reg(), {'foo': {'val': [1, 2]}})
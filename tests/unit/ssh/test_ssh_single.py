@@ -10,7 +10,7 @@ import os.path
 
 # Import Salt Testing libs
 from tests.support.unit import TestCase, skipIf
-from tests.support.mock import NO_MOCK, NO_MOCK_REASON
+from tests.support.mock import NO_MOCK, NO_MOCK_REASON, MagicMock, patch
 
 # Import Salt libs
 import tests.integration as integration
@@ -63,3 +63,59 @@ class SSHSingleTests(TestCase):
                          'PasswordAuthentication=yes -o ConnectTimeout=65 -o Port=22 '
                          '-o IdentityFile=/etc/salt/pki/master/ssh/salt-ssh.rsa '
                          '-o User=root  date +%s')
+
+    def test_single_control_persist(self):
+        ''' ssh.Single multiplexes its commands when ssh_control_persist is set
+        '''
+        opts = {
+            'argv': ['uptime'],
+            '__role': 'master',
+            'raw_shell': True,
+            'cachedir': self.tmp_cachedir,
+            'extension_modules': os.path.join(self.tmp_cachedir, 'extmods'),
+            'ssh_control_persist': 60,
+            '_ssh_version': (7, 4),
+        }
+        target = {
+            'host': 'login1',
+            'user': 'root',
+            'port': '22',
+            'priv': '/etc/salt/pki/master/ssh/salt-ssh.rsa'
+        }
+        single = ssh.Single(
+                opts,
+                opts['argv'],
+                'localhost',
+                mods={},
+                fsclient=None,
+                thin=thin.thin_path(opts['cachedir']),
+                mine=False,
+                **target)
+        control_path = single.shell._control_path()
+        self.assertTrue(control_path.startswith(
+            os.path.join(self.tmp_cachedir, 'ssh_control')))
+        self.assertTrue(single.shell._cmd_str('date +%s').endswith(
+            '-o ControlMaster=auto -o ControlPath={0} -o ControlPersist=60 '
+            'date +%s'.format(control_path)))
+
+        run_cmd = MagicMock(side_effect=[('', 'No such file', 255),
+                                         ('', '', 0),
+                                         ('out', '', 0)])
+        with patch.object(single.shell, '_run_cmd', run_cmd):
+            self.assertEqual(single.run(), ('out', '', 0))
+        self.assertTrue(run_cmd.call_args_list[0][0][0].endswith('-O check'))
+        self.assertTrue(run_cmd.call_args_list[1][0][0].endswith('-f -N'))
+        self.assertEqual(run_cmd.call_args_list[2][0][0],
+                         single.shell._cmd_str('uptime'))
+        self.assertIn('connect', single.timing)
+        self.assertIn('execute', single.timing)
+
+        # An open connection is reused, a failure to connect is returned
+        run_cmd = MagicMock(side_effect=[('', 'Master running', 0),
+                                         ('out', '', 0)])
+        with patch.object(single.shell, '_run_cmd', run_cmd):
+            self.assertEqual(single.run(), ('out', '', 0))
+        run_cmd = MagicMock(side_effect=[('', 'No such file', 255),
+                                         ('', 'Permission denied', 255)])
+        with patch.object(single.shell, '_run_cmd', run_cmd):
+            self.assertEqual(single.run(), ('', 'Permission denied', 255))
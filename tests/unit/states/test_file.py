@@ -976,6 +976,32 @@ class TestFileState(TestCase, LoaderModuleMockMixin):
                     ret.update({'comment': comt, 'result': True})
                     self.assertDictEqual(filestate.recurse(name, source), ret)
 
+    def test_recurse_prefetched_hashes(self):
+        '''
+        Test that recurse only prefetches the hashes of the files it manages,
+        and drops those it did not use even when managing a file fails.
+        '''
+        name = '/opt/code/flask'
+        source = 'salt://code/flask'
+        mng_files = [(name + '/a.txt', 'salt://code/flask/a.txt?saltenv=base')]
+        mock_hash_dir = MagicMock()
+        mock_clear = MagicMock()
+        with patch.dict(filestate.__salt__, {'file.source_list': MagicMock(return_value=(source, '')),
+                                             'cp.list_master_dirs': MagicMock(return_value=['code/flask']),
+                                             'cp.hash_dir': mock_hash_dir,
+                                             'cp.clear_prefetched_hashes': mock_clear}), \
+                patch.object(filestate, '_gen_recurse_managed_files',
+                             MagicMock(return_value=(mng_files, [], [], set()))), \
+                patch.object(filestate, 'managed',
+                             MagicMock(side_effect=CommandExecutionError)), \
+                patch.object(os.path, 'isabs', MagicMock(return_value=True)), \
+                patch.object(os.path, 'isdir', MagicMock(return_value=True)):
+            self.assertRaises(CommandExecutionError, filestate.recurse, name, source)
+        mock_hash_dir.assert_called_once_with(
+            'salt://code/flask', 'base',
+            prefetch=['salt://code/flask/a.txt?saltenv=base'])
+        mock_clear.assert_called_once_with()
+
     # 'replace' function tests: 1
 
     def test_replace(self):
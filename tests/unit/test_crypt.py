@@ -296,3 +296,65 @@ class TestM2CryptoRegression47124(TestCase):
         with patch('salt.crypt.get_rsa_key', return_value=key):
             signature = salt.crypt.sign_message('/keydir/keyname.pem', message, passphrase='password')
         self.assertEqual(signature, self.SIGNATURE)
+
+
+@skipIf(not HAS_PYCRYPTO_RSA and not HAS_M2, 'No AES implementation available')
+class CrypticleTestCase(TestCase):
+    def test_loads_format(self):
+        key = crypt.Crypticle.generate_key_string()
+        load = {'fun': 'test.ping', 'data': b'\xff'}
+        old = crypt.Crypticle({}, key)
+        self.assertEqual(
+            old.loads_format(old.dumps(load)),
+            (load, {'serial_bin_type': False, 'compression': None}))
+
+    @skipIf(six.PY2, 'Python 2 does not serialize with the bin type')
+    def test_dumps_bin_type(self):
+        key = crypt.Crypticle.generate_key_string()
+        load = {'fun': 'test.ping', 'data': b'abc'}
+        new = crypt.Crypticle({}, key, use_bin_type=True)
+        # A peer which does not use the bin type itself reads it as well
+        old = crypt.Crypticle({}, key)
+        self.assertEqual(
+            old.loads_format(new.dumps(load)),
+            (load, {'serial_bin_type': True, 'compression': None}))
+        # The text in bytes stays bytes, unlike with the old format
+        self.assertEqual(old.loads(old.dumps(load))['data'], 'abc')
+
+    def test_compression(self):
+        key = crypt.Crypticle.generate_key_string()
+        opts = {'wire_compression_threshold': 1024,
+                'wire_compression': ['zlib']}
+        small = {'fun': 'test.ping'}
+        large = {'return': 'x' * 4096}
+        comp = crypt.Crypticle(opts, key, compression='zlib')
+        plain = crypt.Crypticle(opts, key)
+        self.assertEqual(comp.loads_format(comp.dumps(small))[1]['compression'], None)
+        data = comp.dumps(large)
+        self.assertLess(len(data), len(plain.dumps(large)))
+        self.assertEqual(
+            plain.loads_format(data),
+            (large, {'serial_bin_type': False, 'compression': 'zlib'}))
+        # The compression can be turned off per load
+        self.assertEqual(
+            plain.loads_format(comp.dumps(large, compression=False))[1]['compression'],
+            None)
+        stats = comp.pop_compression_stats()
+        self.assertEqual(stats['zlib']['runs'], 1)
+        self.assertLess(stats['zlib']['bytes_out'], stats['zlib']['bytes_in'])
+        self.assertEqual(comp.pop_compression_stats(), {})
+
+    def test_decompression_limits(self):
+        key = crypt.Crypticle.generate_key_string()
+        opts = {'wire_compression_threshold': 1024,
+                'wire_compression': ['zlib'],
+                'wire_compression_max_size': 8192}
+        comp = crypt.Crypticle(opts, key, compression='zlib')
+        self.assertEqual(
+            comp.loads_format(comp.dumps({'return': 'x' * 4096})),
+            ({'return': 'x' * 4096}, {'serial_bin_type': False, 'compression': 'zlib'}))
+        # Loads which decompress to more than wire_compression_max_size
+        self.assertEqual(comp.loads(comp.dumps({'return': 'x' * 16384})), {})
+        # Loads compressed with an algorithm which is not enabled here
+        plain = crypt.Crypticle({}, key)
+        self.assertEqual(plain.loads(comp.dumps({'return': 'x' * 4096})), {})
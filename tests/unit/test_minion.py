@@ -7,6 +7,9 @@
 from __future__ import absolute_import
 import copy
 import os
+import shutil
+import tempfile
+import time
 
 # Import Salt Testing libs
 from tests.support.unit import TestCase, skipIf
@@ -16,6 +19,8 @@ from tests.support.helpers import skip_if_not_root
 # Import salt libs
 import salt.minion
 import salt.utils.event as event
+import salt.utils.files
+import salt.utils.minion
 from salt.exceptions import SaltSystemExit
 import salt.syspaths
 import tornado
@@ -256,6 +261,102 @@ class MinionTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
             finally:
                 minion.destroy()
 
+    def test_job_pool(self):
+        '''
+        Tests that the _handle_decoded_payload function queues jobs to the job pool when job_pool_workers
+        is set, and restarts the pool when the master connection changed.
+        '''
+        with patch('salt.utils.process.SignalHandlingMultiprocessingProcess.start', MagicMock(return_value=True)), \
+                patch('salt.utils.minion.JobPool') as job_pool:
+            mock_opts = copy.deepcopy(salt.config.DEFAULT_MINION_OPTS)
+            mock_opts['job_pool_workers'] = 2
+            minion = salt.minion.Minion(mock_opts, jid_queue=[], io_loop=tornado.ioloop.IOLoop())
+            try:
+                for jid in (1, 2):
+                    minion._handle_decoded_payload({'fun': 'foo.bar', 'jid': jid}).result()
+                self.assertEqual(salt.utils.process.SignalHandlingMultiprocessingProcess.start.call_count, 0)
+                self.assertEqual(job_pool.call_count, 1)
+                self.assertEqual(job_pool.return_value.start.call_count, 1)
+                self.assertEqual(job_pool.return_value.submit.call_count, 2)
+
+                minion.connected = True
+                minion._handle_decoded_payload({'fun': 'foo.bar', 'jid': 3}).result()
+                job_pool.return_value.stop.assert_called_once_with(wait=False)
+                self.assertEqual(job_pool.call_count, 2)
+                self.assertEqual(job_pool.return_value.submit.call_count, 3)
+            finally:
+                minion.destroy()
+
+    def test_job_pool_runs_jobs(self):
+        '''
+        Tests that the job pool runs the queued jobs in the workers and replaces recycled workers.
+        '''
+        def make_handler(path):
+            def handle(data):
+                with salt.utils.files.fopen(os.path.join(path, str(data['jid'])), 'w') as fp_:
+                    fp_.write(str(os.getpid()))
+            return handle
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        pool = salt.utils.minion.JobPool({'job_pool_workers': 2, 'job_pool_max_jobs': 2},
+                                         make_handler, args=(tmpdir,))
+        pool.start()
+        try:
+            for jid in range(6):
+                pool.submit({'jid': jid})
+            for _ in range(100):
+                if pool.stats()['completed'] == 6:
+                    break
+                # Done by the minion's cleanup callback every loop_interval
+                pool.maintain()
+                time.sleep(0.1)
+            self.assertEqual(pool.stats(), {'workers': pool.stats()['workers'], 'busy': 0,
+                                            'queued': 0, 'completed': 6})
+            self.assertEqual(sorted(os.listdir(tmpdir)), [str(jid) for jid in range(6)])
+            pids = set()
+            for jid in range(6):
+                with salt.utils.files.fopen(os.path.join(tmpdir, str(jid))) as fp_:
+                    pids.add(fp_.read())
+            self.assertNotIn(str(os.getpid()), pids)
+            # Every worker exits after two jobs, so more than two were used
+            self.assertGreater(len(pids), 2)
+            pool.maintain()
+            self.assertEqual(pool.stats()['workers'], 2)
+        finally:
+            pool.stop()
+
+    def test_job_pool_resets_cwd_and_environ(self):
+        '''
+        Tests that every job of a job pool worker starts in the working directory and with the
+        environment the worker started with.
+        '''
+        def make_handler(path):
+            def handle(data):
+                with salt.utils.files.fopen(os.path.join(path, str(data['jid'])), 'w') as fp_:
+                    fp_.write('{0}|{1}'.format(os.getcwd(), os.environ.get('SALT_JOB_POOL_TEST', '')))
+                os.chdir(path)
+                os.environ['SALT_JOB_POOL_TEST'] = str(data['jid'])
+            return handle
+
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir, ignore_errors=True)
+        pool = salt.utils.minion.JobPool({'job_pool_workers': 1, 'job_pool_max_jobs': 0},
+                                         make_handler, args=(tmpdir,))
+        pool.start()
+        try:
+            for jid in range(2):
+                pool.submit({'jid': jid})
+            for _ in range(100):
+                if pool.stats()['completed'] == 2:
+                    break
+                time.sleep(0.1)
+            for jid in range(2):
+                with salt.utils.files.fopen(os.path.join(tmpdir, str(jid))) as fp_:
+                    self.assertEqual(fp_.read(), '{0}|'.format(os.getcwd()))
+        finally:
+            pool.stop()
+
     def test_beacons_before_connect(self):
         '''
         Tests that the 'beacons_before_connect' option causes the beacons to be initialized before connect.
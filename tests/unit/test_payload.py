@@ -153,6 +153,25 @@ class PayloadTestCase(TestCase):
         odata = payload.loads(sdata)
         self.assertEqual(edata, odata)
 
+    @skipIf(six.PY2, 'Python 2 does not tell str from bytes')
+    def test_loads_embedded_bytes(self):
+        '''
+        Test that the bytes which are not text stay bytes, with and without
+        the bin type
+        '''
+        payload = salt.payload.Serial('msgpack')
+        idata = {'text': 'ünicode', 'data': b'\xff\xfe', 'list': [b'abc']}
+        self.assertEqual(
+            payload.loads(payload.dumps(idata)),
+            {'text': 'ünicode', 'data': b'\xff\xfe', 'list': ['abc']})
+        self.assertEqual(
+            payload.loads(payload.dumps(idata, use_bin_type=True),
+                          encoding='utf-8'),
+            idata)
+        self.assertEqual(
+            payload.loads(payload.dumps({'text': 'ünicode'}), raw=True),
+            {b'text': 'ünicode'.encode('utf-8')})
+
 
 class SREQTestCase(TestCase):
     port = 8845  # TODO: dynamically assign a port?
@@ -24,6 +24,8 @@ import salt.exceptions
 import salt.state
 from salt.utils.odict import OrderedDict, DefaultOrderedDict
 from salt.utils.decorators import state as statedecorators
+from salt.ext import six
+from salt.ext.six.moves import range  # pylint: disable=import-error,redefined-builtin
 
 try:
     import pytest
@@ -72,6 +74,94 @@ class StateCompilerTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
             with self.assertRaises(salt.exceptions.SaltRenderError):
                 state_obj.call_high(high_data)
 
+    def test_requisites_resolved_by_index(self):
+        '''
+        Test id, name, sls and glob requisites are resolved in chunk order
+        '''
+        with patch('salt.state.State._gather_pillar'):
+            high_data = OrderedDict()
+            for num in range(3):
+                high_data['dep{0}'.format(num)] = OrderedDict([
+                    ('test', ['succeed_without_changes',
+                              {'name': 'name{0}'.format(num)}]),
+                    ('__sls__', 'deps'), ('__env__', 'base')])
+            for req in ({'sls': 'deps'}, {'sls': 'de*'}, {'test': 'name1'},
+                        {'test': 'dep*'}, {'id': 'dep2'}):
+                high_data['use_{0}'.format(next(iter(req.values())))] = OrderedDict([
+                    ('test', ['succeed_without_changes', {'require': [req]}]),
+                    ('__sls__', 'users'), ('__env__', 'base')])
+            high_data['missing'] = OrderedDict([
+                ('test', ['succeed_without_changes',
+                          {'require': [{'test': 'nonexistent'}]}]),
+                ('__sls__', 'users'), ('__env__', 'base')])
+            minion_opts = self.get_temp_config('minion')
+            state_obj = salt.state.State(minion_opts)
+            ret = state_obj.call_high(high_data)
+            for tag, data in six.iteritems(ret):
+                if '_|-missing_|-' in tag:
+                    self.assertFalse(data['result'])
+                    self.assertIn('requisites were not found', data['comment'])
+                else:
+                    self.assertTrue(data['result'], tag)
+
+    def test_chunk_index_matches_fnmatch(self):
+        '''
+        Test the ChunkIndex returns the same chunks as fnmatch over all chunks
+        '''
+        chunks = [
+            {'state': 'file', '__id__': 'a', 'name': '/tmp/a', '__sls__': 'web.a'},
+            {'state': 'pkg', '__id__': 'b', 'name': 'nginx', '__sls__': 'web.b'},
+            {'state': 'file', '__id__': 'nginx', 'name': '/etc/nginx', '__sls__': 'web.b'},
+            {'state': 'service', '__id__': 'c', 'name': 'nginx', '__sls__': 'other'},
+        ]
+        index = salt.state.ChunkIndex(chunks)
+        self.assertEqual(index.match('id', 'nginx'), chunks[1:])
+        self.assertEqual(index.match('pkg', 'nginx'), [chunks[1]])
+        self.assertEqual(index.match('file', 'nginx'), [chunks[2]])
+        self.assertEqual(index.match('file', '/tmp/a'), [chunks[0]])
+        self.assertEqual(index.match('sls', 'web.b'), chunks[1:3])
+        self.assertEqual(index.match('sls', 'web.*'), chunks[:3])
+        self.assertEqual(index.match('id', '*a'), [chunks[0]])
+        self.assertEqual(index.match('id', 'missing'), [])
+
+    def test_chunk_index_non_string_requisite(self):
+        '''
+        Test a requisite value which is not a string matches no chunk
+        '''
+        chunks = [
+            {'state': 'file', '__id__': 'a', 'name': '/tmp/a', '__sls__': 'web.a'},
+        ]
+        index = salt.state.ChunkIndex(chunks)
+        self.assertEqual(index.match('sls', 5), [])
+        self.assertEqual(index.match('file', 5), [])
+        self.assertEqual(index.match('id', {'a': 'b'}), [])
+        self.assertEqual(index.match('file', ['/tmp/a']), [])
+
+    def test_non_string_sls_requisite_not_found(self):
+        '''
+        Test an sls requisite with a value which is not a string is reported
+        as not found
+        '''
+        with patch('salt.state.State._gather_pillar'):
+            high_data = OrderedDict([
+                ('dep', OrderedDict([
+                    ('test', ['succeed_without_changes']),
+                    ('__sls__', 'deps'), ('__env__', 'base')])),
+                ('use', OrderedDict([
+                    ('test', ['succeed_without_changes',
+                              {'require': [{'sls': 5}]}]),
+                    ('__sls__', 'users'), ('__env__', 'base')])),
+            ])
+            minion_opts = self.get_temp_config('minion')
+            state_obj = salt.state.State(minion_opts)
+            ret = state_obj.call_high(high_data)
+            for tag, data in six.iteritems(ret):
+                if '_|-use_|-' in tag:
+                    self.assertFalse(data['result'])
+                    self.assertIn('requisites were not found', data['comment'])
+                else:
+                    self.assertTrue(data['result'], tag)
+
 
 class HighStateTestCase(TestCase, AdaptedConfigurationTestCaseMixin):
     def setUp(self):
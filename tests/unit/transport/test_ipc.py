@@ -154,3 +154,88 @@ class IPCMessageClient(BaseIPCReqCase):
         self.channel.send({'stop': True})
         self.wait()
         self.assertEqual(self.payloads[:-1], [None, None, 'foo', 'foo'])
+
+
+@skipIf(salt.utils.platform.is_windows(), 'Windows does not support Posix IPC')
+class IPCMessagePubSubCase(tornado.testing.AsyncTestCase):
+    '''
+    Test the subscriptions and high-water mark of the IPC publisher
+    '''
+    def setUp(self):
+        super(IPCMessagePubSubCase, self).setUp()
+        self.socket_path = os.path.join(TMP, 'ipc_pub_test.ipc')
+        self.pub_channel = salt.transport.ipc.IPCMessagePublisher(
+            {'ipc_write_buffer': 0},
+            self.socket_path,
+            io_loop=self.io_loop,
+        )
+        self.pub_channel.start()
+        self.sub_channel = salt.transport.ipc.IPCMessageSubscriber(
+            socket_path=self.socket_path,
+            io_loop=self.io_loop,
+        )
+        self.received = []
+
+    def tearDown(self):
+        self.sub_channel.close()
+        self.pub_channel.close()
+        os.unlink(self.socket_path)
+        del self.pub_channel
+        del self.sub_channel
+        super(IPCMessagePubSubCase, self).tearDown()
+
+    @tornado.gen.coroutine
+    def _connect(self):
+        yield self.sub_channel.connect()
+        self.io_loop.spawn_callback(self.sub_channel.read_async, self.received.append)
+        for _ in range(50):
+            if self.pub_channel.streams:
+                break
+            yield tornado.gen.sleep(0.01)
+
+    @tornado.gen.coroutine
+    def _wait_for(self, condition):
+        for _ in range(100):
+            if condition():
+                break
+            yield tornado.gen.sleep(0.01)
+
+    @tornado.gen.coroutine
+    def _wait_for_pending(self):
+        yield self._wait_for(
+            lambda: not any(six.itervalues(self.pub_channel.pending)))
+
+    @tornado.testing.gen_test
+    def test_subscribe(self):
+        self.sub_channel.subscribe(['salt/job/', 'salt/auth'])
+        yield self._connect()
+        yield self._wait_for(lambda: self.pub_channel.filters)
+        for tag in ('salt/auth', 'salt/key', 'salt/job/123/ret/web1', 'minion_start'):
+            self.pub_channel.publish(tag, tag=tag)
+        # Messages without a tag are sent to everyone
+        self.pub_channel.publish('untagged')
+        yield self._wait_for(lambda: len(self.received) == 3)
+        self.assertEqual(self.received, ['salt/auth', 'salt/job/123/ret/web1', 'untagged'])
+
+        self.sub_channel.subscribe(None)
+        yield self._wait_for(lambda: not self.pub_channel.filters)
+        self.pub_channel.publish('salt/key', tag='salt/key')
+        yield self._wait_for(lambda: len(self.received) == 4)
+        self.assertEqual(self.received[-1], 'salt/key')
+
+    @tornado.testing.gen_test
+    def test_high_water_mark(self):
+        self.pub_channel.hwm = 2
+        yield self._connect()
+        stream = next(iter(self.pub_channel.streams))
+        # Pretend the subscriber has not read the last two messages yet
+        self.pub_channel.pending[stream] = 2
+        self.pub_channel.publish('dropped')
+        self.pub_channel.publish('dropped')
+        self.assertEqual(self.pub_channel.drops[stream], 2)
+        self.pub_channel.pending[stream] = 0
+        self.pub_channel.publish('sent')
+        self.assertEqual(self.pub_channel.drops[stream], 0)
+        yield self._wait_for(lambda: self.received)
+        yield self._wait_for_pending()
+        self.assertEqual(self.received, ['sent'])
@@ -5,7 +5,10 @@
 
 # Import python libs
 from __future__ import absolute_import, print_function, unicode_literals
+import hashlib
 import os
+import shutil
+import tempfile
 import time
 import threading
 
@@ -16,6 +19,7 @@ except ImportError:
     from distro import linux_distribution
 
 # Import 3rd-party libs
+import zmq
 import zmq.eventloop.ioloop
 # support pyzmq 13.0.x, TODO: remove once we force people to 14.0.x
 if not hasattr(zmq.eventloop.ioloop, 'ZMQIOLoop'):
@@ -25,16 +29,23 @@ import tornado.gen
 
 # Import Salt libs
 import salt.config
+import salt.crypt
+import salt.daemons.masterapi
+import salt.master
+import salt.payload
 from salt.ext import six
+import salt.utils.files
 import salt.utils.process
+import salt.utils.stringutils
 import salt.transport.server
 import salt.transport.client
+import salt.transport.zeromq
 import salt.exceptions
 from salt.ext.six.moves import range
 from salt.transport.zeromq import AsyncReqMessageClientPool
 
 # Import test support libs
-from tests.support.paths import TMP_CONF_DIR
+from tests.support.paths import TMP, TMP_CONF_DIR
 from tests.support.unit import TestCase, skipIf
 from tests.support.helpers import flaky, get_unused_localhost_port
 from tests.support.mixins import AdaptedConfigurationTestCaseMixin
@@ -338,3 +349,241 @@ class ZMQConfigTest(TestCase):
             assert salt.transport.zeromq._get_master_uri(master_ip=m_ip,
                                                          master_port=m_port,
                                                          source_port=s_port) == 'tcp://0.0.0.0:{0};{1}:{2}'.format(s_port, m_ip, m_port)
+
+
+class ZMQPubServerChannelPushTest(TestCase):
+    '''
+    Test the connection from the master workers to the publish daemon
+    '''
+    def setUp(self):
+        self.opts = {'sock_dir': TMP_CONF_DIR, 'ipc_mode': 'ipc'}
+        with patch('salt.utils.minions.CkMinions', MagicMock()):
+            self.chan = salt.transport.zeromq.ZeroMQPubServerChannel(self.opts)
+        self.chan._pack_load = lambda load: load['fun']
+
+    def test_connection_is_reused(self):
+        context = MagicMock()
+        with patch('salt.transport.zeromq.zmq.Context', context):
+            self.chan.publish({'fun': 'test.ping'})
+            self.chan.publish({'fun': 'test.arg'})
+        self.assertEqual(context.call_count, 1)
+        sock = context.return_value.socket.return_value
+        sock.connect.assert_called_once_with(
+            'ipc://{0}'.format(os.path.join(TMP_CONF_DIR, 'publish_pull.ipc')))
+        self.assertEqual(sock.send_multipart.call_args_list,
+                         [((['test.ping'],),), ((['test.arg'],),)])
+
+    def test_publish_batch(self):
+        context = MagicMock()
+        with patch('salt.transport.zeromq.zmq.Context', context):
+            self.chan.publish_batch([{'fun': 'test.ping'}, {'fun': 'test.arg'}])
+            self.chan.publish_batch([])
+        sock = context.return_value.socket.return_value
+        sock.send_multipart.assert_called_once_with(['test.ping', 'test.arg'])
+
+    def test_reconnect_on_error(self):
+        context = MagicMock()
+        bad_sock, good_sock = MagicMock(), MagicMock()
+        bad_sock.send_multipart.side_effect = zmq.ZMQError()
+        context.return_value.socket.side_effect = [bad_sock, good_sock]
+        with patch('salt.transport.zeromq.zmq.Context', context):
+            self.chan.publish({'fun': 'test.ping'})
+        bad_sock.close.assert_called_once_with()
+        good_sock.send_multipart.assert_called_once_with(['test.ping'])
+
+    def test_no_reuse_after_fork(self):
+        context = MagicMock()
+        with patch('salt.transport.zeromq.zmq.Context', context):
+            self.chan.publish({'fun': 'test.ping'})
+            with patch('os.getpid', MagicMock(return_value=-1)):
+                self.chan.publish({'fun': 'test.ping'})
+        self.assertEqual(context.call_count, 2)
+        context.return_value.socket.return_value.close.assert_not_called()
+
+
+class ZMQPubServerChannelCryptoTest(TestCase):
+    '''
+    Test the encryption of published loads
+    '''
+    def setUp(self):
+        self.opts = {'sock_dir': TMP_CONF_DIR, 'sign_pub_messages': False,
+                     'master_stats': True, 'zmq_filtering': False}
+        self.secrets = {'aes': {'secret': MagicMock(value=salt.crypt.Crypticle.generate_key_string())}}
+        patcher = patch.dict(salt.master.SMaster.secrets, self.secrets)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        with patch('salt.utils.minions.CkMinions', MagicMock()):
+            self.chan = salt.transport.zeromq.ZeroMQPubServerChannel(self.opts)
+
+    def test_crypticle_reused_until_key_rotation(self):
+        crypticle = self.chan.crypticle
+        self.assertIs(self.chan.crypticle, crypticle)
+        self.secrets['aes']['secret'].value = salt.crypt.Crypticle.generate_key_string()
+        self.assertIsNot(self.chan.crypticle, crypticle)
+        self.assertEqual(self.chan.crypticle.key_string, self.secrets['aes']['secret'].value)
+
+    def test_crypto_stats(self):
+        load = {'fun': 'test.ping', 'tgt': '*', 'tgt_type': 'glob'}
+        payload = self.chan._encrypt_publish(load)
+        self.assertEqual(self.chan.crypticle.loads(payload['load']), load)
+        self.chan._encrypt_publish(load)
+        stats = self.chan.pop_crypto_stats()
+        self.assertEqual(list(stats), ['encrypt'])
+        self.assertEqual(stats['encrypt']['runs'], 2)
+        self.assertEqual(self.chan.pop_crypto_stats(), {})
+
+
+class ZMQAuthQueueTest(TestCase):
+    '''
+    Test the admission of sign ins to the auth workers
+    '''
+    def test_admit(self):
+        queue = salt.transport.zeromq.AuthQueue({'auth_queue_size': 2})
+        self.assertTrue(queue.admit([b'minion1', b'']))
+        self.assertTrue(queue.admit([b'minion2', b'']))
+        self.assertFalse(queue.admit([b'minion3', b'']))
+        queue.done([b'minion1', b''])
+        self.assertTrue(queue.admit([b'minion3', b'']))
+        # Requests which were never answered make room after a while
+        queue.pending[(b'minion2', b'')] -= queue.STALE + 1
+        self.assertTrue(queue.admit([b'minion4', b'']))
+        self.assertEqual(len(queue.pending), 2)
+        self.assertEqual(queue.stats['admitted'], 4)
+        self.assertEqual(queue.stats['rejected'], 1)
+        self.assertEqual(queue.stats['answered'], 1)
+        self.assertEqual(queue.stats['max_depth'], 2)
+
+    def test_report(self):
+        opts = {'auth_queue_size': 2, 'master_stats': True,
+                'master_stats_event_iter': 60, 'sock_dir': TMP_CONF_DIR}
+        queue = salt.transport.zeromq.AuthQueue(opts)
+        queue.event = MagicMock()
+        queue.admit([b'minion1', b''])
+        queue.report()
+        queue.event.fire_event.assert_not_called()
+        queue.clock -= 61
+        queue.report()
+        data, tag = queue.event.fire_event.call_args[0]
+        self.assertEqual(tag, 'salt/stats/MWorkerQueue')
+        self.assertEqual(data['stats']['auth_queue']['admitted'], 1)
+        self.assertEqual(data['stats']['auth_queue']['depth'], 1)
+        self.assertEqual(queue.stats['admitted'], 0)
+
+    def test_is_auth_request(self):
+        serial = salt.payload.Serial({})
+        chan = salt.transport.zeromq.ZeroMQReqServerChannel
+        self.assertTrue(chan._is_auth_request(serial, serial.dumps(
+            {'enc': 'clear', 'load': {'cmd': '_auth', 'id': 'minion'}})))
+        self.assertFalse(chan._is_auth_request(serial, serial.dumps(
+            {'enc': 'clear', 'load': {'cmd': 'publish', 'arg': ['_auth']}})))
+        self.assertFalse(chan._is_auth_request(serial, serial.dumps(
+            {'enc': 'aes', 'load': b'...'})))
+        self.assertFalse(chan._is_auth_request(serial, b'_auth garbage'))
+
+    def test_recv_ready(self):
+        sock = MagicMock()
+        sock.recv_multipart.side_effect = [[b'a'], [b'b'], zmq.Again()]
+        chan = salt.transport.zeromq.ZeroMQReqServerChannel
+        self.assertEqual(list(chan._recv_ready(sock)), [[b'a'], [b'b']])
+        # A busy socket yields to the others after a batch
+        sock.recv_multipart.side_effect = [[b'a'], [b'b'], [b'c']]
+        self.assertEqual(list(chan._recv_ready(sock, limit=2)), [[b'a'], [b'b']])
+
+
+class ZMQReqServerChannelSessionTest(TestCase):
+    '''
+    Test the resumption of auth sessions
+    '''
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=TMP)
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.opts = {'pki_dir': self.tmp_dir, 'cachedir': self.tmp_dir,
+                     'sock_dir': TMP_CONF_DIR, 'publish_port': 4505,
+                     'auth_session_ttl': 3600, 'auth_events': False}
+        self.secrets = {'aes': {'secret': MagicMock(value=salt.crypt.Crypticle.generate_key_string())}}
+        patcher = patch.dict(salt.master.SMaster.secrets, self.secrets)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.chan = salt.transport.zeromq.ZeroMQReqServerChannel(self.opts)
+        self.chan.serial = salt.payload.Serial(self.opts)
+        self.pub = 'minion public key'
+        os.makedirs(os.path.join(self.tmp_dir, 'minions'))
+        with salt.utils.files.fopen(os.path.join(self.tmp_dir, 'minions', 'minion'), 'w') as fp_:
+            fp_.write(self.pub)
+        self.key = salt.crypt.Crypticle.generate_key_string()
+        self._write_session(time.time() + 60)
+
+    def _write_session(self, expires):
+        os.makedirs(os.path.join(self.tmp_dir, 'auth_sessions'))
+        with salt.utils.files.fopen(self.chan._session_path('minion'), 'wb') as fp_:
+            fp_.write(self.chan.serial.dumps({
+                'key': self.key,
+                'pub': hashlib.sha256(salt.utils.stringutils.to_bytes(self.pub)).hexdigest(),
+                'expires': expires}))
+
+    def _load(self, key=None, pub=None):
+        return {'cmd': '_auth', 'id': 'minion', 'pub': pub or self.pub,
+                'resume': {'nonce': 'abc',
+                           'proof': salt.crypt.session_proof(key or self.key, 'minion', 'abc')}}
+
+    def test_resume(self):
+        ret = self.chan._resume_session(self._load())
+        self.assertEqual(ret['enc'], 'pub')
+        self.assertEqual(
+            salt.crypt.Crypticle(self.opts, self.key).loads(ret['resume']),
+            {'aes': self.secrets['aes']['secret'].value, 'nonce': 'abc'})
+
+    def test_bad_proof(self):
+        key = salt.crypt.Crypticle.generate_key_string()
+        self.assertIsNone(self.chan._resume_session(self._load(key=key)))
+
+    def test_key_changed(self):
+        self.assertIsNone(self.chan._resume_session(self._load(pub='another key')))
+        os.remove(os.path.join(self.tmp_dir, 'minions', 'minion'))
+        self.assertIsNone(self.chan._resume_session(self._load()))
+
+    def test_expired(self):
+        shutil.rmtree(os.path.join(self.tmp_dir, 'auth_sessions'))
+        self._write_session(time.time() - 1)
+        self.assertIsNone(self.chan._resume_session(self._load()))
+
+    def test_session_signed(self):
+        master_key = salt.crypt.RSA.generate(2048)
+        minion_key = salt.crypt.RSA.generate(2048)
+        with salt.utils.files.fopen(os.path.join(self.tmp_dir, 'minion_master.pub'), 'wb') as fp_:
+            fp_.write(master_key.publickey().exportKey('PEM'))
+        self.chan.master_key = MagicMock(key=master_key)
+        ret = {}
+        self.chan._new_session({'id': 'minion', 'pub': self.pub},
+                               minion_key.publickey(), ret)
+        auth = MagicMock(opts=self.opts, mpub='minion_master.pub')
+        auth.get_keys.return_value = minion_key
+        aes = self.secrets['aes']['secret'].value
+        with patch.dict(salt.crypt.AsyncAuth.sessions, clear=True):
+            salt.crypt.AsyncAuth.save_session(auth, ret, aes)
+            self.assertEqual(len(salt.crypt.AsyncAuth.sessions), 1)
+            # A session key which was not sent by the master is rejected
+            ret['session'] = salt.crypt.PKCS1_OAEP.new(minion_key.publickey()).encrypt(
+                salt.utils.stringutils.to_bytes(salt.crypt.Crypticle.generate_key_string()))
+            salt.crypt.AsyncAuth.save_session(auth, ret, aes)
+            self.assertEqual(salt.crypt.AsyncAuth.sessions, {})
+            # And so is a session without a signature
+            del ret['session_sig']
+            salt.crypt.AsyncAuth.save_session(auth, ret, aes)
+            self.assertEqual(salt.crypt.AsyncAuth.sessions, {})
+
+    def test_clean_auth_sessions(self):
+        session_dir = os.path.join(self.tmp_dir, 'auth_sessions')
+        with salt.utils.files.fopen(os.path.join(session_dir, 'old'), 'wb') as fp_:
+            fp_.write(self.chan.serial.dumps({'expires': time.time() - 1}))
+        with salt.utils.files.fopen(os.path.join(session_dir, 'broken'), 'wb') as fp_:
+            fp_.write(b'garbage')
+        salt.daemons.masterapi.clean_auth_sessions(self.opts)
+        self.assertEqual(os.listdir(session_dir), ['minion'])
+        self.assertIsNotNone(self.chan._resume_session(self._load()))
+
+    def test_remove_auth_session(self):
+        salt.daemons.masterapi.remove_auth_session(self.opts, 'minion')
+        self.assertFalse(os.path.exists(self.chan._session_path('minion')))
+        # Removing a session which is gone already is fine
+        salt.daemons.masterapi.remove_auth_session(self.opts, 'minion')
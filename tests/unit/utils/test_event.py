@@ -11,6 +11,9 @@
 from __future__ import absolute_import, unicode_literals, print_function
 import os
 import hashlib
+import shutil
+import signal
+import tempfile
 import time
 from tornado.testing import AsyncTestCase
 import zmq
@@ -23,6 +26,7 @@ from multiprocessing import Process
 
 # Import Salt Testing libs
 from tests.support.unit import expectedFailure, skipIf, TestCase
+from tests.support.mock import MagicMock, call, patch
 
 # Import salt libs
 import salt.utils.event
@@ -277,6 +281,22 @@ class TestSaltEvent(TestCase):
             self.assertGotEvent(evt2, {'data': 'foo2'})
             self.assertGotEvent(evt1, {'data': 'foo1'})
 
+    def test_event_subscribe_prefixes(self):
+        '''Test the publisher only sends events of the subscribed prefixes'''
+        with eventpublisher_process():
+            me1 = salt.utils.event.MasterEvent(SOCK_DIR, listen=True)
+            me1.subscribe_prefixes(['salt/job/'])
+            me2 = salt.utils.event.MasterEvent(SOCK_DIR, listen=True)
+            # Give the publisher time to process the subscription
+            time.sleep(0.5)
+            me2.fire_event({'data': 'foo1'}, 'salt/auth')
+            me2.fire_event({'data': 'foo2'}, 'salt/job/123/ret/web1')
+            evt1 = me1.get_event(tag='', full=True)
+            self.assertEqual(evt1['tag'], 'salt/job/123/ret/web1')
+            self.assertGotEvent(evt1['data'], {'data': 'foo2'})
+            evt2 = me2.get_event(tag='', full=True)
+            self.assertEqual(evt2['tag'], 'salt/auth')
+
     def test_event_multiple_clients(self):
         '''Test event is received by multiple clients'''
         with eventpublisher_process():
@@ -366,3 +386,93 @@ class TestAsyncEventPublisher(AsyncTestCase):
         self.assertEqual(self.tag, 'evt1')
         self.data.pop('_stamp')  # drop the stamp
         self.assertEqual(self.data, {'data': 'foo1'})
+
+
+class TestEventReturn(TestCase):
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp(dir=integration.TMP)
+        self.opts = {
+            'cachedir': self.cachedir,
+            'event_return': 'test',
+            'event_return_queue': 2,
+            'event_return_queue_max_size': 4,
+            'event_return_queue_max_seconds': 0,
+            'event_return_spill': True,
+        }
+        with patch('salt.minion.MasterMinion', MagicMock()):
+            self.evr = salt.utils.event.EventReturn(self.opts)
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir, ignore_errors=True)
+        del self.evr
+
+    def test_buffer_drops_oldest(self):
+        '''Test a full returner buffer drops and counts its oldest events'''
+        buf = salt.utils.event.EventReturnBuffer('test', 2, 3, 0)
+        for num in range(5):
+            buf.put({'tag': num})
+        self.assertEqual(buf.take(), [{'tag': 2}, {'tag': 3}])
+        stats = buf.stats()
+        self.assertEqual(stats['dropped'], 2)
+        self.assertEqual(stats['queue_depth'], 1)
+        buf.stop()
+        self.assertEqual(buf.take(), [{'tag': 4}])
+        self.assertIsNone(buf.take())
+
+    def test_buffer_max_seconds(self):
+        '''Test a partial batch is flushed once its oldest event is too old'''
+        buf = salt.utils.event.EventReturnBuffer('test', 10, 20, 1)
+        buf.put({'tag': 'a'})
+        with buf.cond:
+            self.assertFalse(buf.ready())
+            buf.events[0] = (time.time() - 2, buf.events[0][1])
+            self.assertTrue(buf.ready())
+
+    def test_spill_and_replay(self):
+        '''Test failed batches are spilled and replayed after a success'''
+        buf = self.evr.buffers[0]
+        returner = MagicMock(side_effect=[Exception('down'), None, None])
+        self.evr._flush_event_single(buf, returner, [{'tag': 'a'}])
+        self.assertEqual(buf.spill_files, 1)
+        self.assertEqual(len(self.evr._spill_files(buf)), 1)
+
+        self.evr._flush_event_single(buf, returner, [{'tag': 'b'}])
+        self.assertEqual(returner.call_args_list[1][0][0], [{'tag': 'b'}])
+        self.assertEqual(returner.call_args_list[2][0][0], [{'tag': 'a'}])
+        self.assertEqual(self.evr._spill_files(buf), [])
+        stats = buf.stats()
+        self.assertEqual(stats['failures'], 1)
+        self.assertEqual(stats['spilled'], 1)
+        self.assertEqual(stats['replayed'], 1)
+        self.assertEqual(stats['flushed'], 2)
+        self.assertIn('flush_latency', stats)
+
+    def test_one_worker_per_returner(self):
+        '''Test each returner is flushed by a single worker thread'''
+        returner = MagicMock()
+        self.evr.minion.returners = {'test.event_return': returner}
+        self.evr.start_workers()
+        self.assertEqual([worker.name for worker in self.evr.workers],
+                         ['EventReturn-test'])
+        for num in range(4):
+            self.evr.buffers[0].put({'tag': num})
+        self.evr.stop_workers()
+        self.assertEqual(self.evr.workers, [])
+        self.assertEqual(returner.call_args_list,
+                         [call([{'tag': 0}, {'tag': 1}]),
+                          call([{'tag': 2}, {'tag': 3}])])
+
+    def test_signal_stops_main_loop(self):
+        '''Test the signal handler leaves the flush to the main loop'''
+        with patch.object(self.evr, 'stop_workers') as stop_workers:
+            self.evr._handle_signals(signal.SIGTERM, None)
+        self.assertTrue(self.evr.stop)
+        stop_workers.assert_not_called()
+
+    def test_stop_spills_unflushed(self):
+        '''Test events still queued at shutdown are spilled to disk'''
+        buf = self.evr.buffers[0]
+        buf.put({'tag': 'a'})
+        self.evr.stop_workers(timeout=0)
+        self.assertEqual(buf.stats()['queue_depth'], 0)
+        self.assertEqual(len(self.evr._spill_files(buf)), 1)
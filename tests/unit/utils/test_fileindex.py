@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+from __future__ import absolute_import, unicode_literals
+import os
+import shutil
+import tempfile
+import time
+
+# Import Salt Libs
+import salt.utils.fileindex
+import salt.utils.files
+
+# Import Salt Testing Libs
+from tests.support.paths import TMP
+from tests.support.unit import TestCase, skipIf
+
+
+class FileListIndexTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=TMP)
+        self.root = os.path.join(self.tmp_dir, 'root')
+        os.makedirs(os.path.join(self.root, 'a', 'b'))
+        os.makedirs(os.path.join(self.root, 'empty'))
+        for path in ('top.sls', 'a/x.sls', 'a/b/y.sls'):
+            self._touch(path)
+        self.opts = {
+            'cachedir': self.tmp_dir,
+            'file_roots': {'base': [self.root]},
+            'fileserver_ignoresymlinks': False,
+            'fileserver_followsymlinks': True,
+            'file_ignore_regex': [],
+            'file_ignore_glob': [],
+        }
+        self.index = salt.utils.fileindex.FileListIndex(self.opts, 'base')
+        self.index.build()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _touch(self, path):
+        with salt.utils.files.fopen(os.path.join(self.root, path), 'w'):
+            pass
+
+    def _snapshot(self):
+        self.index.write()
+        return salt.utils.fileindex.FileListSnapshot(
+            salt.utils.fileindex.snapshot_path(self.opts, 'base'))
+
+    def test_build(self):
+        lists = self.index.lists()
+        self.assertEqual(sorted(lists['files']),
+                         ['a/b/y.sls', 'a/x.sls', 'top.sls'])
+        self.assertEqual(sorted(lists['dirs']), ['a', 'a/b', 'empty'])
+        self.assertEqual(sorted(lists['empty_dirs']), ['empty'])
+
+    def test_refresh_reads_changed_dirs(self):
+        # Make sure the directory mtimes change
+        time.sleep(0.01)
+        self._touch('empty/new.sls')
+        os.makedirs(os.path.join(self.root, 'c', 'd'))
+        self._touch('c/d/z.sls')
+        shutil.rmtree(os.path.join(self.root, 'a', 'b'))
+        self.assertTrue(self.index.refresh())
+        lists = self.index.lists()
+        self.assertEqual(sorted(lists['files']),
+                         ['a/x.sls', 'c/d/z.sls', 'empty/new.sls', 'top.sls'])
+        self.assertEqual(sorted(lists['dirs']), ['a', 'c', 'c/d', 'empty'])
+        self.assertEqual(lists['empty_dirs'], set())
+        self.assertFalse(self.index.refresh())
+
+    def test_snapshot_prefix_query(self):
+        snapshot = self._snapshot()
+        try:
+            self.assertEqual(snapshot.query('files'),
+                             ['a/b/y.sls', 'a/x.sls', 'top.sls'])
+            self.assertEqual(snapshot.query('files', 'a/'),
+                             ['a/b/y.sls', 'a/x.sls'])
+            self.assertEqual(snapshot.query('files', 'a/b'), ['a/b/y.sls'])
+            self.assertEqual(snapshot.query('files', 'nope'), [])
+            self.assertEqual(snapshot.query('empty_dirs'), ['empty'])
+            self.assertTrue(snapshot.is_current())
+            self._snapshot().close()
+            self.assertFalse(snapshot.is_current())
+        finally:
+            snapshot.close()
+
+    @skipIf(not hasattr(os, 'symlink'), 'symlinks are not supported')
+    def test_snapshot_links(self):
+        os.symlink('x.sls', os.path.join(self.root, 'a', 'link.sls'))
+        self.index.refresh([os.path.join(self.root, 'a')])
+        snapshot = self._snapshot()
+        try:
+            self.assertEqual(snapshot.query('links'), {'a/link.sls': 'x.sls'})
+            self.assertEqual(snapshot.query('links', 'top'), {})
+        finally:
+            snapshot.close()
+
+    def test_large_snapshot_prefix_query(self):
+        path = os.path.join(self.tmp_dir, 'large.idx')
+        salt.utils.fileindex.write_snapshot(path, {
+            'files': set('f{0:05d}'.format(num) for num in range(5000)),
+            'dirs': set(), 'empty_dirs': set(), 'links': {}})
+        snapshot = salt.utils.fileindex.FileListSnapshot(path)
+        try:
+            self.assertEqual(
+                snapshot.query('files', 'f012'),
+                ['f{0:05d}'.format(num) for num in range(1200, 1300)])
+            self.assertEqual(snapshot.query('files', 'f04999'), ['f04999'])
+            self.assertEqual(snapshot.query('files', 'f1'), [])
+            self.assertEqual(len(snapshot.query('files')), 5000)
+        finally:
+            snapshot.close()
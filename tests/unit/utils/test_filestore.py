@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+from __future__ import absolute_import, unicode_literals
+import os
+import shutil
+import tempfile
+
+# Import Salt Libs
+import salt.utils.filestore
+import salt.utils.files
+import salt.utils.hashutils
+
+# Import Salt Testing Libs
+from tests.support.paths import TMP
+from tests.support.unit import skipIf, TestCase
+
+
+class FileStoreTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=TMP)
+        self.store = salt.utils.filestore.FileStore(
+            os.path.join(self.tmp_dir, 'file_store'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmp_dir, name)
+        with salt.utils.files.fopen(path, 'w') as fp_:
+            fp_.write(content)
+        return path, {'hsum': salt.utils.hashutils.get_hash(path, 'sha256'),
+                      'hash_type': 'sha256'}
+
+    def test_add_and_link(self):
+        path, hash_server = self._write('base_file', 'same content')
+        dest = os.path.join(self.tmp_dir, 'dev_file')
+        self.assertFalse(self.store.link(hash_server, dest))
+        self.store.add(path, hash_server)
+        self.assertTrue(self.store.link(hash_server, dest))
+        with salt.utils.files.fopen(dest) as fp_:
+            self.assertEqual(fp_.read(), 'same content')
+        if hasattr(os, 'link'):
+            self.assertTrue(os.path.samefile(path, dest))
+
+    def test_add_bad_download(self):
+        path, hash_server = self._write('file', 'content')
+        with salt.utils.files.fopen(path, 'w') as fp_:
+            fp_.write('truncated')
+        self.store.add(path, hash_server)
+        self.assertFalse(os.path.exists(self.store.path(hash_server)))
+
+    def test_evict(self):
+        self.store.max_size = 10
+        old, old_hash = self._write('old', 'x' * 6)
+        new, new_hash = self._write('new', 'y' * 6)
+        self.store.add(old, old_hash)
+        os.remove(old)
+        os.utime(self.store.path(old_hash) + salt.utils.filestore.USED_SUFFIX,
+                 (1, 1))
+        self.store.add(new, new_hash)
+        os.remove(new)
+        self.store._size = None
+        self.store.evict()
+        self.assertFalse(os.path.exists(self.store.path(old_hash)))
+        self.assertFalse(os.path.exists(
+            self.store.path(old_hash) + salt.utils.filestore.USED_SUFFIX))
+        self.assertTrue(os.path.exists(self.store.path(new_hash)))
+
+    @skipIf(not hasattr(os, 'link'), 'Hard links are not supported')
+    def test_evict_linked(self):
+        self.store.max_size = 10
+        old, old_hash = self._write('old', 'x' * 6)
+        new, new_hash = self._write('new', 'y' * 6)
+        self.store.add(old, old_hash)
+        self.store.add(new, new_hash)
+        # Both are linked from the cache, so neither counts
+        self.assertTrue(os.path.exists(self.store.path(old_hash)))
+        self.assertTrue(os.path.exists(self.store.path(new_hash)))
+        # Using a stored file does not change the mtime of its links
+        os.utime(old, (1, 1))
+        self.assertTrue(self.store.link(old_hash, old))
+        self.assertEqual(os.path.getmtime(old), 1)
+        # Once unlinked from the cache, the least recently used one goes
+        os.utime(self.store.path(new_hash) + salt.utils.filestore.USED_SUFFIX,
+                 (1, 1))
+        os.remove(old)
+        os.remove(new)
+        self.store._size = None
+        self.store.evict()
+        self.assertFalse(os.path.exists(self.store.path(new_hash)))
+        self.assertTrue(os.path.exists(self.store.path(old_hash)))
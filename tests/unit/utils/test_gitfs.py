@@ -6,13 +6,20 @@ any remotes.
 
 # Import python libs
 from __future__ import absolute_import, unicode_literals, print_function
+import os
+import shutil
+import tempfile
+import threading
+import time
 
 # Import Salt Testing libs
+from tests.support.paths import TMP
 from tests.support.unit import skipIf, TestCase
 from tests.support.mock import MagicMock, patch, NO_MOCK, NO_MOCK_REASON
 
 # Import salt libs
 import salt.utils.gitfs
+import salt.utils.gitindex
 from salt.exceptions import FileserverConfigError
 
 # GLOBALS
@@ -90,3 +97,122 @@ class TestGitFSProvider(TestCase):
                                 role_class,
                                 *args,
                                 **kwargs)
+
+
+class FakeRemote(object):
+    '''
+    A remote which takes ``delay`` seconds to fetch
+    '''
+    def __init__(self, id_, delay=0, changed=False, error=None):
+        self.id = id_
+        self.delay = delay
+        self.changed = changed
+        self.error = error
+        self.done = threading.Event()
+
+    def fetch(self):
+        try:
+            time.sleep(self.delay)
+            if self.error:
+                raise Exception(self.error)
+            return self.changed
+        finally:
+            self.done.set()
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class TestGitFSFetchRemotes(TestCase):
+
+    def _gitfs(self, remotes, **opts):
+        with patch.object(salt.utils.gitfs.GitFS, 'verify_gitpython',
+                          MagicMock(return_value=True)), \
+                patch.object(salt.utils.gitfs.GitFS, 'verify_pygit2',
+                             MagicMock(return_value=False)), \
+                patch.dict(OPTS, {'gitfs_provider': 'gitpython'}):
+            gitfs = salt.utils.gitfs.GitFS(OPTS, {}, init_remotes=False)
+        gitfs.opts = dict(gitfs.opts, **opts)
+        gitfs.remotes = remotes
+        return gitfs
+
+    def test_fetch_remotes(self):
+        '''
+        Ensure that every remote is fetched and its result is kept, whether
+        they are fetched one after another or at the same time
+        '''
+        for workers in (1, 3):
+            gitfs = self._gitfs([FakeRemote('a'),
+                                 FakeRemote('b', changed=True),
+                                 FakeRemote('c', error='unreachable')],
+                                gitfs_fetch_workers=workers)
+            self.assertTrue(gitfs.fetch_remotes())
+            self.assertEqual(
+                dict((repo_id, (result['changed'], result.get('error')))
+                     for repo_id, result in gitfs.fetch_results.items()),
+                {'a': (False, None),
+                 'b': (True, None),
+                 'c': (False, 'unreachable')})
+            self.assertFalse(gitfs.fetch_remotes(remotes=[('a', None)]))
+            self.assertEqual(list(gitfs.fetch_results), ['a'])
+
+    def test_fetch_remotes_timeout(self):
+        '''
+        Ensure that a hung remote does not hold up the others, and that its
+        changes are reported once it finishes
+        '''
+        slow = FakeRemote('slow', delay=2, changed=True)
+        gitfs = self._gitfs([slow, FakeRemote('a'), FakeRemote('b')],
+                            gitfs_fetch_workers=2,
+                            gitfs_fetch_timeout=1)
+        start = time.time()
+        self.assertFalse(gitfs.fetch_remotes())
+        self.assertLess(time.time() - start, 2)
+        self.assertIn('error', gitfs.fetch_results['slow'])
+        self.assertNotIn('error', gitfs.fetch_results['a'])
+        self.assertNotIn('error', gitfs.fetch_results['b'])
+        slow.done.wait(5)
+        time.sleep(0.1)
+        slow.delay, slow.changed = 0, False
+        self.assertTrue(gitfs.fetch_remotes())
+
+
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class TestGitFSTreeIndexes(TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=TMP)
+        self.repo = object.__new__(salt.utils.gitfs.GitProvider)
+        self.repo.index_dir = os.path.join(self.tmp_dir, 'index')
+        self.repo.get_tree_sha = lambda tree: tree
+        self.repo.walk_tree = lambda tree: [
+            ('top.sls', 'blob', tree, 0o100644, None)]
+        patcher = patch.object(salt.utils.gitfs, '_TREE_INDEXES',
+                               salt.utils.gitfs.OrderedDict())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        del self.repo
+
+    def test_evicted_indexes_are_closed(self):
+        '''
+        Ensure that the tree indexes which drop out of the cache, or whose
+        tree is pruned, are closed
+        '''
+        with patch.object(salt.utils.gitfs, '_TREE_INDEXES_MAX', 2):
+            first = self.repo.get_tree_index('a' * 40)
+            self.assertIs(self.repo.get_tree_index('a' * 40), first)
+            with patch.object(salt.utils.gitindex.TreeIndex, 'close') \
+                    as close:
+                self.repo.get_tree_index('b' * 40)
+                close.assert_not_called()
+                self.repo.get_tree_index('c' * 40)
+                close.assert_called_once_with()
+                close.reset_mock()
+                with patch.object(self.repo, 'get_tree',
+                                  MagicMock(return_value='c' * 40)):
+                    self.repo.prune_tree_indexes(['base'])
+                close.assert_called_once_with()
+        self.assertEqual(list(salt.utils.gitfs._TREE_INDEXES),
+                         [os.path.join(self.repo.index_dir, 'c' * 40)])
+        self.assertEqual(os.listdir(self.repo.index_dir), ['c' * 40])
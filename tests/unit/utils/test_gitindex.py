@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+from __future__ import absolute_import, unicode_literals
+import os
+import shutil
+import tempfile
+
+# Import Salt Libs
+import salt.utils.files
+import salt.utils.gitindex
+
+# Import Salt Testing Libs
+from tests.support.paths import TMP
+from tests.support.unit import TestCase
+
+ENTRIES = [
+    ('top.sls', 'blob', 'a' * 40, 0o100644, None),
+    ('web', 'tree', 'b' * 40, 0o40000, None),
+    ('web/init.sls', 'blob', 'c' * 40, 0o100644, None),
+    ('web/files', 'tree', 'd' * 40, 0o40000, None),
+    ('web/files/nginx.conf', 'blob', 'e' * 40, 0o100644, None),
+    ('web/current.sls', 'link', 'f' * 40, 0o120000, 'init.sls'),
+    ('web-old/init.sls', 'blob', '1' * 40, 0o100644, None),
+]
+
+
+class TreeIndexTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=TMP)
+        self.path = os.path.join(self.tmp_dir, 'index', 'b' * 40)
+        salt.utils.gitindex.write(self.path, ENTRIES)
+        self.index = salt.utils.gitindex.TreeIndex(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def test_get(self):
+        self.assertEqual(len(self.index), len(ENTRIES))
+        self.assertEqual(
+            self.index.get('web/init.sls'),
+            salt.utils.gitindex.Entry('web/init.sls', 'blob', 'c' * 40,
+                                      0o100644, None))
+        self.assertEqual(self.index.get('web/current.sls').target, 'init.sls')
+        self.assertEqual(self.index.get('web').kind, 'tree')
+        self.assertIsNone(self.index.get('web/missing.sls'))
+        self.assertIsNone(self.index.get('we'))
+
+    def test_walk(self):
+        self.assertEqual(
+            [entry.path for entry in self.index.walk('web')],
+            ['web/current.sls', 'web/files', 'web/files/nginx.conf',
+             'web/init.sls'])
+        self.assertEqual(
+            [entry.path for entry in self.index.walk('web/files/')],
+            ['web/files/nginx.conf'])
+        self.assertEqual(len(list(self.index.walk())), len(ENTRIES))
+        self.assertEqual(list(self.index.walk('missing')), [])
+
+    def test_not_an_index(self):
+        path = os.path.join(self.tmp_dir, 'index', 'garbage')
+        with salt.utils.files.fopen(path, 'wb') as fp_:
+            fp_.write(b'\0' * 64)
+        self.assertRaises(ValueError, salt.utils.gitindex.TreeIndex, path)
+
+    def test_close(self):
+        self.index.close()
+        self.assertRaises(ValueError, self.index.get, 'top.sls')
+
+    def test_no_temp_files(self):
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ['b' * 40])
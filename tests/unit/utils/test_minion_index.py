@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+from __future__ import absolute_import, unicode_literals
+import os
+import shutil
+import tempfile
+
+# Import Salt Libs
+import salt.cache
+import salt.utils.data
+import salt.utils.files
+import salt.utils.minion_index
+import salt.utils.minions
+
+# Import Salt Testing Libs
+from tests.support.unit import TestCase
+from tests.support.mock import patch, MagicMock
+
+# Import 3rd-party libs
+from salt.ext import six
+
+MINION_DATA = {
+    'web1': {
+        'grains': {'os': 'Ubuntu', 'os_family': 'Debian', 'osrelease': '18.04',
+                   'roles': ['web', 'frontend'], 'num_cpus': 4,
+                   'ip_interfaces': {'eth0': ['10.0.0.1']},
+                   'disks': [{'name': 'sda', 'size': 100}],
+                   'virtual': 'physical'},
+        'pillar': {'app': {'env': 'prod', 'port': 8080}, 'tier': 'web:front'},
+    },
+    'web2': {
+        'grains': {'os': 'Ubuntu', 'os_family': 'Debian', 'osrelease': '16.04',
+                   'roles': ['web'], 'num_cpus': 2,
+                   'ip_interfaces': {'eth0': ['10.0.0.2'], 'eth1': []},
+                   'virtual': 'kvm'},
+        'pillar': {'app': {'env': 'staging', 'port': 8080}},
+    },
+    'db1': {
+        'grains': {'os': 'CentOS', 'os_family': 'RedHat', 'osrelease': '7.5',
+                   'roles': ['db'], 'num_cpus': 16, 'virtual': None},
+        'pillar': {'app': {'env': 'prod'}, 'tier': 'db'},
+    },
+}
+
+EXPRESSIONS = [
+    'os:Ubuntu', 'os:ubuntu', 'os:Ubu*', 'os:*', 'os_family:RedHat',
+    'osrelease:1?.04', 'roles:web', 'roles:0:web', 'roles:*end',
+    'num_cpus:16', 'ip_interfaces:eth0', 'ip_interfaces:eth0:10.0.0.*',
+    'ip_interfaces:eth1', 'ip_interfaces:eth*', 'disks:name:sda',
+    'virtual:none', 'missing:key', 'app:env:prod', 'app:port:8080', 'app:*',
+    'tier:web:front', 'tier:web:*',
+]
+
+
+class MinionIndexTestCase(TestCase):
+    '''
+    TestCase for salt.utils.minion_index
+    '''
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.opts = {'cachedir': self.cachedir}
+        self.data = dict(MINION_DATA)
+        self.cache = MagicMock()
+        self.cache.list.side_effect = lambda bank: sorted(self.data)
+        self.cache.fetch_many.side_effect = lambda bank_keys: dict(
+            ((bank, key), self.data.get(bank.split('/')[1]))
+            for bank, key in bank_keys)
+        self.cache.iter_many.side_effect = lambda bank_keys: \
+            six.get_unbound_function(salt.cache.Cache.iter_many)(
+                self.cache, bank_keys)
+        self.cache.list_with_data.side_effect = \
+            lambda bank, key: dict(self.data)
+        self.cache.updated.return_value = None
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir, ignore_errors=True)
+
+    def _build(self):
+        index = salt.utils.minion_index.MinionIndex(self.opts)
+        index.build(self.cache)
+        self.assertTrue(index.available())
+        return index
+
+    def _expected(self, search_type, expr, **kwargs):
+        return set(
+            minion_id for minion_id, data in self.data.items()
+            if salt.utils.data.subdict_match(data[search_type], expr, **kwargs)
+        )
+
+    def test_unavailable_before_build(self):
+        index = salt.utils.minion_index.MinionIndex(self.opts)
+        self.assertFalse(index.available())
+
+    def test_match_like_subdict_match(self):
+        index = self._build()
+        for search_type in salt.utils.minion_index.SEARCH_TYPES:
+            for expr in EXPRESSIONS:
+                for kwargs in ({}, {'exact_match': True}):
+                    self.assertEqual(
+                        index.match(search_type, expr, **kwargs),
+                        self._expected(search_type, expr, **kwargs),
+                        '{0} {1} {2}'.format(search_type, expr, kwargs))
+
+    def test_regex_match(self):
+        index = self._build()
+        for expr in ('os:(Ubuntu|CentOS)', 'osrelease:1[68]', 'roles:d.*'):
+            self.assertEqual(
+                index.match('grains', expr, regex_match=True),
+                self._expected('grains', expr, regex_match=True))
+
+    def test_custom_delimiter(self):
+        index = self._build()
+        self.assertEqual(index.match('pillar', 'app|env|prod', delimiter='|'),
+                         set(['web1', 'db1']))
+
+    def test_wildcard_key_is_unindexable(self):
+        index = self._build()
+        self.assertRaises(salt.utils.minion_index.Unindexable,
+                          index.match, 'grains', 'ip_interfaces:*:10.0.0.1')
+
+    def test_update_is_shared(self):
+        index = self._build()
+        other = salt.utils.minion_index.MinionIndex(self.opts)
+        self.assertTrue(other.available())
+
+        self.data['db1'] = {'grains': {'os': 'Ubuntu'}, 'pillar': {}}
+        index.update('db1', self.data['db1'])
+        self.assertTrue(other.available())
+        self.assertEqual(other.match('grains', 'os:Ubuntu'),
+                         set(['web1', 'web2', 'db1']))
+        self.assertEqual(other.match('grains', 'os:CentOS'), set())
+
+        del self.data['web2']
+        index.update('web2', None)
+        self.assertTrue(other.available())
+        self.assertEqual(other.match('grains', 'os:Ubuntu'),
+                         set(['web1', 'db1']))
+
+    def test_compaction(self):
+        index = self._build()
+        self.data['db1'] = {'grains': {'os': 'Ubuntu'}, 'pillar': {}}
+        index.update('db1', self.data['db1'])
+        generation = index.generation
+        index.build(self.cache)
+        self.assertEqual(index._current_generation(), generation + 1)
+
+        other = salt.utils.minion_index.MinionIndex(self.opts)
+        self.assertTrue(other.available())
+        self.assertEqual(other.offset, 0)
+        self.assertEqual(other.match('grains', 'os:Ubuntu'),
+                         set(['web1', 'web2', 'db1']))
+
+    def test_sync_indexes_new_minions(self):
+        index = self._build()
+        self.data['web3'] = {'grains': {'os': 'Ubuntu'}, 'pillar': {}}
+        self.assertEqual(index.sync(self.cache, ['web1', 'web3', 'gone']),
+                         set(['web1', 'web3']))
+        other = salt.utils.minion_index.MinionIndex(self.opts)
+        self.assertTrue(other.available())
+        self.assertIn('web3', other.match('grains', 'os:Ubuntu'))
+
+    def test_sync_does_not_check_indexed_minions(self):
+        index = self._build()
+        self.cache.fetch_many.reset_mock()
+        self.assertEqual(index.sync(self.cache, ['web1', 'web2']),
+                         set(['web1', 'web2']))
+        self.cache.updated.assert_not_called()
+        self.cache.contains.assert_not_called()
+        self.cache.fetch_many.assert_not_called()
+
+    def test_build_reindexes_stale_minions(self):
+        index = self._build()
+        generation = index.generation
+        self.data['web1'] = {'grains': {'os': 'CentOS'}, 'pillar': {}}
+        del self.data['web2']
+        indexed = int(index.minions['web1']['time'])
+        self.cache.contains.side_effect = \
+            lambda bank, key: bank.split('/')[1] in self.data
+        # Stored before the index was built, nothing to do
+        self.cache.updated.return_value = indexed - 1
+        self.data['web2'] = MINION_DATA['web2']
+        index.build(self.cache)
+        self.assertEqual(index._current_generation(), generation)
+        # Stored by a process which did not update the index, in the same
+        # second the minion was indexed in or later, or flushed
+        self.cache.updated.side_effect = \
+            lambda bank, key: indexed if bank == 'minions/web1' else indexed - 1
+        del self.data['web2']
+        index.build(self.cache)
+        self.assertEqual(index._current_generation(), generation + 1)
+        other = salt.utils.minion_index.MinionIndex(self.opts)
+        self.assertTrue(other.available())
+        self.assertEqual(other.match('grains', 'os:CentOS'),
+                         set(['web1', 'db1']))
+        self.assertEqual(other.match('grains', 'os:Ubuntu'), set())
+
+
+class CkMinionsIndexTestCase(TestCase):
+    '''
+    TestCase for the use of the minion data index by CkMinions
+    '''
+    def setUp(self):
+        self.cachedir = tempfile.mkdtemp()
+        self.opts = {'cachedir': self.cachedir,
+                     'minion_data_cache': True,
+                     'minion_data_index': True,
+                     'pki_dir': self.cachedir}
+        self.data = dict(MINION_DATA)
+        self.cache = MagicMock()
+        self.cache.list.side_effect = lambda bank: sorted(self.data)
+        self.cache.fetch_many.side_effect = lambda bank_keys: dict(
+            ((bank, key), self.data.get(bank.split('/')[1]))
+            for bank, key in bank_keys)
+        self.cache.iter_many.side_effect = lambda bank_keys: \
+            six.get_unbound_function(salt.cache.Cache.iter_many)(
+                self.cache, bank_keys)
+        self.cache.list_with_data.side_effect = \
+            lambda bank, key: dict(self.data)
+        self.cache.updated.return_value = None
+        with patch('salt.cache.factory', MagicMock(return_value=self.cache)):
+            self.ckminions = salt.utils.minions.CkMinions(self.opts)
+        self.ckminions.index.build(self.cache)
+        self.cache.fetch_many.reset_mock()
+
+    def tearDown(self):
+        shutil.rmtree(self.cachedir, ignore_errors=True)
+
+    def test_grain_target_from_index(self):
+        ret = self.ckminions._check_grain_minions('os:Ubuntu', ':', False)
+        self.assertEqual(sorted(ret['minions']), ['web1', 'web2'])
+        self.cache.fetch_many.assert_not_called()
+
+    def test_greedy_keeps_minions_without_data(self):
+        os.makedirs(os.path.join(self.cachedir, 'minions'))
+        for minion_id in ('db1', 'new', 'web1'):
+            with salt.utils.files.fopen(os.path.join(self.cachedir, 'minions', minion_id), 'w'):
+                pass
+        ret = self.ckminions._check_pillar_minions('app:env:prod', ':', True)
+        self.assertEqual(ret['minions'], ['db1', 'new', 'web1'])
+        self.cache.fetch_many.assert_not_called()
+
+    def test_unindexable_falls_back_to_cache(self):
+        ret = self.ckminions._check_grain_minions('ip_interfaces:*:10.0.0.2', ':', False)
+        self.assertEqual(ret['minions'], ['web2'])
+        self.assertTrue(self.cache.fetch_many.called)
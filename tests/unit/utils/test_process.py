@@ -6,6 +6,7 @@ import os
 import sys
 import time
 import signal
+import threading
 import multiprocessing
 import functools
 
@@ -212,6 +213,44 @@ class TestThreadPool(TestCase):
         self.assertEqual(pool._job_queue.qsize(), 1)
 
 
+class TestRunInThreads(TestCase):
+
+    def test_run_in_threads(self):
+        '''
+        Make sure the calls run at most ``workers`` at a time, and that the
+        ones which time out are reported and left out
+        '''
+        running = []
+        most = []
+        late = threading.Event()
+        reported = {}
+
+        def _call(delay, fail=False):
+            running.append(delay)
+            most.append(len(running))
+            time.sleep(delay)
+            running.remove(delay)
+            if fail:
+                raise ValueError('failed')
+            return delay
+
+        calls = [('a', functools.partial(_call, 0.1)),
+                 ('b', functools.partial(_call, 0.2, fail=True)),
+                 ('c', functools.partial(_call, 1.5)),
+                 ('d', functools.partial(_call, 0.1))]
+        ret = salt.utils.process.run_in_threads(
+            calls, 2, timeout=1,
+            on_timeout=lambda key, secs: reported.setdefault('timeout', key),
+            on_late=lambda key, val, exc: late.set())
+        self.assertEqual(sorted(ret), ['a', 'b', 'd'])
+        self.assertEqual(ret['a'][:2], (0.1, None))
+        self.assertIsNone(ret['b'][0])
+        self.assertEqual(ret['b'][1][0], ValueError)
+        self.assertEqual(reported, {'timeout': 'c'})
+        self.assertLessEqual(max(most), 2)
+        self.assertTrue(late.wait(5))
+
+
 class TestProcess(TestCase):
 
     @skipIf(NO_MOCK, NO_MOCK_REASON)
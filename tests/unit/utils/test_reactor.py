@@ -2,13 +2,17 @@
 
 from __future__ import absolute_import, print_function, unicode_literals
 import codecs
+import fnmatch
 import glob
 import logging
 import os
+import shutil
+import tempfile
 import textwrap
 
 import salt.loader
 import salt.utils.data
+import salt.utils.files
 import salt.utils.reactor as reactor
 import salt.utils.yaml
 
@@ -461,6 +465,121 @@ class TestReactor(TestCase, AdaptedConfigurationTestCaseMixin):
                                     self.assertEqual(reactions, LOW_CHUNKS[tag])
 
 
+@skipIf(NO_MOCK, NO_MOCK_REASON)
+class TestReactorCache(TestCase, AdaptedConfigurationTestCaseMixin):
+    '''
+    Tests for the compiled reactor map and the cached reaction renders
+    '''
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, ignore_errors=True)
+        self.opts = self.get_temp_config('master')
+
+    def _reactor(self, react_map):
+        self.opts['reactor'] = react_map
+        self.reactor = reactor.Reactor(self.opts)
+
+    def _write(self, name, content):
+        path = os.path.join(self.tmpdir, name)
+        with salt.utils.files.fopen(path, 'w') as fp_:
+            fp_.write(content)
+        return path
+
+    def test_list_reactors_like_fnmatch(self):
+        '''
+        Ensure that the compiled reactor map matches tags the way fnmatch
+        does and keeps the order of the reactor map.
+        '''
+        react_map = [
+            {'salt/minion/*/start': ['/srv/reactor/start.sls']},
+            {'salt/auth': '/srv/reactor/auth.sls'},
+            {'salt/job/*/ret/*': ['/srv/reactor/ret.sls']},
+            {'*': ['/srv/reactor/all.sls']},
+            {'salt/minion/web?/start': ['/srv/reactor/web.sls']},
+            {'salt/minion/[ab]*/start': ['/srv/reactor/ab.sls']},
+            {'salt/auth': ['/srv/reactor/auth2.sls']},
+            'not a dict',
+            {'too': 'many', 'keys': 'here'},
+        ]
+        self._reactor(react_map)
+        tags = ('salt/minion/web1/start', 'salt/minion/alpha/start', 'salt/auth',
+                'salt/job/20180101/ret/web1', 'salt/minion', 'custom/tag', '')
+        for tag in tags:
+            expected = []
+            for ropt in react_map:
+                if isinstance(ropt, dict) and len(ropt) == 1:
+                    key, val = next(iter(ropt.items()))
+                    if fnmatch.fnmatch(tag, key):
+                        expected.extend([val] if isinstance(val, str) else val)
+            self.assertEqual(self.reactor.list_reactors(tag), expected, tag)
+
+    def test_reactor_map_reloaded_on_change(self):
+        '''
+        Ensure that the reactor map file is only parsed again after it changed
+        '''
+        self._reactor(self._write('reactor.conf', '- test/tag:\n  - /srv/one.sls\n'))
+        with patch.object(salt.utils.yaml, 'safe_load', MagicMock(wraps=salt.utils.yaml.safe_load)):
+            for _ in range(3):
+                self.assertEqual(self.reactor.list_reactors('test/tag'), ['/srv/one.sls'])
+            self.assertEqual(salt.utils.yaml.safe_load.call_count, 1)
+
+            self._write('reactor.conf', '- test/*:\n  - /srv/one.sls\n  - /srv/two.sls\n')
+            os.utime(self.opts['reactor'], (0, 0))
+            self.assertEqual(self.reactor.list_reactors('test/tag'), ['/srv/one.sls', '/srv/two.sls'])
+            self.assertEqual(salt.utils.yaml.safe_load.call_count, 2)
+
+    def test_reactor_map_reloaded_on_manage(self):
+        '''
+        Ensure that reactors added through the reactor management events are
+        matched
+        '''
+        self._reactor([{'test/tag': ['/srv/one.sls']}])
+        self.assertEqual(self.reactor.list_reactors('test/other'), [])
+        self.reactor.add_reactor('test/other', ['/srv/two.sls'])
+        self.reactor._react_map_stamp = None
+        self.assertEqual(self.reactor.list_reactors('test/other'), ['/srv/two.sls'])
+
+    def test_subscribe_reactor_tags(self):
+        '''
+        Ensure that the reactor only subscribes to the tags in the reactor map
+        '''
+        self._reactor([{'salt/minion/*/start': ['/srv/one.sls']},
+                       {'custom/tag': ['/srv/two.sls']}])
+        self.reactor.event = MagicMock()
+        with patch('salt.utils.platform.is_windows', MagicMock(return_value=False)):
+            self.reactor.list_reactors('custom/tag')
+            self.reactor.event.subscribe_prefixes.assert_called_once_with(
+                set(['salt/minion/', 'custom/tag', 'salt/reactors/manage/']))
+
+            self.reactor.add_reactor('*', ['/srv/all.sls'])
+            self.reactor._react_map_stamp = None
+            self.reactor.list_reactors('custom/tag')
+            self.reactor.event.subscribe_prefixes.assert_called_with(None)
+
+    def test_static_reaction_cached(self):
+        '''
+        Ensure that reaction files which do not use the event are rendered
+        once, and reaction files which do are rendered for every event.
+        '''
+        self._reactor([])
+        static = self._write('static.sls', 'ping:\n  local.test.ping:\n    - tgt: \'*\'\n')
+        dynamic = self._write('dynamic.sls', 'ping:\n  local.test.ping:\n    - tgt: {{ data[\'id\'] }}\n')
+        with patch.object(self.reactor, 'render_template',
+                          MagicMock(wraps=self.reactor.render_template)):
+            for minion_id in ('web1', 'web2'):
+                react = self.reactor.render_reaction(static, 'test/tag', {'id': minion_id})
+                self.assertIn({'tgt': '*'}, react['ping']['local'])
+                react = self.reactor.render_reaction(dynamic, 'test/tag', {'id': minion_id})
+                self.assertIn({'tgt': minion_id}, react['ping']['local'])
+            self.assertEqual(self.reactor.render_template.call_count, 3)
+
+            self._write('static.sls', 'ping:\n  local.test.ping:\n    - tgt: web\n')
+            os.utime(static, (0, 0))
+            react = self.reactor.render_reaction(static, 'test/tag', {'id': 'web1'})
+            self.assertIn({'tgt': 'web'}, react['ping']['local'])
+            self.assertEqual(self.reactor.render_template.call_count, 4)
+
+
 @skipIf(NO_MOCK, NO_MOCK_REASON)
 class TestReactWrap(TestCase, AdaptedConfigurationTestCaseMixin):
     '''
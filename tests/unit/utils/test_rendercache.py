@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+# Import python libs
+from __future__ import absolute_import, unicode_literals
+import os
+import shutil
+import tempfile
+
+# Import Salt Libs
+import salt.utils.files
+import salt.utils.rendercache
+import salt.utils.templates
+from salt.ext import six
+
+# Import Salt Testing Libs
+from tests.support.paths import TMP
+from tests.support.unit import TestCase, skipIf
+
+
+def jinja_render():
+    pass
+
+
+jinja_render.__module__ = 'salt.loaded.int.render.jinja'
+
+
+def py_render():
+    pass
+
+
+py_render.__module__ = 'salt.loaded.int.render.py'
+
+
+@skipIf(six.PY2, 'The render cache is only used on Python 3')
+class RenderCacheTestCase(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp(dir=TMP)
+        self.sls = os.path.join(self.tmp_dir, 'users.sls')
+        self.template = os.path.join(self.tmp_dir, 'map.jinja')
+        for path in (self.sls, self.template):
+            with salt.utils.files.fopen(path, 'w') as fp_:
+                fp_.write('data')
+        salt.utils.rendercache._CACHE = None
+        self.renders = 0
+
+    def tearDown(self):
+        salt.utils.rendercache._CACHE = None
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def _tracker(self, grains):
+        tracker = salt.utils.rendercache.Tracker({}, ['grains.get'])
+        grains = tracker.track('grains', grains)
+        functions = tracker.functions({'grains.get': grains.get,
+                                       'cmd.run': lambda cmd: cmd})
+        return tracker, grains, functions
+
+    def _render(self, tracker, render, pipe=((jinja_render, ''),)):
+        def _render():
+            self.renders += 1
+            return render()
+        return tracker.render(self.sls, 'base', 'users', pipe, {}, _render)
+
+    def test_shared_between_same_reads(self):
+        tracker, grains, _ = self._tracker({'os': 'Debian', 'id': 'web01'})
+        self.assertEqual(
+            self._render(tracker, lambda: {'pkg': grains['os']}),
+            {'pkg': 'Debian'})
+        tracker, grains, _ = self._tracker({'os': 'Debian', 'id': 'web02'})
+        self.assertEqual(
+            self._render(tracker, lambda: {'pkg': grains['os']}),
+            {'pkg': 'Debian'})
+        self.assertEqual(self.renders, 1)
+        tracker, grains, _ = self._tracker({'os': 'RedHat', 'id': 'web03'})
+        self.assertEqual(
+            self._render(tracker, lambda: {'pkg': grains['os']}),
+            {'pkg': 'RedHat'})
+        self.assertEqual(self.renders, 2)
+        self.assertEqual(salt.utils.rendercache.pop_stats(),
+                         {'hits': 1, 'misses': 2, 'uncacheable': 0})
+
+    def test_whole_dict_read(self):
+        def _update(grains):
+            ret = {}
+            ret.update(grains)
+            return ret
+        copies = (
+            dict,
+            _update,
+            lambda grains: dict(**grains),
+            lambda grains: {'id': '{id}'.format(**grains)},
+        )
+        for copy_ in copies:
+            salt.utils.rendercache._CACHE = None
+            self.renders = 0
+            for minion in ('web01', 'web02'):
+                tracker, grains, _ = self._tracker(
+                    {'os': 'Debian', 'id': minion})
+                data = self._render(tracker, lambda: copy_(grains))
+                self.assertEqual(data['id'], minion)
+            self.assertEqual(self.renders, 2)
+
+    def test_uncacheable_jinja(self):
+        templates = (
+            '{{ [1, 2, 3] | random }}',
+            '{{ 100 | random_hash }}',
+            '{{ 100 | rand_str }}',
+            '{{ 32 | random_str }}',
+            '{{ "web" | uuid }}',
+            '{{ None | strftime }}',
+            '{{ lipsum(1) }}',
+        )
+        for tmpl in templates:
+            salt.utils.rendercache._CACHE = None
+            self.renders = 0
+            for _ in range(2):
+                tracker, _, _ = self._tracker({})
+                self._render(tracker, lambda: {
+                    'data': salt.utils.templates.render_jinja_tmpl(
+                        tmpl, {'opts': {}, 'saltenv': None})})
+            self.assertEqual(self.renders, 2, tmpl)
+            self.assertEqual(
+                salt.utils.rendercache.pop_stats()['uncacheable'], 2)
+        # Other filters are fine
+        for _ in range(2):
+            tracker, _, _ = self._tracker({})
+            self._render(tracker, lambda: {
+                'data': salt.utils.templates.render_jinja_tmpl(
+                    '{{ "web" | upper }}', {'opts': {}, 'saltenv': None})})
+        self.assertEqual(self.renders, 3)
+
+    def test_functions(self):
+        for minion in ('web01', 'web02'):
+            tracker, _, functions = self._tracker({'os': 'Debian', 'id': minion})
+            self._render(tracker, lambda: {'pkg': functions.grains.get('os')})
+        self.assertEqual(self.renders, 1)
+        with salt.utils.files.fopen(self.sls, 'w') as fp_:
+            fp_.write('changed')
+        for minion in ('web01', 'web02'):
+            tracker, _, functions = self._tracker({'os': 'Debian', 'id': minion})
+            self._render(tracker, lambda: {'up': functions['cmd.run']('uptime')})
+        self.assertEqual(self.renders, 3)
+
+    def test_template_change(self):
+        def _render():
+            salt.utils.rendercache.read_file(self.template)
+            return {'pkg': 'vim'}
+        tracker, _, _ = self._tracker({})
+        self._render(tracker, _render)
+        self._render(tracker, _render)
+        self.assertEqual(self.renders, 1)
+        with salt.utils.files.fopen(self.template, 'w') as fp_:
+            fp_.write('changed')
+        self._render(tracker, _render)
+        self.assertEqual(self.renders, 2)
+
+    def test_uncacheable(self):
+        def _change():
+            grains['os'] = 'Debian'
+            return {}
+        for _ in range(2):
+            tracker, grains, _ = self._tracker({})
+            self._render(tracker, _change)
+            self._render(tracker, dict, pipe=((py_render, ''),))
+        self.assertEqual(self.renders, 4)
+        self.assertEqual(salt.utils.rendercache.pop_stats()['uncacheable'], 4)
+
+    def test_cached_copy(self):
+        tracker, _, _ = self._tracker({})
+        self._render(tracker, lambda: {'include': ['common']}).pop('include')
+        self.assertEqual(self._render(tracker, dict), {'include': ['common']})
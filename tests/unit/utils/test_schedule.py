@@ -331,3 +331,39 @@ class ScheduleTestCase(TestCase):
         self.schedule.eval()
         self.assertTrue(self.schedule.opts['schedule']['testjob']['_splay'] >
                         self.schedule.opts['schedule']['testjob']['_next_fire_time'])
+
+    def test_eval_only_due_jobs(self):
+        '''
+        Tests eval only evaluates the jobs whose next fire time has come
+        '''
+        self.schedule.opts.update({'pillar': {'schedule': {}}})
+        self.schedule.opts.update({'schedule': {'testjob': {'function': 'test.true', 'seconds': 60}}})
+        now = datetime.datetime(2017, 11, 29, 14)
+        with patch.object(self.schedule, '_run_job', MagicMock()) as run_job, \
+                patch.object(self.schedule, '_check_max_running',
+                             MagicMock(side_effect=lambda func, data, opts, now: data)):
+            self.schedule.eval(now=now)
+            self.assertEqual(self.schedule.time_to_next_eval(now=now), 60)
+            self.schedule.eval(now=now + datetime.timedelta(seconds=30))
+            self.assertEqual(self.schedule.opts['schedule']['testjob']['_next_fire_time'],
+                             now + datetime.timedelta(seconds=60))
+            self.assertFalse(run_job.called)
+            self.schedule.eval(now=now + datetime.timedelta(seconds=60))
+            self.assertEqual(run_job.call_count, 1)
+        self.assertEqual(self.schedule.time_to_next_eval(now=now + datetime.timedelta(seconds=60)), 60)
+
+    def test_eval_requeue_modified_job(self):
+        '''
+        Tests a job changed through the schedule methods is evaluated again
+        '''
+        self.schedule.opts.update({'pillar': {'schedule': {}}})
+        self.schedule.opts.update({'schedule': {'testjob': {'function': 'test.true', 'seconds': 60}}})
+        now = datetime.datetime(2017, 11, 29, 14)
+        self.schedule.eval(now=now)
+        with patch('salt.utils.event.get_event', MagicMock()), \
+                patch.object(self.schedule, 'persist', MagicMock()):
+            self.schedule.modify_job('testjob', {'function': 'test.true', 'seconds': 10})
+        self.assertEqual(self.schedule.time_to_next_eval(now=now), 0)
+        self.schedule.eval(now=now + datetime.timedelta(seconds=1))
+        self.assertEqual(self.schedule.opts['schedule']['testjob']['_next_fire_time'],
+                         now + datetime.timedelta(seconds=11))
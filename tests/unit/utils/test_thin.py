@@ -369,6 +369,27 @@ class SSHThinTestCase(TestCase):
         assert path == '/path/to/thin/thin.tgz'
         assert form == 'sha256'
 
+    @patch('salt.utils.hashutils.get_hash', MagicMock(return_value=12345))
+    def test_thin_sum_cached(self):
+        '''
+        Test thin.thin_sum function only hashes the tarball again once it
+        changed.
+
+        :return:
+        '''
+        thintar = os.path.abspath(__file__)
+        with patch('salt.utils.thin.gen_thin', MagicMock(return_value=thintar)), \
+                patch.dict(thin._THIN_SUMS, {}):
+            assert thin.thin_sum('/cachedir', form='sha256')[1] == 12345
+            assert thin.thin_sum('/cachedir', form='sha256')[1] == 12345
+            assert thin.salt.utils.hashutils.get_hash.call_count == 1
+            thin.thin_sum('/cachedir', form='sha1')
+            assert thin.salt.utils.hashutils.get_hash.call_count == 2
+            checksum = thin._THIN_SUMS[(thintar, 'sha256')][1]
+            thin._THIN_SUMS[(thintar, 'sha256')] = (None, checksum)
+            thin.thin_sum('/cachedir', form='sha256')
+            assert thin.salt.utils.hashutils.get_hash.call_count == 3
+
     @patch('salt.utils.thin.gen_min', MagicMock(return_value='/path/to/thin/min.tgz'))
     @patch('salt.utils.hashutils.get_hash', MagicMock(return_value=12345))
     def test_min_sum(self):